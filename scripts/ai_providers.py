@@ -0,0 +1,764 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI provider 공통 클라이언트 (OpenAI · Grok(xAI) · Gemini)
+
+보고서 스크립트(3ai, openai_grok, collaborative, gemini, openai)와 discuss_report, list_*_models,
+test_grok_models가 모두 이 모듈로 요청을 만들고 보낸다. 스크립트마다 따로 있던 요청 조립·폴백·재시도를
+한곳에 모아 아래 동작이 모든 경로에 똑같이 적용된다.
+
+- 레지스트리: PROVIDERS(기본 URL·키 env·인증 방식), MODEL_CHAINS(provider·용도별 폴백 순서), PRICE_PER_1M
+- 연결 재사용: provider 공통 requests.Session (keep-alive 연결 풀)
+- 속도 제한: <PROVIDER>_MAX_RPM (분당 요청 수, 예: GEMINI_MAX_RPM=10) → 같은 provider 요청 간 최소 간격
+- 재시도: 429/503·네트워크 오류는 2·4초(Retry-After 헤더가 있으면 그 값, 최대 60초) 대기 후 재시도, 나머지 오류는 다음 모델
+- 캐시: GET(모델 목록 등) 프로세스 내 5분 캐시. 생성 응답은 AI_RESPONSE_CACHE_DIR 설정 시 같은 요청 본문을 디스크에서 재사용 (기본 끔)
+- 사용량: 성공 호출마다 usage_ledger 원장 기록(USAGE_RUN의 run_id·step) + run_trace span(call → model → http)
+
+사용 예:
+    text, model = ai_providers.call_openai(key, prompt, preferred_model="gpt-5.2", system_content=sys_text)
+    text, model = ai_providers.call_grok(key, prompt, use_web_search=False)
+    reply, model = ai_providers.chat_gemini(key, messages)
+    ids, err = ai_providers.list_models("grok", key)
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import usage_ledger
+import run_trace
+
+PROJECT_ROOT = Path(__file__).parent.parent
+RequestException = requests.exceptions.RequestException
+
+# provider 레지스트리. auth: bearer(Authorization 헤더) | query(?key=)
+PROVIDERS = {
+    "openai": {"label": "OpenAI", "key_env": "OPENAI_API_KEY", "base_url_env": "OPENAI_BASE_URL",
+               "base_url": "https://api.openai.com/v1", "auth": "bearer"},
+    "grok": {"label": "Grok", "key_env": "GROK_API_KEY", "base_url_env": "GROK_BASE_URL",
+             "base_url": "https://api.x.ai/v1", "auth": "bearer"},
+    "gemini": {"label": "Gemini", "key_env": "GEMINI_API_KEY", "base_url_env": "GEMINI_BASE_URL",
+               "base_url": "https://generativelanguage.googleapis.com/v1beta", "auth": "query"},
+}
+
+# (provider, 용도) → 폴백 순서. 기본 모델보다 비싼 모델은 넣지 않음 (gpt-5.2-pro, grok-4/4-0709, gemini pro 계열 제외)
+MODEL_CHAINS = {
+    ("openai", "generate"): ["gpt-5.2", "gpt-5.2-2025-12-11", "gpt-4o", "gpt-4-turbo", "gpt-4", "gpt-3.5-turbo"],
+    ("openai", "chat"): ["gpt-4o", "gpt-4-turbo", "gpt-4", "gpt-3.5-turbo"],
+    ("grok", "web_search"): ["grok-4-1-fast-reasoning", "grok-4-1-fast", "grok-4-1-fast-non-reasoning",
+                             "grok-4-fast-reasoning", "grok-4-fast", "grok-4-fast-non-reasoning", "grok-3", "grok-3-mini"],
+    ("grok", "generate"): ["grok-4-1-fast-reasoning", "grok-4-1-fast-non-reasoning", "grok-4-fast-reasoning",
+                           "grok-4-fast-non-reasoning", "grok-3", "grok-3-mini"],
+    ("grok", "chat"): ["grok-4-1-fast-reasoning", "grok-4-1-fast-non-reasoning", "grok-3", "grok-3-mini"],
+    ("gemini", "generate"): ["gemini-3-flash-preview", "gemini-3-flash", "gemini-2.5-flash", "gemini-pro"],
+    ("gemini", "chat"): ["gemini-3-flash-preview", "gemini-2.5-flash", "gemini-pro"],
+}
+
+# Chat Completions이 아닌 Responses API(v1/responses)를 써야 하는 OpenAI 모델 (Thinking/Reasoning 지원)
+OPENAI_RESPONSES_API_MODELS = ("gpt-5.2", "gpt-5.2-2025-12-11", "gpt-5.2-pro", "gpt-5.2-pro-2025-12-11")
+# reasoning_effort 미지정 시 (파이프라인 단계 options.reasoning_effort로 덮어씀)
+DEFAULT_REASONING_EFFORT = "medium"
+
+# system 지시가 없을 때 기본값
+DEFAULT_SYSTEM = {
+    "openai": "당신은 전문적인 포트폴리오 매니저입니다. 정확하고 상세한 포트폴리오 보고서를 작성합니다.",
+    "grok": "당신은 전문적인 포트폴리오 보고서 리뷰어입니다. 보고서의 정확성, 완성도, 논리성을 검토하고 구체적인 개선 사항을 제안합니다.",
+}
+
+# ---------------------------------------------------------------------------
+# temperature: CAGR 등 수치 예측의 "실행 간 변동"을 줄이기 위해 0으로 통일.
+# - temperature > 0 이면 같은 프롬프트라도 매 호출마다 다른 토큰이 샘플링되어
+#   예측 CAGR(12% vs 17% vs 19%)이 크게 달라질 수 있음.
+# - 0으로 두면 "가장 확률 높은 답" 위주로 출력되어 실행마다 숫자가 상대적으로 안정됨.
+# - 참고: web_search/검색 결과 차이로 인한 변동은 temperature와 무관하게 남을 수 있음.
+# ---------------------------------------------------------------------------
+API_TEMPERATURE = 0
+
+# 1M tokens당 USD (입력, 출력). 알 수 없는 모델은 provider 기본 모델 수준으로 추정 (docs/Model_Price_Comparison.md 참고)
+PRICE_PER_1M = {
+    "openai": {
+        "gpt-5.2": (1.75, 14.0), "gpt-5.2-2025-12-11": (1.75, 14.0),
+        "gpt-5.2-pro": (21.0, 168.0), "gpt-5.2-pro-2025-12-11": (21.0, 168.0),
+        "gpt-4o": (2.5, 10.0), "gpt-4o-mini": (0.15, 0.6), "gpt-4-turbo": (10.0, 30.0), "gpt-4": (30.0, 60.0),
+        "gpt-3.5-turbo": (0.5, 1.5),
+    },
+    "grok": {
+        "grok-4-1-fast-reasoning": (0.20, 0.50), "grok-4-1-fast": (0.20, 0.50), "grok-4-1-fast-non-reasoning": (0.20, 0.50),
+        "grok-4-fast-reasoning": (0.20, 0.50), "grok-4-fast": (0.20, 0.50), "grok-4-fast-non-reasoning": (0.20, 0.50),
+        "grok-3": (3.0, 15.0), "grok-3-mini": (0.5, 2.0),
+    },
+    "gemini": {
+        "gemini-3-flash-preview": (0.50, 3.0), "gemini-3-flash": (0.50, 3.0),
+        "gemini-2.5-flash": (0.30, 2.5), "gemini-2.5-pro": (1.25, 10.0),
+        "gemini-3-pro-preview": (2.0, 12.0), "gemini-3-pro": (2.0, 12.0), "gemini-pro": (0.5, 1.5),
+    },
+}
+DEFAULT_PRICE = {"openai": (1.75, 14.0), "grok": (0.20, 0.50), "gemini": (0.50, 3.0)}
+
+RETRY_STATUSES = (429, 503)
+MAX_RETRY_AFTER_S = 60
+GET_CACHE_TTL_S = 300
+RESPONSE_CACHE_ENV = "AI_RESPONSE_CACHE_DIR"
+
+_SESSION = {"session": None}
+_LOCK = threading.Lock()
+_LAST_REQUEST = {}
+_GET_CACHE = {}
+
+
+# ---------------------------------------------------------------------------
+# 레지스트리 조회
+# ---------------------------------------------------------------------------
+
+def base_url(provider):
+    """provider API 기본 URL (끝 / 없음). *_BASE_URL 환경 변수 우선 (로컬 모의 서버 등)."""
+    p = PROVIDERS[provider]
+    return (os.environ.get(p["base_url_env"]) or p["base_url"]).rstrip("/")
+
+
+def api_key(provider):
+    """환경 변수의 API 키 (없으면 None)."""
+    return os.environ.get(PROVIDERS[provider]["key_env"])
+
+
+def models(provider, purpose="generate", preferred=None):
+    """폴백 순서 목록. preferred가 있으면 맨 앞 (목록에 없던 모델도 허용)."""
+    chain = list(MODEL_CHAINS[(provider, purpose)])
+    if preferred:
+        if preferred in chain:
+            chain.remove(preferred)
+        chain.insert(0, preferred)
+    return chain
+
+
+def get_price(provider, model):
+    """(input_per_1M, output_per_1M) USD. 없으면 provider 기본값."""
+    d = PRICE_PER_1M.get(provider, {})
+    if model in d:
+        return d[model]
+    return DEFAULT_PRICE.get(provider, (1.0, 5.0))
+
+
+# ---------------------------------------------------------------------------
+# 사용량 원장
+# ---------------------------------------------------------------------------
+
+# 호출 1건마다 report/.usage_ledger.sqlite3(usage_ledger.py)에 append. run_id로 실행, step으로 단계 구분
+USAGE_RUN = {"run_id": usage_ledger.new_run_id(), "step": None}
+# 병렬 단계(pipeline_engine) 작업 스레드의 단계명. 설정돼 있으면 USAGE_RUN["step"]보다 우선
+_THREAD = threading.local()
+
+
+def start_usage_run():
+    """새 실행 ID 발급. 이후 기록은 이 run_id로 묶인다."""
+    USAGE_RUN["run_id"] = usage_ledger.new_run_id()
+    USAGE_RUN["step"] = None
+
+
+def set_thread_step(step):
+    """현재 스레드에서만 쓰는 단계명 (병렬 단계용). None이면 해제 → USAGE_RUN["step"] 사용."""
+    _THREAD.step = step
+
+
+def current_step():
+    return getattr(_THREAD, "step", None) or USAGE_RUN["step"]
+
+
+def estimate_tokens(text):
+    """대략적 토큰 수 (문자 수/4, 최소 1)."""
+    if not text:
+        return 0
+    return max(1, len(str(text)) // 4)
+
+
+def log_usage(provider, model, input_tokens, output_tokens, latency_s=None):
+    """호출당 사용량·비용을 원장에 기록하고 현재 추적 span에 토큰·비용 기록. latency_s는 성공한 HTTP 호출 1회 소요(초)."""
+    model = model or "unknown"
+    price_in, price_out = get_price(provider, model)
+    cost = (int(input_tokens or 0) / 1_000_000) * price_in + (int(output_tokens or 0) / 1_000_000) * price_out
+    usage_ledger.record_usage(
+        USAGE_RUN["run_id"], provider, model, input_tokens, output_tokens, cost,
+        step=current_step(), latency_s=latency_s,
+    )
+    run_trace.set_attrs(input_tokens=int(input_tokens or 0), output_tokens=int(output_tokens or 0), cost_usd=round(cost, 6))
+
+
+# ---------------------------------------------------------------------------
+# HTTP: 연결 풀 · 속도 제한 · 추적 · 재시도 · 캐시
+# ---------------------------------------------------------------------------
+
+def session():
+    """provider 공통 Session (keep-alive 연결 재사용)."""
+    if _SESSION["session"] is None:
+        s = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(PROVIDERS) + 2, pool_maxsize=8)
+        s.mount("https://", adapter)
+        s.mount("http://", adapter)
+        _SESSION["session"] = s
+    return _SESSION["session"]
+
+
+def _max_rpm(provider):
+    try:
+        v = float(os.environ.get(f"{provider.upper()}_MAX_RPM") or 0)
+        return v if v > 0 else None
+    except ValueError:
+        return None
+
+
+def _throttle(provider):
+    """<PROVIDER>_MAX_RPM이 있으면 같은 provider 직전 요청과의 간격을 60/RPM초 이상으로 맞춘다."""
+    rpm = _max_rpm(provider)
+    if not rpm:
+        return
+    interval = 60.0 / rpm
+    with _LOCK:
+        now = time.monotonic()
+        wait = _LAST_REQUEST.get(provider, 0.0) + interval - now
+        _LAST_REQUEST[provider] = now + max(wait, 0.0)
+    if wait > 0:
+        run_trace.add_attrs(throttle_wait_s=round(wait, 3))
+        time.sleep(wait)
+
+
+def _request(method, provider, path, api_key=None, body=None, timeout=180):
+    """HTTP 1회 (추적 span http). URL의 ?key=는 기록하지 않음."""
+    url = f"{base_url(provider)}{path}"
+    headers = {"Content-Type": "application/json"}
+    params = None
+    if api_key:
+        if PROVIDERS[provider]["auth"] == "bearer":
+            headers["Authorization"] = f"Bearer {api_key}"
+        else:
+            params = {"key": api_key}
+    _throttle(provider)
+    with run_trace.span("http", method, url=url.split("?", 1)[0]) as sp:
+        if body is not None:
+            sp["attrs"]["request_bytes"] = len(json.dumps(body, ensure_ascii=False).encode("utf-8"))
+        response = session().request(method, url, headers=headers, params=params, json=body, timeout=timeout)
+        sp["attrs"]["status_code"] = response.status_code
+        sp["attrs"]["response_bytes"] = len(response.content)
+        if response.status_code != 200:
+            sp["status"] = "error"
+        return response
+
+
+def http_post(provider, path, body, api_key=None, timeout=180):
+    """POST 1회 (재시도 없음). 반환: requests.Response. 네트워크 오류는 RequestException."""
+    return _request("POST", provider, path, api_key=api_key, body=body, timeout=timeout)
+
+
+def http_get(provider, path, api_key=None, timeout=30):
+    """GET 1회 (캐시 없음). 반환: requests.Response."""
+    return _request("GET", provider, path, api_key=api_key, timeout=timeout)
+
+
+def get_json(provider, path, api_key=None, timeout=30, cache_ttl_s=GET_CACHE_TTL_S):
+    """GET → (json, None) 또는 (None, 오류 문자열). 성공 응답은 cache_ttl_s 동안 프로세스 내 캐시."""
+    key = (provider, base_url(provider), path, hashlib.sha256((api_key or "").encode()).hexdigest())
+    hit = _GET_CACHE.get(key)
+    if hit and time.monotonic() - hit[0] < cache_ttl_s:
+        return hit[1], None
+    try:
+        r = http_get(provider, path, api_key=api_key, timeout=timeout)
+        if r.status_code != 200:
+            return None, f"HTTP {r.status_code}"
+        data = r.json()
+    except (RequestException, ValueError) as e:
+        return None, str(e)
+    _GET_CACHE[key] = (time.monotonic(), data)
+    return data, None
+
+
+def retry_sleep(wait_s):
+    """재시도 대기. 현재 추적 span(폴백 모델 시도)에 retries·retry_wait_s 누적."""
+    run_trace.add_attrs(retries=1, retry_wait_s=wait_s)
+    time.sleep(wait_s)
+
+
+def _retry_wait(response, attempt):
+    """Retry-After(초) 헤더가 있으면 그 값(최대 60초), 없으면 (attempt+1)*2초."""
+    ra = response.headers.get("Retry-After") if response is not None else None
+    try:
+        if ra is not None:
+            return min(max(float(ra), 0.0), MAX_RETRY_AFTER_S)
+    except ValueError:
+        pass
+    return (attempt + 1) * 2
+
+
+def post_json(provider, path, body, api_key=None, timeout=180, max_retries=3, on_retry_status=None):
+    """POST + 429/503·네트워크 오류 재시도. 반환: (response, None) 또는 (None, 네트워크 오류 문자열).
+    마지막 시도까지 429/503이면 그 응답을 그대로 반환. on_retry_status(response): 429/503 응답마다 호출."""
+    for attempt in range(max_retries):
+        last = attempt == max_retries - 1
+        try:
+            response = http_post(provider, path, body, api_key=api_key, timeout=timeout)
+        except RequestException as e:
+            if last:
+                return None, str(e)
+            wait_s = (attempt + 1) * 2
+            print(f"   네트워크 오류 - {wait_s}초 후 재시도... (시도 {attempt + 1}/{max_retries})")
+            retry_sleep(wait_s)
+            continue
+        if response.status_code in RETRY_STATUSES:
+            if on_retry_status:
+                on_retry_status(response)
+            if not last:
+                wait_s = _retry_wait(response, attempt)
+                print(f"   서버 오류 ({response.status_code}) - {wait_s:g}초 후 재시도... (시도 {attempt + 1}/{max_retries})")
+                retry_sleep(wait_s)
+                continue
+        return response, None
+    return None, "max_retries"
+
+
+def _response_cache_path(provider, path, body):
+    d = os.environ.get(RESPONSE_CACHE_ENV)
+    if not d:
+        return None
+    digest = hashlib.sha256(json.dumps([provider, path, body], ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+    cache_dir = Path(d)
+    if not cache_dir.is_absolute():
+        cache_dir = PROJECT_ROOT / cache_dir
+    return cache_dir / f"{provider}_{digest[:32]}.json"
+
+
+def _attempt(provider, path, body, api_key, model, parse, est_input, est_output_factor=1, timeout=180,
+             max_retries=3, on_retry_status=None):
+    """모델 1개 생성 시도: 캐시 조회 → POST(재시도) → parse(result) → 원장 기록.
+    parse(result) → (text, (input_tokens, output_tokens) 또는 None).
+    반환: (text, status_code, 오류 문자열). 네트워크 실패 status_code=0."""
+    cache_path = _response_cache_path(provider, path, body)
+    if cache_path is not None and cache_path.exists():
+        try:
+            text, _ = parse(json.loads(cache_path.read_text(encoding="utf-8")))
+            if text:
+                run_trace.set_attrs(cached=True)
+                print(f"   [캐시] {provider} {model} 응답 재사용 ({cache_path.name})")
+                return text, 200, None
+        except (OSError, ValueError, KeyError, IndexError, TypeError):
+            pass
+    t_call = time.perf_counter()
+    response, err = post_json(provider, path, body, api_key=api_key, timeout=timeout,
+                              max_retries=max_retries, on_retry_status=on_retry_status)
+    if response is None:
+        return None, 0, err
+    if response.status_code != 200:
+        return None, response.status_code, response.text
+    try:
+        result = response.json()
+        text, usage = parse(result)
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        return None, 200, f"응답 형식 오류: {e}"
+    if not text:
+        return None, 200, "응답 본문에 텍스트 없음"
+    latency = time.perf_counter() - t_call
+    if usage and usage[0] and usage[1]:
+        log_usage(provider, model, usage[0], usage[1], latency_s=latency)
+    else:
+        log_usage(provider, model, (usage or (0, 0))[0] or est_input,
+                  (usage or (0, 0))[1] or estimate_tokens(text) * est_output_factor, latency_s=latency)
+    if cache_path is not None:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_text(json.dumps(result, ensure_ascii=False), encoding="utf-8")
+        except OSError as e:
+            print(f"[WARNING] 응답 캐시 저장 실패: {e}")
+    return text, 200, None
+
+
+def _call_result_attrs(result):
+    """call_* 반환값 (text, model) → 추적 span 속성."""
+    text, model = (result or (None, None))[:2]
+    return {"ok": text is not None, "model": model, "output_chars": len(text) if text else None}
+
+
+# ---------------------------------------------------------------------------
+# 요청 본문·응답 파싱
+# ---------------------------------------------------------------------------
+
+def responses_text_format(response_schema):
+    """Responses API(OpenAI·xAI 공통) text.format 값."""
+    return {"format": {"type": "json_schema", "name": response_schema["name"], "schema": response_schema["schema"], "strict": True}}
+
+
+def chat_response_format(response_schema):
+    """Chat Completions(OpenAI·xAI 공통) response_format 값."""
+    return {"type": "json_schema", "json_schema": {"name": response_schema["name"], "schema": response_schema["schema"], "strict": True}}
+
+
+def _parse_responses_api_usage(result):
+    """Responses API 응답에서 usage 추출. reasoning_tokens 포함 시 청구되는 output 토큰 합산."""
+    # 응답 구조 변형 대응 (usage, usage_metadata, response.usage 등)
+    usage = (
+        result.get("usage")
+        or result.get("usage_metadata")
+        or (result.get("response") or {}).get("usage")
+        or {}
+    )
+    inp = usage.get("input_tokens") or usage.get("prompt_tokens") or 0
+    out = usage.get("output_tokens") or usage.get("completion_tokens") or 0
+    # reasoning 모델: reasoning_tokens는 output으로 청구됨 (API에선 별도 필드)
+    out_details = usage.get("output_tokens_details") or {}
+    reasoning = out_details.get("reasoning_tokens") or 0
+    # output_tokens가 이미 reasoning 포함일 수 있음 → reasoning 있으면 별도 합산
+    out_total = int(out) + int(reasoning) if reasoning else int(out)
+    return (int(inp), out_total)
+
+
+def _parse_responses(result):
+    """Responses API: output[].message.content[].output_text → (text, usage)."""
+    for item in result.get("output") or []:
+        if item.get("type") == "message" and item.get("role") == "assistant":
+            for c in item.get("content") or []:
+                if c.get("type") == "output_text" and c.get("text"):
+                    return c["text"], _parse_responses_api_usage(result)
+    return None, None
+
+
+def _parse_chat(result):
+    """Chat Completions: choices[0].message.content → (text, usage)."""
+    if not result.get("choices"):
+        return None, None
+    usage = result.get("usage") or {}
+    return (result["choices"][0]["message"]["content"],
+            (usage.get("prompt_tokens") or usage.get("input_tokens"), usage.get("completion_tokens") or usage.get("output_tokens")))
+
+
+def _parse_gemini(result):
+    """generateContent: candidates[0].content.parts[0].text → (text, usage)."""
+    if not result.get("candidates"):
+        return None, None
+    um = result.get("usageMetadata") or {}
+    return (result["candidates"][0]["content"]["parts"][0]["text"],
+            (um.get("promptTokenCount") or um.get("inputTokenCount"), um.get("candidatesTokenCount") or um.get("outputTokenCount")))
+
+
+def _messages_to_responses_input(messages):
+    """messages = [{"role":"system"|"user"|"assistant", "content":"..."}] 를 Responses API용 instructions + input으로 변환."""
+    instructions = None
+    parts = []
+    for m in messages:
+        role, content = m.get("role"), m.get("content", "")
+        if role == "system":
+            instructions = content
+            continue
+        label = "User" if role == "user" else "Assistant"
+        parts.append(f"{label}: {content}")
+    input_text = "\n\n".join(parts) if parts else ""
+    return instructions or "You are a helpful assistant. Answer based on the conversation.", input_text
+
+
+def _messages_to_gemini(messages):
+    """messages → (system_text, contents). assistant는 model 역할."""
+    system_text = None
+    contents = []
+    for m in messages:
+        role, content = m.get("role"), m.get("content", "")
+        if role == "system":
+            system_text = content
+        elif role == "user":
+            contents.append({"role": "user", "parts": [{"text": content}]})
+        elif role == "assistant":
+            contents.append({"role": "model", "parts": [{"text": content}]})
+    return system_text, contents
+
+
+# ---------------------------------------------------------------------------
+# OpenAI
+# ---------------------------------------------------------------------------
+
+def _openai_responses(api_key, input_value, model_name, instructions=None, response_schema=None,
+                      reasoning_effort=DEFAULT_REASONING_EFFORT, max_output_tokens=32000, est_input=0):
+    """Responses API(v1/responses) 1개 모델 시도. (temperature는 API 기본값 사용)
+    reasoning 파라미터를 거부(400)하는 모델은 reasoning 없이 한 번 더 시도. 반환: (text, status, err)."""
+    # gpt-5.2 / gpt-5.2-pro 계열: reasoning_effort로 Thinking 강도 조절 (수석 매니저 의사결정용)
+    body = {"model": model_name, "input": input_value, "max_output_tokens": max_output_tokens}
+    if instructions:
+        body["instructions"] = instructions
+    if response_schema:
+        body["text"] = responses_text_format(response_schema)
+    body["reasoning"] = {"effort": reasoning_effort or DEFAULT_REASONING_EFFORT}
+    # usage 미제공 시 추정 (reasoning/Thinking 토큰 포함: 출력 ~10배)
+    text, status, err = _attempt("openai", "/responses", body, api_key, model_name, _parse_responses,
+                                 est_input, est_output_factor=10, timeout=300)
+    if status == 400:
+        body = {k: v for k, v in body.items() if k != "reasoning"}
+        text, status, err = _attempt("openai", "/responses", body, api_key, model_name, _parse_responses,
+                                     est_input, est_output_factor=10, timeout=300)
+    return text, status, err
+
+
+@run_trace.traced("call", "openai", result_attrs=_call_result_attrs)
+def call_openai(api_key, prompt, preferred_model=None, system_content=None, response_schema=None,
+                reasoning_effort=None, max_output_tokens=None, temperature=API_TEMPERATURE, models_to_try=None):
+    """OpenAI 생성 호출. gpt-5.2 계열은 v1/responses, 나머지는 v1/chat/completions.
+    response_schema가 있으면 두 API 모두 json_schema 구조화 출력. models_to_try로 폴백 목록을 직접 지정 가능.
+    반환: (text, model) 또는 (None, None)."""
+    instructions = system_content if system_content is not None else DEFAULT_SYSTEM["openai"]
+    chain = list(models_to_try) if models_to_try else models("openai", "generate", preferred_model)
+    est_input = estimate_tokens(instructions) + estimate_tokens(prompt)
+    # temperature=0: 동일 입력 시 CAGR 등 수치가 실행마다 크게 달라지는 것을 완화 (API_TEMPERATURE)
+    chat_body = {
+        "messages": [
+            {"role": "system", "content": instructions},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": temperature,
+        "max_tokens": max_output_tokens or 32000
+    }
+    if response_schema:
+        chat_body["response_format"] = chat_response_format(response_schema)
+
+    for model_name in chain:
+        responses_api = model_name in OPENAI_RESPONSES_API_MODELS
+        run_trace.enter("model", model_name, provider="openai", api="responses" if responses_api else "chat")
+        if responses_api:
+            text, status, err = _openai_responses(
+                api_key, prompt, model_name, instructions=instructions, response_schema=response_schema,
+                reasoning_effort=reasoning_effort or DEFAULT_REASONING_EFFORT, max_output_tokens=max_output_tokens or 32000, est_input=est_input,
+            )
+            path = "/responses"
+        else:
+            path = "/chat/completions"
+            text, status, err = _attempt("openai", path, {**chat_body, "model": model_name}, api_key, model_name,
+                                         _parse_chat, est_input)
+        if text is not None:
+            if model_name != chain[0]:
+                print(f"   Fallback 모델 사용: {model_name}")
+            return text, model_name
+        if status == 404:
+            print(f"   [404] 요청 URL: {base_url('openai')}{path}")
+            print(f"   [404] 응답 본문: {err}")
+        elif status != 200:
+            print(f"   [OpenAI] {model_name} 실패: {'HTTP ' + str(status) if status else '네트워크'} - {str(err)[:200]}")
+
+    print("[ERROR] 모든 OpenAI 모델 시도 실패")
+    return None, None
+
+
+def chat_openai(api_key, messages, preferred_model=None):
+    """대화 히스토리 전달 (discuss_report·디버그 대화). gpt-5.2 계열은 Responses API, 나머지는 Chat Completions."""
+    chain = list(MODEL_CHAINS[("openai", "chat")])
+    if preferred_model and preferred_model not in chain:
+        chain.insert(0, preferred_model)
+    est_input = sum(estimate_tokens(m.get("content")) for m in messages)
+    for model_name in chain:
+        if model_name in OPENAI_RESPONSES_API_MODELS:
+            instructions, input_text = _messages_to_responses_input(messages)
+            text, _, _ = _openai_responses(api_key, input_text, model_name, instructions=instructions, est_input=est_input)
+        else:
+            body = {"model": model_name, "messages": messages, "temperature": API_TEMPERATURE, "max_tokens": 8000}
+            text, _, _ = _attempt("openai", "/chat/completions", body, api_key, model_name, _parse_chat, est_input, timeout=120)
+        if text is not None:
+            return text, model_name
+    return None, None
+
+
+# ---------------------------------------------------------------------------
+# Grok (xAI)
+# ---------------------------------------------------------------------------
+
+def _grok_web_search(api_key, prompt, preferred_model, system_text, response_schema, max_output_tokens, temperature,
+                     models_to_try=None):
+    """Responses API(/v1/responses) + web_search 도구. 404/400/422(도구 미지원 등)면 중단. 반환: (text, model)."""
+    est_input = estimate_tokens(system_text) + estimate_tokens(prompt)
+    for model_name in list(models_to_try) if models_to_try else models("grok", "web_search", preferred_model):
+        run_trace.enter("model", model_name, provider="grok", api="responses", web_search=True)
+        # temperature=0: Grok 1차 CAGR 예측이 실행마다 13% vs 18% 등으로 크게 흔들리지 않도록 (API_TEMPERATURE)
+        body = {
+            "model": model_name,
+            "input": [
+                {"role": "system", "content": system_text},
+                {"role": "user", "content": prompt}
+            ],
+            "max_output_tokens": max_output_tokens or 8000,
+            "temperature": temperature,
+            "tools": [{"type": "web_search"}]
+        }
+        if response_schema:
+            body["text"] = responses_text_format(response_schema)
+        text, status, _ = _attempt("grok", "/responses", body, api_key, model_name, _parse_responses, est_input,
+                                   timeout=300, max_retries=1)
+        if text is not None:
+            print(f"   Grok 모델 사용 (web_search): {model_name}")
+            return text, model_name
+        if status in (404, 400, 422, 200):
+            break
+    return None, None
+
+
+@run_trace.traced("call", "grok", result_attrs=_call_result_attrs)
+def call_grok(api_key, prompt, preferred_model=None, use_web_search=True, system_content=None, response_schema=None,
+              max_output_tokens=None, temperature=API_TEMPERATURE, models_to_try=None):
+    """Grok 생성 호출. use_web_search=True이면 Responses API+web_search 시도 후 실패 시 Chat Completions(검색 없음)로 폴백.
+    response_schema가 있으면 두 경로 모두 json_schema 구조화 출력. max_output_tokens 기본 8000.
+    반환: (text, model) 또는 (None, None)."""
+    system_text = system_content if system_content is not None else DEFAULT_SYSTEM["grok"]
+    if use_web_search:
+        text, model_name = _grok_web_search(api_key, prompt, preferred_model, system_text, response_schema,
+                                            max_output_tokens, temperature, models_to_try)
+        if text is not None:
+            return text, model_name
+    chain = list(models_to_try) if models_to_try else models("grok", "generate", preferred_model)
+    est_input = estimate_tokens(system_text) + estimate_tokens(prompt)
+    for model_name in chain:
+        run_trace.enter("model", model_name, provider="grok", api="chat")
+        # temperature=0: Grok 폴백(Chat)에서도 CAGR 등 수치 변동 완화 (API_TEMPERATURE)
+        data = {
+            "model": model_name,
+            "messages": [
+                {"role": "system", "content": system_text},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": temperature,
+            "max_tokens": max_output_tokens or 8000
+        }
+        if response_schema:
+            data["response_format"] = chat_response_format(response_schema)
+        text, status, err = _attempt("grok", "/chat/completions", data, api_key, model_name, _parse_chat, est_input)
+        if text is not None:
+            print(f"   Grok 모델 사용: {model_name}")
+            return text, model_name
+        if status == 403:
+            print(f"   [Grok] {model_name} 권한 오류 (403): {str(err)[:200]}")
+            if model_name == chain[-1]:
+                print("[ERROR] Grok API 권한 오류 (403) - 크레딧·모델 접근 권한 확인: https://console.x.ai/")
+                return None, None
+    print("[ERROR] 모든 Grok 모델 시도 실패")
+    return None, None
+
+
+def chat_grok(api_key, messages, preferred_model=None):
+    """대화 히스토리 전달 (Chat Completions)."""
+    chain = list(MODEL_CHAINS[("grok", "chat")])
+    if preferred_model and preferred_model not in chain:
+        chain.insert(0, preferred_model)
+    est_input = sum(estimate_tokens(m.get("content")) for m in messages)
+    for model_name in chain:
+        # temperature=0: 디버그 대화에서도 수치 변동 완화 (API_TEMPERATURE)
+        body = {"model": model_name, "messages": messages, "temperature": API_TEMPERATURE, "max_tokens": 8000}
+        text, _, _ = _attempt("grok", "/chat/completions", body, api_key, model_name, _parse_chat, est_input, timeout=120)
+        if text is not None:
+            return text, model_name
+    return None, None
+
+
+# ---------------------------------------------------------------------------
+# Gemini
+# ---------------------------------------------------------------------------
+
+def _gemini_error_logger(model_name, error_log_dir):
+    """429/503 응답 시 요청 URL(키 제외)·응답 전문 출력 및 error_log_dir/gemini_last_error.txt 저장 (폴백 원인 확인용)."""
+    def log(response):
+        err_detail = (
+            f"[Gemini {response.status_code}] 요청 URL(키 제외): {base_url('gemini')}/models/{model_name}:generateContent\n"
+            f"[Gemini] 호출 방식: Python, requests (공식 SDK 미사용)\n"
+            f"[Gemini] 응답 본문 전문:\n{response.text}"
+        )
+        print(err_detail)
+        if error_log_dir is None:
+            return
+        try:
+            Path(error_log_dir).mkdir(parents=True, exist_ok=True)
+            (Path(error_log_dir) / "gemini_last_error.txt").write_text(err_detail, encoding="utf-8")
+        except Exception:
+            pass
+    return log
+
+
+@run_trace.traced("call", "gemini", result_attrs=_call_result_attrs)
+def call_gemini(api_key, prompt, preferred_model=None, system_content=None, response_schema=None, max_output_tokens=None,
+                temperature=API_TEMPERATURE, use_search=True, generation_config=None, models_to_try=None, error_log_dir=None):
+    """Gemini generateContent 호출. use_search=True면 Google Search 도구 사용.
+    response_schema가 있으면 responseMimeType=application/json + responseJsonSchema 구조화 출력
+    (검색 도구와 함께 거부(400)되면 도구만 빼고 같은 모델 재시도). generation_config: topP 등 추가 설정.
+    반환: (text, model) 또는 (None, None)."""
+    chain = list(models_to_try) if models_to_try else models("gemini", "generate", preferred_model)
+    est_input = estimate_tokens(system_content) + estimate_tokens(prompt)
+    for model_name in chain:
+        run_trace.enter("model", model_name, provider="gemini", api="generateContent")
+        # temperature=0: Gemini 1차 CAGR(β) 예측이 실행마다 크게 흔들리지 않도록 (API_TEMPERATURE)
+        data = {
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": {"temperature": temperature, "maxOutputTokens": max_output_tokens or 8000, **(generation_config or {})},
+        }
+        if use_search:
+            data["tools"] = [{"google_search": {}}]
+        if system_content:
+            data["systemInstruction"] = {"parts": [{"text": system_content}]}
+        if response_schema:
+            data["generationConfig"]["responseMimeType"] = "application/json"
+            data["generationConfig"]["responseJsonSchema"] = response_schema["schema"]
+        path = f"/models/{model_name}:generateContent"
+        on_retry = _gemini_error_logger(model_name, error_log_dir)
+        text, status, _ = _attempt("gemini", path, data, api_key, model_name, _parse_gemini, est_input, on_retry_status=on_retry)
+        if status == 400 and response_schema and "tools" in data:
+            # 구조화 출력 + google_search 동시 사용 미지원 모델: 검색 도구만 빼고 같은 모델 재시도
+            data = {k: v for k, v in data.items() if k != "tools"}
+            text, status, _ = _attempt("gemini", path, data, api_key, model_name, _parse_gemini, est_input, on_retry_status=on_retry)
+        if text is not None:
+            print(f"   Gemini 모델 사용: {model_name}")
+            return text, model_name
+    print("[ERROR] 모든 Gemini 모델 시도 실패")
+    return None, None
+
+
+def chat_gemini(api_key, messages, preferred_model=None):
+    """대화 히스토리 전달. system 메시지는 systemInstruction으로."""
+    chain = list(MODEL_CHAINS[("gemini", "chat")])
+    if preferred_model and preferred_model not in chain:
+        chain.insert(0, preferred_model)
+    system_text, contents = _messages_to_gemini(messages)
+    est_input = sum(estimate_tokens(m.get("content")) for m in messages)
+    for model_name in chain:
+        # temperature=0: 디버그 대화에서도 수치 변동 완화 (API_TEMPERATURE)
+        data = {"contents": contents, "generationConfig": {"temperature": API_TEMPERATURE, "maxOutputTokens": 8000}}
+        if system_text:
+            data["systemInstruction"] = {"parts": [{"text": system_text}]}
+        text, _, _ = _attempt("gemini", f"/models/{model_name}:generateContent", data, api_key, model_name,
+                              _parse_gemini, est_input, timeout=120)
+        if text is not None:
+            return text, model_name
+    return None, None
+
+
+# ---------------------------------------------------------------------------
+# 공통 진입점
+# ---------------------------------------------------------------------------
+
+CALLS = {"openai": call_openai, "grok": call_grok, "gemini": call_gemini}
+CHATS = {"openai": chat_openai, "grok": chat_grok, "gemini": chat_gemini}
+
+
+def generate(provider, api_key, prompt, **kwargs):
+    """provider 이름으로 call_* 호출. 반환: (text, model)."""
+    return CALLS[provider](api_key, prompt, **kwargs)
+
+
+def chat(provider, api_key, messages, preferred_model=None):
+    """provider 이름으로 chat_* 호출. 반환: (text, model)."""
+    return CHATS[provider](api_key, messages, preferred_model)
+
+
+def list_models(provider, api_key):
+    """사용 가능한 모델 ID 목록 (Gemini는 generateContent 지원만). 반환: (정렬된 목록, None) 또는 (None, 오류)."""
+    data, err = get_json(provider, "/models", api_key=api_key)
+    if err:
+        return None, err
+    if provider == "gemini":
+        ids = []
+        for m in data.get("models", []):
+            if "generateContent" in m.get("supportedGenerationMethods", []):
+                name = m.get("name", "").split("/")[-1]
+                if name:
+                    ids.append(name)
+        return sorted(ids), None
+    return sorted(m["id"] for m in data.get("data", []) if m.get("id")), None
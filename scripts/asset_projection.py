@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+시나리오별 자산 추이 계산 (보고서 5장 표, 로컬 계산)
+
+portfolio_prompt.txt의 지출 시나리오 1~4를 최종 CAGR·구간별 감쇠율로 100세까지 계산한다.
+예전에는 OpenAI가 보고서 안에서 직접 계산했으나, 순수 산술이라 스크립트가 표를 만들어 보고서에 넣고
+OpenAI는 가정·해석 코멘트만 쓴다 (출력 토큰 절감, 실행 간 계산 오차 없음).
+
+- 계산 방식 (docs/Changelog.md 2.3): 연초자산 × 해당 연도 CAGR = 성장액, 인출·추가투자는 연말 반영
+- 첫 해: 기준일이 속한 달~12월만 (성장은 (1+r)^(개월/12), 공통 지출은 from_month 이후 개월만)
+- 50세(retire_age) 전: 시나리오별 월 흐름 × 12 (음수 인출, 양수 추가 투자). 50세부터: 연초자산 × 4%, 최소 연 9,600만
+- 감쇠: 2034년 / 2035~2039년 / 2040년+ 구간별 Base 대비 적용률(%) (cagr_schema.json decay_rates와 같은 키)
+- 자산이 0 아래로 내려가면 0으로 두고(1원 미만 잔여도 0), 이후 100세까지 0에 머무는 구간의 첫 연도를 고갈 연도로 표시
+  (추가 투자로 다시 불어나는 일시 고갈은 고갈로 보지 않음)
+- 시나리오 축으로 벡터화 (numpy가 있으면 배열 연산, 없으면 같은 계산을 순수 파이썬으로). 설정 기본값은 DEFAULT_SETTINGS, 바꿀 키만 config.json "projection"
+
+사용법:
+    python asset_projection.py --start-krw 1500000000 --cagr 15
+    python asset_projection.py --start-krw 1500000000 --cagr 15 --decay 90,75,50 --json
+"""
+
+import sys
+import json
+import argparse
+from datetime import date
+
+import common
+
+
+DEFAULT_SETTINGS = {
+    "birth_year": 1984,
+    "retire_age": 50,
+    "end_age": 100,
+    "step_years": 5,
+    "first_year_spending": {"year": 2026, "from_month": 3, "monthly_krw": 11_000_000},
+    "scenarios": [
+        {"name": "시나리오 1", "desc": "2027년~50세 전 월 800만 인출", "flows": [{"from_year": 2027, "monthly_krw": -8_000_000}]},
+        {"name": "시나리오 2", "desc": "2027년~50세 전 월 400만 인출", "flows": [{"from_year": 2027, "monthly_krw": -4_000_000}]},
+        {"name": "시나리오 3", "desc": "2027년~50세 전 지출 0원", "flows": []},
+        {"name": "시나리오 4", "desc": "2027년 0원, 2028년~50세 전 월 400만 추가 투자", "flows": [{"from_year": 2028, "monthly_krw": 4_000_000}]},
+    ],
+    "withdrawal_rate": 4.0,
+    "min_annual_withdrawal_krw": 96_000_000,
+    "decay": {"y2034": 90, "y2035_2039": 75, "y2040_plus": 50},
+}
+# (decay 키, 시작 연도, 끝 연도 또는 None) — 구간 밖(2033년 이전)은 Base 100%
+DECAY_BANDS = (("y2034", 2034, 2034), ("y2035_2039", 2035, 2039), ("y2040_plus", 2040, None))
+EOK = 100_000_000
+
+
+def load_settings(overrides=None):
+    """DEFAULT_SETTINGS에 config.json "projection" 값(최상위 키 단위)을 덮어쓴 설정."""
+    s = dict(DEFAULT_SETTINGS)
+    if isinstance(overrides, dict):
+        s.update({k: v for k, v in overrides.items() if k in DEFAULT_SETTINGS})
+    return s
+
+
+def resolve_decay(decay=None, settings=None):
+    """구간별 적용률(%) dict. decay에 없는(또는 None·0 이하) 구간은 설정 기본값. 반환: (decay, 기본값 사용 구간 목록)."""
+    base = (settings or DEFAULT_SETTINGS)["decay"]
+    out, defaulted = {}, []
+    for key, _, _ in DECAY_BANDS:
+        v = (decay or {}).get(key)
+        try:
+            v = float(v) if v is not None else None
+        except (TypeError, ValueError):
+            v = None
+        if v is None or v <= 0:
+            v = float(base[key])
+            defaulted.append(key)
+        out[key] = v
+    return out, defaulted
+
+
+def decay_factor(year, decay):
+    for key, start, end in DECAY_BANDS:
+        if year >= start and (end is None or year <= end):
+            return decay[key] / 100
+    return 1.0
+
+
+def _planned_flows(years, months, s):
+    """은퇴 전 연도별 계획 흐름 [시나리오][연도] (원, 음수=인출). 은퇴 후 칸은 0 (계산 중 4% 규칙 적용)."""
+    fys = s.get("first_year_spending") or {}
+    rows = []
+    for sc in s["scenarios"]:
+        flows = sorted(sc.get("flows") or [], key=lambda f: f["from_year"])
+        row = []
+        for y, m in zip(years, months):
+            if y == fys.get("year"):
+                first_month = max(int(fys.get("from_month") or 1), 13 - m)
+                row.append(-float(fys["monthly_krw"]) * max(0, 13 - first_month))
+                continue
+            monthly = 0.0
+            for f in flows:
+                if f["from_year"] <= y:
+                    monthly = float(f["monthly_krw"])
+            row.append(monthly * m)
+        rows.append(row)
+    return rows
+
+
+def _simulate_numpy(np, start_krw, growth, planned, retired, months, wr, min_w):
+    """시나리오 축 벡터화. growth [연도], planned [시나리오×연도] → 연초·성장·흐름·기말 [시나리오×연도]."""
+    planned = np.asarray(planned, dtype=float)
+    n_sc, n_y = planned.shape
+    begin, gain, flow, end = (np.zeros((n_sc, n_y)) for _ in range(4))
+    a = np.full(n_sc, float(start_krw))
+    for j in range(n_y):
+        g = a * growth[j]
+        f = -np.maximum(a * wr, min_w) * (months[j] / 12) if retired[j] else planned[:, j]
+        f = np.maximum(f, -(a + g))  # 가진 것 이상 인출 불가 → 0에서 멈춤
+        begin[:, j], gain[:, j], flow[:, j] = a, g, f
+        a = a + g + f
+        a = np.where(a < 1.0, 0.0, a)  # 부동소수 잔여(1원 미만)·음수는 0
+        end[:, j] = a
+    return begin.tolist(), gain.tolist(), flow.tolist(), end.tolist()
+
+
+def _simulate_python(start_krw, growth, planned, retired, months, wr, min_w):
+    out = ([], [], [], [])
+    for row in planned:
+        a = float(start_krw)
+        cols = ([], [], [], [])
+        for j, p in enumerate(row):
+            g = a * growth[j]
+            f = -max(a * wr, min_w) * (months[j] / 12) if retired[j] else p
+            f = max(f, -(a + g))
+            nxt = a + g + f
+            nxt = 0.0 if nxt < 1.0 else nxt
+            for col, v in zip(cols, (a, g, f, nxt)):
+                col.append(v)
+            a = nxt
+        for dst, col in zip(out, cols):
+            dst.append(col)
+    return out
+
+
+def depleted_year(years, end):
+    """기말자산이 0 이하로 내려가 끝(100세)까지 회복하지 못하는 구간의 첫 연도. 끝 해 자산이 남아 있으면 None."""
+    start = None
+    for y, v in zip(years, end):
+        if v <= 0:
+            start = y if start is None else start
+        else:
+            start = None
+    return start
+
+
+def project(start_krw, base_cagr, decay=None, settings=None, start_date=None):
+    """기준일 자산(원)·Base CAGR(%)·감쇠율로 시나리오별 연도별 추이 계산.
+    반환: {"years", "ages", "months", "rates"(%), "decay", "decay_defaulted", "scenarios": [{"name", "desc",
+    "begin", "growth", "flow", "end", "depleted_year"}], ...} (금액은 원)."""
+    s = load_settings(settings)
+    today = start_date or date.today()
+    last_year = s["birth_year"] + s["end_age"]
+    years = list(range(today.year, last_year + 1))
+    months = [13 - today.month] + [12] * (len(years) - 1)
+    decay, defaulted = resolve_decay(decay, s)
+    rates = [float(base_cagr) * decay_factor(y, decay) for y in years]
+    growth = [(1 + r / 100) ** (m / 12) - 1 for r, m in zip(rates, months)]
+    retired = [y - s["birth_year"] >= s["retire_age"] for y in years]
+    planned = _planned_flows(years, months, s)
+    wr, min_w = s["withdrawal_rate"] / 100, float(s["min_annual_withdrawal_krw"])
+    np = common.numpy()
+    if np is not None:
+        cols = _simulate_numpy(np, start_krw, growth, planned, retired, months, wr, min_w)
+    else:
+        cols = _simulate_python(start_krw, growth, planned, retired, months, wr, min_w)
+    scenarios = []
+    for i, sc in enumerate(s["scenarios"]):
+        begin, gain, flow, end = (c[i] for c in cols)
+        depleted = depleted_year(years, end)
+        scenarios.append({"name": sc["name"], "desc": sc.get("desc", ""), "begin": begin, "growth": gain,
+                          "flow": flow, "end": end, "depleted_year": depleted})
+    return {
+        "start_date": today.isoformat(), "start_krw": float(start_krw), "base_cagr": float(base_cagr),
+        "birth_year": s["birth_year"], "years": years, "ages": [y - s["birth_year"] for y in years], "months": months, "rates": rates,
+        "decay": decay, "decay_defaulted": defaulted, "retire_age": s["retire_age"], "step_years": s["step_years"],
+        "withdrawal_rate": s["withdrawal_rate"], "min_annual_withdrawal_krw": min_w, "scenarios": scenarios,
+    }
+
+
+def table_rows(proj, sc):
+    """보고서 표 행: 50세까지 매년, 이후 step_years 단위 묶음 (묶음 행은 성장·흐름 합계, 연초=첫 해 연초, 기말=끝 해 기말)."""
+    years, ages, rates = proj["years"], proj["ages"], proj["rates"]
+    rows, j = [], 0
+    while j < len(years):
+        k = j + 1 if ages[j] <= proj["retire_age"] else min(j + proj["step_years"], len(years))
+        r = rates[j:k]
+        rows.append({
+            "years": (years[j], years[k - 1]), "ages": (ages[j], ages[k - 1]),
+            "rate": (min(r), max(r)), "begin": sc["begin"][j],
+            "growth": sum(sc["growth"][j:k]), "flow": sum(sc["flow"][j:k]), "end": sc["end"][k - 1],
+        })
+        j = k
+    return rows
+
+
+def independence_year(proj, sc):
+    """연말 자산 × 인출률이 최소 연 인출액 이상이 되는 첫 연도 (자립 가능 시점). 없으면 None."""
+    need = proj["min_annual_withdrawal_krw"] / (proj["withdrawal_rate"] / 100)
+    return next((y for y, v in zip(proj["years"], sc["end"]) if v >= need), None)
+
+
+def _eok(v):
+    return f"{v / EOK:,.2f}"
+
+
+def _span(a, b, unit=""):
+    return f"{a}{unit}" if a == b else f"{a}~{b}{unit}"
+
+
+def format_markdown(proj, month_year=2035):
+    """보고서 삽입용 마크다운: 가정 → 시나리오 요약(자립 시점·50세·month_year 말 4% 월 인출·100세) → 시나리오별 표 (억원)."""
+    d = proj["decay"]
+    default_note = " (감쇠 제안 없음 → 기본값)" if len(proj["decay_defaulted"]) == len(DECAY_BANDS) else (
+        f" (기본값: {', '.join(proj['decay_defaulted'])})" if proj["decay_defaulted"] else "")
+    years, ages = proj["years"], proj["ages"]
+    lines = [
+        f"**계산 가정 (스크립트 계산, 명목·억원):** 기준일 {proj['start_date']} 자산 {_eok(proj['start_krw'])}억, "
+        f"최종 CAGR {proj['base_cagr']:g}%, 감쇠 2034년 {d['y2034']:g}% / 2035~2039년 {d['y2035_2039']:g}% / "
+        f"2040년+ {d['y2040_plus']:g}%{default_note}. 성장은 연초자산 기준, 인출·추가투자는 연말 반영. "
+        f"{proj['retire_age']}세부터 연 {proj['withdrawal_rate']:g}% 인출 (최소 연 {proj['min_annual_withdrawal_krw'] / 10_000:,.0f}만원).",
+        "",
+        f"| 시나리오 | 자립 가능 시점 (4% ≥ 연 {proj['min_annual_withdrawal_krw'] / 10_000:,.0f}만) | "
+        f"{proj['retire_age']}세 말 자산 | {month_year}년 말 4% 월 인출(만원) | {ages[-1]}세 말 자산 | 고갈 |",
+        "|---|---|---|---|---|---|",
+    ]
+    retire_year = proj["birth_year"] + proj["retire_age"]
+    for sc in proj["scenarios"]:
+        end_of = dict(zip(years, sc["end"]))
+        iy = independence_year(proj, sc)
+        when = f"{iy}년 ({iy - proj['birth_year']}세)" if iy else "미도달"
+        retire_end = f"{_eok(end_of[retire_year])}억" if retire_year in end_of else "-"
+        monthly = (f"{end_of[month_year] * proj['withdrawal_rate'] / 100 / 12 / 10_000:,.0f}"
+                   if month_year in end_of else "-")
+        lines.append(f"| {sc['name']} ({sc['desc']}) | {when} | {retire_end} | {monthly} | "
+                     f"{_eok(sc['end'][-1])}억 | {sc['depleted_year'] or '-'} |")
+    for sc in proj["scenarios"]:
+        lines += ["", f"**{sc['name']}** — {sc['desc']}", "",
+                  "| 연도 | 나이 | 적용 CAGR | 연초자산 | 성장액 | 인출·투자액 | 기말자산 |",
+                  "|---|---|---|---|---|---|---|"]
+        for row in table_rows(proj, sc):
+            lo, hi = row["rate"]
+            lines.append(
+                f"| {_span(*row['years'])} | {_span(*row['ages'])} | {_span(f'{lo:.2f}', f'{hi:.2f}')}% | "
+                f"{_eok(row['begin'])} | {_eok(row['growth'])} | {row['flow'] / EOK:+,.2f} | {_eok(row['end'])} |"
+            )
+    return "\n".join(lines)
+
+
+def to_json(proj):
+    """중간 데이터 저장용 (projection.json)."""
+    return json.dumps(proj, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="지출 시나리오별 자산 추이 (100세까지) 계산")
+    parser.add_argument("--start-krw", type=float, required=True, help="기준일 총자산 (원)")
+    parser.add_argument("--cagr", type=float, required=True, help="Base CAGR (%%)")
+    parser.add_argument("--decay", default=None, help="구간별 적용률 %% (2034,2035~2039,2040+), 예: 90,75,50")
+    parser.add_argument("--start-date", default=None, help="기준일 YYYY-MM-DD (기본: 오늘)")
+    parser.add_argument("--json", action="store_true", help="표 대신 계산 결과 JSON 출력")
+    args = parser.parse_args()
+    common.utf8_stdout()
+    decay = None
+    if args.decay:
+        try:
+            decay = dict(zip((k for k, _, _ in DECAY_BANDS), (float(x) for x in args.decay.split(","))))
+        except ValueError:
+            print(f"[ERROR] --decay 형식 오류: {args.decay} (예: 90,75,50)")
+            return 1
+    start = date.fromisoformat(args.start_date) if args.start_date else None
+    proj = project(args.start_krw, args.cagr, decay, start_date=start)
+    print(to_json(proj) if args.json else format_markdown(proj))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
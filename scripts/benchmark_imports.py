@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CLI 진입점 콜드 스타트(모듈 임포트) 벤치마크
+
+진입점 모듈마다 새 파이썬 프로세스를 N번 띄워 import 시간과 프로세스 전체 시간을 재고,
+목표(--target-ms)를 넘거나 주가 조회 전용 무거운 의존성(yfinance·pandas·numpy)이 임포트 시점에
+올라오면 실패(종료 코드 1)로 표시한다. 모듈 단위 상위 비용은 python -X importtime으로 확인.
+
+- import(ms): 진입 모듈 import 문 소요 (인터프리터 기동 제외)
+- 프로세스(ms): 인터프리터 기동 + import + 종료
+- 결과: report/benchmarks/imports_YYYYMMDD_HHMM_<commit>.json
+
+사용법:
+    python benchmark_imports.py                      # 기본 진입점 × 5회, 목표 300ms
+    python benchmark_imports.py --runs 10 --target-ms 200 --top 10
+    python benchmark_imports.py --modules discuss_report,generate_portfolio_report_3ai
+"""
+
+import io
+import sys
+import json
+import time
+import argparse
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+from benchmark_pipeline import percentile, _git_commit
+
+# Windows 콘솔 인코딩 설정
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+SCRIPTS_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPTS_DIR.parent
+BENCH_DIR = PROJECT_ROOT / "report" / "benchmarks"
+
+ENTRY_MODULES = [
+    "generate_portfolio_report_3ai",
+    "discuss_report",
+    "usage_ledger",
+    "run_planner",
+    "run_trace",
+    "run_metrics",
+    "pipeline_engine",
+    "asset_projection",
+    "monte_carlo",
+    "rebalance_grid",
+    "swing_rules",
+    "swing_backtest",
+    "swing_monitor",
+    "swing_scanner",
+    "risk_metrics",
+    "stress_test",
+    "valuation",
+    "snapshot_store",
+    "cagr_archive",
+    "report_search",
+    "list_gemini_models",
+    "mock_provider_server",
+]
+# 임포트 시점에 올라오면 안 되는 모듈 (실제로 쓰는 함수 안에서 임포트)
+HEAVY_MODULES = ["yfinance", "pandas", "numpy"]
+DEFAULT_TARGET_MS = 300.0
+
+_CHILD = """
+import sys, time, json
+sys.path.insert(0, {scripts!r})
+t = time.perf_counter()
+__import__({module!r})
+dt = time.perf_counter() - t
+print(json.dumps({{"import_s": dt, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_once(module, importtime=False):
+    """새 프로세스에서 module 1회 임포트. 반환: {"import_ms", "process_ms", "heavy", "importtime"} 또는 {"error"}."""
+    code = _CHILD.format(scripts=str(SCRIPTS_DIR), module=module, heavy=HEAVY_MODULES)
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    t0 = time.perf_counter()
+    r = subprocess.run(cmd, cwd=PROJECT_ROOT, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    process_s = time.perf_counter() - t0
+    if r.returncode != 0:
+        return {"error": ((r.stderr + r.stdout).strip().splitlines() or ["?"])[-1]}
+    try:
+        data = json.loads(r.stdout.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        return {"error": "결과 JSON 파싱 실패"}
+    out = {"import_ms": data["import_s"] * 1000, "process_ms": process_s * 1000, "heavy": data["heavy"]}
+    if importtime:
+        out["importtime"] = r.stderr
+    return out
+
+
+def parse_importtime(stderr, module, top=8):
+    """-X importtime 출력 → 진입 모듈이 직접 임포트한 모듈 중 누적 시간 상위 [(name, cumulative_ms)].
+    importtime은 하위 모듈을 부모보다 먼저 출력하므로, 진입 모듈 줄에서 거꾸로 올라가며 한 단계 아래 줄만 모은다."""
+    entries = []  # (depth, name, cumulative_us)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        raw = parts[2][1:].rstrip()
+        depth = (len(raw) - len(raw.lstrip())) // 2
+        entries.append((depth, raw.strip(), int(parts[1])))
+    idx = next((i for i in range(len(entries) - 1, -1, -1) if entries[i][1] == module), None)
+    if idx is None:
+        return []
+    base = entries[idx][0]
+    rows = []
+    for depth, name, cum in reversed(entries[:idx]):
+        if depth <= base:
+            break
+        if depth == base + 1:
+            rows.append((name, cum / 1000))
+    rows.sort(key=lambda r: r[1], reverse=True)
+    return rows[:top]
+
+
+def run_benchmark(modules, runs, top=0):
+    results = {}
+    for module in modules:
+        samples = [measure_once(module) for _ in range(runs)]
+        errors = [s["error"] for s in samples if "error" in s]
+        ok = [s for s in samples if "error" not in s]
+        res = {"runs": len(ok), "errors": errors[:1]}
+        if ok:
+            imports = [s["import_ms"] for s in ok]
+            procs = [s["process_ms"] for s in ok]
+            res.update({
+                "import_ms": {"p50": percentile(imports, 50), "max": max(imports)},
+                "process_ms": {"p50": percentile(procs, 50), "max": max(procs)},
+                "heavy": sorted({m for s in ok for m in s["heavy"]}),
+            })
+        if top and ok:
+            it = measure_once(module, importtime=True)
+            if "importtime" in it:
+                res["top_imports"] = parse_importtime(it["importtime"], module, top)
+        results[module] = res
+    return results
+
+
+def check(results, target_ms):
+    """목표 초과·무거운 모듈 임포트 목록. 반환: [문자열] (비어 있으면 통과)."""
+    failures = []
+    for module, res in results.items():
+        if res.get("errors"):
+            failures.append(f"{module}: 임포트 실패 ({res['errors'][0]})")
+            continue
+        if res["import_ms"]["p50"] > target_ms:
+            failures.append(f"{module}: import p50 {res['import_ms']['p50']:.0f}ms > 목표 {target_ms:.0f}ms")
+        if res["heavy"]:
+            failures.append(f"{module}: 임포트 시점에 {', '.join(res['heavy'])} 로드")
+    return failures
+
+
+def format_results(results, target_ms):
+    lines = [f"  {'모듈':<32} {'import p50':>11} {'max':>8} {'프로세스 p50':>12} {'max':>8}  무거운 모듈"]
+    for module, res in results.items():
+        if "import_ms" not in res:
+            lines.append(f"  {module:<32} 실패: {res['errors'][0] if res['errors'] else '?'}")
+            continue
+        imp, proc = res["import_ms"], res["process_ms"]
+        flag = " <- 목표 초과" if imp["p50"] > target_ms else ""
+        lines.append(f"  {module:<32} {imp['p50']:>9.1f}ms {imp['max']:>6.1f}ms {proc['p50']:>10.1f}ms {proc['max']:>6.1f}ms  "
+                     f"{', '.join(res['heavy']) or '-'}{flag}")
+        for name, ms in res.get("top_imports", []):
+            lines.append(f"      {name:<36} {ms:>8.1f}ms")
+    return "\n".join(lines)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="CLI 진입점 콜드 스타트(임포트) 벤치마크")
+    parser.add_argument("--modules", default=",".join(ENTRY_MODULES), help="쉼표 구분 모듈명 (scripts/ 기준)")
+    parser.add_argument("--runs", type=int, default=5, help="모듈당 새 프로세스 실행 횟수 (기본 5)")
+    parser.add_argument("--target-ms", type=float, default=DEFAULT_TARGET_MS, help=f"import p50 목표 ms (기본 {DEFAULT_TARGET_MS:.0f})")
+    parser.add_argument("--top", type=int, default=0, help="-X importtime 기준 직접 임포트 상위 N개 모듈 표시")
+    parser.add_argument("--output", default=None, help="결과 JSON 경로 (기본: report/benchmarks/imports_*.json)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    modules = [m.strip() for m in args.modules.split(",") if m.strip()]
+    print(f"[임포트 벤치마크] {len(modules)}개 모듈 × {args.runs}회, 목표 import p50 ≤ {args.target_ms:.0f}ms")
+    results = run_benchmark(modules, args.runs, args.top)
+    print(format_results(results, args.target_ms))
+
+    commit = _git_commit()
+    out = Path(args.output) if args.output else BENCH_DIR / f"imports_{datetime.now().strftime('%Y%m%d_%H%M')}_{commit or 'nogit'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({
+        "commit": commit, "python": sys.version.split()[0], "runs": args.runs,
+        "target_ms": args.target_ms, "results": results,
+    }, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n결과 저장: {out}")
+
+    failures = check(results, args.target_ms)
+    if failures:
+        print("\n[ERROR] 콜드 스타트 목표 미달:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("\n[OK] 모든 진입점이 목표 이내")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+generate_portfolio_report_3ai.py 종단 벤치마크
+
+로컬 모의 AI 서버(mock_provider_server.py)를 별도 프로세스로 띄우고, 파이프라인 main()을
+모드별로 N회 같은 프로세스에서 실행하며 단계별 지연·CPU·메모리·쓰기 바이트를 잰다.
+결과는 JSON으로 저장 → 커밋 간 --compare로 회귀 확인.
+
+- 모드: check-prices(환율·주가만), cagr(--test-cagr-only), full(보고서 전체)
+- 단계 지연: data_fetch(환율·주가 조회) + AI 호출 단계(step1_grok … step3_openai, cagr_openai)
+- CPU: time.process_time (모의 서버는 별도 프로세스라 제외), 메모리: tracemalloc 최대치(파이썬 힙)
+- 쓰기 바이트: 실행별 임시 report 디렉터리(보고서·중간 데이터·원장) 파일 크기 합
+- 실제 .env·report/·사용량 원장은 건드리지 않음 (임시 디렉터리 + 더미 키)
+
+사용법:
+    python benchmark_pipeline.py                                 # 3개 모드 × 5회
+    python benchmark_pipeline.py --modes cagr,full --runs 10 --mock-latency 0.2 --mock-jitter 0.1
+    python benchmark_pipeline.py --recorded-data data.json       # 환율·주가를 기록된 값으로 (네트워크 없이)
+    python benchmark_pipeline.py --compare report/benchmarks/bench_20260301_0900_abc1234.json
+"""
+
+import os
+import io
+import sys
+import json
+import math
+import time
+import socket
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+# Windows 콘솔 인코딩 설정
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+SCRIPTS_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPTS_DIR.parent
+BENCH_DIR = PROJECT_ROOT / "report" / "benchmarks"
+MOCK_SERVER = SCRIPTS_DIR / "mock_provider_server.py"
+
+MODES = {
+    "check-prices": ["--check-prices"],
+    "cagr": ["--test-cagr-only"],
+    "full": [],
+}
+
+# 단계 지연 측정 대상: 함수명 → 버킷 (None이면 호출 시점의 단계명, ai_providers.current_step())
+TIMED_FUNCTIONS = {
+    "fetch_usd_krw_rate": "data_fetch",
+    "fetch_us_stock_prices": "data_fetch",
+    "fetch_kr_stock_prices": "data_fetch",
+    "call_grok_api": None,
+    "call_gemini_api": None,
+    "call_openai_api": None,
+}
+
+
+def percentile(values, pct):
+    """최근접 순위 백분위수 (numpy 없이). 빈 목록이면 None."""
+    if not values:
+        return None
+    s = sorted(values)
+    k = max(0, min(len(s) - 1, math.ceil(pct / 100.0 * len(s)) - 1))
+    return s[k]
+
+
+def _summary(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {
+        "p50": percentile(values, 50), "p95": percentile(values, 95),
+        "mean": sum(values) / len(values), "min": min(values), "max": max(values), "n": len(values),
+    }
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock_server(args):
+    """모의 서버를 별도 프로세스로 시작. 반환: (Popen, base_url_env dict)."""
+    port = _free_port()
+    cmd = [
+        sys.executable, str(MOCK_SERVER), "--port", str(port), "--quiet", "--seed", str(args.seed),
+        "--latency", str(args.mock_latency), "--jitter", str(args.mock_jitter),
+        "--tokens-per-s", str(args.mock_tokens_per_s), "--error-rate", str(args.mock_error_rate),
+        "--output-chars", str(args.mock_output_chars),
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    root = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            if requests.get(f"{root}/_mock/stats", timeout=1).status_code == 200:
+                break
+        except requests.exceptions.RequestException:
+            time.sleep(0.05)
+    else:
+        proc.kill()
+        raise RuntimeError("모의 서버 시작 실패")
+    return proc, {
+        "OPENAI_BASE_URL": f"{root}/openai/v1",
+        "GROK_BASE_URL": f"{root}/xai/v1",
+        "GEMINI_BASE_URL": f"{root}/gemini/v1beta",
+    }
+
+
+def _instrument(gen, timings, recorded=None):
+    """파이프라인 모듈 함수들을 시간 측정 래퍼로 교체. recorded가 있으면 환율·주가 조회는 기록값 반환."""
+    originals = {}
+    for name, bucket in TIMED_FUNCTIONS.items():
+        fn = getattr(gen, name)
+        originals[name] = fn
+
+        def wrapper(*a, _fn=fn, _name=name, _bucket=bucket, **kw):
+            t0 = time.perf_counter()
+            try:
+                if recorded is not None and _bucket == "data_fetch":
+                    key = {"fetch_usd_krw_rate": "usd_krw_rate", "fetch_us_stock_prices": "us_stock_prices"}.get(_name, "kr_stock_prices")
+                    return recorded.get(key)
+                return _fn(*a, **kw)
+            finally:
+                b = _bucket or gen.ai_providers.current_step() or _name
+                timings[b] = timings.get(b, 0.0) + (time.perf_counter() - t0)
+
+        setattr(gen, name, wrapper)
+    return originals
+
+
+def _dir_bytes(path):
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
+
+
+def run_once(gen, usage_ledger, mode, work_dir, recorded=None, trace_memory=True):
+    """모드 1회 실행. 반환: {"mode", "exit_code", "wall_s", "cpu_s", "peak_mem_mb", "bytes_written", "steps"}."""
+    report_dir = Path(work_dir) / "report"
+    report_dir.mkdir(parents=True, exist_ok=True)
+    gen.REPORTS_DIR = report_dir
+    usage_ledger.LEDGER_FILE = report_dir / ".usage_ledger.sqlite3"
+    usage_ledger.LEGACY_CACHE_FILE = report_dir / ".usage_cache.json"
+    gen.snapshot_store.SNAPSHOT_FILE = report_dir / ".snapshots.sqlite3"
+
+    timings = {}
+    originals = _instrument(gen, timings, recorded)
+    argv = sys.argv
+    sys.argv = ["generate_portfolio_report_3ai.py", *MODES[mode], "--no-budget-scheduler"]
+    if trace_memory:
+        tracemalloc.start()
+    t_wall, t_cpu = time.perf_counter(), time.process_time()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            exit_code = gen.main()
+    except SystemExit as e:
+        exit_code = e.code
+    finally:
+        wall, cpu = time.perf_counter() - t_wall, time.process_time() - t_cpu
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+        sys.argv = argv
+        for name, fn in originals.items():
+            setattr(gen, name, fn)
+    return {
+        "mode": mode,
+        "exit_code": exit_code,
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "peak_mem_mb": peak / (1024 * 1024) if peak is not None else None,
+        "bytes_written": _dir_bytes(report_dir),
+        "steps": timings,
+    }
+
+
+def summarize(runs):
+    """모드별 실행 목록 → 지표별 p50/p95 요약."""
+    out = {}
+    for mode in dict.fromkeys(r["mode"] for r in runs):
+        rs = [r for r in runs if r["mode"] == mode]
+        steps = list(dict.fromkeys(s for r in rs for s in r["steps"]))
+        out[mode] = {
+            "runs": len(rs),
+            "failures": sum(1 for r in rs if r["exit_code"] not in (0, None)),
+            "wall_s": _summary([r["wall_s"] for r in rs]),
+            "cpu_s": _summary([r["cpu_s"] for r in rs]),
+            "peak_mem_mb": _summary([r["peak_mem_mb"] for r in rs]),
+            "bytes_written": _summary([r["bytes_written"] for r in rs]),
+            "steps": {s: _summary([r["steps"].get(s) for r in rs]) for s in steps},
+        }
+    return out
+
+
+def _git_commit():
+    try:
+        r = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=10)
+        return r.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def format_summary(summary, baseline=None):
+    """요약 표 문자열. baseline(이전 결과 summary)이 있으면 p50/p95 변화율 표시."""
+    lines = []
+
+    def _delta(cur, prev):
+        if cur is None or not prev:
+            return ""
+        return f" ({(cur - prev) / prev * 100:+.0f}%)"
+
+    for mode, m in summary.items():
+        base = (baseline or {}).get(mode) or {}
+        lines.append(f"\n[{mode}] {m['runs']}회 (실패 {m['failures']})")
+        lines.append(f"  {'지표':<16} {'p50':>18} {'p95':>18}")
+        rows = [(k, m[k], base.get(k)) for k in ("wall_s", "cpu_s", "peak_mem_mb", "bytes_written")]
+        rows += [(f"step:{s}", v, (base.get("steps") or {}).get(s)) for s, v in m["steps"].items()]
+        for name, cur, prev in rows:
+            if not cur:
+                continue
+            fmt = "{:,.0f}" if name == "bytes_written" else "{:.3f}"
+            p50 = fmt.format(cur["p50"]) + _delta(cur["p50"], (prev or {}).get("p50"))
+            p95 = fmt.format(cur["p95"]) + _delta(cur["p95"], (prev or {}).get("p95"))
+            lines.append(f"  {name:<16} {p50:>18} {p95:>18}")
+    return "\n".join(lines)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="3-AI 보고서 파이프라인 종단 벤치마크 (모의 AI 서버 사용)")
+    parser.add_argument("--modes", default="check-prices,cagr,full", help="쉼표 구분: check-prices, cagr, full")
+    parser.add_argument("--runs", type=int, default=5, help="모드별 측정 횟수 (기본 5)")
+    parser.add_argument("--warmup", type=int, default=1, help="모드별 측정 제외 예열 횟수 (기본 1)")
+    parser.add_argument("--mock-latency", type=float, default=0.0, help="모의 서버 응답당 지연(초)")
+    parser.add_argument("--mock-jitter", type=float, default=0.0, help="모의 서버 추가 무작위 지연(초)")
+    parser.add_argument("--mock-tokens-per-s", type=float, default=0.0, help="모의 서버 출력 토큰 처리 속도")
+    parser.add_argument("--mock-error-rate", type=float, default=0.0, help="모의 서버 429/503 비율 (재시도·폴백 경로 측정)")
+    parser.add_argument("--mock-output-chars", type=int, default=4000, help="모의 응답 본문 길이(문자)")
+    parser.add_argument("--recorded-data", default=None, help="환율·주가 기록 JSON {usd_krw_rate, us_stock_prices, kr_stock_prices} (네트워크 조회 대신)")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="메모리 측정 끄기 (tracemalloc 오버헤드 제외)")
+    parser.add_argument("--seed", type=int, default=1, help="모의 서버 난수 시드")
+    parser.add_argument("--output", default=None, help="결과 JSON 경로 (기본: report/benchmarks/bench_YYYYMMDD_HHMM_<commit>.json)")
+    parser.add_argument("--compare", default=None, help="이전 결과 JSON과 p50/p95 비교")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        print(f"[ERROR] 알 수 없는 모드: {unknown} (가능: {', '.join(MODES)})")
+        return 1
+    recorded = None
+    if args.recorded_data:
+        with open(args.recorded_data, "r", encoding="utf-8") as f:
+            recorded = json.load(f)
+
+    proc, base_env = start_mock_server(args)
+    saved_env = {k: os.environ.get(k) for k in [*base_env, "OPENAI_API_KEY", "GROK_API_KEY", "GEMINI_API_KEY"]}
+    os.environ.update(base_env)
+    for k in ("OPENAI_API_KEY", "GROK_API_KEY", "GEMINI_API_KEY"):
+        os.environ[k] = "mock"
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    runs = []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import generate_portfolio_report_3ai as gen
+            import usage_ledger
+            import common
+        # 실제 .env가 *_BASE_URL·키를 덮어쓰지 않도록 없는 파일로 지정
+        common.ENV_FILE = Path(tempfile.gettempdir()) / "benchmark_pipeline_no.env"
+        print("=" * 60)
+        print(f"파이프라인 벤치마크: 모드 {', '.join(modes)} × {args.runs}회 (예열 {args.warmup}회)")
+        print(f"모의 서버: {base_env['OPENAI_BASE_URL'].rsplit('/openai', 1)[0]} (지연 {args.mock_latency}s, 오류율 {args.mock_error_rate})")
+        print("=" * 60)
+        with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as tmp:
+            for mode in modes:
+                for i in range(args.warmup + args.runs):
+                    r = run_once(gen, usage_ledger, mode, Path(tmp) / f"{mode}_{i}", recorded, trace_memory=not args.no_tracemalloc)
+                    label = "예열" if i < args.warmup else f"{i - args.warmup + 1}/{args.runs}"
+                    print(f"  [{mode}] {label}: {r['wall_s']:.2f}초 (exit {r['exit_code']})")
+                    if i >= args.warmup:
+                        runs.append(r)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        for k, v in saved_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+    summary = summarize(runs)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("summary")
+    print(format_summary(summary, baseline))
+
+    commit = _git_commit()
+    result = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "summary": summary,
+        "runs": runs,
+    }
+    out = Path(args.output) if args.output else BENCH_DIR / f"bench_{datetime.now().strftime('%Y%m%d_%H%M')}_{commit or 'nogit'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n결과 저장: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
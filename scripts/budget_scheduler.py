@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+월 예산 기반 모델 스케줄러
+
+각 단계 호출 직전에 이번 달 누적 비용(usage_ledger)과 *_MONTHLY_BUDGET을 비교해
+남은 예산을 남은 실행 횟수로 나눈 "회당 허용액" 안에 들어가도록
+모델 → reasoning effort → max_output_tokens 순으로 낮춘다.
+
+- 예산 환경 변수가 없는 provider는 스케줄링하지 않음 (요청 모델 그대로)
+- 단계별 예상 출력 토큰은 원장의 최근 실행 평균, 없으면 DEFAULT_OUTPUT_TOKENS
+- 결정은 콘솔 출력 + 원장 schedule 테이블에 기록
+"""
+
+import os
+import calendar
+from datetime import datetime
+
+import usage_ledger
+
+BUDGET_ENV = {"openai": "OPENAI_MONTHLY_BUDGET", "grok": "GROK_MONTHLY_BUDGET", "gemini": "GEMINI_MONTHLY_BUDGET"}
+
+# 하향 후보 (비싼 순이 아니라 "허용 후보" 목록. 실제 순서는 단가 기준으로 정렬)
+MODEL_LADDERS = {
+    "openai": ["gpt-5.2-pro", "gpt-5.2", "gpt-4o", "gpt-3.5-turbo"],
+    "grok": ["grok-4-1-fast-reasoning", "grok-4-1-fast-non-reasoning", "grok-3-mini"],
+    "gemini": ["gemini-3-pro-preview", "gemini-3-flash-preview", "gemini-2.5-flash"],
+}
+
+# Responses API reasoning effort 단계 (높음 → 낮음)와 출력 토큰 배율 (reasoning 토큰 포함 추정)
+EFFORT_LEVELS = ["high", "medium", "low"]
+EFFORT_OUTPUT_FACTOR = {"high": 1.6, "medium": 1.0, "low": 0.6}
+
+# 원장 이력이 없을 때 단계별 예상 출력 토큰
+DEFAULT_OUTPUT_TOKENS = {
+    "step1_grok": 3000, "step2_gemini": 2500, "step2b_grok": 1500, "step2b_gemini": 1500,
+    "step3_openai": 20000, "cagr_openai": 2000,
+}
+
+# 허용액이 부족해도 이 값 아래로는 max_output_tokens를 줄이지 않음 (보고서가 잘리는 것 방지)
+MIN_OUTPUT_TOKENS = 4000
+HISTORY_RUNS = 10
+
+
+def _budget(provider):
+    try:
+        b = os.environ.get(BUDGET_ENV.get(provider, ""))
+        if b:
+            return float(str(b).strip())
+    except (ValueError, TypeError):
+        pass
+    return None
+
+
+def _runs_left_this_month(now=None):
+    """오늘 포함 남은 일수 × 하루 실행 횟수(REPORT_RUNS_PER_DAY, 기본 1)."""
+    now = now or datetime.now()
+    days_left = calendar.monthrange(now.year, now.month)[1] - now.day + 1
+    try:
+        per_day = max(1, int(os.environ.get("REPORT_RUNS_PER_DAY") or 1))
+    except ValueError:
+        per_day = 1
+    return max(1, days_left * per_day)
+
+
+def _expected_output_tokens(step, model):
+    """원장 최근 실행에서 (step, model) 평균 출력 토큰. 없으면 같은 step 평균, 그래도 없으면 기본값."""
+    stats = [r for r in usage_ledger.step_stats(last_runs=HISTORY_RUNS) if r["step"] == step]
+    same_model = [r for r in stats if r["model"] == model]
+    pick = same_model or stats
+    if pick:
+        return int(sum(r["avg_out"] * r["calls"] for r in pick) / max(1, sum(r["calls"] for r in pick)))
+    return DEFAULT_OUTPUT_TOKENS.get(step, 4000)
+
+
+def allowed_models(provider, model, price_fn, fallback_models=()):
+    """model + 실패 시 폴백 후보 중 입력·출력 단가가 모두 model 이하인 것 (fallback_models 순서, 이어서 MODEL_LADDERS).
+    호출 측 폴백이 스케줄러가 고른 모델보다 비싼 모델로 올라가 예산을 넘지 않도록 models_to_try로 전달."""
+    p_in, p_out = price_fn(provider, model)
+    out = [model]
+    for m in list(fallback_models) + MODEL_LADDERS.get(provider, []):
+        if m not in out and price_fn(provider, m)[0] <= p_in and price_fn(provider, m)[1] <= p_out:
+            out.append(m)
+    return out
+
+
+def plan_step(provider, step, requested_model, input_tokens, price_fn, run_id,
+              requested_effort=None, default_max_output=8000, steps_left=1, effort_models=(), fallback_models=()):
+    """단계 1회 호출의 모델·effort·max_output_tokens를 정한다. effort는 effort_models(Responses API reasoning 모델)에만 적용.
+    fallback_models: 호출 측 기본 폴백 순서 (ai_providers.models) → 결과 "models"는 그중 고른 모델 이하 단가만.
+    반환: {"model", "effort", "max_output_tokens", "models", "projected_cost", "over_budget", "allowance", "mtd", "budget"}
+    또는 None(예산 미설정). over_budget: 가장 싼 조합·최소 출력 상한(MIN_OUTPUT_TOKENS)으로도 허용액 초과 (경고 출력)."""
+    budget = _budget(provider)
+    if budget is None or budget <= 0:
+        return None
+    mtd = usage_ledger.month_totals().get(provider, {}).get("cost", 0.0)
+    spent_run = sum(r["cost"] or 0 for r in usage_ledger.run_totals(run_id) if r["provider"] == provider)
+    remaining = max(0.0, budget - mtd)
+    # 이번 실행 몫(실행 시작 시점 잔여 / 남은 실행 수)에서 이번 실행에 이미 쓴 만큼 빼고, 남은 같은 provider 단계 수로 나눔
+    run_allowance = (remaining + spent_run) / _runs_left_this_month()
+    allowance = max(0.0, run_allowance - spent_run) / max(1, steps_left)
+
+    # 요청 모델 이하 단가의 후보만 (요청 모델보다 비싼 모델로 올리지 않음)
+    req_price = price_fn(provider, requested_model)
+    ladder = [m for m in MODEL_LADDERS.get(provider, []) if m != requested_model and price_fn(provider, m)[1] <= req_price[1]]
+    ladder.sort(key=lambda m: price_fn(provider, m)[1], reverse=True)
+    candidates = [requested_model] + ladder
+
+    efforts = [None]
+    if requested_effort in EFFORT_LEVELS:
+        efforts = EFFORT_LEVELS[EFFORT_LEVELS.index(requested_effort):]
+
+    def _cost(model, out_tokens):
+        p_in, p_out = price_fn(provider, model)
+        return (input_tokens / 1_000_000) * p_in + (out_tokens / 1_000_000) * p_out
+
+    def _output_cap(model):
+        """허용액에서 입력 비용을 뺀 나머지로 살 수 있는 출력 토큰 수 (0 이상)."""
+        p_in, p_out = price_fn(provider, model)
+        room = allowance - (input_tokens / 1_000_000) * p_in
+        return int(room / p_out * 1_000_000) if p_out > 0 and room > 0 else 0
+
+    chosen = None
+    for model in candidates:
+        base_out = _expected_output_tokens(step, model)
+        for effort in (efforts if model in effort_models else [None]):
+            # effort 배율은 요청 effort 대비 상대값 (이력은 요청 effort로 쌓였다고 가정)
+            factor = EFFORT_OUTPUT_FACTOR.get(effort, 1.0) / EFFORT_OUTPUT_FACTOR.get(requested_effort, 1.0) if effort else 1.0
+            out_tokens = int(base_out * factor)
+            cost = _cost(model, out_tokens)
+            if cost <= allowance:
+                # 예상 출력은 맞아도 상한까지 쓰면 넘을 수 있음 → 상한도 허용액 안으로 (MIN_OUTPUT_TOKENS 하한)
+                cap = max(MIN_OUTPUT_TOKENS, min(default_max_output, _output_cap(model)))
+                chosen = {"model": model, "effort": effort, "max_output_tokens": cap, "projected_cost": cost,
+                          "over_budget": False}
+                break
+        if chosen:
+            break
+
+    if chosen is None:
+        # 가장 싼 조합으로도 초과: 출력 상한을 허용액에 맞춰 줄임 (MIN_OUTPUT_TOKENS 하한)
+        model = candidates[-1]
+        effort = efforts[-1] if model in effort_models else None
+        cap = _output_cap(model)
+        # 하한 아래면 보고서가 잘리지 않도록 하한으로 진행하되, 허용액 초과를 경고·기록 (over_budget)
+        over = cap < MIN_OUTPUT_TOKENS
+        if over:
+            print(f"   [WARNING] 예산 스케줄러: {step} 허용액 ${allowance:.4f}로는 출력 {cap:,}토큰뿐 → 최소 상한 {MIN_OUTPUT_TOKENS:,}토큰으로 "
+                  f"진행 (예상 ${_cost(model, MIN_OUTPUT_TOKENS):.4f}, 허용액 초과)")
+        cap = max(MIN_OUTPUT_TOKENS, min(default_max_output, cap))
+        chosen = {"model": model, "effort": effort, "max_output_tokens": cap, "projected_cost": _cost(model, cap), "over_budget": over}
+
+    chosen.update({"models": allowed_models(provider, chosen["model"], price_fn, fallback_models),
+                   "allowance": allowance, "mtd": mtd, "budget": budget})
+    changed = chosen["model"] != requested_model or chosen["effort"] != requested_effort or chosen["max_output_tokens"] != default_max_output
+    effort_s = f", effort {chosen['effort']}" if chosen["effort"] else ""
+    print(
+        f"   [예산 스케줄러] {step}: {requested_model} → {chosen['model']}{effort_s}, max_output_tokens {chosen['max_output_tokens']:,}"
+        f"{' (하향)' if changed else ''}{' (예산 초과)' if chosen['over_budget'] else ''} | 이번 달 ${mtd:.2f}/${budget:.2f}, 단계 허용 ${allowance:.4f}, 예상 ${chosen['projected_cost']:.4f}"
+    )
+    usage_ledger.record_schedule(
+        run_id, step, provider, requested_model, chosen["model"], chosen["effort"], chosen["max_output_tokens"],
+        chosen["projected_cost"], allowance, mtd, budget,
+    )
+    return chosen
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+과거 CAGR 결정 아카이브 (증분 색인)
+
+report/portfolio_report_*.md와 중간 데이터 디렉터리(report/YYYYMMDD_HHMM/)에서 실행별 Grok α·Gemini β·OpenAI Base·최종 CAGR·
+구간별 감쇠·사용 모델을 한 번만 파싱해 report/cache/cagr_archive.json에 실행 키(파일명 날짜_시각)별로 저장한다.
+- 증분: 보고서·중간 단계 파일의 (mtime, 크기)가 색인과 같으면 다시 읽지 않음 → 새 보고서만 파싱, 최근 N회 조회는 수 ms
+- 값 출처: 보고서 머리말(작성일·성장률·사용 모델) → 비어 있으면 중간 데이터 step1(α JSON)·step2(β JSON) 출력,
+  최종 CAGR·감쇠는 step3 출력의 PROJECTION 줄(보고서 저장 시 지워짐) → 없으면 projection.json → 없으면 보고서 본문 '최종 전략적 CAGR'
+- CAGR 파싱 함수(parse_alpha_json 등)는 3ai 스크립트와 공용 (이 모듈이 원본)
+- 3ai 스크립트 --cagr-anchor N: 최근 N회 결정을 Step 1 실시간 데이터에 참고(앵커) 블록으로 넣음 (docs/TBD.md 설계)
+
+사용법:
+    python cagr_archive.py                  # 색인 갱신 후 최근 10회
+    python cagr_archive.py --last 5 --json
+    python cagr_archive.py --rebuild        # 색인 전체 다시 만들기
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import common
+
+PROJECT_ROOT = Path(__file__).parent.parent
+REPORTS_DIR = PROJECT_ROOT / "report"
+INDEX_FILE = REPORTS_DIR / "cache" / "cagr_archive.json"
+INDEX_VERSION = 1
+DEFAULT_ANCHOR_RUNS = 3
+
+DECAY_KEYS = ("y2034", "y2035_2039", "y2040_plus")
+DECAY_LABELS = {"y2034": "2034", "y2035_2039": "2035~2039", "y2040_plus": "2040+"}
+
+# ---- CAGR 파싱 (3ai 스크립트 공용) ----
+
+PROJECTION_LINE = re.compile(r'^[ \t>*`]*PROJECTION:(.*)$', re.MULTILINE)
+_PROJECTION_DECAY = (("y2034", r'2034(?!\s*[~-])'), ("y2035_2039", r'2035\s*[~-]\s*2039'), ("y2040_plus", r'2040\s*\+?'))
+
+
+def _with_structured(values, structured, keys):
+    """정규식 결과 values에 구조화 출력 값(keys 순서, None이 아닌 필드만)을 덮어씀.
+    구조화 출력에 없거나 null인 필드(스키마 밖 market_data 등, key None)는 정규식 값 유지."""
+    if not structured:
+        return values
+    return tuple(structured[k] if k and structured.get(k) is not None else v for k, v in zip(keys, values))
+
+
+def parse_alpha_json(text, structured=None):
+    """Grok 출력에서 Alpha CAGR JSON을 추출. alpha_cagr, current_total_krw, market_data 반환.
+    structured(검증된 구조화 출력 dict)가 있으면 그 값을 우선하고, 없는 필드만 정규식 결과 사용."""
+    return _with_structured(_parse_alpha_text(text), structured, ("alpha_cagr", "current_total_krw", None))
+
+
+def _parse_alpha_text(text):
+    if not text:
+        return None, None, None
+    # ```json ... ``` 또는 마지막 {...} 블록 찾기
+    for pattern in (r'```(?:json)?\s*(\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\})\s*```', r'(\{"alpha_cagr"\s*:\s*[^}]+\})'):
+        m = re.search(pattern, text, re.DOTALL)
+        if m:
+            try:
+                data = json.loads(m.group(1).strip())
+                return (
+                    data.get("alpha_cagr"),
+                    data.get("current_total_krw"),
+                    data.get("market_data")
+                )
+            except (json.JSONDecodeError, TypeError):
+                pass
+    # 단순 alpha_cagr 숫자만 찾기
+    m = re.search(r'"alpha_cagr"\s*:\s*([\d.]+)', text)
+    if m:
+        try:
+            return float(m.group(1)), None, None
+        except ValueError:
+            pass
+    return None, None, None
+
+
+def parse_beta_json(text, structured=None):
+    """Gemini 출력에서 Beta CAGR JSON을 추출. beta_cagr, risk_level, audit_notes 반환.
+    structured(검증된 구조화 출력 dict)가 있으면 그 값을 우선하고, 없는 필드만 정규식 결과 사용."""
+    return _with_structured(_parse_beta_text(text), structured, ("beta_cagr", "risk_level", "audit_notes"))
+
+
+def _parse_beta_text(text):
+    if not text:
+        return None, None, None
+    for pattern in (r'```(?:json)?\s*(\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\})\s*```', r'(\{"beta_cagr"\s*:\s*[^}]+\})'):
+        m = re.search(pattern, text, re.DOTALL)
+        if m:
+            try:
+                data = json.loads(m.group(1).strip())
+                return (
+                    data.get("beta_cagr"),
+                    data.get("risk_level"),
+                    data.get("audit_notes")
+                )
+            except (json.JSONDecodeError, TypeError):
+                pass
+    m = re.search(r'"beta_cagr"\s*:\s*([\d.]+)', text)
+    if m:
+        try:
+            return float(m.group(1)), None, None
+        except ValueError:
+            pass
+    return None, None, None
+
+
+def parse_openai_cagr_minimal(text, structured=None):
+    """OpenAI 최소 CAGR 응답에서 Base / Final 숫자 추출. (base_cagr, final_cagr) 또는 (None, None).
+    structured(검증된 구조화 출력 dict)가 있으면 그 값을 우선하고, 없는 필드만 정규식 결과 사용."""
+    return _with_structured(_parse_openai_text(text), structured, ("base_cagr", "final_cagr"))
+
+
+def _parse_openai_text(text):
+    if not text:
+        return None, None
+    base_cagr = None
+    final_cagr = None
+    # Base: 17.5%  Final: 16.9%
+    m = re.search(r'Base\s*:\s*([\d.]+)\s*%', text, re.IGNORECASE)
+    if m:
+        base_cagr = float(m.group(1))
+    m = re.search(r'Final\s*:\s*([\d.]+)\s*%', text, re.IGNORECASE)
+    if m:
+        final_cagr = float(m.group(1))
+    # 한글: 수석.*?([\d.]+)% .*?최종.*?([\d.]+)% 등
+    if base_cagr is None:
+        m = re.search(r'(?:수석|Base)\s*(?:CAGR)?\s*[\s:]*([\d.]+)\s*%', text)
+        if m:
+            base_cagr = float(m.group(1))
+    if final_cagr is None:
+        m = re.search(r'(?:최종\s*전략적\s*CAGR|Final)\s*[\s:]*([\d.]+)\s*%', text)
+        if m:
+            final_cagr = float(m.group(1))
+    return base_cagr, final_cagr
+
+
+def parse_projection_values(text):
+    """최종 보고서의 'PROJECTION: Final X% | 2034 X% | 2035~2039 X% | 2040+ X%' 줄(마지막 것) → (final_cagr, decay dict).
+    줄이 없거나 Final이 없으면 '최종 전략적 CAGR: X%' 등 parse_openai_cagr_minimal 정규식으로 Final만."""
+    final_cagr, decay = None, {}
+    lines = PROJECTION_LINE.findall(text or "")
+    if lines:
+        line = lines[-1]
+        m = re.search(r'Final\s*:?\s*(\d+(?:\.\d+)?)\s*%', line, re.IGNORECASE)
+        if m:
+            final_cagr = float(m.group(1))
+        for key, pat in _PROJECTION_DECAY:
+            m = re.search(pat + r'\s*:?\s*(\d+(?:\.\d+)?)\s*%', line)
+            if m:
+                decay[key] = float(m.group(1))
+    if final_cagr is None:
+        final_cagr = parse_openai_cagr_minimal(text)[1]
+    return final_cagr, decay
+
+
+# ---- 보고서 파싱 ----
+
+_REPORT_KEY = re.compile(r"^portfolio_report_(\d{8})_([^_.]+(?:_grok)?)")
+_WRITTEN = re.compile(r"작성일:\s*(\d{4})년\s*(\d{1,2})월\s*(\d{1,2})일(?:\s*(\d{1,2})시\s*(\d{1,2})분)?")
+_BASES = re.compile(r"Base\(Grok\)\s*([\d.]+|N/A)%\s*\|\s*Base\(Gemini\)\s*([\d.]+|N/A)%")
+_MODEL_LINE = re.compile(r"^-\s*([^:\n]+?):\s*`([^`]+)`\s*$", re.MULTILINE)
+_PIPELINE = re.compile(r"파이프라인:\s*`([^`]+)`")
+# 보고서 본문 (PROJECTION 줄이 지워진 뒤): '최종 전략적 CAGR(계획용): **12.8%**' 등 마지막 언급, 수석 매니저 Base는 첫 언급
+_FINAL_TEXT = re.compile(r"최종\s*전략적\s*CAGR(?:\([^)\n]*\))?[^\d\n%]{0,30}(\d+(?:\.\d+)?)\s*%")
+_DYNAMIC_TEXT = re.compile(r"(?:Dynamic\s*CAGR|예상\s*성장률)(?:\([^)\n]*\))?[^\d\n%]{0,30}(\d+(?:\.\d+)?)\s*%")  # 3-AI 이전 보고서
+_OPENAI_BASE = re.compile(r"수석\s*(?:PM|매니저)?[^\n\d%]{0,20}?(\d+(?:\.\d+)?)\s*%")
+STEP_FILES = {"alpha": "step1_", "beta": "step2_", "final": "step3_"}
+
+
+def run_key(report_name):
+    """보고서 파일명 → 실행 키 ('20260204_1016', '20260123_auto' 등). 형식이 다르면 None."""
+    m = _REPORT_KEY.match(report_name)
+    return f"{m.group(1)}_{m.group(2)}" if m else None
+
+
+def _step_output(path):
+    """중간 데이터 단계 파일(<단계 id>.md)의 '## 출력' 이후 (프롬프트의 JSON 예시를 피하려고)."""
+    text = path.read_text(encoding="utf-8", errors="replace")
+    i = text.rfind("\n## 출력\n")
+    return text[i:] if i >= 0 else ""
+
+
+def _step_dir(report_path, key):
+    d = report_path.parent / key
+    return d if d.is_dir() else None
+
+
+def _step_file(step_dir, prefix):
+    if step_dir is None:
+        return None
+    return next(iter(sorted(step_dir.glob(prefix + "*.md"))), None)
+
+
+def sources(report_path):
+    """보고서 1건이 읽는 파일 → {상대 경로: [mtime_ns, 크기]} (색인 변경 판정용)."""
+    report_path = Path(report_path)
+    key = run_key(report_path.name)
+    files = [report_path]
+    d = _step_dir(report_path, key) if key else None
+    if d is not None:
+        files += [f for f in (_step_file(d, p) for p in STEP_FILES.values()) if f]
+        files += [f for f in (d / "projection.json", d / "README.md") if f.exists()]
+    out = {}
+    for f in files:
+        st = f.stat()
+        out[f.relative_to(report_path.parent).as_posix()] = [st.st_mtime_ns, st.st_size]
+    return out
+
+
+def _cagr(v):
+    try:
+        return None if v in (None, "N/A") else float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_run(report_path):
+    """보고서 1건(+ 중간 데이터) → 아카이브 항목 dict 또는 None (실행 키를 모르면)."""
+    report_path = Path(report_path)
+    key = run_key(report_path.name)
+    if key is None:
+        return None
+    text = report_path.read_text(encoding="utf-8", errors="replace")
+    head = text[:3000]
+    m = _WRITTEN.search(head)
+    written = datetime(*(int(g or 0) for g in m.groups())) if m else datetime.strptime(key[:8], "%Y%m%d")
+    if not (m and m.group(4)) and key[9:].isdigit():  # 작성일에 시각이 없으면 파일명 시각
+        written = written.replace(hour=int(key[9:11]), minute=int(key[11:13]))
+    bases = _BASES.search(head)
+    alpha = _cagr(bases.group(1)) if bases else None
+    beta = _cagr(bases.group(2)) if bases else None
+    models_at = head.find("**사용 모델:**")
+    models = {}
+    if models_at >= 0:
+        block = head[models_at:].split("\n---", 1)[0]
+        models = {label.strip(): model for label, model in _MODEL_LINE.findall(block)}
+    entry = {
+        "key": key, "written": written.isoformat(timespec="minutes"), "report": report_path.name, "step_dir": None,
+        "pipeline": None, "alpha": alpha, "beta": beta, "openai_base": None, "final": None, "decay": {}, "models": models,
+        "final_source": None,
+    }
+    d = _step_dir(report_path, key)
+    step3_out = ""
+    if d is not None:
+        entry["step_dir"] = d.name
+        readme = d / "README.md"
+        if readme.exists():
+            pm = _PIPELINE.search(readme.read_text(encoding="utf-8", errors="replace"))
+            entry["pipeline"] = pm.group(1) if pm else None
+        f = _step_file(d, STEP_FILES["alpha"])
+        if entry["alpha"] is None and f:
+            entry["alpha"] = _cagr(parse_alpha_json(_step_output(f))[0])
+        f = _step_file(d, STEP_FILES["beta"])
+        if entry["beta"] is None and f:
+            entry["beta"] = _cagr(parse_beta_json(_step_output(f))[0])
+        f = _step_file(d, STEP_FILES["final"])
+        step3_out = _step_output(f) if f else ""
+        if PROJECTION_LINE.search(step3_out):
+            final, decay = parse_projection_values(step3_out)
+            entry.update(final=final, decay=decay, final_source="PROJECTION")
+        proj = d / "projection.json"
+        if entry["final"] is None and proj.exists():
+            try:
+                data = json.loads(proj.read_text(encoding="utf-8"))
+                entry.update(final=_cagr(data.get("base_cagr")), decay={k: v for k, v in (data.get("decay") or {}).items() if k in DECAY_KEYS},
+                             final_source="projection.json")
+            except (json.JSONDecodeError, TypeError, AttributeError):
+                pass
+    for pat, source in ((_FINAL_TEXT, "보고서 본문"), (_DYNAMIC_TEXT, "보고서 본문 (Dynamic CAGR)")):
+        found = pat.findall(text) if entry["final"] is None else None
+        if found:
+            entry.update(final=float(found[-1]), final_source=source)
+            break
+    m = _OPENAI_BASE.search(step3_out) or _OPENAI_BASE.search(text)
+    entry["openai_base"] = float(m.group(1)) if m else None
+    return entry
+
+
+# ---- 증분 색인 ----
+
+def _load_index(path):
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("version") == INDEX_VERSION and isinstance(data.get("runs"), dict):
+            return data
+    except Exception:
+        pass
+    return {"version": INDEX_VERSION, "runs": {}}
+
+
+def update(reports_dir=None, index_file=None, rebuild=False):
+    """새로 생기거나 바뀐 보고서만 파싱해 색인 갱신. 반환: (색인 dict, 파싱한 보고서 수)."""
+    reports_dir = Path(reports_dir) if reports_dir else REPORTS_DIR
+    path = Path(index_file) if index_file else INDEX_FILE
+    index = {"version": INDEX_VERSION, "runs": {}} if rebuild or not path.exists() else _load_index(path)
+    old = index["runs"]
+    runs, parsed, changed = {}, 0, False
+    for report in sorted(reports_dir.glob("portfolio_report_*.md")):
+        key = run_key(report.name)
+        if key is None:
+            continue
+        try:
+            src = sources(report)
+            prev = old.get(key)
+            if prev and prev.get("sources") == src:
+                runs[key] = prev
+                continue
+            entry = parse_run(report)
+        except Exception as e:
+            print(f"[WARNING] CAGR 아카이브 파싱 실패 ({report.name}): {e}")
+            continue
+        if entry:
+            entry["sources"] = src
+            runs[key] = entry
+            parsed += 1
+            changed = True
+    changed = changed or set(runs) != set(old)
+    index["runs"] = runs
+    if changed:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            tmp.write_text(json.dumps(index, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"[WARNING] CAGR 아카이브 저장 실패: {e}")
+    return index, parsed
+
+
+def last_runs(n=10, index=None, with_final=False):
+    """최근 n회 실행 항목 (작성 시각 최신순). index가 없으면 update()로 갱신 후 조회. with_final: 최종 CAGR 있는 실행만."""
+    if index is None:
+        index, _ = update()
+    runs = sorted(index["runs"].values(), key=lambda e: (e["written"], e["key"]), reverse=True)
+    if with_final:
+        runs = [e for e in runs if e.get("final") is not None]
+    return runs[:max(int(n), 0)]
+
+
+def _pct(v):
+    return f"{v:g}%" if v is not None else "-"
+
+
+def format_decay(decay):
+    return " / ".join(f"{DECAY_LABELS[k]} {decay[k]:g}%" for k in DECAY_KEYS if k in (decay or {})) or "-"
+
+
+def format_for_prompt(runs):
+    """{{realtime_data}}에 넣을 과거 CAGR 참고(앵커) 블록 (docs/TBD.md 문구). runs가 비면 None (첫 실행 등)."""
+    if not runs:
+        return None
+    lines = ["**참고(과거 CAGR 결정 — 스크립트 집계, 앵커용)**",
+             "이번 예측 시 참고하되, 시장·데이터가 달라졌으면 근거와 함께 다른 수치를 제시해도 됨.", "",
+             "| 작성 | Grok α | Gemini β | OpenAI Base | 최종 | 감쇠 |", "|---|---|---|---|---|---|"]
+    for e in runs:
+        lines.append(f"| {e['written'].replace('T', ' ')} | {_pct(e['alpha'])} | {_pct(e['beta'])} | {_pct(e['openai_base'])} | "
+                     f"**{_pct(e['final'])}** | {format_decay(e['decay'])} |")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="과거 CAGR 결정 아카이브 (report/ 증분 색인)")
+    parser.add_argument("--last", type=int, default=10, metavar="N", help="최근 N회 출력 (기본 10)")
+    parser.add_argument("--with-final", action="store_true", help="최종 CAGR 있는 실행만")
+    parser.add_argument("--rebuild", action="store_true", help="색인 전체 다시 만들기")
+    parser.add_argument("--json", action="store_true", help="JSON 출력")
+    args = parser.parse_args()
+    common.utf8_stdout()
+    t0 = time.perf_counter()
+    index, parsed = update(rebuild=args.rebuild)
+    runs = last_runs(args.last, index, with_final=args.with_final)
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    if args.json:
+        print(json.dumps([{k: v for k, v in e.items() if k != "sources"} for e in runs], ensure_ascii=False, indent=2))
+        return 0
+    print(f"[CAGR 아카이브] 실행 {len(index['runs'])}건 (이번에 파싱 {parsed}건, {elapsed_ms:.1f}ms) → {INDEX_FILE}")
+    for e in runs:
+        models = ", ".join(e["models"].values()) if e["models"] else "-"
+        print(f"  {e['written'].replace('T', ' ')}  α {_pct(e['alpha']):>6}  β {_pct(e['beta']):>6}  "
+              f"OpenAI Base {_pct(e['openai_base']):>6}  최종 {_pct(e['final']):>6}  감쇠 {format_decay(e['decay'])}  [{models}]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,7 @@
 
 현재 자산에서 2030년 목표 자산 달성에 필요한 CAGR을 계산하고,
 다양한 CAGR 시나리오별 예상 자산을 산출합니다.
+(보유 종목 변동성·지출 시나리오를 반영한 달성 확률은 monte_carlo.py)
 """
 
 start = 10.11  # 현재 자산 (억원)
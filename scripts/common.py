@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+scripts/ 모듈 공용 도우미
+
+모듈마다 같은 코드를 다시 쓰지 않도록 한 곳에 둔다.
+  - numpy(): numpy를 첫 호출 시 임포트 (3ai 스크립트 콜드 스타트에 포함되지 않도록). 없으면 None
+  - load_config(): prompts/config.json (없거나 읽기 실패 시 빈 dict)
+  - load_env(): 프로젝트 루트 .env를 os.environ에 반영하고 (OpenAI, Grok, Gemini) API 키 반환
+  - utf8_stdout(): Windows 콘솔 UTF-8 출력 (각 스크립트 main() 시작에서 호출, 모듈 import 시에는 건드리지 않음)
+
+사용법 (모듈):
+    import common
+    np = common.numpy()
+    holdings = common.load_config().get("portfolio_holdings") or {}
+
+    def main():
+        common.utf8_stdout()
+"""
+
+import os
+import sys
+import json
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CONFIG_FILE = PROJECT_ROOT / "prompts" / "config.json"
+ENV_FILE = PROJECT_ROOT / ".env"
+
+_NUMPY = {"module": None, "checked": False}
+
+
+def numpy():
+    """numpy 모듈 (첫 호출 시 임포트). 없으면 None."""
+    if not _NUMPY["checked"]:
+        _NUMPY["checked"] = True
+        try:
+            import numpy as np
+            _NUMPY["module"] = np
+        except ImportError:
+            pass
+    return _NUMPY["module"]
+
+
+def load_config():
+    """prompts/config.json을 읽는다. 없거나 실패 시 빈 dict."""
+    try:
+        if CONFIG_FILE.exists():
+            data = json.loads(CONFIG_FILE.read_text(encoding="utf-8"))
+            return data if isinstance(data, dict) else {}
+    except Exception:
+        pass
+    return {}
+
+
+def load_env(require_keys=True):
+    """환경 변수 로드 (.env 파일에서). require_keys=False면 키가 없어도 종료하지 않음 (--plan 등 LLM 미호출 모드)."""
+    if ENV_FILE.exists():
+        encodings = ['utf-8-sig', 'utf-8', 'cp949', 'latin-1']  # utf-8-sig 먼저 (BOM 제거)
+        content = None
+        for encoding in encodings:
+            try:
+                with open(ENV_FILE, 'r', encoding=encoding) as f:
+                    content = f.read()
+                    break
+            except UnicodeDecodeError:
+                continue
+
+        if content:
+            for line in content.splitlines():
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    key = key.strip().lstrip('\ufeff')  # BOM 제거
+                    os.environ[key] = value.strip()
+
+    openai_key = os.environ.get('OPENAI_API_KEY')
+    grok_key = os.environ.get('GROK_API_KEY')
+    gemini_key = os.environ.get('GEMINI_API_KEY')
+    if not require_keys:
+        return openai_key, grok_key, gemini_key
+
+    if not openai_key:
+        print("[ERROR] OPENAI_API_KEY가 설정되지 않았습니다.")
+        print(f"   {ENV_FILE} 파일에 OPENAI_API_KEY=your-key 형식으로 설정하세요.")
+        sys.exit(1)
+
+    if not grok_key:
+        print("[ERROR] GROK_API_KEY가 설정되지 않았습니다.")
+        print(f"   {ENV_FILE} 파일에 GROK_API_KEY=your-key 형식으로 설정하세요.")
+        sys.exit(1)
+
+    if not gemini_key:
+        print("[ERROR] GEMINI_API_KEY가 설정되지 않았습니다.")
+        print(f"   {ENV_FILE} 파일에 GEMINI_API_KEY=your-key 형식으로 설정하세요.")
+        sys.exit(1)
+
+    return openai_key, grok_key, gemini_key
+
+
+def utf8_stdout(line_buffering=False):
+    """Windows 콘솔 인코딩 설정 (다른 OS는 그대로)."""
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace', line_buffering=line_buffering)
@@ -14,31 +14,37 @@
     --openai-model MODEL  OpenAI 모델 (기본값: gpt-5.2)
     --grok-model MODEL    Grok 모델 (기본값: grok-4-1-fast-reasoning)
     --gemini-model MODEL  Gemini 모델 (기본값: gemini-3-flash-preview)
+    --profile             단계별 cProfile(임포트·보고서 로드·AI별 대화)을 report/profiles/discuss_*/에 저장
+    --search              질문마다 report/ 전체(다른 실행 보고서·중간 데이터) 검색 색인에서 관련 구절을 붙임 (report_search.py)
+    --search-only         보고서 전문을 싣지 않고 검색 구절만으로 대화 (여러 주치 보고서 질문용)
+    --search-k N          질문당 구절 수 (기본값: 8)
 
 대화 중 명령:
     g, grok     → Grok로 전환
     o, openai   → OpenAI로 전환
     gemini      → Gemini로 전환
+    search 질의 → 검색 색인 구절만 출력 (AI 호출 없음, --search/--search-only)
     quit, exit  → 종료
 """
 
 import os
 import sys
 import argparse
+from datetime import datetime
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).parent.parent
 REPORTS_DIR = PROJECT_ROOT / "report"
 
-# 같은 폴더의 generate_portfolio_report_3ai에서 함수 import
+# 같은 폴더의 공용 모듈 import
 sys.path.insert(0, str(Path(__file__).parent))
-from generate_portfolio_report_3ai import (
-    load_env,
-    call_openai_chat,
-    call_grok_chat,
-    call_gemini_chat,
-    ENV_FILE,
-)
+import run_profile
+# --profile: ai_providers(및 requests 등) 임포트 시간부터 프로파일
+run_profile.start_if_requested("import")
+import common
+import ai_providers
+import cagr_archive
+import report_search
 
 
 def find_latest_report():
@@ -60,17 +66,38 @@ def load_report(report_path):
     return path.read_text(encoding="utf-8", errors="replace")
 
 
-def build_system_prompt(report_content):
-    """보고서를 컨텍스트로 한 시스템 프롬프트."""
+SEARCH_NOTE = """사용자 질문 앞에 '관련 과거 보고서 구절'(작성 일시·파일:줄 표시)이 붙을 수 있습니다. 과거 결정·수치와 그 시점을 물으면
+구절의 작성 일시를 근거로 답하고, 구절에 없는 내용은 추측하지 말고 없다고 말해 주세요.
+"""
+
+
+def build_system_prompt(report_content, search=False):
+    """보고서를 컨텍스트로 한 시스템 프롬프트. search: 검색 구절 안내 추가, report_content가 None이면 구절만으로 대화."""
+    if report_content is None:
+        return f"""당신은 포트폴리오 분석 전문가입니다. 3-AI 협업으로 생성된 과거 포트폴리오 보고서·중간 데이터에서 검색한 구절을 바탕으로
+사용자의 질문에 답변해 주세요. 수치, CAGR, 시나리오, 리스크 등 구절에 있는 정보를 인용할 수 있습니다.
+{SEARCH_NOTE}"""
     return f"""당신은 포트폴리오 분석 전문가입니다. 아래에 3-AI 협업으로 생성된 포트폴리오 보고서가 있습니다.
 이 보고서 내용을 바탕으로 사용자의 질문에 답변해 주세요. 수치, CAGR, 시나리오, 리스크 등 보고서에 있는 정보를 인용할 수 있습니다.
-
+{SEARCH_NOTE if search else ""}
 === 포트폴리오 보고서 ===
 {report_content}
 === 보고서 끝 ===
 """
 
 
+def print_search_hits(hits):
+    """대화 중 'search 질의' 결과 출력 (AI 호출 없음)."""
+    if not hits:
+        print("[검색] 관련 구절 없음\n")
+        return
+    for h in hits:
+        preview = " ".join(h["text"].split())
+        print(f"  {h['score']:6.2f}  {report_search.run_label(h['run_key'])}  {h['path']}:{h['line']}  {h['heading'] or '-'}\n"
+              f"          {preview[:160]}{' …' if len(preview) > 160 else ''}")
+    print()
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
         description="보고서 기반 Grok·Gemini·OpenAI 대화",
@@ -101,16 +128,52 @@ def parse_args():
     parser.add_argument("--openai-model", type=str, default="gpt-5.2")
     parser.add_argument("--grok-model", type=str, default="grok-4-1-fast-reasoning")
     parser.add_argument("--gemini-model", type=str, default="gemini-3-flash-preview")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="단계별 cProfile(import·load_env·load_report·search·chat_<AI>, 입력 대기 제외)을 report/profiles/discuss_YYYYMMDD_HHMM/에 저장"
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="질문마다 report/ 검색 색인(다른 실행 보고서·중간 데이터, BM25)에서 관련 구절을 붙임. 색인은 시작 시 증분 갱신"
+    )
+    parser.add_argument(
+        "--search-only",
+        action="store_true",
+        help="보고서 전문을 시스템 프롬프트에 싣지 않고 검색 구절만으로 대화 (--search 포함)"
+    )
+    parser.add_argument(
+        "--search-k",
+        type=int,
+        default=report_search.DEFAULT_K,
+        metavar="N",
+        help=f"질문당 검색 구절 수 (기본값: {report_search.DEFAULT_K})"
+    )
     return parser.parse_args()
 
 
 def run_chat(args):
     """대화 루프."""
-    openai_key, grok_key, gemini_key = load_env()
+    run_profile.switch("load_env")
+    openai_key, grok_key, gemini_key = common.load_env()
+    run_profile.switch("load_report")
+
+    # 검색 색인 (새 보고서만 증분 색인). 색인을 못 쓰면 기존처럼 보고서 1건으로 대화
+    search = args.search or args.search_only
+    if search:
+        stats = report_search.update()
+        if stats is None:
+            print("[WARNING] 검색 없이 보고서 1건으로 대화합니다.")
+            search = False
+        else:
+            print(f"[INFO] 검색 색인: 파일 {stats['docs']}개 · 구절 {stats['passages']}개 (이번에 색인 {stats['indexed']}개)")
 
     # 보고서 로드
     report_path = args.report
-    if not report_path:
+    if search and args.search_only:
+        report_path = None
+    elif not report_path:
         report_path = find_latest_report()
         if not report_path:
             print("[ERROR] report/ 폴더에 portfolio_report_*.md 파일이 없습니다.")
@@ -124,18 +187,23 @@ def run_chat(args):
             print(f"[ERROR] 보고서 파일을 찾을 수 없습니다: {args.report}")
             sys.exit(1)
 
-    report_content = load_report(report_path)
-    if not report_content:
-        print("[ERROR] 보고서 읽기 실패")
-        sys.exit(1)
+    report_content, exclude_runs = None, ()
+    if report_path is not None:
+        report_content = load_report(report_path)
+        if not report_content:
+            print("[ERROR] 보고서 읽기 실패")
+            sys.exit(1)
+        # 시스템 프롬프트에 이미 있는 실행은 검색에서 뺌
+        key = cagr_archive.run_key(report_path.name)
+        exclude_runs = (key,) if key else ()
 
-    system_prompt = build_system_prompt(report_content)
+    system_prompt = build_system_prompt(report_content, search)
 
     # AI별 호출 함수·키·모델
     ai_map = {
-        "openai": (call_openai_chat, openai_key, args.openai_model),
-        "grok": (call_grok_chat, grok_key, args.grok_model),
-        "gemini": (call_gemini_chat, gemini_key, args.gemini_model),
+        "openai": (ai_providers.chat_openai, openai_key, args.openai_model),
+        "grok": (ai_providers.chat_grok, grok_key, args.grok_model),
+        "gemini": (ai_providers.chat_gemini, gemini_key, args.gemini_model),
     }
 
     current_ai = args.ai
@@ -146,12 +214,16 @@ def run_chat(args):
 
     print("=" * 60)
     print("보고서 기반 AI 대화 (Grok · Gemini · OpenAI)")
-    print(f"보고서: {report_path.name}")
+    print(f"보고서: {report_path.name if report_path else '(없음 — 검색 구절만)'}")
+    if search:
+        print(f"검색: 질문당 관련 구절 최대 {args.search_k}개 (report/ 전체)")
     print(f"현재 AI: {current_ai} ({preferred_model})")
     print("=" * 60)
-    print("\n명령: g/grok → Grok, o/openai → OpenAI, gemini → Gemini | quit/exit → 종료\n")
+    print("\n명령: g/grok → Grok, o/openai → OpenAI, gemini → Gemini | "
+          f"{'search 질의 → 구절만 보기 | ' if search else ''}quit/exit → 종료\n")
 
     while True:
+        run_profile.switch(None)  # 입력 대기는 프로파일 제외
         try:
             line = input(f"[{current_ai}] You> ").strip()
         except EOFError:
@@ -184,9 +256,23 @@ def run_chat(args):
             print(f"[전환] Gemini ({preferred_model})\n")
             continue
 
-        # 대화
+        if search and low.startswith("search "):
+            run_profile.switch("search")
+            print_search_hits(report_search.search(line[len("search "):], args.search_k, exclude_runs=exclude_runs))
+            continue
+
+        # 대화. 검색 구절은 이번 요청에만 붙이고 히스토리에는 질문만 남김 (턴마다 컨텍스트가 쌓이지 않도록)
+        content = line
+        if search:
+            run_profile.switch("search")
+            hits = report_search.search(line, args.search_k, exclude_runs=exclude_runs)
+            block = report_search.format_for_prompt(hits)
+            if block:
+                content = f"{block}\n\n질문: {line}"
+                print(f"[검색] 관련 구절 {len(hits)}개 첨부")
+        run_profile.switch(f"chat_{current_ai}")
         messages.append({"role": "user", "content": line})
-        reply, model_used = chat_fn(chat_key, messages, preferred_model)
+        reply, model_used = chat_fn(chat_key, messages[:-1] + [{"role": "user", "content": content}], preferred_model)
 
         if reply is None:
             print(f"[ERROR] {current_ai} API 호출 실패\n")
@@ -199,7 +285,12 @@ def run_chat(args):
 
 def main():
     args = parse_args()
+    if args.profile:
+        profile_dir = REPORTS_DIR / "profiles" / f"discuss_{datetime.now().strftime('%Y%m%d_%H%M')}"
+        run_profile.start("startup", default_dir=profile_dir)
     run_chat(args)
+    if args.profile:
+        run_profile.write(profile_dir)
 
 
 if __name__ == "__main__":
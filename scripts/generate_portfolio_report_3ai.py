@@ -17,12 +17,19 @@
     --gemini-model MODEL     Gemini 모델 지정 (기본값: gemini-3-flash-preview)
     --prompt-file FILE        프롬프트 파일 경로 (기본값: prompts/config.json의 portfolio_prompt_file)
     --output-file FILE        결과 파일 경로 (기본값: 자동 생성)
+    --pipeline NAME          prompts/pipelines.json 파이프라인 (기본값: 3ai, 2라운드 생략: 3ai_fast)
+    --no-local-projection    시나리오별 자산 추이 표를 스크립트 계산 대신 OpenAI가 직접 작성 (예전 방식)
+    --monte-carlo [N]        보유 종목 과거 수익률로 목표 달성 확률 몬테카를로(N경로, 기본 200000) 후 Step 1 실시간 데이터에 포함
     --no-grok-web-search     Grok web_search 비활성화
     --test-stock-price       주가 실시간 조회 테스트만 실행
     --test-data-fetch        환율·미국주가 API 조회만 테스트 후 종료
     --check-prices           환율·주가 확인만 실행 후 종료 (별도 실행용, --test-data-fetch와 동일)
     --test-cagr-only         CAGR 예측만 1회 (Grok→Gemini→OpenAI 최소). 보고서 미생성. 변동 테스트용
     --test-cagr-runs N       CAGR 예측만 N회 연속 수행 후 요약 표 출력 (예: --test-cagr-runs 4). temperature 효과 비교용
+    --structured-output      CAGR 단계를 JSON 스키마(prompts/cagr_schema.json) 구조화 출력으로 요청
+    --no-budget-scheduler    월 예산 기반 모델 자동 하향 비활성화 (예산 env 설정 시 기본 활성)
+    --plan                   LLM 호출 없이 예상 비용·소요 시간·임계 경로만 출력 (드라이런, API 키 불필요)
+    --profile                단계별 cProfile(임포트 포함)을 중간 데이터 디렉터리에 저장하고 상위 함수 요약 출력
     --debug-step 1|2|3|4|5   1=Grok R1, 2=+Gemini R1, 3=+Grok R2, 4=+Gemini R2, 5=+OpenAI — 실행 시 Step 0에서 환율·주가 확인 후 해당 AI와 추가 질문 (종료: quit 또는 exit 입력)
 """
 
@@ -34,17 +41,46 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import json
 import re
-import requests
 import time
 
-# yfinance 임포트 (없으면 설치 필요: pip install yfinance)
-try:
-    import yfinance as yf
-    import pandas as pd
-    YFINANCE_AVAILABLE = True
-except ImportError:
-    YFINANCE_AVAILABLE = False
-    print("[WARNING] yfinance 미설치. 미국 주가 조회 불가. 설치: pip install yfinance pandas")
+import run_profile
+# --profile: requests 등 모듈 임포트 시간부터 프로파일 (인자 파싱 전). yfinance는 data_fetch 단계에서 임포트
+run_profile.start_if_requested("import")
+
+import requests
+
+import common
+import usage_ledger
+import budget_scheduler
+import run_planner
+import run_trace
+import run_metrics
+import ai_providers
+import pipeline_engine
+import asset_projection
+import monte_carlo
+import swing_rules
+import swing_scanner
+import risk_metrics
+import stress_test
+import valuation
+import snapshot_store
+import cagr_archive
+
+# yfinance(+pandas)는 주가 조회 시점에 처음 임포트 (없으면 설치 필요: pip install yfinance)
+# 대화(discuss_report)·--list-models·--test-models·--plan 등 주가를 조회하지 않는 경로는 임포트 비용 없음
+_YFINANCE = {"module": None, "checked": False}
+
+def _yfinance():
+    """yfinance 모듈 (첫 호출 시 임포트). 미설치면 경고 1회 출력 후 None."""
+    if not _YFINANCE["checked"]:
+        _YFINANCE["checked"] = True
+        try:
+            import yfinance
+            _YFINANCE["module"] = yfinance
+        except ImportError:
+            print("[WARNING] yfinance 미설치. 미국 주가 조회 불가. 설치: pip install yfinance pandas")
+    return _YFINANCE["module"]
 
 # Windows 콘솔 인코딩 설정
 if sys.platform == 'win32':
@@ -54,100 +90,32 @@ if sys.platform == 'win32':
 
 # 프로젝트 루트 디렉토리
 PROJECT_ROOT = Path(__file__).parent.parent
-ENV_FILE = PROJECT_ROOT / ".env"
 REPORTS_DIR = PROJECT_ROOT / "report"
 PROMPTS_DIR = PROJECT_ROOT / "prompts"
 
 # 설정·폴백은 모두 prompts/에서 로드 (config.json, fallback_*_system.md)
 CONFIG_FILE = PROMPTS_DIR / "config.json"
+# Step 3 자산 추이 표를 스크립트가 계산할 때 OpenAI 유저 프롬프트 끝에 붙는 지시 (표 자리 [[ASSET_PROJECTION]])
+PROJECTION_INSTRUCTION_FILE = PROMPTS_DIR / "step3_projection_instruction.md"
 FALLBACK_FILES = {"grok": "fallback_grok_system.md", "gemini": "fallback_gemini_system.md", "openai": "fallback_openai_system.md"}
 
-# API 비용 추적 (1M tokens당 USD. docs/Model_Price_Comparison.md 참고)
-API_USAGE_LOG = []
+# AI API 기본 URL·모델 폴백·가격·사용량 원장·HTTP 재시도는 ai_providers.py (모든 보고서 스크립트 공통)
+# .env의 *_BASE_URL로 바꾸면 로컬 모의 서버(scripts/mock_provider_server.py) 등으로 호출 가능
+USAGE_RUN = ai_providers.USAGE_RUN
+start_usage_run = ai_providers.start_usage_run
 
-def _estimate_tokens(text):
-    """대략적 토큰 수 (문자 수/4, 최소 1)."""
-    if not text:
-        return 0
-    return max(1, len(str(text)) // 4)
-
-def _log_usage(provider, model, input_tokens, output_tokens):
-    """호출당 사용량 기록. 비용 계산용."""
-    API_USAGE_LOG.append({
-        "provider": provider,
-        "model": model or "unknown",
-        "input_tokens": int(input_tokens or 0),
-        "output_tokens": int(output_tokens or 0),
-    })
-
-# 1M tokens당 USD (입력, 출력). 알 수 없는 모델은 openai 5.2 수준으로 추정
-PRICE_PER_1M = {
-    "openai": {
-        "gpt-5.2": (1.75, 14.0), "gpt-5.2-2025-12-11": (1.75, 14.0),
-        "gpt-5.2-pro": (21.0, 168.0), "gpt-5.2-pro-2025-12-11": (21.0, 168.0),
-        "gpt-4o": (2.5, 10.0), "gpt-4-turbo": (10.0, 30.0), "gpt-4": (30.0, 60.0), "gpt-3.5-turbo": (0.5, 1.5),
-    },
-    "grok": {
-        "grok-4-1-fast-reasoning": (0.20, 0.50), "grok-4-1-fast": (0.20, 0.50), "grok-4-1-fast-non-reasoning": (0.20, 0.50),
-        "grok-4-fast-reasoning": (0.20, 0.50), "grok-4-fast": (0.20, 0.50), "grok-4-fast-non-reasoning": (0.20, 0.50),
-        "grok-3": (3.0, 15.0), "grok-3-mini": (0.5, 2.0),
-    },
-    "gemini": {
-        "gemini-3-flash-preview": (0.50, 3.0), "gemini-3-flash": (0.50, 3.0),
-        "gemini-2.5-flash": (0.30, 2.5), "gemini-2.5-pro": (1.25, 10.0),
-        "gemini-3-pro-preview": (2.0, 12.0), "gemini-3-pro": (2.0, 12.0), "gemini-pro": (0.5, 1.5),
-    },
-}
+def set_usage_step(step):
+    """이후 사용량 원장 기록에 붙일 단계명 (예: step1_grok, step3_openai). 추적 step span도 여기서 전환."""
+    USAGE_RUN["step"] = step
+    enter_step(step)
 
-def _get_price(provider, model):
-    """(input_per_1M, output_per_1M) USD. 없으면 기본값."""
-    d = PRICE_PER_1M.get(provider, {})
-    if model in d:
-        return d[model]
-    if provider == "openai":
-        return (1.75, 14.0)
-    if provider == "grok":
-        return (0.20, 0.50)
-    if provider == "gemini":
-        return (0.50, 3.0)
-    return (1.0, 5.0)
+def enter_step(step):
+    """추적 step span·--profile 단계 전환 (사용량 기록이 없는 read_prompt·data_fetch·save_report는 직접 호출)."""
+    run_trace.enter("step", step)
+    run_profile.switch(step)
 
-USAGE_CACHE_FILE = REPORTS_DIR / ".usage_cache.json"
-
-def _load_usage_cache():
-    """report/.usage_cache.json에서 이번 달 누적 사용량 로드. {provider: {inp, out, cost}}"""
-    try:
-        if USAGE_CACHE_FILE.exists():
-            data = json.loads(USAGE_CACHE_FILE.read_text(encoding="utf-8"))
-            if isinstance(data, dict):
-                return data
-    except Exception:
-        pass
-    return {}
-
-def _save_usage_cache(cache):
-    """이번 달 누적 사용량 저장."""
-    try:
-        REPORTS_DIR.mkdir(parents=True, exist_ok=True)
-        USAGE_CACHE_FILE.write_text(json.dumps(cache, ensure_ascii=False, indent=2), encoding="utf-8")
-    except Exception:
-        pass
-
-def _merge_usage_to_cache(cache, by_provider_costs):
-    """API_USAGE_LOG 기반 비용을 cache에 합산. by_provider_costs = {provider: cost}."""
-    now = datetime.now()
-    month_key = f"{now.year}-{now.month:02d}"
-    if month_key not in cache or not isinstance(cache[month_key], dict):
-        cache[month_key] = {"openai": {"inp": 0, "out": 0, "cost": 0}, "grok": {"inp": 0, "out": 0, "cost": 0}, "gemini": {"inp": 0, "out": 0, "cost": 0}}
-    m = cache[month_key]
-    for prov, cost in by_provider_costs.items():
-        if prov not in m or not isinstance(m[prov], dict):
-            m[prov] = {"inp": 0, "out": 0, "cost": 0}
-        inp_sum = sum(u["input_tokens"] for u in API_USAGE_LOG if u["provider"] == prov)
-        out_sum = sum(u["output_tokens"] for u in API_USAGE_LOG if u["provider"] == prov)
-        m[prov]["inp"] = m[prov].get("inp", 0) + inp_sum
-        m[prov]["out"] = m[prov].get("out", 0) + out_sum
-        m[prov]["cost"] = m[prov].get("cost", 0) + cost
+_estimate_tokens = ai_providers.estimate_tokens
+_get_price = ai_providers.get_price
 
 def fetch_openai_usage_this_month(api_key):
     """OpenAI Usage API로 이번 달 completions 사용량 조회. (input_tokens, output_tokens, 추정비용USD) 또는 None."""
@@ -156,8 +124,8 @@ def fetch_openai_usage_this_month(api_key):
         start = datetime(now.year, now.month, 1)
         start_ts = int(start.timestamp())
         end_ts = int(now.timestamp())
-        url = f"https://api.openai.com/v1/organization/usage/completions?start_time={start_ts}&end_time={end_ts}&bucket_width=1d&limit=31"
-        r = requests.get(url, headers={"Authorization": f"Bearer {api_key}"}, timeout=15)
+        path = f"/organization/usage/completions?start_time={start_ts}&end_time={end_ts}&bucket_width=1d&limit=31"
+        r = ai_providers.http_get("openai", path, api_key=api_key, timeout=15)
         if r.status_code != 200:
             return None
         data = r.json()
@@ -181,10 +149,8 @@ def fetch_openai_usage_this_month(api_key):
 
 
 def compute_and_print_cost(usd_krw_rate=None, openai_key=None):
-    """API_USAGE_LOG 기준으로 비용(USD·KRW) 계산 후 출력. openai_key 있으면 이번 달 사용량·잔여 표시."""
-    now = datetime.now()
-    month_key = f"{now.year}-{now.month:02d}"
-    cache = _load_usage_cache()
+    """사용량 원장 기준으로 이번 실행 비용(USD·KRW) 계산 후 출력. 이번 달 누적·잔여도 원장에서 조회 (openai_key 있으면 OpenAI는 Usage API 우선)."""
+    month_key = usage_ledger.month_key()
     monthly_openai = None
     if openai_key:
         monthly_openai = fetch_openai_usage_this_month(openai_key)
@@ -204,23 +170,14 @@ def compute_and_print_cost(usd_krw_rate=None, openai_key=None):
         "gemini": _parse_budget("GEMINI_MONTHLY_BUDGET"),
     }
 
-    if not API_USAGE_LOG and not monthly_openai:
+    run_rows = usage_ledger.run_totals(USAGE_RUN["run_id"])
+    if not run_rows and not monthly_openai:
         return
-    total_usd = 0.0
     lines = ["\n[API 비용 (추정)]"]
     by_provider = {}
-    for u in API_USAGE_LOG:
-        provider = u["provider"]
-        model = u["model"]
-        inp, out = u["input_tokens"], u["output_tokens"]
-        price_in, price_out = _get_price(provider, model)
-        cost = (inp / 1_000_000) * price_in + (out / 1_000_000) * price_out
-        total_usd += cost
-        by_provider[provider] = by_provider.get(provider, 0) + cost
-
-    # 이번 실행 누적을 캐시에 저장
-    _merge_usage_to_cache(cache, by_provider)
-    _save_usage_cache(cache)
+    for r in run_rows:
+        by_provider[r["provider"]] = by_provider.get(r["provider"], 0) + (r["cost"] or 0)
+    total_usd = sum(by_provider.values())
 
     for prov, c in sorted(by_provider.items()):
         lines.append(f"  {prov}: ${c:.4f}")
@@ -235,7 +192,7 @@ def compute_and_print_cost(usd_krw_rate=None, openai_key=None):
             lines.append(f"  **한국돈: 약 {total_krw:,}원** (환율 {rate}원/USD 기준)")
 
     # 이번 달 사용량·예상 잔여 (OpenAI, Grok, Gemini)
-    month_data = cache.get(month_key, {})
+    month_data = usage_ledger.month_totals(month_key)
     dashboards = {"openai": "https://platform.openai.com/usage", "grok": "https://console.x.ai/team/default/usage", "gemini": "https://aistudio.google.com/usage"}
     for prov in ["openai", "grok", "gemini"]:
         cost_est = None
@@ -246,7 +203,7 @@ def compute_and_print_cost(usd_krw_rate=None, openai_key=None):
             d = month_data[prov]
             inp, out, cost_est = d["inp"], d["out"], d["cost"]
         if cost_est is not None and cost_est > 0:
-            src = "API" if prov == "openai" and monthly_openai else "스크립트 누적"
+            src = "API" if prov == "openai" and monthly_openai else "원장 누적"
             fmt = "${:.4f}" if cost_est < 0.01 else "${:.2f}"
             lines.append(f"  [이번 달 {prov} 사용] ~{fmt.format(cost_est)} (입력 {inp:,} / 출력 {out:,} 토큰, {src})")
             b = budgets.get(prov)
@@ -294,6 +251,10 @@ def get_portfolio_holdings():
         return None
     return {"cash_krw": int(cash) if cash is not None else 0, "positions": positions}
 
+def get_projection_settings():
+    """prompts/config.json의 projection (지출 시나리오·인출률·기본 감쇠). 없는 키는 asset_projection 기본값."""
+    return asset_projection.load_settings(load_prompts_config().get("projection"))
+
 def get_stock_price_test_prompt():
     """주가 실시간 조회 테스트용 프롬프트 (config 또는 prompts/stock_price_test_prompt.txt)."""
     cfg = load_prompts_config()
@@ -405,7 +366,8 @@ def fetch_usd_krw_rate():
 
 def fetch_us_stock_prices(tickers):
     """yfinance로 미국 주식 가격 조회. 딕셔너리 {ticker: {prices}} 반환. 실패 시 빈 dict."""
-    if not YFINANCE_AVAILABLE:
+    yf = _yfinance()
+    if yf is None:
         return {}
     try:
         result = {}
@@ -440,18 +402,14 @@ def fetch_us_stock_prices(tickers):
         print(f"[WARNING] 미국 주가 조회 실패: {str(e)}")
         return {}
 
-def _best_usd_price(prices):
-    """미국 주가 dict에서 정규장 종가 우선, 없으면 애프터·프리 순으로 단일 가격(USD) 반환. 보고서 평가·계산용."""
-    if not prices:
-        return None
-    for key in ("regular", "post", "pre"):
-        if key in prices and prices[key] is not None:
-            return float(prices[key])
-    return None
+_best_usd_price = valuation.best_usd_price  # 정규장 종가 우선, 없으면 애프터·프리 (평가 엔진과 같은 규칙)
 
 def fetch_kr_stock_prices(tickers):
     """yfinance로 한국 주식/ETF 가격 조회. ticker -> KRW 가격(원) 반환. .KS/.KQ 지원."""
-    if not YFINANCE_AVAILABLE or not tickers:
+    if not tickers:
+        return {}
+    yf = _yfinance()
+    if yf is None:
         return {}
     result = {}
     for ticker in tickers:
@@ -467,65 +425,12 @@ def fetch_kr_stock_prices(tickers):
 
 def compute_portfolio_valuation(holdings, usd_krw_rate, us_stock_prices, kr_stock_prices):
     """
-    보유 종목 + 환율 + 주가로 평가액(원) 계산.
-    반환: (rows, total_krw). rows는 [{"account", "name", "qty", "unit", "value_krw", "pct"}, ...]
+    보유 종목 + 환율 + 주가로 평가액(원) 계산 (열 단위 평가 엔진 valuation.py).
+    반환: (rows, total_krw). rows는 [{"account", "symbol", "currency", "name", "qty", "unit", "value_krw", "pct"}, ...] (현금 행 symbol None)
     """
     if not holdings or not holdings.get("positions"):
         return [], 0
-    cash_krw = int(holdings.get("cash_krw") or 0)
-    total_krw = cash_krw
-    rows = []
-
-    if cash_krw > 0:
-        rows.append({
-            "account": "법인 Active",
-            "name": "현금",
-            "qty": None,
-            "unit": "원",
-            "value_krw": cash_krw,
-            "pct": None,
-        })
-
-    for pos in holdings["positions"]:
-        account = pos.get("account") or ""
-        symbol = pos.get("symbol") or ""
-        name = pos.get("name") or symbol
-        qty = int(pos.get("qty") or 0)
-        currency = (pos.get("currency") or "USD").upper()
-        value_krw = 0
-        unit = ""
-
-        if currency == "USD":
-            price_usd = _best_usd_price(us_stock_prices.get(symbol)) if us_stock_prices else None
-            if price_usd is not None and usd_krw_rate:
-                value_krw = round(qty * price_usd * usd_krw_rate, 0)
-                unit = f"${price_usd:.2f}"
-            else:
-                unit = "(가격 조회 실패)"
-        else:
-            price_krw = kr_stock_prices.get(symbol) if kr_stock_prices else None
-            if price_krw is not None:
-                value_krw = qty * int(price_krw)
-                unit = f"{int(price_krw):,}원"
-            else:
-                unit = "(가격 조회 실패)"
-
-        total_krw += value_krw
-        rows.append({
-            "account": account,
-            "name": name,
-            "qty": qty,
-            "unit": unit,
-            "value_krw": value_krw,
-            "pct": None,
-        })
-
-    if total_krw > 0:
-        for r in rows:
-            if r["value_krw"] and r["value_krw"] > 0:
-                r["pct"] = round(100.0 * r["value_krw"] / total_krw, 2)
-
-    return rows, int(total_krw)
+    return valuation.to_rows(valuation.value_book(holdings, usd_krw_rate, us_stock_prices, kr_stock_prices))
 
 def format_valuation_for_prompt(rows, total_krw):
     """평가 행 목록과 총자산을 프롬프트용 마크다운 테이블 문자열로 반환."""
@@ -543,47 +448,40 @@ def format_valuation_for_prompt(rows, total_krw):
     lines.append(f"**총자산(API·스크립트 계산): {total_krw:,}원 (약 {total_krw/100_000_000:.2f}억)**")
     return "\n".join(lines)
 
-def load_env():
-    """환경 변수 로드 (.env 파일에서)"""
-    if ENV_FILE.exists():
-        encodings = ['utf-8-sig', 'utf-8', 'cp949', 'latin-1']  # utf-8-sig 먼저 (BOM 제거)
-        content = None
-        for encoding in encodings:
-            try:
-                with open(ENV_FILE, 'r', encoding=encoding) as f:
-                    content = f.read()
-                    break
-            except UnicodeDecodeError:
-                continue
-        
-        if content:
-            for line in content.splitlines():
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    key = key.strip().lstrip('\ufeff')  # BOM 제거
-                    os.environ[key] = value.strip()
-    
-    openai_key = os.environ.get('OPENAI_API_KEY')
-    grok_key = os.environ.get('GROK_API_KEY')
-    gemini_key = os.environ.get('GEMINI_API_KEY')
-    
-    if not openai_key:
-        print("[ERROR] OPENAI_API_KEY가 설정되지 않았습니다.")
-        print(f"   {ENV_FILE} 파일에 OPENAI_API_KEY=your-key 형식으로 설정하세요.")
-        sys.exit(1)
-    
-    if not grok_key:
-        print("[ERROR] GROK_API_KEY가 설정되지 않았습니다.")
-        print(f"   {ENV_FILE} 파일에 GROK_API_KEY=your-key 형식으로 설정하세요.")
-        sys.exit(1)
-    
-    if not gemini_key:
-        print("[ERROR] GEMINI_API_KEY가 설정되지 않았습니다.")
-        print(f"   {ENV_FILE} 파일에 GEMINI_API_KEY=your-key 형식으로 설정하세요.")
-        sys.exit(1)
-    
-    return openai_key, grok_key, gemini_key
+def format_pnl_for_prompt(rows):
+    """평단(avg_cost) 있는 행의 원가·손익·수익률·가격/환율 효과 표 (스크립트 계산). 평단 있는 행이 없으면 None."""
+    pnl_rows = [r for r in rows if r.get("pnl_krw") is not None]
+    if not pnl_rows:
+        return None
+
+    def won(v):
+        return "-" if v is None else f"{v:+,.0f}" if round(v) else "0"
+
+    lines = [
+        "**종목별 수익률 (평단 대비, 스크립트 계산 — 3.1 종목별 수익률은 이 표를 그대로 사용하고 재계산하지 말 것)**",
+        "",
+        "| 계좌 | 종목 | 수량 | 평단 | 현재가 | 수익률(현지) | 원가(원) | 손익(원) | 수익률(원화) | 가격 효과(원) | 환율 효과(원) |",
+        "|------|------|------|-----:|-------:|------:|------:|------:|------:|------:|------:|",
+    ]
+    for r in pnl_rows:
+        avg = f"${r['avg_cost']:.2f}" if r["currency"] == "USD" else f"{r['avg_cost']:,.0f}원"
+        ret = f"{r['return_pct']:+.1f}%" if r["return_pct"] is not None else "-"
+        ret_krw = f"{r['return_krw_pct']:+.1f}%" if r["return_krw_pct"] is not None else "-"
+        lines.append(f"| {r['account']} | {r['name']} | {r['qty']} | {avg} | {r['unit']} | {ret} | {r['cost_krw']:,.0f} | "
+                     f"{won(r['pnl_krw'])} | {ret_krw} | {won(r['pnl_price_krw'])} | {won(r['pnl_fx_krw'])} |")
+    cost = sum(r["cost_krw"] for r in pnl_rows)
+    pnl = sum(r["pnl_krw"] for r in pnl_rows)
+    fx_known = [r["pnl_fx_krw"] for r in pnl_rows if r["pnl_fx_krw"] is not None]
+    lines.append("")
+    lines.append(f"**합계: 원가 {cost:,.0f}원, 손익 {pnl:+,.0f}원 ({pnl / cost * 100:+.1f}%)**" if cost else f"**합계 손익 {pnl:+,.0f}원**")
+    lines.append(f"- 가격 효과 {sum(r['pnl_price_krw'] for r in pnl_rows):+,.0f}원, 환율 효과 {sum(fx_known):+,.0f}원")
+    assumed = sorted({r["cost_fx"] for r in pnl_rows if r.get("cost_fx_assumed")})
+    if assumed:
+        rates = ", ".join(f"{v:,.0f}원" for v in assumed)
+        lines.append(f"- 매수 환율(cost_fx) 미기재 USD 종목은 기본 매수 환율 {rates} 가정 (config default_cost_fx) → 해당 행 환율 효과는 추정치")
+    if any(r["currency"] == "USD" and r["pnl_fx_krw"] is None for r in pnl_rows):
+        lines.append("- 환율 효과 '-': 매수 환율(cost_fx) 미기재 → 원가를 현재 환율로 환산, 손익은 가격 효과만")
+    return "\n".join(lines) + "\n"
 
 def read_portfolio_prompt(prompt_file_path):
     """프롬프트 파일을 읽어옵니다."""
@@ -637,15 +535,22 @@ def generate_report_filename(openai_model=None, grok_model=None, gemini_model=No
     filepath = REPORTS_DIR / filename
     return filename, filepath
 
-def create_initial_prompt(portfolio_prompt_content, usd_krw_rate=None, us_stock_prices=None, computed_valuation_text=None):
-    """초기 프롬프트를 생성합니다. 환율·미국주가·(선택) API 계산 평가액을 주입합니다."""
-    today = datetime.now()
-    yesterday = today - timedelta(days=1)
-    date_str = today.strftime("%Y년 %m월 %d일")
-    yesterday_str = yesterday.strftime("%Y년 %m월 %d일")
-    yesterday_iso = yesterday.strftime("%Y-%m-%d")
-    
-    # 실시간 데이터 블록 생성
+# 스크립트 계산 프롬프트 블록 키 (main()이 채운 blocks dict, 템플릿·파이프라인 컨텍스트 치환 이름과 같음)
+PROMPT_BLOCKS = ("risk_metrics", "monte_carlo", "swing_scan", "cagr_anchor", "stress_test", "holdings_pnl")
+# Step 1 {{realtime_data}} 뒤에 이 순서로 붙는 블록
+REALTIME_BLOCKS = ("risk_metrics", "monte_carlo", "swing_scan", "cagr_anchor")
+
+def fill_blocks(text, blocks):
+    """템플릿의 {{블록 키}}를 blocks 값으로 치환 (없는 블록은 빈 문자열)."""
+    for key in PROMPT_BLOCKS:
+        text = text.replace("{{" + key + "}}", (blocks or {}).get(key) or "")
+    return text
+
+def build_realtime_data(usd_krw_rate=None, us_stock_prices=None, computed_valuation_text=None, yesterday_iso=None, blocks=None):
+    """Step 1 유저 프롬프트의 {{realtime_data}} 블록 (환율·미국주가·API 계산 평가액 + blocks의 리스크 지표·(선택) 몬테카를로 확률·
+    스윙 신호·(선택) 과거 CAGR 참고, 실패 항목은 웹 검색 지시)."""
+    if yesterday_iso is None:
+        yesterday_iso = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
     realtime_data = "\n\n## [제공된 실시간 데이터 - 반드시 이 값을 사용할 것]\n\n"
     
     if usd_krw_rate:
@@ -674,6 +579,18 @@ def create_initial_prompt(portfolio_prompt_content, usd_krw_rate=None, us_stock_
         realtime_data += "\n"
     else:
         realtime_data += f"**한국 주식 종가** (SK하이닉스, 삼성전자, 파마리서치 등): 웹 검색으로 {yesterday_iso} 종가를 찾으세요.\n"
+    for key in REALTIME_BLOCKS:
+        if (blocks or {}).get(key):
+            realtime_data += "\n" + blocks[key]
+    return realtime_data
+
+def create_initial_prompt(portfolio_prompt_content, usd_krw_rate=None, us_stock_prices=None, computed_valuation_text=None, blocks=None):
+    """초기 프롬프트를 생성합니다. 환율·미국주가·(선택) API 계산 평가액·스크립트 계산 블록(blocks)을 주입합니다."""
+    today = datetime.now()
+    yesterday = today - timedelta(days=1)
+    date_str = today.strftime("%Y년 %m월 %d일")
+    yesterday_str = yesterday.strftime("%Y년 %m월 %d일")
+    realtime_data = build_realtime_data(usd_krw_rate, us_stock_prices, computed_valuation_text, yesterday.strftime("%Y-%m-%d"), blocks)
     
     tpl = load_user_template("grok")
     if tpl:
@@ -692,539 +609,165 @@ def create_initial_prompt(portfolio_prompt_content, usd_krw_rate=None, us_stock_
 **출력 범위:** 자산 요약·시장 해석·CAGR 예측 및 근거(시장·리스크)만. 보고서 본문은 Step 5에서 작성. **출력 하단에 JSON 포함:** {{"alpha_cagr": 0.0, "current_total_krw": 0, "market_data": {{...}}}}
 """
 
-def parse_alpha_json(text):
-    """Grok 출력에서 Alpha CAGR JSON을 추출. alpha_cagr, current_total_krw, market_data 반환."""
-    if not text:
-        return None, None, None
-    # ```json ... ``` 또는 마지막 {...} 블록 찾기
-    for pattern in (r'```(?:json)?\s*(\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\})\s*```', r'(\{"alpha_cagr"\s*:\s*[^}]+\})'):
-        m = re.search(pattern, text, re.DOTALL)
-        if m:
-            try:
-                data = json.loads(m.group(1).strip())
-                return (
-                    data.get("alpha_cagr"),
-                    data.get("current_total_krw"),
-                    data.get("market_data")
-                )
-            except (json.JSONDecodeError, TypeError):
-                pass
-    # 단순 alpha_cagr 숫자만 찾기
-    m = re.search(r'"alpha_cagr"\s*:\s*([\d.]+)', text)
-    if m:
-        try:
-            return float(m.group(1)), None, None
-        except ValueError:
-            pass
-    return None, None, None
-
-def parse_beta_json(text):
-    """Gemini 출력에서 Beta CAGR JSON을 추출. beta_cagr, risk_level, audit_notes 반환."""
-    if not text:
-        return None, None, None
-    for pattern in (r'```(?:json)?\s*(\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\})\s*```', r'(\{"beta_cagr"\s*:\s*[^}]+\})'):
-        m = re.search(pattern, text, re.DOTALL)
-        if m:
-            try:
-                data = json.loads(m.group(1).strip())
-                return (
-                    data.get("beta_cagr"),
-                    data.get("risk_level"),
-                    data.get("audit_notes")
-                )
-            except (json.JSONDecodeError, TypeError):
-                pass
-    m = re.search(r'"beta_cagr"\s*:\s*([\d.]+)', text)
-    if m:
-        try:
-            return float(m.group(1)), None, None
-        except ValueError:
-            pass
-    return None, None, None
-
-# Chat Completions이 아닌 Responses API(v1/responses)를 써야 하는 모델 (Thinking/Reasoning 지원)
-OPENAI_RESPONSES_API_MODELS = ("gpt-5.2", "gpt-5.2-2025-12-11", "gpt-5.2-pro", "gpt-5.2-pro-2025-12-11")
-
-# ---------------------------------------------------------------------------
-# temperature: CAGR 등 수치 예측의 "실행 간 변동"을 줄이기 위해 0으로 통일.
-# - temperature > 0 이면 같은 프롬프트라도 매 호출마다 다른 토큰이 샘플링되어
-#   예측 CAGR(12% vs 17% vs 19%)이 크게 달라질 수 있음.
-# - 0으로 두면 "가장 확률 높은 답" 위주로 출력되어 실행마다 숫자가 상대적으로 안정됨.
-# - 참고: web_search/검색 결과 차이로 인한 변동은 temperature와 무관하게 남을 수 있음.
-# ---------------------------------------------------------------------------
-API_TEMPERATURE = 0
-
-def _parse_responses_api_usage(result):
-    """Responses API 응답에서 usage 추출. reasoning_tokens 포함 시 청구되는 output 토큰 합산."""
-    # 응답 구조 변형 대응 (usage, usage_metadata, response.usage 등)
-    usage = (
-        result.get("usage")
-        or result.get("usage_metadata")
-        or (result.get("response") or {}).get("usage")
-        or {}
-    )
-    inp = usage.get("input_tokens") or usage.get("prompt_tokens") or 0
-    out = usage.get("output_tokens") or usage.get("completion_tokens") or 0
-    # reasoning 모델: reasoning_tokens는 output으로 청구됨 (API에선 별도 필드)
-    out_details = usage.get("output_tokens_details") or {}
-    reasoning = out_details.get("reasoning_tokens") or 0
-    # output_tokens가 이미 reasoning 포함일 수 있음 → reasoning 있으면 별도 합산
-    out_total = int(out) + int(reasoning) if reasoning else int(out)
-    return (int(inp), out_total)
-
-
-def _openai_responses_api(api_key, prompt, model_name, instructions=None, max_retries=3):
-    """Responses API(v1/responses)로 호출. input + instructions 사용. (temperature는 API 기본값 사용)"""
-    url = "https://api.openai.com/v1/responses"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    # gpt-5.2 / gpt-5.2-pro 계열: reasoning_effort로 Thinking 강도 조절 (수석 매니저 의사결정용)
-    body = {
-        "model": model_name,
-        "input": prompt,
-        "max_output_tokens": 32000,
-    }
-    if instructions:
-        body["instructions"] = instructions
-    # reasoning_effort: medium — 복리 페널티 등 논리 계산 (API 지원 모델만 적용)
-    body["reasoning"] = {"effort": "medium"}
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(url, headers=headers, json=body, timeout=300)
-            if response.status_code == 400 and "reasoning" in body:
-                body = {k: v for k, v in body.items() if k != "reasoning"}
-                response = requests.post(url, headers=headers, json=body, timeout=300)
-            if response.status_code != 200:
-                return (None, response.status_code, response.text, None)
-            result = response.json()
-            usage = _parse_responses_api_usage(result)
-            # output: [{ "type": "message", "role": "assistant", "content": [{ "type": "output_text", "text": "..." }] }]
-            for item in result.get("output") or []:
-                if item.get("type") == "message" and item.get("role") == "assistant":
-                    for c in item.get("content") or []:
-                        if c.get("type") == "output_text" and c.get("text"):
-                            return (c["text"], model_name, None, usage)
-            return (None, 200, "output_text not found", usage)
-        except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
-                time.sleep((attempt + 1) * 2)
-                continue
-            return (None, 0, str(e), None)
-    return (None, 0, "max_retries", None)
-
-def call_openai_api(api_key, prompt, preferred_model=None, system_content=None):
-    """OpenAI API를 호출합니다. gpt-5.2-pro 계열은 v1/responses, 나머지는 v1/chat/completions."""
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    instructions = system_content if system_content is not None else "당신은 전문적인 포트폴리오 매니저입니다. 정확하고 상세한 포트폴리오 보고서를 작성합니다."
-    
-    # 기본(gpt-5.2)보다 비싼 폴백은 사용하지 않음 (5.2-pro 제외)
-    models_to_try = [
-        'gpt-5.2',
-        'gpt-5.2-2025-12-11',
-        'gpt-4o',
-        'gpt-4-turbo',
-        'gpt-4',
-        'gpt-3.5-turbo',
-    ]
-    
-    if preferred_model:
-        if preferred_model in models_to_try:
-            models_to_try.remove(preferred_model)
-        models_to_try.insert(0, preferred_model)
-    
-    # temperature=0: 동일 입력 시 CAGR 등 수치가 실행마다 크게 달라지는 것을 완화 (API_TEMPERATURE)
-    chat_data_template = {
-        "messages": [
-            {"role": "system", "content": instructions},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": API_TEMPERATURE,
-        "max_tokens": 32000
-    }
-    
-    for model_name in models_to_try:
-        # gpt-5.2-pro 계열은 Responses API 사용
-        if model_name in OPENAI_RESPONSES_API_MODELS:
-            text, status_or_name, err, usage = _openai_responses_api(api_key, prompt, model_name, instructions=instructions)
-            if text is not None:
-                if usage and usage[0] > 0 and usage[1] > 0:
-                    _log_usage("openai", model_name, usage[0], usage[1])
-                else:
-                    # API에서 usage 미제공 시 추정 (reasoning/Thinking 토큰 포함: 출력 ~10배)
-                    _log_usage("openai", model_name, _estimate_tokens(instructions) + _estimate_tokens(prompt), _estimate_tokens(text) * 10)
-                if model_name != models_to_try[0]:
-                    print(f"   Fallback 모델 사용: {model_name}")
-                return text, model_name
-            # 실패 시 다음 모델로 (원인 출력)
-            if status_or_name == 404:
-                print(f"   [404] Responses API URL: https://api.openai.com/v1/responses")
-                print(f"   [404] 응답 본문: {err}")
-            elif status_or_name != 200:
-                print(f"   [Responses API] {model_name} 실패: HTTP {status_or_name} - {str(err)[:200]}")
-            continue
-        
-        # 나머지는 Chat Completions
-        url = "https://api.openai.com/v1/chat/completions"
-        data = {**chat_data_template, "model": model_name}
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(url, headers=headers, json=data, timeout=180)
-                if response.status_code == 200:
-                    result = response.json()
-                    if result.get('choices') and len(result['choices']) > 0:
-                        content = result['choices'][0]['message']['content']
-                        usage = result.get('usage') or {}
-                        _log_usage("openai", model_name,
-                            usage.get('prompt_tokens') or _estimate_tokens(instructions) + _estimate_tokens(prompt),
-                            usage.get('completion_tokens') or _estimate_tokens(content))
-                        if model_name != models_to_try[0]:
-                            print(f"   Fallback 모델 사용: {model_name}")
-                        return content, model_name
-                elif response.status_code == 404:
-                    print(f"   [404] 요청 URL: {url}")
-                    print(f"   [404] 응답 본문: {response.text}")
-                    break
-                elif response.status_code in (503, 429):
-                    if attempt < max_retries - 1:
-                        time.sleep((attempt + 1) * 2)
-                        continue
-                    break
-                else:
-                    response.raise_for_status()
-            except requests.exceptions.RequestException as e:
-                if attempt < max_retries - 1:
-                    time.sleep((attempt + 1) * 2)
-                    continue
-                print(f"   모델 {model_name} 호출 실패: {str(e)}")
-                break
-    
-    print("[ERROR] 모든 OpenAI 모델 시도 실패")
-    return None, None
-
-def _messages_to_responses_input(messages):
-    """messages = [{"role":"system"|"user"|"assistant", "content":"..."}] 를 Responses API용 instructions + input으로 변환."""
-    instructions = None
-    parts = []
-    for m in messages:
-        role, content = m.get("role"), m.get("content", "")
-        if role == "system":
-            instructions = content
-            continue
-        label = "User" if role == "user" else "Assistant"
-        parts.append(f"{label}: {content}")
-    input_text = "\n\n".join(parts) if parts else ""
-    return instructions or "You are a helpful assistant. Answer based on the conversation.", input_text
-
-
-def call_openai_chat(api_key, messages, preferred_model=None):
-    """OpenAI Chat Completions 또는 Responses API로 대화 히스토리 전달. messages = [{"role":"system"|"user"|"assistant", "content": "..."}, ...]. 디버그용."""
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    # gpt-5.2 계열은 Responses API, 나머지는 Chat Completions
-    chat_models = ["gpt-4o", "gpt-4-turbo", "gpt-4", "gpt-3.5-turbo"]
-    models = list(chat_models)
-    if preferred_model and preferred_model not in models:
-        models.insert(0, preferred_model)
-
-    for model_name in models:
-        try:
-            if model_name in OPENAI_RESPONSES_API_MODELS:
-                instructions, input_text = _messages_to_responses_input(messages)
-                text, _, _, _ = _openai_responses_api(api_key, input_text, model_name, instructions=instructions)
-                if text is not None:
-                    return text, model_name
-                continue
-            # Chat Completions
-            url = "https://api.openai.com/v1/chat/completions"
-            r = requests.post(url, headers=headers, json={"model": model_name, "messages": messages, "temperature": API_TEMPERATURE, "max_tokens": 8000}, timeout=120)
-            if r.status_code == 200 and r.json().get("choices"):
-                return r.json()["choices"][0]["message"]["content"], model_name
-        except Exception:
-            continue
-    return None, None
-
-def call_grok_chat(api_key, messages, preferred_model=None):
-    """Grok Chat Completions로 대화 히스토리 전달. 디버그용."""
-    base_url = "https://api.x.ai/v1/chat/completions"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    models = ["grok-4-1-fast-reasoning", "grok-4-1-fast-non-reasoning", "grok-3", "grok-3-mini"]
-    if preferred_model and preferred_model not in models:
-        models.insert(0, preferred_model)
-    for model_name in models:
-        try:
-            # temperature=0: 디버그 대화에서도 수치 변동 완화 (API_TEMPERATURE)
-            r = requests.post(base_url, headers=headers, json={"model": model_name, "messages": messages, "temperature": API_TEMPERATURE, "max_tokens": 8000}, timeout=120)
-            if r.status_code == 200 and r.json().get("choices"):
-                return r.json()["choices"][0]["message"]["content"], model_name
-        except Exception:
-            continue
-    return None, None
-
-def call_gemini_chat(api_key, messages, preferred_model=None):
-    """Gemini generateContent로 대화 히스토리 전달. messages = [{"role":"user"|"assistant", "content": "..."}, ...]. system은 별도. 디버그용."""
-    models = ["gemini-3-flash-preview", "gemini-2.5-flash", "gemini-pro"]
-    if preferred_model and preferred_model not in models:
-        models.insert(0, preferred_model)
-    system_text = None
-    contents = []
-    for m in messages:
-        role, content = m.get("role"), m.get("content", "")
-        if role == "system":
-            system_text = content
-            continue
-        if role == "user":
-            contents.append({"role": "user", "parts": [{"text": content}]})
-        elif role == "assistant":
-            contents.append({"role": "model", "parts": [{"text": content}]})
-    for model_name in models:
-        try:
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={api_key}"
-            # temperature=0: 디버그 대화에서도 수치 변동 완화 (API_TEMPERATURE)
-            data = {"contents": contents, "generationConfig": {"temperature": API_TEMPERATURE, "maxOutputTokens": 8000}}
-            if system_text:
-                data["systemInstruction"] = {"parts": [{"text": system_text}]}
-            r = requests.post(url, headers={"Content-Type": "application/json"}, json=data, timeout=120)
-            if r.status_code == 200 and r.json().get("candidates"):
-                text = r.json()["candidates"][0]["content"]["parts"][0]["text"]
-                return text, model_name
-        except Exception:
-            continue
-    return None, None
-
-def _grok_responses_api_with_web_search(api_key, prompt, preferred_model=None, system_content=None):
-    """Grok Responses API (/v1/responses) + web_search 도구로 호출. 실패 시 (None, None) 반환."""
-    # 도구 호출 지원 모델 (xAI 문서 기준)
-    # 기본(4.1-fast-reasoning)보다 비싼 폴백 미사용 (grok-4, 4-0709 제외)
-    base_models = [
-        "grok-4-1-fast-reasoning",
-        "grok-4-1-fast",
-        "grok-4-1-fast-non-reasoning",
-        "grok-4-fast-reasoning",
-        "grok-4-fast",
-        "grok-4-fast-non-reasoning",
-        "grok-3",
-        "grok-3-mini",
-    ]
-    web_search_models = list(base_models)
-    if preferred_model:
-        if preferred_model in web_search_models:
-            web_search_models.remove(preferred_model)
-        web_search_models.insert(0, preferred_model)
-    default_system = load_fallback_system("grok")
-    system_text = system_content if system_content is not None else default_system
-    url = "https://api.x.ai/v1/responses"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
+CAGR_SCHEMA_FILE = PROMPTS_DIR / "cagr_schema.json"
+
+def load_cagr_schema(role):
+    """prompts/cagr_schema.json에서 role('grok'|'gemini'|'openai')용 구조화 출력 스펙을 만든다.
+    반환: {"name", "schema", "instruction"} 또는 None. schema는 strict 모드용(전 필드 required, additionalProperties false)."""
+    try:
+        if not CAGR_SCHEMA_FILE.exists():
+            return None
+        data = json.loads(CAGR_SCHEMA_FILE.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"[WARNING] CAGR 스키마 로드 실패 ({CAGR_SCHEMA_FILE.name}): {e}")
+        return None
+    fields = (data.get("roles") or {}).get(role)
+    props = data.get("properties") or {}
+    if not fields:
+        return None
+    schema = {
+        "type": "object",
+        "properties": {f: props[f] for f in fields if f in props},
+        "required": [f for f in fields if f in props],
+        "additionalProperties": False,
     }
-    for model_name in web_search_models:
-        # temperature=0: Grok 1차 CAGR 예측이 실행마다 13% vs 18% 등으로 크게 흔들리지 않도록 (API_TEMPERATURE)
-        body = {
-            "model": model_name,
-            "input": [
-                {"role": "system", "content": system_text},
-                {"role": "user", "content": prompt}
-            ],
-            "max_output_tokens": 8000,
-            "temperature": API_TEMPERATURE,
-            "tools": [{"type": "web_search"}]
-        }
-        try:
-            resp = requests.post(url, headers=headers, json=body, timeout=300)
-            if resp.status_code != 200:
-                if resp.status_code in (404, 400, 422):
-                    break
-                continue
-            result = resp.json()
-            for item in (result.get("output") or []):
-                if item.get("type") == "message" and item.get("role") == "assistant":
-                    for c in (item.get("content") or []):
-                        if c.get("type") == "output_text" and c.get("text"):
-                            text = c["text"]
-                            _log_usage("grok", model_name, _estimate_tokens(system_text) + _estimate_tokens(prompt), _estimate_tokens(text))
-                            print(f"   Grok 모델 사용 (web_search): {model_name}")
-                            return text, model_name
-            break
-        except requests.exceptions.RequestException:
-            continue
-    return None, None
-
-def call_grok_api(api_key, prompt, preferred_model=None, use_web_search=True, system_content=None):
-    """Grok API를 호출합니다. use_web_search=True이면 Responses API+web_search 시도 후 실패 시 Chat Completions로 폴백."""
-    if use_web_search:
-        content, model_name = _grok_responses_api_with_web_search(api_key, prompt, preferred_model, system_content=system_content)
-        if content is not None:
-            return content, model_name
-    # 폴백: Chat Completions (검색 도구 없음)
-    # Chat Completions 폴백: 기본보다 비싼 4/4-0709 제외
-    possible_models = [
-        "grok-4-1-fast-reasoning",
-        "grok-4-1-fast-non-reasoning",
-        "grok-4-fast-reasoning",
-        "grok-4-fast-non-reasoning",
-        "grok-3",
-        "grok-3-mini",
-    ]
-    if preferred_model:
-        if preferred_model in possible_models:
-            possible_models.remove(preferred_model)
-        possible_models.insert(0, preferred_model)
-    base_url = "https://api.x.ai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
+    return {
+        "name": f"{data.get('name') or 'portfolio_cagr'}_{role}",
+        "schema": schema,
+        "instruction": data.get("instruction") or "",
     }
-    for model_name in possible_models:
-        system_text = system_content if system_content is not None else load_fallback_system("grok")
-        # temperature=0: Grok 폴백(Chat)에서도 CAGR 등 수치 변동 완화 (API_TEMPERATURE)
-        data = {
-            "model": model_name,
-            "messages": [
-                {"role": "system", "content": system_text},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": API_TEMPERATURE,
-            "max_tokens": 8000
-        }
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(base_url, headers=headers, json=data, timeout=180)
-                if response.status_code == 200:
-                    result = response.json()
-                    if 'choices' in result and len(result['choices']) > 0:
-                        content = result['choices'][0]['message']['content']
-                        usage = result.get('usage') or {}
-                        inp = usage.get('prompt_tokens') or usage.get('input_tokens')
-                        out = usage.get('completion_tokens') or usage.get('output_tokens')
-                        _log_usage("grok", model_name, inp or _estimate_tokens(system_text) + _estimate_tokens(prompt), out or _estimate_tokens(content))
-                        print(f"   Grok 모델 사용: {model_name}")
-                        return content, model_name
-                elif response.status_code == 404:
-                    break
-                elif response.status_code == 403:
-                    if model_name == possible_models[-1]:
-                        print(f"[ERROR] Grok API 권한 오류 (403)")
-                        return None, None
-                    break
-                elif response.status_code == 503 or response.status_code == 429:
-                    if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 2
-                        print(f"   서버 오류 ({response.status_code}) - {wait_time}초 후 재시도... (시도 {attempt + 1}/{max_retries})")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        break
-                else:
-                    response.raise_for_status()
-            except requests.exceptions.RequestException as e:
-                if attempt < max_retries - 1:
-                    wait_time = (attempt + 1) * 2
-                    print(f"   네트워크 오류 - {wait_time}초 후 재시도... (시도 {attempt + 1}/{max_retries})")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    break
-    print(f"[ERROR] 모든 Grok 모델 시도 실패")
-    return None, None
-
-def call_gemini_api(api_key, prompt, preferred_model=None, system_content=None):
-    """Gemini API를 호출합니다. 사용된 모델명을 반환합니다. system_content는 리스크 감사관 등 역할 지시용."""
-    # 기본(3-flash)보다 비싼 폴백 미사용 (2.5-pro, 3-pro 계열 제외)
-    possible_models = [
-        'gemini-3-flash-preview',
-        'gemini-3-flash',
-        'gemini-2.5-flash',
-        'gemini-pro',
-    ]
-    
-    if preferred_model:
-        if preferred_model in possible_models:
-            possible_models.remove(preferred_model)
-        possible_models.insert(0, preferred_model)
-    
-    base_url = "https://generativelanguage.googleapis.com/v1beta/models"
-    headers = {"Content-Type": "application/json"}
-    
-    for model_name in possible_models:
-        url = f"{base_url}/{model_name}:generateContent?key={api_key}"
-        
-        # temperature=0: Gemini 1차 CAGR(β) 예측이 실행마다 크게 흔들리지 않도록 (API_TEMPERATURE)
-        data = {
-            "contents": [{"parts": [{"text": prompt}]}],
-            "generationConfig": {"temperature": API_TEMPERATURE, "maxOutputTokens": 8000},
-            "tools": [{"google_search": {}}]
+
+def _validate_json_schema(value, schema, path="$"):
+    """cagr_schema.json에서 쓰는 범위(type, enum, properties, required, items, additionalProperties)만 검증. 오류 문자열 또는 None."""
+    types = schema.get("type")
+    if types is not None:
+        types = types if isinstance(types, list) else [types]
+        checks = {
+            "object": lambda v: isinstance(v, dict),
+            "array": lambda v: isinstance(v, list),
+            "string": lambda v: isinstance(v, str),
+            "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+            "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+            "boolean": lambda v: isinstance(v, bool),
+            "null": lambda v: v is None,
         }
-        if system_content:
-            data["systemInstruction"] = {"parts": [{"text": system_content}]}
-        
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(url, headers=headers, json=data, timeout=180)
-                if response.status_code == 200:
-                    result = response.json()
-                    if 'candidates' in result and len(result['candidates']) > 0:
-                        content = result['candidates'][0]['content']['parts'][0]['text']
-                        um = result.get('usageMetadata') or {}
-                        inp = um.get('promptTokenCount') or um.get('inputTokenCount')
-                        out = um.get('candidatesTokenCount') or um.get('outputTokenCount')
-                        _log_usage("gemini", model_name, inp or _estimate_tokens(prompt), out or _estimate_tokens(content))
-                        print(f"   Gemini 모델 사용: {model_name}")
-                        return content, model_name
-                elif response.status_code == 400:
-                    # 모델을 찾을 수 없음 - 다음 모델 시도
-                    break
-                elif response.status_code == 503 or response.status_code == 429:
-                    # 폴백 시 원인 확인용: 요청 URL(키 제외), 호출 방식, 응답 전문 출력 및 파일 저장
-                    url_without_key = f"{base_url}/{model_name}:generateContent"
-                    err_detail = (
-                        f"[Gemini {response.status_code}] 요청 URL(키 제외): {url_without_key}\n"
-                        f"[Gemini] 호출 방식: Python, requests (공식 SDK 미사용)\n"
-                        f"[Gemini] 응답 본문 전문:\n{response.text}"
-                    )
-                    print(err_detail)
-                    try:
-                        REPORTS_DIR.mkdir(parents=True, exist_ok=True)
-                        (REPORTS_DIR / "gemini_last_error.txt").write_text(err_detail, encoding="utf-8")
-                    except Exception:
-                        pass
-                    if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 2
-                        print(f"   서버 오류 ({response.status_code}) - {wait_time}초 후 재시도... (시도 {attempt + 1}/{max_retries})")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        break
-                else:
-                    response.raise_for_status()
-            except requests.exceptions.RequestException as e:
-                if attempt < max_retries - 1:
-                    wait_time = (attempt + 1) * 2
-                    print(f"   네트워크 오류 - {wait_time}초 후 재시도... (시도 {attempt + 1}/{max_retries})")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    print(f"   모델 {model_name} 호출 실패: {str(e)}")
-                    break
-    
-    print(f"[ERROR] 모든 Gemini 모델 시도 실패")
-    return None, None
+        if not any(checks.get(t, lambda v: False)(value) for t in types):
+            return f"{path}: 타입 불일치 (기대 {'/'.join(types)})"
+    if "enum" in schema and value not in schema["enum"]:
+        return f"{path}: 허용되지 않은 값 {value!r}"
+    if isinstance(value, dict):
+        props = schema.get("properties") or {}
+        for key in schema.get("required") or []:
+            if key not in value:
+                return f"{path}.{key}: 필수 필드 누락"
+        if schema.get("additionalProperties") is False:
+            extra = [k for k in value if k not in props]
+            if extra:
+                return f"{path}: 정의되지 않은 필드 {extra}"
+        for key, sub in props.items():
+            if key in value:
+                err = _validate_json_schema(value[key], sub, f"{path}.{key}")
+                if err:
+                    return err
+    if isinstance(value, list) and isinstance(schema.get("items"), dict):
+        for i, item in enumerate(value):
+            err = _validate_json_schema(item, schema["items"], f"{path}[{i}]")
+            if err:
+                return err
+    return None
 
-def create_audit_prompt(draft_report, alpha_cagr, portfolio_prompt_content):
-    """Gemini(리스크 감사관) 전용: 동일 Base 시나리오 기준 CAGR 예측 프롬프트."""
+def parse_structured_cagr(text, role):
+    """구조화 출력 응답을 한 번에 디코드·검증. 검증된 dict 또는 None (실패 사유는 경고로 출력)."""
+    spec = load_cagr_schema(role)
+    if not text or not spec:
+        return None
+    raw = text.strip()
+    # 일부 모델은 스키마 모드에서도 ```json 펜스를 붙임 → 펜스만 제거
+    if raw.startswith("```"):
+        raw = re.sub(r'^```(?:json)?\s*|\s*```$', '', raw)
+    try:
+        data = json.loads(raw)
+    except (json.JSONDecodeError, TypeError) as e:
+        print(f"   [WARNING] 구조화 출력 디코드 실패 ({role}): {e} → 정규식 파싱으로 대체")
+        return None
+    err = _validate_json_schema(data, spec["schema"])
+    if err:
+        print(f"   [WARNING] 구조화 출력 스키마 검증 실패 ({role}): {err} → 정규식 파싱으로 대체")
+        return None
+    return data
+
+def apply_structured_output(text, role):
+    """구조화 출력 응답을 (본문 텍스트, data)로 변환. 본문 = discussion + 하단 JSON 블록으로 기존 단계 출력 형식과 동일하게 맞춘다.
+    검증 실패 시 (text, None) — 이후 단계는 기존 정규식 경로로 동작."""
+    data = parse_structured_cagr(text, role)
+    if data is None:
+        return text, None
+    discussion = (data.get("discussion") or "").strip()
+    fields = {k: v for k, v in data.items() if k != "discussion"}
+    body = discussion + "\n\n```json\n" + json.dumps(fields, ensure_ascii=False, indent=2) + "\n```"
+    return body.strip(), data
+
+def with_structured_instruction(prompt, response_schema):
+    """구조화 출력 모드이면 유저 프롬프트 끝에 스키마 출력 지시를 덧붙인다."""
+    if not response_schema or not response_schema.get("instruction"):
+        return prompt
+    return prompt + "\n\n" + response_schema["instruction"]
+
+# CAGR 파싱은 과거 결정 아카이브와 공용 (scripts/cagr_archive.py)
+parse_alpha_json = cagr_archive.parse_alpha_json
+parse_beta_json = cagr_archive.parse_beta_json
+parse_openai_cagr_minimal = cagr_archive.parse_openai_cagr_minimal
+parse_projection_values = cagr_archive.parse_projection_values
+
+OPENAI_RESPONSES_API_MODELS = ai_providers.OPENAI_RESPONSES_API_MODELS
+DEFAULT_REASONING_EFFORT = ai_providers.DEFAULT_REASONING_EFFORT
+API_TEMPERATURE = ai_providers.API_TEMPERATURE
+
+# 대화 히스토리 전달 (디버그 대화·discuss_report)
+call_openai_chat = ai_providers.chat_openai
+call_grok_chat = ai_providers.chat_grok
+call_gemini_chat = ai_providers.chat_gemini
+
+def call_openai_api(api_key, prompt, preferred_model=None, system_content=None, response_schema=None,
+                    reasoning_effort=None, max_output_tokens=None, models_to_try=None):
+    """OpenAI API를 호출합니다. gpt-5.2 계열은 v1/responses, 나머지는 v1/chat/completions.
+    response_schema가 있으면 두 API 모두 json_schema 구조화 출력으로 요청.
+    reasoning_effort·max_output_tokens·models_to_try: 예산 스케줄러 결정값 (없으면 medium / 32000 / 기본 폴백 순서)."""
+    return ai_providers.call_openai(
+        api_key, prompt, preferred_model=preferred_model, system_content=system_content, response_schema=response_schema,
+        reasoning_effort=reasoning_effort, max_output_tokens=max_output_tokens, models_to_try=models_to_try,
+    )
+
+def call_grok_api(api_key, prompt, preferred_model=None, use_web_search=True, system_content=None, response_schema=None, max_output_tokens=None,
+                  models_to_try=None):
+    """Grok API를 호출합니다. use_web_search=True이면 Responses API+web_search 시도 후 실패 시 Chat Completions로 폴백.
+    system_content가 없으면 prompts/fallback_grok_system.md. max_output_tokens 기본 8000."""
+    return ai_providers.call_grok(
+        api_key, prompt, preferred_model=preferred_model, use_web_search=use_web_search,
+        system_content=system_content if system_content is not None else load_fallback_system("grok"),
+        response_schema=response_schema, max_output_tokens=max_output_tokens, models_to_try=models_to_try,
+    )
+
+def call_gemini_api(api_key, prompt, preferred_model=None, system_content=None, response_schema=None, max_output_tokens=None,
+                    models_to_try=None):
+    """Gemini API를 호출합니다 (Google Search 도구 사용). system_content는 리스크 감사관 등 역할 지시용.
+    429/503 응답 전문은 report/gemini_last_error.txt에 남긴다."""
+    return ai_providers.call_gemini(
+        api_key, prompt, preferred_model=preferred_model, system_content=system_content, response_schema=response_schema,
+        max_output_tokens=max_output_tokens, models_to_try=models_to_try, error_log_dir=REPORTS_DIR,
+    )
+
+def create_audit_prompt(draft_report, alpha_cagr, portfolio_prompt_content, blocks=None):
+    """Gemini(리스크 감사관) 전용: 동일 Base 시나리오 기준 CAGR 예측 프롬프트. blocks: 스크립트 계산 블록 (리스크 지표 사용)."""
     alpha_str = f"{alpha_cagr}%" if alpha_cagr is not None else "(미제시)"
     portfolio_2000 = (portfolio_prompt_content or "")[:2000]
+    risk_block = (blocks or {}).get("risk_metrics") or ""
     tpl = load_user_template("gemini")
     if tpl:
-        return tpl.replace("{{alpha_cagr}}", alpha_str).replace("{{draft_report}}", draft_report).replace("{{portfolio_prompt_content}}", portfolio_2000)
+        return fill_blocks(tpl.replace("{{alpha_cagr}}", alpha_str).replace("{{draft_report}}", draft_report)
+                           .replace("{{portfolio_prompt_content}}", portfolio_2000), blocks)
     return f"""[Step 2 - 리스크 감사관용] Grok의 CAGR·시장해석·리스크 논의와 Base CAGR({alpha_str}) 참고, 동일 Base 시나리오 기준으로 독립 CAGR 산출. 출력 하단 JSON: {{"beta_cagr": 0.0, "risk_level": "low/mid/high", "audit_notes": "..."}}
-
+{risk_block}
 **Grok CAGR·논의**:
 {draft_report}
 
@@ -1246,31 +789,8 @@ def create_minimal_openai_cagr_prompt(alpha_cagr, beta_cagr, grok_tail, gemini_t
 위를 참고하여 (1) 당신의 Base 시나리오 CAGR 한 개, (2) Bear/Bull 반영한 최종 전략적 CAGR 한 개만 제시하세요.
 **반드시 마지막에 한 줄로만 출력:** Base: X.X%  Final: X.X%  (숫자만 정확히, 예: Base: 17.5%  Final: 16.9%)"""
 
-def parse_openai_cagr_minimal(text):
-    """OpenAI 최소 CAGR 응답에서 Base / Final 숫자 추출. (base_cagr, final_cagr) 또는 (None, None)."""
-    if not text:
-        return None, None
-    base_cagr = None
-    final_cagr = None
-    # Base: 17.5%  Final: 16.9%
-    m = re.search(r'Base\s*:\s*([\d.]+)\s*%', text, re.IGNORECASE)
-    if m:
-        base_cagr = float(m.group(1))
-    m = re.search(r'Final\s*:\s*([\d.]+)\s*%', text, re.IGNORECASE)
-    if m:
-        final_cagr = float(m.group(1))
-    # 한글: 수석.*?([\d.]+)% .*?최종.*?([\d.]+)% 등
-    if base_cagr is None:
-        m = re.search(r'(?:수석|Base)\s*(?:CAGR)?\s*[\s:]*([\d.]+)\s*%', text)
-        if m:
-            base_cagr = float(m.group(1))
-    if final_cagr is None:
-        m = re.search(r'(?:최종\s*전략적\s*CAGR|Final)\s*[\s:]*([\d.]+)\s*%', text)
-        if m:
-            final_cagr = float(m.group(1))
-    return base_cagr, final_cagr
-
-def run_test_cagr_only(openai_key, grok_key, gemini_key, portfolio_prompt, usd_krw_rate, us_stock_prices, args, computed_valuation_text=None):
+def run_test_cagr_only(openai_key, grok_key, gemini_key, portfolio_prompt, usd_krw_rate, us_stock_prices, args, computed_valuation_text=None,
+                       blocks=None):
     """
     CAGR 예측만 수행 (보고서 미생성). Grok → Gemini → OpenAI(최소 프롬프트) 한 사이클.
     temperature 효과 등 실행 간 변동 테스트용. 반환: (alpha_cagr, beta_cagr, openai_base, openai_final).
@@ -1278,33 +798,52 @@ def run_test_cagr_only(openai_key, grok_key, gemini_key, portfolio_prompt, usd_k
     grok_system = load_system_prompt("grok") or load_fallback_system("grok")
     gemini_system = load_system_prompt("gemini") or load_fallback_system("gemini")
     openai_system = (load_system_prompt("openai") or load_fallback_system("openai") or "")[:1500]
+    structured = getattr(args, "structured_output", False)
+    grok_schema = load_cagr_schema("grok") if structured else None
+    gemini_schema = load_cagr_schema("gemini") if structured else None
+    openai_schema = load_cagr_schema("openai") if structured else None
+    grok_data = gemini_data = openai_data = None
 
     # Step 1: Grok
     print("[CAGR 테스트] Step 1/3 Grok (Base CAGR α)...")
-    initial_prompt = create_initial_prompt(portfolio_prompt, usd_krw_rate, us_stock_prices, computed_valuation_text)
-    draft_result = call_grok_api(grok_key, initial_prompt, preferred_model=args.grok_model, use_web_search=not args.no_grok_web_search, system_content=grok_system)
+    set_usage_step("step1_grok")
+    initial_prompt = create_initial_prompt(portfolio_prompt, usd_krw_rate, us_stock_prices, computed_valuation_text, blocks)
+    initial_prompt = with_structured_instruction(initial_prompt, grok_schema)
+    grok_model_s, grok_kw = schedule_step("grok", "step1_grok", args.grok_model, initial_prompt, grok_system, args)
+    draft_result = call_grok_api(grok_key, initial_prompt, preferred_model=grok_model_s, use_web_search=not args.no_grok_web_search, system_content=grok_system, response_schema=grok_schema, **grok_kw)
     if not draft_result[0]:
         print("[ERROR] Grok 호출 실패")
         return None, None, None, None
     draft_report, _ = draft_result
-    alpha_cagr, _, _ = parse_alpha_json(draft_report)
+    if grok_schema:
+        draft_report, grok_data = apply_structured_output(draft_report, "grok")
+    alpha_cagr, _, _ = parse_alpha_json(draft_report, grok_data)
 
     # Step 2: Gemini
     print("[CAGR 테스트] Step 2/3 Gemini (Base CAGR β)...")
-    audit_prompt = create_audit_prompt(draft_report, alpha_cagr, portfolio_prompt)
-    audit_result = call_gemini_api(gemini_key, audit_prompt, preferred_model=args.gemini_model, system_content=gemini_system)
+    set_usage_step("step2_gemini")
+    audit_prompt = with_structured_instruction(create_audit_prompt(draft_report, alpha_cagr, portfolio_prompt, blocks), gemini_schema)
+    gemini_model_s, gemini_kw = schedule_step("gemini", "step2_gemini", args.gemini_model, audit_prompt, gemini_system, args)
+    audit_result = call_gemini_api(gemini_key, audit_prompt, preferred_model=gemini_model_s, system_content=gemini_system, response_schema=gemini_schema, **gemini_kw)
     audit_comments = audit_result[0] or ""
-    beta_cagr, _, _ = parse_beta_json(audit_comments) if audit_comments else (None, None, None)
+    if audit_comments and gemini_schema:
+        audit_comments, gemini_data = apply_structured_output(audit_comments, "gemini")
+    beta_cagr, _, _ = parse_beta_json(audit_comments, gemini_data) if audit_comments else (None, None, None)
 
     # Step 3: OpenAI 최소(보고서 없이 Base/Final CAGR만)
     print("[CAGR 테스트] Step 3/3 OpenAI (Base + 최종 전략적 CAGR)...")
+    set_usage_step("cagr_openai")
     minimal_prompt = create_minimal_openai_cagr_prompt(
         alpha_cagr, beta_cagr,
         (draft_report or "")[-800:],
         (audit_comments or "")[-800:]
     )
-    openai_content, _ = call_openai_api(openai_key, minimal_prompt, preferred_model=args.openai_model, system_content=openai_system)
-    openai_base, openai_final = parse_openai_cagr_minimal(openai_content) if openai_content else (None, None)
+    minimal_prompt = with_structured_instruction(minimal_prompt, openai_schema)
+    openai_model_s, openai_kw = schedule_step("openai", "cagr_openai", args.openai_model, minimal_prompt, openai_system, args)
+    openai_content, _ = call_openai_api(openai_key, minimal_prompt, preferred_model=openai_model_s, system_content=openai_system, response_schema=openai_schema, **openai_kw)
+    if openai_content and openai_schema:
+        openai_data = parse_structured_cagr(openai_content, "openai")
+    openai_base, openai_final = parse_openai_cagr_minimal(openai_content, openai_data) if openai_content else (None, None)
 
     return alpha_cagr, beta_cagr, openai_base, openai_final
 
@@ -1330,8 +869,10 @@ def create_gemini_r2_prompt(grok_r2_response):
 {grok_r2_response or ''}
 """
 
-def create_final_prompt(grok_draft, alpha_cagr, gemini_audit_text, beta_cagr, portfolio_prompt_content, grok_r2=None, gemini_r2=None):
-    """OpenAI(수석 매니저) 전용: 세 Base CAGR 비교 + 2라운드 합의·대립 + Bear/Bull 반영 후 최종 CAGR 확정. 비용 절감: portfolio는 앞 3000자만 전달."""
+def create_final_prompt(grok_draft, alpha_cagr, gemini_audit_text, beta_cagr, portfolio_prompt_content, grok_r2=None, gemini_r2=None,
+                        blocks=None):
+    """OpenAI(수석 매니저) 전용: 세 Base CAGR 비교 + 2라운드 합의·대립 + Bear/Bull 반영 후 최종 CAGR 확정. 비용 절감: portfolio는 앞 3000자만 전달.
+    blocks: 스크립트 계산 블록 (스트레스 테스트 Bear/Base/Bull 충격 후 총자산·비중, 종목별 평단 대비 수익률 표 사용)."""
     alpha_str = f"{alpha_cagr}%" if alpha_cagr is not None else "(미제시)"
     beta_str = f"{beta_cagr}%" if beta_cagr is not None else "(미제시)"
     grok_r2_text = (grok_r2 or "").strip()
@@ -1347,7 +888,7 @@ def create_final_prompt(grok_draft, alpha_cagr, gemini_audit_text, beta_cagr, po
         out = out.replace("{{grok_draft}}", grok_draft).replace("{{gemini_audit_text}}", gemini_audit_text)
         out = out.replace("{{portfolio_prompt_content}}", portfolio_3000)
         out = out.replace("{{grok_r2_response}}", grok_r2_text).replace("{{gemini_r2_response}}", gemini_r2_text)
-        return out
+        return fill_blocks(out, blocks).replace("{{projection_instruction}}", "")
     return f"""[Step 3 - 수석 매니저용] Grok Base({alpha_str})·Gemini Base({beta_str})와 자신의 Base 예측을 비교한 뒤 Bear/Bull 반영해 최종 CAGR 확정. 전 종목 포함, 복리 저해 효과 경고.
 
 **Grok CAGR·논의**: {grok_draft}
@@ -1358,9 +899,299 @@ def create_final_prompt(grok_draft, alpha_cagr, gemini_audit_text, beta_cagr, po
 
 **2라운드 Gemini 수용·반박**: {gemini_r2_text or '(없음)'}
 
+{(blocks or {}).get("stress_test") or ''}
+{(blocks or {}).get("holdings_pnl") or ''}
 **포트폴리오 참고**: {portfolio_3000}
 """
 
+def schedule_step(provider, step, requested_model, prompt, system_content=None, args=None, steps_left=1, requested_effort=None):
+    """예산 스케줄러(budget_scheduler.py)로 단계 모델·reasoning effort·출력 상한·폴백 모델 목록 결정.
+    requested_effort: 단계 정의의 options.reasoning_effort (없으면 medium, Responses API 모델만).
+    반환: (model, call_kwargs). --no-budget-scheduler 또는 *_MONTHLY_BUDGET 미설정이면 (requested_model, {})."""
+    if args is not None and getattr(args, "no_budget_scheduler", False):
+        return requested_model, {}
+    is_responses = provider == "openai" and requested_model in OPENAI_RESPONSES_API_MODELS
+    default_max = 32000 if provider == "openai" else 8000
+    plan = budget_scheduler.plan_step(
+        provider, step, requested_model,
+        _estimate_tokens(system_content) + _estimate_tokens(prompt),
+        _get_price, USAGE_RUN["run_id"],
+        requested_effort=(requested_effort or DEFAULT_REASONING_EFFORT) if is_responses else None,
+        default_max_output=default_max, steps_left=steps_left,
+        effort_models=OPENAI_RESPONSES_API_MODELS, fallback_models=ai_providers.models(provider, "generate"),
+    )
+    if not plan:
+        return requested_model, {}
+    # 폴백도 고른 모델 이하 단가로만 (기본 폴백 목록에는 더 비싼 모델이 있을 수 있음)
+    kwargs = {"max_output_tokens": plan["max_output_tokens"], "models_to_try": plan["models"]}
+    if provider == "openai":
+        kwargs["reasoning_effort"] = plan["effort"]
+    return plan["model"], kwargs
+
+# pipeline_engine 단계 parser 이름 → 출력에서 값 추출 (결과는 "<단계>.alpha_cagr" 등으로 다음 단계 템플릿에 전달)
+PIPELINE_PARSERS = {
+    "alpha": lambda text, data: dict(zip(("alpha_cagr", "current_total_krw", "market_data"), parse_alpha_json(text, data))),
+    "beta": lambda text, data: dict(zip(("beta_cagr", "risk_level", "audit_notes"), parse_beta_json(text, data))),
+}
+PIPELINE_VALUE_LABELS = {"alpha_cagr": ("Base CAGR(Grok)", "%"), "beta_cagr": ("Base CAGR(Gemini)", "%"), "risk_level": ("리스크 수준", "")}
+
+def build_pipeline_context(portfolio_prompt, usd_krw_rate=None, us_stock_prices=None, computed_valuation_text=None, projection_instruction="",
+                           blocks=None):
+    """파이프라인 템플릿의 $portfolio·$date_str·$yesterday_str·$realtime_data·$projection_instruction 값과
+    blocks의 블록 키별 값($risk_metrics·$stress_test·$holdings_pnl 등, 없으면 빈 문자열)."""
+    today = datetime.now()
+    yesterday = today - timedelta(days=1)
+    return {
+        "portfolio": portfolio_prompt,
+        "date_str": today.strftime("%Y년 %m월 %d일"),
+        "yesterday_str": yesterday.strftime("%Y년 %m월 %d일"),
+        "realtime_data": build_realtime_data(usd_krw_rate, us_stock_prices, computed_valuation_text, yesterday.strftime("%Y-%m-%d"), blocks),
+        **{key: (blocks or {}).get(key) or "" for key in PROMPT_BLOCKS},
+        "projection_instruction": projection_instruction,
+    }
+
+def pipeline_hooks(pipeline, args):
+    """pipeline_engine 훅: 단계 전환(사용량 원장·추적·프로파일), 구조화 출력, 예산 스케줄러, CAGR 파서, 진행 출력."""
+    def before_call(step, prompt, system, kwargs):
+        role = step.get("schema_role") if args.structured_output else None
+        schema = load_cagr_schema(role) if role else None
+        prompt = with_structured_instruction(prompt, schema)
+        extra = {"response_schema": schema} if schema else {}
+        if step["provider"] == "grok" and args.no_grok_web_search:
+            extra["use_web_search"] = False
+        model, sched_kw = schedule_step(step["provider"], step["id"], kwargs.get("preferred_model"), prompt, system, args,
+                                        steps_left=pipeline_engine.provider_steps_left(pipeline, step["id"]),
+                                        requested_effort=kwargs.get("reasoning_effort"))
+        extra.update(sched_kw, preferred_model=model)
+        return prompt, extra
+
+    def after_call(step, text):
+        role = step.get("schema_role") if args.structured_output else None
+        return apply_structured_output(text, role) if role else (text, None)
+
+    def on_step_end(step, res):
+        if res["status"] != "ok":
+            if step.get("required"):
+                return  # 파이프라인 중단 메시지는 엔진이 출력
+            note = " - 대체 문구로 다음 단계 진행" if step.get("fallback_text") else ""
+            print(f"  [WARNING] {step.get('label', step['id'])} 실패{note} (소요: {format_elapsed(res['elapsed_s'])})")
+            return
+        for key, (label, unit) in PIPELINE_VALUE_LABELS.items():
+            if res["data"].get(key) is not None:
+                print(f"  {label}: {res['data'][key]}{unit}")
+        print(f"  [{step['id']}] 완료 ({len(res['text'])} 문자, {res['model']}). (소요: {format_elapsed(res['elapsed_s'])})")
+
+    return {"on_step_start": set_usage_step, "before_call": before_call, "after_call": after_call,
+            "parsers": PIPELINE_PARSERS, "on_step_end": on_step_end}
+
+def pipeline_value(results, key):
+    """파이프라인 결과에서 파서 값(alpha_cagr 등)을 단계 순서대로 찾아 처음 값. 없으면 None."""
+    for res in results.values():
+        if (res.get("data") or {}).get(key) is not None:
+            return res["data"][key]
+    return None
+
+PROJECTION_MARKER = "[[ASSET_PROJECTION]]"
+
+def load_projection_instruction():
+    """자산 추이 로컬 계산 지시 (Step 3 유저 프롬프트 끝에 붙임). 파일이 없으면 "" → OpenAI가 표까지 작성."""
+    try:
+        if PROJECTION_INSTRUCTION_FILE.exists():
+            text = PROJECTION_INSTRUCTION_FILE.read_text(encoding="utf-8").strip()
+            return "\n\n---\n\n" + text if text else ""
+    except Exception as e:
+        print(f"[WARNING] {PROJECTION_INSTRUCTION_FILE.name} 로드 실패: {e}")
+    return ""
+
+def apply_local_projection(report_text, start_krw, fallback_cagr=None, settings=None):
+    """최종 보고서의 CAGR·감쇠로 시나리오별 자산 추이를 계산해 [[ASSET_PROJECTION]] 자리(없으면 보고서 끝 부록)에 표 삽입.
+    PROJECTION 줄은 지운다. 최종 CAGR이 없으면 fallback_cagr. 반환: (보고서, proj 또는 None, CAGR 출처)."""
+    final_cagr, decay = parse_projection_values(report_text)
+    source = "OpenAI 최종 CAGR"
+    if final_cagr is None and fallback_cagr is not None:
+        final_cagr, source = fallback_cagr, "Grok·Gemini Base 평균 (최종 CAGR 미검출)"
+    text = cagr_archive.PROJECTION_LINE.sub("", report_text).rstrip() + "\n"
+    if final_cagr is None:
+        return text.replace(PROJECTION_MARKER, "(자산 추이 표 생략: 최종 CAGR 미검출)"), None, None
+    proj = asset_projection.project(start_krw, final_cagr, decay, settings)
+    md = asset_projection.format_markdown(proj)
+    if PROJECTION_MARKER in text:
+        text = text.replace(PROJECTION_MARKER, md, 1).replace(PROJECTION_MARKER, "")
+    else:
+        text += "\n---\n\n## 부록. 시나리오별 자산 추이 (스크립트 계산)\n\n" + md + "\n"
+    return text, proj, source
+
+def run_monte_carlo(holdings, total_krw, paths):
+    """--monte-carlo: 보유 종목 과거 월 수익률·공분산으로 시나리오별 목표 달성 확률. 반환: (프롬프트 블록, 결과 dict) 또는 (None, None)."""
+    history = monte_carlo.load_history(holdings)
+    if history is None:
+        print("  [WARNING] 과거 수익률 조회 실패 - 몬테카를로 생략")
+        return None, None
+    params = monte_carlo.portfolio_params(holdings, history)
+    result = monte_carlo.simulate(total_krw or params["start_krw"], params["mu_month"], params["sigma_month"], paths=paths,
+                                  settings=get_projection_settings())
+    if result is None:
+        return None, None
+    print(f"  몬테카를로: {result['paths']:,}경로, 연 기대수익률 {result['expected_return']:.1f}%·변동성 {result['annual_vol']:.1f}% "
+          f"(과거 {params['history_months']}개월), {result['elapsed_s']}초")
+    return monte_carlo.format_for_prompt(result, params), {"params": params, **result}
+
+def load_holdings_history(holdings, with_risk=True):
+    """스윙 스캔·리스크 지표 공용 일봉을 한 번에 조회 (보유 종목, with_risk면 SPY·환율과 리스크 지표 기간까지)."""
+    symbols = list(dict.fromkeys(p["symbol"] for p in holdings.get("positions") or []))
+    years = swing_rules.SIGNAL_HISTORY_YEARS
+    if with_risk:
+        symbols, years = risk_metrics.history_request(holdings)
+    return swing_rules.load_daily_history(symbols, years)
+
+def run_swing_scan(holdings, us_stock_prices, kr_stock_prices, history):
+    """보유 전 종목 스윙 기준가·주봉 RSI·위치 판정 (캐시 일봉, 현재가는 이번에 조회한 가격). 반환: (프롬프트 블록, 행 목록) 또는 (None, None)."""
+    positions = holdings.get("positions") or []
+    symbols = list(dict.fromkeys(p["symbol"] for p in positions))
+    currency = {p["symbol"]: (p.get("currency") or "USD").upper() for p in positions}
+    names = {p["symbol"]: p.get("name") or p["symbol"] for p in positions}
+    if not history:
+        print("  [WARNING] 일봉 이력 없음 - 스윙 신호 스캔 생략")
+        return None, None
+    prices = {s: _best_usd_price((us_stock_prices or {}).get(s)) if currency[s] == "USD" else (kr_stock_prices or {}).get(s) for s in symbols}
+    rules = swing_rules.load_rules()
+    rows = swing_scanner.scan({s: history[s] for s in symbols if s in history}, rules,
+                              {s: p for s, p in prices.items() if p is not None}, currency)
+    if not rows:
+        return None, None
+    signals = [f"{names[r['symbol']]} {r['signal']}" for r in rows if r["signal"] != swing_rules.SIGNAL_HOLD]
+    print(f"  스윙 신호: {len(rows)}/{len(symbols)}종목 — {', '.join(signals) if signals else '전 종목 홀딩'}")
+    return swing_scanner.format_for_prompt(rows, rules, swing_rules.load_sleeve(), names), rows
+
+def run_risk_metrics(holdings, history):
+    """보유 종목 일간 수익률로 변동성·상관·VaR/CVaR·SPY 베타·집중도 (거래일별 캐시). 반환: (프롬프트 블록, 결과 dict) 또는 (None, None)."""
+    result = risk_metrics.load(holdings, history=history)
+    if result is None:
+        print("  [WARNING] 리스크 지표 계산 실패 - 생략")
+        return None, None
+    p, c = result["portfolio"], result["concentration"]
+    print(f"  리스크 지표: 연 변동성 {p['vol_pct']:.1f}%, 1일 VaR95 -{p['var']['95']['var_pct']:.2f}%, 베타 {p['beta']:.2f}, "
+          f"최대 비중 {c['top'][0]['name']} {c['top'][0]['weight_pct']:.1f}% ({result['end']} 기준{', 캐시' if result.get('cached') else ''})")
+    return risk_metrics.format_for_prompt(result), result
+
+def run_stress_test(rows):
+    """평가액 행에 Bear/Base/Bull 등 충격 벡터·요인 그리드 적용 (config.json stress). 반환: (프롬프트 블록, 결과 dict) 또는 (None, None)."""
+    result = stress_test.run(rows)
+    if result is None:
+        return None, None
+    summary = ", ".join(f"{sc['name']} {sc['change_pct']:+.1f}%" for sc in result["scenarios"][:3])
+    grid = f", 그리드 {result['grid']['cells']:,}셀" if result.get("grid") else ""
+    print(f"  스트레스 테스트: {summary}{grid}")
+    return stress_test.format_for_prompt(result), result
+
+def run_cagr_anchor(n):
+    """--cagr-anchor: 과거 보고서의 CAGR 결정(scripts/cagr_archive.py 증분 색인) 최근 n회를 Step 1 참고 블록으로. 없으면 None."""
+    t0 = time.perf_counter()
+    index, parsed = cagr_archive.update(REPORTS_DIR, REPORTS_DIR / "cache" / cagr_archive.INDEX_FILE.name)
+    runs = cagr_archive.last_runs(n, index, with_final=True)
+    if not runs:
+        print("  [참고] 최종 CAGR이 있는 과거 보고서 없음 - CAGR 앵커 생략")
+        return None
+    finals = ", ".join(f"{e['final']:g}%" for e in runs)
+    print(f"  과거 CAGR 앵커: 최근 {len(runs)}회 최종 {finals} "
+          f"(색인 {len(index['runs'])}건, 새로 파싱 {parsed}건, {format_elapsed(time.perf_counter() - t0)})")
+    return cagr_archive.format_for_prompt(runs)
+
+def record_snapshot(rows, total_krw, usd_krw_rate, us_stock_prices, kr_stock_prices, cagr=None, pipeline=None, report_file=None):
+    """실행 1회의 평가·환율·주가·CAGR을 일별 스냅샷 저장소(report/.snapshots.sqlite3, scripts/snapshot_store.py)에 추가."""
+    if snapshot_store.record_run(USAGE_RUN["run_id"], rows, total_krw, usd_krw_rate, us_stock_prices, kr_stock_prices, cagr,
+                                 pipeline=pipeline, report_file=report_file):
+        print(f"  스냅샷 저장: report/{snapshot_store.SNAPSHOT_FILE.name} (총자산 {total_krw or 0:,}원, "
+              f"평가 {len(rows or [])}행, 주가 {len(us_stock_prices or {}) + len(kr_stock_prices or {})}개)")
+
+def run_plan(portfolio_prompt, usd_krw_rate, us_stock_prices, args, computed_valuation_text=None, data_fetch_s=None, projection_instruction="",
+             blocks=None):
+    """--plan: LLM 호출 없이 main()과 같은 순서로 단계별 프롬프트를 만들어 토큰을 세고,
+    과거 실행의 출력 크기·지연(run_planner.py)으로 예상 비용·소요 시간·임계 경로를 출력한다.
+    앞 단계 출력이 들어가는 프롬프트는 과거 평균 출력 길이만큼의 자리표시 텍스트로 채운다."""
+    history = run_planner.load_step_history()
+    structured = getattr(args, "structured_output", False)
+    estimates = []
+
+    def _step(provider, step, model, prompt, system_content, effort=None):
+        if provider == "openai" and model in OPENAI_RESPONSES_API_MODELS:
+            effort = effort or DEFAULT_REASONING_EFFORT
+        else:
+            effort = None
+        est = run_planner.estimate_step(
+            step, provider, model, _estimate_tokens(system_content) + _estimate_tokens(prompt), history, _get_price, effort=effort,
+        )
+        estimates.append(est)
+        return "x" * (est["output_tokens"] * 4)
+
+    if getattr(args, "test_cagr_only", False) or getattr(args, "test_cagr_runs", None):
+        grok_system = load_system_prompt("grok") or load_fallback_system("grok")
+        gemini_system = load_system_prompt("gemini") or load_fallback_system("gemini")
+        initial_prompt = create_initial_prompt(portfolio_prompt, usd_krw_rate, us_stock_prices, computed_valuation_text, blocks)
+        initial_prompt = with_structured_instruction(initial_prompt, load_cagr_schema("grok") if structured else None)
+        draft_report = _step("grok", "step1_grok", args.grok_model, initial_prompt, grok_system)
+        audit_prompt = with_structured_instruction(
+            create_audit_prompt(draft_report, None, portfolio_prompt, blocks), load_cagr_schema("gemini") if structured else None
+        )
+        audit_comments = _step("gemini", "step2_gemini", args.gemini_model, audit_prompt, gemini_system)
+        openai_system = (load_system_prompt("openai") or load_fallback_system("openai") or "")[:1500]
+        minimal_prompt = create_minimal_openai_cagr_prompt(None, None, draft_report[-800:], audit_comments[-800:])
+        minimal_prompt = with_structured_instruction(minimal_prompt, load_cagr_schema("openai") if structured else None)
+        _step("openai", "cagr_openai", args.openai_model, minimal_prompt, openai_system)
+        title = "CAGR 테스트 1회"
+    else:
+        # 보고서: 실제 실행과 같은 파이프라인 정의·템플릿으로 단계 프롬프트를 만들고, 호출 대신 출력 크기만 추정
+        try:
+            pipeline = pipeline_engine.load_pipeline(args.pipeline)
+        except pipeline_engine.PipelineError as e:
+            print(f"[ERROR] {e}")
+            return 1
+        current = {}
+
+        def _estimate_call(provider):
+            def fn(api_key, prompt, system_content=None, preferred_model=None, reasoning_effort=None, **kwargs):
+                return _step(provider, current["step"], preferred_model, prompt, system_content, reasoning_effort), preferred_model
+            return fn
+
+        def _before_call(step, prompt, system, kwargs):
+            role = step.get("schema_role") if structured else None
+            return with_structured_instruction(prompt, load_cagr_schema(role) if role else None), {}
+
+        pipeline_engine.run_pipeline(
+            pipeline, build_pipeline_context(portfolio_prompt, usd_krw_rate, us_stock_prices, computed_valuation_text, projection_instruction,
+                                             blocks),
+            {p: _estimate_call(p) for p in pipeline_engine.PROVIDERS},
+            models={"openai": args.openai_model, "grok": args.grok_model, "gemini": args.gemini_model},
+            hooks={"on_step_start": lambda sid: current.update(step=sid), "before_call": _before_call},
+            max_parallel=1, log=lambda *a: None,
+        )
+        title = f"보고서 1회 ({pipeline['name']})"
+
+    print("\n" + "=" * 60)
+    print(f"[실행 계획] {title} 예상 비용·소요 시간 (LLM 호출 없음)")
+    print("=" * 60)
+    print(run_planner.format_plan(estimates, usd_krw_rate=usd_krw_rate, data_fetch_s=data_fetch_s))
+    if getattr(args, "test_cagr_runs", None):
+        print(f"(--test-cagr-runs {args.test_cagr_runs}: 위 값 × {args.test_cagr_runs}회)")
+    print("※ 예산 스케줄러 하향·폴백 모델 전환은 반영하지 않은 요청 모델 기준 추정")
+    return 0
+
+# --profile 요약의 비네트워크 구간: (표시명, "cum"=진입 함수 누적 | "tot"=자체 시간, 함수 패턴 "파일:함수명" 부분 문자열)
+PROFILE_FOCUS = [
+    ("프롬프트 작성", "cum", [":create_initial_prompt", ":create_audit_prompt", ":create_grok_r2_prompt", ":create_gemini_r2_prompt",
+                         ":create_final_prompt", ":create_minimal_openai_cagr_prompt", ":load_system_prompt", ":load_fallback_system",
+                         "pipeline_engine.py:render_prompt", "pipeline_engine.py:load_system"]),
+    ("자산 추이 계산", "cum", ["asset_projection.py:project", "asset_projection.py:format_markdown"]),
+    ("몬테카를로", "cum", ["monte_carlo.py:load_history", "monte_carlo.py:simulate"]),
+    ("일봉 이력", "cum", [":load_holdings_history"]),
+    ("스윙 스캔", "cum", ["swing_scanner.py:scan"]),
+    ("리스크 지표", "cum", ["risk_metrics.py:load"]),
+    ("스트레스 테스트", "cum", ["stress_test.py:run"]),
+    ("정규식 파싱", "tot", ["re.Pattern", "/re/__init__.py:", "/re/_compiler.py:", "/re/_parser.py:"]),
+    ("평가액 계산", "cum", [":compute_portfolio_valuation", ":format_valuation_for_prompt"]),
+    ("파일 열기·쓰기", "cum", ["<built-in method io.open>", "'write' of '_io.", "'__exit__' of '_io."]),
+]
+
 def format_elapsed(seconds):
     """소요 시간(초)을 '12.3초' 또는 '1분 23.4초' 형식으로 반환."""
     if seconds < 60:
@@ -1423,6 +1254,63 @@ def parse_arguments():
         help='결과 파일 경로 (기본값: 자동 생성)'
     )
     
+    parser.add_argument(
+        '--pipeline',
+        type=str,
+        default='3ai',
+        help='보고서 단계 구성: prompts/pipelines.json의 파이프라인 이름 (기본값: 3ai, 2라운드 생략: 3ai_fast). 목록: python scripts/pipeline_engine.py'
+    )
+    
+    parser.add_argument(
+        '--no-local-projection',
+        action='store_true',
+        help='시나리오별 자산 추이 표를 스크립트(asset_projection.py) 계산 대신 OpenAI가 직접 작성 (예전 방식, 출력 토큰 증가)'
+    )
+    
+    parser.add_argument(
+        '--monte-carlo',
+        type=int,
+        nargs='?',
+        const=monte_carlo.DEFAULT_PATHS,
+        default=None,
+        metavar='N',
+        help=f'보유 종목 과거 월 수익률·공분산으로 시나리오별 목표(2030년 25억·2035년 50억·100세) 달성 확률 몬테카를로 후 Step 1 실시간 데이터에 포함 (N경로, 기본 {monte_carlo.DEFAULT_PATHS:,}). scripts/monte_carlo.py'
+    )
+    
+    parser.add_argument(
+        '--cagr-anchor',
+        type=int,
+        nargs='?',
+        const=cagr_archive.DEFAULT_ANCHOR_RUNS,
+        default=None,
+        metavar='N',
+        help=f'과거 보고서 최근 N회의 CAGR 결정(α·β·OpenAI Base·최종·감쇠, scripts/cagr_archive.py 증분 색인)을 Step 1 실시간 데이터에 참고(앵커)로 포함 (기본 {cagr_archive.DEFAULT_ANCHOR_RUNS}회). docs/TBD.md'
+    )
+    
+    parser.add_argument(
+        '--no-stress-test',
+        action='store_true',
+        help='Bear/Base/Bull 충격 후 총자산·비중 표(scripts/stress_test.py)를 Step 3 최종 프롬프트에 넣지 않음'
+    )
+    
+    parser.add_argument(
+        '--no-snapshot',
+        action='store_true',
+        help='실행 평가·환율·주가·CAGR을 일별 스냅샷 저장소(report/.snapshots.sqlite3, scripts/snapshot_store.py)에 기록하지 않음'
+    )
+    
+    parser.add_argument(
+        '--no-risk-metrics',
+        action='store_true',
+        help='보유 종목 변동성·상관·VaR/CVaR·SPY 베타·집중도(scripts/risk_metrics.py)를 Step 1 실시간 데이터·Step 2 감사 프롬프트에 넣지 않음'
+    )
+    
+    parser.add_argument(
+        '--no-swing-scan',
+        action='store_true',
+        help='보유 전 종목 스윙 기준가·주봉 RSI·판정 표(scripts/swing_scanner.py)를 Step 1 실시간 데이터에 넣지 않음 (Grok이 검색으로 스윙 조언)'
+    )
+    
     parser.add_argument(
         '--test-models',
         action='store_true',
@@ -1474,6 +1362,26 @@ def parse_arguments():
         metavar='N',
         help='CAGR 예측만 N회 연속 수행 후 요약 표 출력 (예: --test-cagr-runs 4). temperature 효과 비교용'
     )
+    parser.add_argument(
+        '--structured-output',
+        action='store_true',
+        help='CAGR 단계(Grok R1·Gemini R1·OpenAI 최소)를 prompts/cagr_schema.json 기반 JSON 스키마 구조화 출력으로 요청 (정규식 파싱 대신 검증된 디코드)'
+    )
+    parser.add_argument(
+        '--no-budget-scheduler',
+        action='store_true',
+        help='월 예산(*_MONTHLY_BUDGET) 기반 모델·effort·출력 상한 자동 하향 비활성화 (요청 모델 그대로 사용)'
+    )
+    parser.add_argument(
+        '--plan',
+        action='store_true',
+        help='드라이런: LLM 호출 없이 main과 같은 프롬프트로 토큰을 세고 과거 실행 출력 크기·지연으로 예상 비용·소요 시간·임계 경로 출력 (--test-cagr-only와 함께 쓰면 CAGR 단계 기준)'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='단계별(import·startup·read_prompt·data_fetch·step1_grok…save_report) cProfile을 중간 데이터 디렉터리에 profile_<단계>.prof로 저장하고 누적 시간 상위 함수·비네트워크 구간 요약 출력'
+    )
     
     return parser.parse_args()
 
@@ -1605,99 +1513,25 @@ def run_test_stock_price(openai_key, grok_key, gemini_key, args):
     print("=" * 60)
     return 0
 
-def _list_openai_models(api_key):
-    """OpenAI API로 사용 가능한 모델 ID 목록 반환."""
-    url = "https://api.openai.com/v1/models"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    try:
-        r = requests.get(url, headers=headers, timeout=30)
-        if r.status_code != 200:
-            return None, f"HTTP {r.status_code}"
-        data = r.json()
-        ids = [m.get("id", "") for m in data.get("data", []) if m.get("id")]
-        return sorted(ids), None
-    except Exception as e:
-        return None, str(e)
-
-def _list_grok_models(api_key):
-    """Grok(xAI) API로 사용 가능한 모델 목록 반환."""
-    url = "https://api.x.ai/v1/models"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    try:
-        r = requests.get(url, headers=headers, timeout=30)
-        if r.status_code != 200:
-            return None, f"HTTP {r.status_code}"
-        data = r.json()
-        ids = [m.get("id", "") for m in data.get("data", []) if m.get("id")]
-        return sorted(ids), None
-    except Exception as e:
-        return None, str(e)
-
-def _list_gemini_models(api_key):
-    """Gemini API로 사용 가능한 모델 목록 반환 (generateContent 지원만)."""
-    url = f"https://generativelanguage.googleapis.com/v1beta/models?key={api_key}"
-    try:
-        r = requests.get(url, timeout=30)
-        if r.status_code != 200:
-            return None, f"HTTP {r.status_code}"
-        data = r.json()
-        models = data.get("models", [])
-        ids = []
-        for m in models:
-            if "generateContent" in m.get("supportedGenerationMethods", []):
-                name = m.get("name", "")
-                if "/" in name:
-                    name = name.split("/")[-1]
-                if name:
-                    ids.append(name)
-        return sorted(ids), None
-    except Exception as e:
-        return None, str(e)
+LIST_MODELS_SECTIONS = [("openai", "OpenAI"), ("grok", "Grok (xAI)"), ("gemini", "Gemini (Google)")]
 
 def run_list_models(openai_key, grok_key, gemini_key):
     """AI별 사용 가능한 모델 목록을 조회해 출력한다."""
     print("\n[AI별 사용 가능한 모델 목록]\n")
-    
-    # OpenAI
-    print("OpenAI")
-    print("-" * 50)
-    ids, err = _list_openai_models(openai_key)
-    if err:
-        print(f"  조회 실패: {err}")
-    elif ids:
-        for m in ids:
-            print(f"  • {m}")
-        print(f"  (총 {len(ids)}개)")
-    else:
-        print("  (목록 없음)")
-    print()
-    
-    # Grok
-    print("Grok (xAI)")
-    print("-" * 50)
-    ids, err = _list_grok_models(grok_key)
-    if err:
-        print(f"  조회 실패: {err}")
-    elif ids:
-        for m in ids:
-            print(f"  • {m}")
-        print(f"  (총 {len(ids)}개)")
-    else:
-        print("  (목록 없음)")
-    print()
-    
-    # Gemini
-    print("Gemini (Google)")
-    print("-" * 50)
-    ids, err = _list_gemini_models(gemini_key)
-    if err:
-        print(f"  조회 실패: {err}")
-    elif ids:
-        for m in ids:
-            print(f"  • {m}")
-        print(f"  (총 {len(ids)}개)")
-    else:
-        print("  (목록 없음)")
+    keys = {"openai": openai_key, "grok": grok_key, "gemini": gemini_key}
+    for provider, title in LIST_MODELS_SECTIONS:
+        print(title)
+        print("-" * 50)
+        ids, err = ai_providers.list_models(provider, keys[provider])
+        if err:
+            print(f"  조회 실패: {err}")
+        elif ids:
+            for m in ids:
+                print(f"  • {m}")
+            print(f"  (총 {len(ids)}개)")
+        else:
+            print("  (목록 없음)")
+        print()
     print("=" * 50)
     return 0
 
@@ -1724,9 +1558,9 @@ def _write_debug_report(draft_report, final_report, usd_krw_rate, us_stock_price
             f.write(f"- 미국 주가: {', '.join(us_stock_prices.keys())} ({yesterday.strftime('%Y-%m-%d')} API 조회)\n")
         f.write(f"\n**성장률:** Base(Grok) {alpha_cagr or 'N/A'}% | Base(Gemini) {beta_cagr or 'N/A'}% → GPT 세 Base 비교 후 Bear/Bull 반영해 최종 확정\n")
         f.write(f"\n**사용 모델:**\n")
-        f.write(f"- Grok (1차 예측·논의): `{grok_model or 'N/A'}`\n")
-        f.write(f"- Gemini (2차 예측·검토 논의): `{gemini_model or 'N/A'}`\n")
-        f.write(f"- OpenAI (최종 결정): `{openai_model_final or 'N/A'}`\n\n")
+        for step, res in labeled:
+            f.write(f"- {step['report_label']}: `{_model(res, step) or 'N/A'}`\n")
+        f.write("\n")
         f.write("---\n\n")
         f.write("## 최종 보고서\n\n")
         f.write(body)
@@ -1821,6 +1655,7 @@ def run_debug_step(openai_key, grok_key, gemini_key, portfolio_prompt, usd_krw_r
     # Step 1
     grok_system = load_system_prompt("grok") or load_fallback_system("grok")
     initial_prompt = create_initial_prompt(portfolio_prompt, usd_krw_rate, us_stock_prices, computed_valuation_text)
+    set_usage_step("step1_grok")
     print("[Step 1] Grok R1 호출 중...")
     t_step = time.perf_counter()
     draft_result = call_grok_api(grok_key, initial_prompt, preferred_model=args.grok_model, use_web_search=not args.no_grok_web_search, system_content=grok_system)
@@ -1848,6 +1683,7 @@ def run_debug_step(openai_key, grok_key, gemini_key, portfolio_prompt, usd_krw_r
     if target_step >= 2:
         gemini_system = load_system_prompt("gemini") or load_fallback_system("gemini")
         audit_prompt = create_audit_prompt(draft_report, alpha_cagr, portfolio_prompt)
+        set_usage_step("step2_gemini")
         print("[Step 2] Gemini R1 호출 중...")
         t_step = time.perf_counter()
         audit_result = call_gemini_api(gemini_key, audit_prompt, preferred_model=args.gemini_model, system_content=gemini_system)
@@ -1878,6 +1714,7 @@ def run_debug_step(openai_key, grok_key, gemini_key, portfolio_prompt, usd_krw_r
         grok_r2_sys = load_system_prompt("grok_r2") or load_fallback_system("grok")
         grok_r2_prompt = create_grok_r2_prompt(audit_comments)
         grok_r2_system = grok_r2_sys
+        set_usage_step("step2b_grok")
         print("[Step 3] Grok R2(수용·반박) 호출 중...")
         t_step = time.perf_counter()
         grok_r2_result = call_grok_api(grok_key, grok_r2_prompt, preferred_model=args.grok_model, use_web_search=False, system_content=grok_r2_system)
@@ -1898,6 +1735,7 @@ def run_debug_step(openai_key, grok_key, gemini_key, portfolio_prompt, usd_krw_r
         gemini_r2_sys = load_system_prompt("gemini_r2") or load_fallback_system("gemini")
         gemini_r2_prompt = create_gemini_r2_prompt(grok_r2)
         gemini_r2_system = gemini_r2_sys
+        set_usage_step("step2b_gemini")
         print("[Step 4] Gemini R2(수용·반박) 호출 중...")
         t_step = time.perf_counter()
         gemini_r2_result = call_gemini_api(gemini_key, gemini_r2_prompt, preferred_model=args.gemini_model, system_content=gemini_r2_system)
@@ -1918,6 +1756,7 @@ def run_debug_step(openai_key, grok_key, gemini_key, portfolio_prompt, usd_krw_r
         openai_system = load_system_prompt("openai") or load_fallback_system("openai")
         user_prompt = create_final_prompt(draft_report, alpha_cagr, audit_comments, beta_cagr, portfolio_prompt, grok_r2=grok_r2, gemini_r2=gemini_r2)
         final_prompt = user_prompt
+        set_usage_step("step3_openai")
         print("[Step 5] OpenAI 호출 중...")
         t_step = time.perf_counter()
         content, model = call_openai_api(openai_key, user_prompt, preferred_model=args.openai_model, system_content=openai_system)
@@ -1952,6 +1791,7 @@ def run_debug_step(openai_key, grok_key, gemini_key, portfolio_prompt, usd_krw_r
             if next_step == 2:
                 gemini_system = load_system_prompt("gemini") or load_fallback_system("gemini")
                 audit_prompt = create_audit_prompt(draft_report, alpha_cagr, portfolio_prompt)
+                set_usage_step("step2_gemini")
                 print("[Step 2] Gemini R1 호출 중...")
                 t_step = time.perf_counter()
                 audit_result = call_gemini_api(gemini_key, audit_prompt, preferred_model=args.gemini_model, system_content=gemini_system)
@@ -1969,6 +1809,7 @@ def run_debug_step(openai_key, grok_key, gemini_key, portfolio_prompt, usd_krw_r
             elif next_step == 3:
                 grok_r2_system = load_system_prompt("grok_r2") or load_fallback_system("grok")
                 grok_r2_prompt = create_grok_r2_prompt(audit_comments)
+                set_usage_step("step2b_grok")
                 print("[Step 3] Grok R2(수용·반박) 호출 중...")
                 t_step = time.perf_counter()
                 grok_r2_result = call_grok_api(grok_key, grok_r2_prompt, preferred_model=args.grok_model, use_web_search=False, system_content=grok_r2_system)
@@ -1983,6 +1824,7 @@ def run_debug_step(openai_key, grok_key, gemini_key, portfolio_prompt, usd_krw_r
             elif next_step == 4:
                 gemini_r2_system = load_system_prompt("gemini_r2") or load_fallback_system("gemini")
                 gemini_r2_prompt = create_gemini_r2_prompt(grok_r2)
+                set_usage_step("step2b_gemini")
                 print("[Step 4] Gemini R2(수용·반박) 호출 중...")
                 t_step = time.perf_counter()
                 gemini_r2_result = call_gemini_api(gemini_key, gemini_r2_prompt, preferred_model=args.gemini_model, system_content=gemini_r2_system)
@@ -1998,6 +1840,7 @@ def run_debug_step(openai_key, grok_key, gemini_key, portfolio_prompt, usd_krw_r
                 openai_system = load_system_prompt("openai") or load_fallback_system("openai")
                 user_prompt = create_final_prompt(draft_report, alpha_cagr, audit_comments, beta_cagr, portfolio_prompt, grok_r2=grok_r2, gemini_r2=gemini_r2)
                 final_prompt = user_prompt
+                set_usage_step("step3_openai")
                 print("[Step 5] OpenAI 호출 중...")
                 t_step = time.perf_counter()
                 content, model = call_openai_api(openai_key, user_prompt, preferred_model=args.openai_model, system_content=openai_system)
@@ -2066,10 +1909,55 @@ def run_debug_step(openai_key, grok_key, gemini_key, portfolio_prompt, usd_krw_r
             print(f"[디버그] 지라 입력/실행 예외: {e}")
     return 0
 
+# (args 속성, 모드 이름) — main()이 확인하는 순서. 해당 없으면 보고서 생성("full")
+RUN_MODES = (("test_data_fetch", "check_prices"), ("check_prices", "check_prices"), ("test_models", "test_models"),
+             ("test_stock_price", "test_stock_price"), ("list_models", "list_models"), ("plan", "plan"),
+             ("debug_step", "debug_step"), ("test_cagr_runs", "test_cagr"), ("test_cagr_only", "test_cagr"))
+
+def run_mode(args):
+    """실행 모드 이름 (루트 span mode 속성·추적 저장 위치)."""
+    return next((name for flag, name in RUN_MODES if getattr(args, flag, None)), "full")
+
+def finish_trace(args, outcome):
+    """실행 추적 마무리·저장 후 메트릭 반영 (mode 라벨). 추적은 보고서 생성이면 중간 데이터 디렉터리(outcome["trace_dir"]),
+    그 전에 중단·실패하면 report/YYYYMMDD_HHMM, 다른 모드는 report/traces/YYYYMMDD_HHMM_<모드>."""
+    mode = run_mode(args)
+    spans = run_trace.finish_run(status=outcome["status"], error=outcome.get("error"))
+    stamp = datetime.now().strftime("%Y%m%d_%H%M")
+    directory = outcome["trace_dir"] or (REPORTS_DIR / stamp if mode == "full" else REPORTS_DIR / "traces" / f"{stamp}_{mode}")
+    try:
+        path = run_trace.write_jsonl(directory)
+        if path and not outcome["trace_dir"]:
+            print(f"  추적: {path}")
+    except OSError as e:
+        print(f"[WARNING] 실행 추적 저장 실패: {e}")
+    if spans:
+        metrics_path = run_metrics.record_run(spans, mode=mode, directory=REPORTS_DIR / "metrics")
+        if metrics_path and mode == "full":
+            print(f"  메트릭 갱신: {metrics_path}")
+
 def main():
-    """메인 함수"""
+    """메인 함수. 모드·종료 코드·예외와 관계없이 끝에서 실행 추적을 저장 (finish_trace)."""
     args = parse_arguments()
-    API_USAGE_LOG.clear()
+    if args.profile:
+        run_profile.start("startup", default_dir=lambda: REPORTS_DIR / "profiles" / datetime.now().strftime("%Y%m%d_%H%M"),
+                          focus=PROFILE_FOCUS)
+    start_usage_run()
+    run_trace.start_run(USAGE_RUN["run_id"], mode=run_mode(args), openai_model=args.openai_model, grok_model=args.grok_model,
+                        gemini_model=args.gemini_model)
+    outcome = {"status": "error", "trace_dir": None}
+    try:
+        code = run_main(args, outcome)
+        outcome["status"] = "ok" if code == 0 else "error"
+        return code
+    except BaseException as e:
+        outcome["error"] = type(e).__name__
+        raise
+    finally:
+        finish_trace(args, outcome)
+
+def run_main(args, outcome):
+    """main() 본문. 반환: 종료 코드. 보고서 생성 시 outcome["trace_dir"]에 중간 데이터 디렉터리를 남김."""
     if args.prompt_file is None:
         args.prompt_file = get_default_prompt_file()
     
@@ -2082,7 +1970,7 @@ def main():
     # 환경 변수 로드 (먼저 수행)
     print("\n[1/8] 환경 변수 로드 중...")
     t0 = time.perf_counter()
-    openai_key, grok_key, gemini_key = load_env()
+    openai_key, grok_key, gemini_key = common.load_env(require_keys=not args.plan)
     print(f"[1/8] 환경 변수 로드 완료. (소요: {format_elapsed(time.perf_counter() - t0)})")
     
     # --test-data-fetch / --check-prices: 환율·주가 확인만 실행 후 종료 (AI 호출 없음)
@@ -2107,13 +1995,15 @@ def main():
     
     # 프롬프트 파일 읽기
     print(f"\n[2/8] 프롬프트 파일 읽는 중: {args.prompt_file}")
+    enter_step("read_prompt")
     t0 = time.perf_counter()
     portfolio_prompt = read_portfolio_prompt(args.prompt_file)
     print(f"[2/8] 프롬프트 파일 읽기 완료. (소요: {format_elapsed(time.perf_counter() - t0)})")
     
     # 실시간 데이터 조회 (환율 + 미국 주가)
     print("\n[3/8] 실시간 데이터 조회 중...")
-    t0 = time.perf_counter()
+    enter_step("data_fetch")
+    t0 = t_fetch = time.perf_counter()
     usd_krw_rate = fetch_usd_krw_rate()
     if usd_krw_rate:
         print(f"  USD/KRW 환율: {usd_krw_rate}원")
@@ -2139,18 +2029,48 @@ def main():
     
     # 포트폴리오 평가액 API·스크립트 계산 (config에 portfolio_holdings 있으면)
     computed_valuation_text = None
+    rows, total_krw = [], None
+    kr_stock_prices = {}
+    stress_result = None
+    blocks = {}  # 스크립트 계산 프롬프트 블록 (PROMPT_BLOCKS 키)
     holdings = get_portfolio_holdings()
     if holdings and usd_krw_rate is not None:
         kr_tickers = list({p["symbol"] for p in holdings["positions"] if (p.get("currency") or "USD").upper() == "KRW"})
-        kr_stock_prices = fetch_kr_stock_prices(kr_tickers) if kr_tickers and YFINANCE_AVAILABLE else {}
+        kr_stock_prices = fetch_kr_stock_prices(kr_tickers) if kr_tickers else {}
         if kr_tickers:
             print(f"  한국 주가: {len(kr_stock_prices)}/{len(kr_tickers)}개 조회")
         rows, total_krw = compute_portfolio_valuation(holdings, usd_krw_rate, us_stock_prices, kr_stock_prices)
         if total_krw > 0:
             computed_valuation_text = format_valuation_for_prompt(rows, total_krw)
             print(f"  포트폴리오 평가(스크립트): 총 {total_krw:,}원 (약 {total_krw/100_000_000:.2f}억)")
+            blocks["holdings_pnl"] = format_pnl_for_prompt(rows)
+            if blocks["holdings_pnl"]:
+                print(f"  종목별 수익률(평단 대비): {sum(1 for r in rows if r.get('pnl_krw') is not None)}개 행 계산")
+            if not args.no_stress_test:
+                blocks["stress_test"], stress_result = run_stress_test(rows)
     elif holdings:
         print("  [참고] 환율 없어 포트폴리오 평가 계산 생략 (AI가 검색으로 대체)")
+    # 스윙 스캔·리스크 지표 일봉은 한 번만 조회 (종목 합집합, 긴 기간 기준)
+    history = None
+    if holdings and not (args.no_risk_metrics and args.no_swing_scan):
+        history = load_holdings_history(holdings, with_risk=not args.no_risk_metrics)
+    risk_result = monte_carlo_result = None
+    if holdings and not args.no_risk_metrics:
+        blocks["risk_metrics"], risk_result = run_risk_metrics(holdings, history)
+    if args.monte_carlo and holdings:
+        blocks["monte_carlo"], monte_carlo_result = run_monte_carlo(holdings, total_krw, args.monte_carlo)
+    swing_rows = None
+    if holdings and not args.no_swing_scan:
+        blocks["swing_scan"], swing_rows = run_swing_scan(holdings, us_stock_prices, kr_stock_prices, history)
+    if args.cagr_anchor:
+        blocks["cagr_anchor"] = run_cagr_anchor(args.cagr_anchor)
+    # 자산 추이 표는 스크립트 평가액이 있을 때만 로컬 계산 (없으면 예전처럼 OpenAI가 작성)
+    projection_instruction = load_projection_instruction() if total_krw and not args.no_local_projection else ""
+    
+    # --plan: LLM 호출 없이 예상 비용·소요 시간만 출력
+    if args.plan:
+        return run_plan(portfolio_prompt, usd_krw_rate, us_stock_prices, args, computed_valuation_text,
+                        data_fetch_s=time.perf_counter() - t_fetch, projection_instruction=projection_instruction, blocks=blocks)
     
     # --debug-step: 해당 스텝만 실행 후 추가 질문 대화 모드
     if args.debug_step is not None:
@@ -2161,7 +2081,8 @@ def main():
         runs = []
         for i in range(args.test_cagr_runs):
             print(f"\n{'='*60}\n[테스트 CAGR 예측] 실행 {i+1}/{args.test_cagr_runs}\n{'='*60}")
-            a, b, ob, ofn = run_test_cagr_only(openai_key, grok_key, gemini_key, portfolio_prompt, usd_krw_rate, us_stock_prices, args, computed_valuation_text)
+            a, b, ob, ofn = run_test_cagr_only(openai_key, grok_key, gemini_key, portfolio_prompt, usd_krw_rate, us_stock_prices, args, computed_valuation_text,
+                                               blocks)
             runs.append((a, b, ob, ofn))
             print(f"  → Grok α: {a if a is not None else 'N/A'}% | Gemini β: {b if b is not None else 'N/A'}% | OpenAI Base: {ob if ob is not None else 'N/A'}% | OpenAI Final: {ofn if ofn is not None else 'N/A'}%")
         print("\n" + "="*60)
@@ -2181,7 +2102,8 @@ def main():
     # --test-cagr-only: CAGR 예측만 1회 (보고서 없음)
     if getattr(args, 'test_cagr_only', False):
         print("\n[CAGR 예측만 1회] Grok → Gemini → OpenAI(최소). 보고서 미생성.\n")
-        a, b, ob, ofn = run_test_cagr_only(openai_key, grok_key, gemini_key, portfolio_prompt, usd_krw_rate, us_stock_prices, args, computed_valuation_text)
+        a, b, ob, ofn = run_test_cagr_only(openai_key, grok_key, gemini_key, portfolio_prompt, usd_krw_rate, us_stock_prices, args, computed_valuation_text,
+                                           blocks)
         print("\n" + "="*60)
         print("[결과] Grok α: {}% | Gemini β: {}% | OpenAI Base: {}% | OpenAI Final: {}%".format(
             a if a is not None else "N/A", b if b is not None else "N/A",
@@ -2189,96 +2111,68 @@ def main():
         print("="*60)
         return 0
     
-    # Step 1: Grok 1차 예측 (Base 시나리오 CAGR) + 시장 해석·리스크 논의
-    grok_system = load_system_prompt("grok") or load_fallback_system("grok")
-    print("\n[4/8] Grok(데이터 분석관) 1차 예측·논의 중 (Base 시나리오 CAGR, web_search)...")
-    t0 = time.perf_counter()
-    initial_prompt = create_initial_prompt(portfolio_prompt, usd_krw_rate, us_stock_prices, computed_valuation_text)
-    draft_result = call_grok_api(grok_key, initial_prompt, preferred_model=args.grok_model, use_web_search=not args.no_grok_web_search, system_content=grok_system)
-    
-    if draft_result[0] is None:
-        print("[ERROR] [4/8] Grok 1차 논의 실패")
+    # Step 4~7: 파이프라인 실행 (prompts/pipelines.json — 기본 3ai: Grok R1 → Gemini R1 → Grok R2 → Gemini R2 → OpenAI)
+    try:
+        pipeline = pipeline_engine.load_pipeline(args.pipeline)
+    except pipeline_engine.PipelineError as e:
+        print(f"[ERROR] {e}")
         return 1
-    
-    draft_report, grok_model = draft_result
-    alpha_cagr, current_total_krw, market_data = parse_alpha_json(draft_report)
-    if alpha_cagr is not None:
-        print(f"  Base CAGR(Grok): {alpha_cagr}%")
-    print(f"[4/8] Grok 1차 예측·논의 완료 ({len(draft_report)} 문자). (소요: {format_elapsed(time.perf_counter() - t0)})")
-    
-    # Step 2: Gemini 2차 예측 (Base 시나리오 CAGR) + 검토 논의
-    gemini_system = load_system_prompt("gemini") or load_fallback_system("gemini")
-    print("\n[5/8] Gemini(리스크 감사관) 2차 예측·검토 논의 중 (Base 시나리오 CAGR, Google Search)...")
+    final_step_def = next((st for st in pipeline["steps"] if st["id"] == (pipeline.get("final") or {}).get("step")), {})
+    if "projection_instruction" not in (final_step_def.get("inputs") or {}):
+        projection_instruction = ""  # 최종 단계 템플릿이 자산 추이 지시를 받지 않는 흐름 (collaborative 등)
+    print(f"\n[4/8] 파이프라인 {pipeline['name']} 실행 중: {pipeline.get('description', '')}")
     t0 = time.perf_counter()
-    audit_prompt = create_audit_prompt(draft_report, alpha_cagr, portfolio_prompt)
-    audit_result = call_gemini_api(gemini_key, audit_prompt, preferred_model=args.gemini_model, system_content=gemini_system)
-    
-    audit_comments = audit_result[0] if audit_result[0] else ""
-    gemini_model = audit_result[1] if audit_result[1] else None
-    beta_cagr, risk_level, audit_notes = parse_beta_json(audit_comments) if audit_comments else (None, None, None)
-    
-    if not audit_comments:
-        print("[WARNING] Gemini 검토 논의 실패 - 최종 단계로 진행합니다.")
-        audit_comments = "검토 논의를 받지 못했습니다."
-    else:
-        if beta_cagr is not None:
-            print(f"  Base CAGR(Gemini): {beta_cagr}%")
-        if risk_level:
-            print(f"  리스크 수준: {risk_level}")
-    
-    print(f"[5/8] Gemini 검토 논의 완료 ({len(audit_comments)} 문자). (소요: {format_elapsed(time.perf_counter() - t0)})")
-    
-    # Round 2: Grok 수용·반박 (Gemini 검토 논의 검토)
-    grok_r2 = ""
-    gemini_r2 = ""
-    print("\n[6/8] 2라운드(수용·반박) 진행 중...")
-    t0 = time.perf_counter()
-    grok_r2_system = load_system_prompt("grok_r2") or load_fallback_system("grok")
-    grok_r2_prompt = create_grok_r2_prompt(audit_comments)
-    grok_r2_result = call_grok_api(grok_key, grok_r2_prompt, preferred_model=args.grok_model, use_web_search=False, system_content=grok_r2_system)
-    if grok_r2_result and grok_r2_result[0]:
-        grok_r2 = grok_r2_result[0]
-        print(f"  Grok 2라운드 완료 ({len(grok_r2)} 문자)")
-    else:
-        print("  [WARNING] Grok 2라운드 실패 - 2라운드 없이 Step 3 진행")
+    run = pipeline_engine.run_pipeline(
+        pipeline, build_pipeline_context(portfolio_prompt, usd_krw_rate, us_stock_prices, computed_valuation_text, projection_instruction, blocks),
+        {"openai": call_openai_api, "grok": call_grok_api, "gemini": call_gemini_api},
+        keys={"openai": openai_key, "grok": grok_key, "gemini": gemini_key},
+        models={"openai": args.openai_model, "grok": args.grok_model, "gemini": args.gemini_model},
+        hooks=pipeline_hooks(pipeline, args),
+    )
+    results = run["results"]
+    if run["aborted"]:
+        print(f"[ERROR] [7/8] 파이프라인 {pipeline['name']} 중단")
+        if not args.no_snapshot:
+            record_snapshot(rows, total_krw, usd_krw_rate, us_stock_prices, kr_stock_prices, pipeline=pipeline["name"])
+        return 1
     
-    if grok_r2:
-        gemini_r2_system = load_system_prompt("gemini_r2") or load_fallback_system("gemini")
-        gemini_r2_prompt = create_gemini_r2_prompt(grok_r2)
-        gemini_r2_result = call_gemini_api(gemini_key, gemini_r2_prompt, preferred_model=args.gemini_model, system_content=gemini_r2_system)
-        if gemini_r2_result and gemini_r2_result[0]:
-            gemini_r2 = gemini_r2_result[0]
-            print(f"  Gemini 2라운드 완료 ({len(gemini_r2)} 문자)")
+    final_sid = pipeline["final"]["step"]
+    final_report = run["final_text"]
+    if run["final_step"] != final_sid:
+        print(f"[WARNING] 최종 보고서 작성 실패 - {run['final_step']} 출력을 사용합니다.")
+    alpha_cagr = pipeline_value(results, "alpha_cagr")
+    beta_cagr = pipeline_value(results, "beta_cagr")
+    final_cagr = parse_projection_values(final_report)[0] if run["final_step"] == final_sid else None
+    projection = None
+    if projection_instruction:
+        bases = [c for c in (alpha_cagr, beta_cagr) if c is not None]
+        final_report, projection, cagr_source = apply_local_projection(
+            final_report, total_krw, round(sum(bases) / len(bases), 2) if bases else None, get_projection_settings())
+        if projection:
+            d = projection["decay"]
+            print(f"  자산 추이 로컬 계산: CAGR {projection['base_cagr']:g}% ({cagr_source}), "
+                  f"감쇠 {d['y2034']:g}/{d['y2035_2039']:g}/{d['y2040_plus']:g}%")
         else:
-            print("  [WARNING] Gemini 2라운드 실패 - 2라운드 Grok만 반영")
-    
-    print(f"[6/8] 2라운드(수용·반박) 완료. (소요: {format_elapsed(time.perf_counter() - t0)})")
-    
-    # Step 3: GPT 최종 결정 (세 Base 비교 + Bear/Bull 반영 후 최종 CAGR 확정)
-    openai_system = load_system_prompt("openai") or load_fallback_system("openai")
-    print("\n[7/8] OpenAI(수석 매니저) 세 Base 비교·Bear/Bull 반영 후 최종 CAGR 확정·보고서 작성 중...")
-    t0 = time.perf_counter()
-    final_prompt = create_final_prompt(draft_report, alpha_cagr, audit_comments, beta_cagr, portfolio_prompt, grok_r2=grok_r2, gemini_r2=gemini_r2)
-    final_result = call_openai_api(openai_key, final_prompt, preferred_model=args.openai_model, system_content=openai_system)
-    
-    elapsed_7 = time.perf_counter() - t0
-    if final_result[0] is None:
-        print(f"[WARNING] 최종 보고서 작성 실패 - 초안을 사용합니다. (소요: {format_elapsed(elapsed_7)})")
-        final_report = draft_report
-        openai_model_final = "N/A"
-    else:
-        final_report, openai_model_final = final_result
-        print(f"[7/8] OpenAI 최종 보고서 작성 완료 ({len(final_report)} 문자). (소요: {format_elapsed(elapsed_7)})")
+            print("  [WARNING] 최종 CAGR을 찾지 못해 자산 추이 표 생략")
+    # 보고서·파일명에 표시할 모델: report_label이 있는 단계 (최종 단계 실패 시 N/A)
+    labeled = [(step, results[step["id"]]) for step in pipeline["steps"] if step.get("report_label")]
+    def _model(res, step):
+        return res["model"] or ("N/A" if step["id"] == final_sid else None)
+    provider_model = {}
+    for step, res in labeled:
+        provider_model.setdefault(step["provider"], _model(res, step))
+    print(f"[7/8] 파이프라인 {pipeline['name']} 완료 ({len(run['order'])}단계, 최종 {len(final_report)} 문자). (소요: {format_elapsed(time.perf_counter() - t0)})")
     
     # 보고서 파일명 생성
     report_filename, report_path = generate_report_filename(
-        openai_model_final, 
-        grok_model, 
-        gemini_model,
+        provider_model.get("openai"),
+        provider_model.get("grok"),
+        provider_model.get("gemini"),
         output_file=args.output_file
     )
     
     print("\n[8/8] 보고서 저장 중...")
+    enter_step("save_report")
     t0 = time.perf_counter()
     if report_path.exists():
         print(f"  [WARNING] {report_filename} 파일이 이미 존재합니다. 기존 파일을 덮어씁니다.")
@@ -2288,7 +2182,7 @@ def main():
     yesterday = now - timedelta(days=1)
     REPORTS_DIR.mkdir(parents=True, exist_ok=True)
     with open(report_path, 'w', encoding='utf-8') as f:
-        f.write(f"# 위웨이크 주식회사 포트폴리오 보고서 (3-AI 협업)\n")
+        f.write(f"# 위웨이크 주식회사 포트폴리오 보고서 ({pipeline.get('report_title', '3-AI 협업')})\n")
         f.write(f"**작성일: {now.strftime('%Y년 %m월 %d일 %H시 %M분')} (어제 종가 기준: {yesterday.strftime('%Y년 %m월 %d일')})**\n\n")
         f.write(f"**실시간 데이터:**\n")
         if usd_krw_rate:
@@ -2297,9 +2191,9 @@ def main():
             f.write(f"- 미국 주가: {', '.join(us_stock_prices.keys())} ({yesterday.strftime('%Y-%m-%d')} API 조회)\n")
         f.write(f"\n**성장률:** Base(Grok) {alpha_cagr or 'N/A'}% | Base(Gemini) {beta_cagr or 'N/A'}% → GPT 세 Base 비교 후 Bear/Bull 반영해 최종 확정\n")
         f.write(f"\n**사용 모델:**\n")
-        f.write(f"- Grok (1차 예측·논의): `{grok_model or 'N/A'}`\n")
-        f.write(f"- Gemini (2차 예측·검토 논의): `{gemini_model or 'N/A'}`\n")
-        f.write(f"- OpenAI (최종 결정): `{openai_model_final or 'N/A'}`\n\n")
+        for step, res in labeled:
+            f.write(f"- {step['report_label']}: `{_model(res, step) or 'N/A'}`\n")
+        f.write("\n")
         f.write("---\n\n")
         f.write("## 최종 보고서\n\n")
         f.write(final_report)
@@ -2309,62 +2203,61 @@ def main():
     date_time_dirname = f"{parts[2]}_{parts[3]}" if len(parts) >= 4 else now.strftime("%Y%m%d_%H%M")
     intermediate_dir = REPORTS_DIR / date_time_dirname
     intermediate_dir.mkdir(parents=True, exist_ok=True)
-    # AI별 프롬프트 + 출력값을 하나의 파일에 저장
-    (intermediate_dir / "step1_grok.md").write_text(
-        "## 시스템 프롬프트\n\n" + (grok_system or "") + "\n\n---\n\n## 유저 프롬프트\n\n" + (initial_prompt or "") + "\n\n---\n\n## 출력\n\n" + (draft_report or ""),
-        encoding="utf-8"
-    )
-    (intermediate_dir / "step2_gemini.md").write_text(
-        "## 시스템 프롬프트\n\n" + (gemini_system or "") + "\n\n---\n\n## 유저 프롬프트\n\n" + (audit_prompt or "") + "\n\n---\n\n## 출력\n\n" + (audit_comments or ""),
-        encoding="utf-8"
-    )
-    if grok_r2:
-        grok_r2_sys = load_system_prompt("grok_r2") or load_fallback_system("grok")
-        (intermediate_dir / "step2b_grok.md").write_text(
-            "## 시스템 프롬프트\n\n" + (grok_r2_sys or "") + "\n\n---\n\n## 유저 프롬프트\n\n" + (grok_r2_prompt or "") + "\n\n---\n\n## 출력\n\n" + (grok_r2 or ""),
-            encoding="utf-8"
-        )
-    if gemini_r2:
-        gemini_r2_sys = load_system_prompt("gemini_r2") or load_fallback_system("gemini")
-        (intermediate_dir / "step2b_gemini.md").write_text(
-            "## 시스템 프롬프트\n\n" + (gemini_r2_sys or "") + "\n\n---\n\n## 유저 프롬프트\n\n" + (gemini_r2_prompt or "") + "\n\n---\n\n## 출력\n\n" + (gemini_r2 or ""),
-            encoding="utf-8"
-        )
-    (intermediate_dir / "step3_openai.md").write_text(
-        "## 시스템 프롬프트\n\n" + (openai_system or "") + "\n\n---\n\n## 유저 프롬프트\n\n" + (final_prompt or "") + "\n\n---\n\n## 출력\n\n" + (final_report or ""),
-        encoding="utf-8"
-    )
+    # 실행된 단계별 프롬프트 + 출력값을 하나의 파일에 저장 (<단계 id>.md)
     readme_lines = [
         "# 중간 데이터 (각 AI별 프롬프트 + 출력값)\n\n",
+        f"파이프라인: `{pipeline['name']}` (prompts/pipelines.json)\n\n",
         "| 파일 | 내용 |\n|------|------|\n",
-        "| step1_grok.md | Grok: 시스템·유저 프롬프트 + 출력(CAGR·논의) |\n",
-        "| step2_gemini.md | Gemini: 시스템·유저 프롬프트 + 출력(검토 논의) |\n",
     ]
-    if grok_r2:
-        readme_lines.append("| step2b_grok.md | Grok 2라운드: 수용·반박 |\n")
-    if gemini_r2:
-        readme_lines.append("| step2b_gemini.md | Gemini 2라운드: 수용·반박 |\n")
-    readme_lines.append("| step3_openai.md | OpenAI: 시스템·유저 프롬프트 + 출력(최종 보고서 본문) |\n")
+    for sid in run["order"]:
+        res = results[sid]
+        step = next(st for st in pipeline["steps"] if st["id"] == sid)
+        (intermediate_dir / f"{sid}.md").write_text(
+            "## 시스템 프롬프트\n\n" + (res.get("system") or "") + "\n\n---\n\n## 유저 프롬프트\n\n" + (res.get("prompt") or "")
+            + "\n\n---\n\n## 출력\n\n" + (res["text"] or ""),
+            encoding="utf-8"
+        )
+        note = "" if res["status"] == "ok" else " (실패)"
+        readme_lines.append(f"| {sid}.md | {step.get('readme') or step.get('label', sid)}{note} |\n")
+    if risk_result:
+        (intermediate_dir / "risk_metrics.json").write_text(json.dumps(risk_result, ensure_ascii=False, indent=2), encoding="utf-8")
+        readme_lines.append("| risk_metrics.json | 종목별 비중·연 변동성·SPY 베타·위험 기여도·상관행렬, 포트폴리오 VaR/CVaR·최대 낙폭·집중도 (`scripts/risk_metrics.py`, Step 1·2 프롬프트에 포함) |\n")
+    if stress_result:
+        (intermediate_dir / "stress_test.json").write_text(json.dumps(stress_result, ensure_ascii=False, indent=2), encoding="utf-8")
+        readme_lines.append("| stress_test.json | Bear/Base/Bull 등 시나리오별 충격 후 총자산·비중과 요인 그리드 분포 (`scripts/stress_test.py`, Step 3 프롬프트에 포함) |\n")
+    if monte_carlo_result:
+        (intermediate_dir / "monte_carlo.json").write_text(json.dumps(monte_carlo_result, ensure_ascii=False, indent=2), encoding="utf-8")
+        readme_lines.append("| monte_carlo.json | --monte-carlo: 포트폴리오 수익률 추정치(비중·μ·σ)와 시나리오별 마일스톤 달성 확률·분위수 (`scripts/monte_carlo.py`) |\n")
+    if swing_rows:
+        (intermediate_dir / "swing_scan.json").write_text(json.dumps(swing_rows, ensure_ascii=False, indent=2), encoding="utf-8")
+        readme_lines.append("| swing_scan.json | 보유 종목별 스윙 기준가·3개월 최고가·주봉 RSI·위치 판정 (`scripts/swing_scanner.py`, Step 1 실시간 데이터에 포함) |\n")
+    if projection:
+        (intermediate_dir / "projection.json").write_text(asset_projection.to_json(projection), encoding="utf-8")
+        readme_lines.append("| projection.json | 시나리오별 자산 추이 로컬 계산 입력(CAGR·감쇠·설정)과 연도별 값 (`scripts/asset_projection.py`) |\n")
+    readme_lines.append(f"| {run_trace.TRACE_FILE_NAME} | 실행 추적: run → step → call → model → http span (JSON lines, `python scripts/run_trace.py <이 디렉터리>`로 트리 보기) |\n")
+    if args.profile:
+        readme_lines.append(f"| profile_<단계>.prof, {run_profile.SUMMARY_FILE_NAME} | --profile: 단계별 cProfile (`python -m pstats <파일>`), 단계별 wall·CPU·상위 함수 요약 |\n")
     (intermediate_dir / "README.md").write_text("".join(readme_lines), encoding="utf-8")
+    run_profile.write(intermediate_dir)
+    outcome["trace_dir"] = intermediate_dir
+    if not args.no_snapshot:
+        record_snapshot(rows, total_krw, usd_krw_rate, us_stock_prices, kr_stock_prices,
+                        cagr={"alpha": alpha_cagr, "beta": beta_cagr, "final": final_cagr}, pipeline=pipeline["name"],
+                        report_file=report_filename)
     print(f"[8/8] 보고서 저장 완료. 최종: report/{report_filename}, 중간: report/{date_time_dirname}/ (소요: {format_elapsed(time.perf_counter() - t0)})")
     
     # AI별 요청 모델 vs 실제 사용 모델 출력
+    requested = {"openai": args.openai_model, "grok": args.grok_model, "gemini": args.gemini_model}
     print("\n[모델 사용 현황]")
-    print("  Grok (1차 예측·논의):")
-    print(f"    요청 모델: {args.grok_model}")
-    print(f"    실제 사용: {grok_model or 'N/A'}")
-    print("  Gemini (2차 예측·검토 논의):")
-    print(f"    요청 모델: {args.gemini_model}")
-    print(f"    실제 사용: {gemini_model or 'N/A'}")
-    print("  OpenAI (최종 결정):")
-    print(f"    요청 모델: {args.openai_model}")
-    print(f"    실제 사용: {openai_model_final or 'N/A'}")
+    for step, res in labeled:
+        print(f"  {step['report_label']}:")
+        print(f"    요청 모델: {requested[step['provider']]}")
+        print(f"    실제 사용: {_model(res, step) or 'N/A'}")
     
-    print(f"\n[SUCCESS] 3-AI 성장률 합의 보고서 생성 완료: {report_filename}")
+    print(f"\n[SUCCESS] 3-AI 성장률 합의 보고서 생성 완료 ({pipeline['name']}): {report_filename}")
     print(f"   파일 위치: {report_path}")
     print(f"   Base CAGR(Grok): {alpha_cagr or 'N/A'}% | Base CAGR(Gemini): {beta_cagr or 'N/A'}%")
     print(f"   최종 보고서 크기: {len(final_report)} 문자")
-    print(f"   검토 논의 크기: {len(audit_comments)} 문자")
     compute_and_print_cost(usd_krw_rate, openai_key=openai_key)
     return 0
 
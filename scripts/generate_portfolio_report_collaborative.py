@@ -5,6 +5,9 @@
 1. Gemini가 프롬프트 기반으로 초안 작성
 2. Grok이 초안을 리뷰하고 코멘트 제공
 3. Gemini가 코멘트를 반영/반박하며 최종 보고서 완성
+
+단계·유저 템플릿(draft/review/revision_user_template.md)은 prompts/pipelines.json의 collaborative 파이프라인,
+실행은 pipeline_engine.py
 """
 
 import os
@@ -12,7 +15,10 @@ import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 import json
-import requests
+
+sys.path.insert(0, str(Path(__file__).parent))
+import ai_providers
+import pipeline_engine
 
 # Windows 콘솔 인코딩 설정
 if sys.platform == 'win32':
@@ -90,227 +96,30 @@ def generate_report_filename():
     date_str = today.strftime("%Y%m%d")
     return f"portfolio_report_{date_str}_collaborative.md"
 
-def create_initial_prompt(portfolio_prompt_content):
-    """Gemini에게 보낼 초기 프롬프트를 생성합니다."""
-    today = datetime.now()
-    date_str = today.strftime("%Y년 %m월 %d일")
-    yesterday_str = (today - timedelta(days=1)).strftime("%Y년 %m월 %d일")
-    
-    prompt = f"""너는 '위웨이크 주식회사'의 포트폴리오 매니저야.
-
-작성일: {date_str} (어제 종가 기준: {yesterday_str})
-
-{portfolio_prompt_content}
-
-위 지침에 따라 포트폴리오 보고서 초안을 작성해주세요. 보고서는 마크다운 형식으로 작성하고, 모든 섹션을 빠짐없이 포함해야 합니다.
-
-보고서 구조:
-1. 포트폴리오 운영 목표
-2. 어제 기준 마켓 현황 (실시간 환율, 주요 종목 등락, 리스크 요인)
-3. 어제 기준 자산 현황표 (모든 종목 포함)
-4. 목표 달성 로드맵 점검
-5. 정리 코멘트
+# 초안·최종본은 Gemini pro 계열로 작성 (3ai 기본 폴백과 달리 pro 모델 우선)
+GEMINI_MODELS = ['gemini-3-pro-preview', 'gemini-2.5-pro', 'gemini-2.5-flash', 'gemini-pro']
 
-중요: 환율과 주가는 웹 검색을 통해 최신 정보를 사용하되, 정확하지 않은 경우 이전 보고서의 패턴을 참고하여 작성하세요.
-"""
-    return prompt
-
-def call_gemini_api(api_key, prompt, model_name='gemini-3-pro-preview'):
-    """Gemini API를 호출합니다."""
-    import time
-    
-    # 여러 모델을 순서대로 시도
-    models_to_try = [
-        'gemini-3-pro-preview',
-        'gemini-2.5-pro',
-        'gemini-2.5-flash',
-        'gemini-pro',
-    ]
-    
+def call_gemini_api(api_key, prompt, model_name='gemini-3-pro-preview', system_content=None):
+    """Gemini API를 호출합니다. (ai_providers 공통 클라이언트, 검색 도구 없음). 반환: (text, model)"""
+    models_to_try = list(GEMINI_MODELS)
     # 지정된 모델이 있으면 우선 시도
     if model_name in models_to_try:
         models_to_try.remove(model_name)
-        models_to_try.insert(0, model_name)
-    
-    headers = {"Content-Type": "application/json"}
-    data = {
-        "contents": [{"parts": [{"text": prompt}]}],
-        "generationConfig": {
-            "temperature": 0.7,
-            "topP": 0.95,
-            "topK": 40,
-            "maxOutputTokens": 16384,
-        }
-    }
-    
-    for model in models_to_try:
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
-        
-        # 최대 3번 재시도
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(url, headers=headers, json=data, timeout=120)
-                if response.status_code == 200:
-                    result = response.json()
-                    if 'candidates' in result and len(result['candidates']) > 0:
-                        if model != models_to_try[0]:
-                            print(f"   Fallback 모델 사용: {model}")
-                        return result['candidates'][0]['content']['parts'][0]['text']
-                elif response.status_code == 503:
-                    # 서버 오류 - 재시도
-                    if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 2  # 2초, 4초, 6초 대기
-                        print(f"   서버 오류 (503) - {wait_time}초 후 재시도... (시도 {attempt + 1}/{max_retries})")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        # 마지막 시도도 실패하면 다음 모델로
-                        print(f"   모델 {model} 재시도 실패 - 다음 모델 시도")
-                        break
-                elif response.status_code == 429:
-                    # 할당량 초과 - 다음 모델로
-                    print(f"   모델 {model} 할당량 초과 - 다음 모델 시도")
-                    break
-                else:
-                    response.raise_for_status()
-            except requests.exceptions.RequestException as e:
-                if attempt < max_retries - 1:
-                    wait_time = (attempt + 1) * 2
-                    print(f"   네트워크 오류 - {wait_time}초 후 재시도... (시도 {attempt + 1}/{max_retries})")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    print(f"   모델 {model} 호출 실패: {str(e)}")
-                    break
-    
-    print(f"[ERROR] 모든 Gemini 모델 시도 실패")
-    return None
-
-def call_grok_api(api_key, prompt):
-    """Grok API를 호출합니다."""
-    # 여러 가능한 모델명 시도
-    possible_models = [
-        "grok-beta",
-        "grok-2",
-        "grok-2-latest",
-        "grok-2-1212",
-        "grok",
-        "grok-1",
-    ]
-    
-    # Grok API 엔드포인트 (xAI API 사용)
-    base_url = "https://api.x.ai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    for model_name in possible_models:
-        data = {
-            "model": model_name,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "당신은 전문적인 포트폴리오 보고서 리뷰어입니다. 보고서의 정확성, 완성도, 논리성을 검토하고 구체적인 개선 사항을 제안합니다."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "temperature": 0.7,
-            "max_tokens": 8000
-        }
-        
-        try:
-            response = requests.post(base_url, headers=headers, json=data, timeout=120)
-            if response.status_code == 200:
-                result = response.json()
-                if 'choices' in result and len(result['choices']) > 0:
-                    print(f"   Grok 모델 사용: {model_name}")
-                    return result['choices'][0]['message']['content']
-            elif response.status_code == 404:
-                # 모델을 찾을 수 없음 - 다음 모델 시도
-                continue
-            elif response.status_code == 403:
-                # 권한 오류 - 에러 메시지 출력 후 종료
-                error_detail = response.text
-                print(f"[ERROR] Grok API 권한 오류 (403)")
-                print(f"   시도한 모델: {model_name}")
-                print(f"   응답: {error_detail[:200]}")
-                if model_name == possible_models[-1]:
-                    # 마지막 모델도 실패하면 종료
-                    print(f"   모든 모델 시도 실패. xAI 공식 문서에서 최신 모델명을 확인하세요.")
-                    return None
-                continue
-            else:
-                response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            if model_name == possible_models[-1]:
-                # 마지막 모델도 실패하면 에러 출력
-                print(f"[ERROR] Grok API 호출 실패: {str(e)}")
-                print(f"   참고: Grok API 엔드포인트나 모델명이 변경되었을 수 있습니다.")
-                print(f"   xAI 공식 문서 확인: https://docs.x.ai/")
-            continue
-    
-    return None
-
-def create_review_prompt(draft_report, portfolio_prompt_content):
-    """Grok에게 보낼 리뷰 프롬프트를 생성합니다."""
-    prompt = f"""다음은 포트폴리오 보고서 초안입니다. 이 보고서를 검토하고 다음 관점에서 코멘트를 제공해주세요:
-
-1. **정확성**: 데이터와 계산이 정확한가?
-2. **완성도**: 필수 섹션이 모두 포함되었는가?
-3. **논리성**: 분석과 결론이 논리적으로 연결되어 있는가?
-4. **개선점**: 더 명확하거나 구체적으로 개선할 수 있는 부분은?
-
-아래 형식으로 코멘트를 제공해주세요:
-
-## 리뷰 코멘트
-
-### 강점
-- (보고서의 잘된 부분)
-
-### 개선 필요 사항
-- (구체적인 개선 제안)
-
-### 추가 제안
-- (보고서에 추가하면 좋을 내용)
-
----
-
-**포트폴리오 프롬프트 (참고용)**:
-{portfolio_prompt_content[:500]}...
-
----
-
-**보고서 초안**:
-{draft_report}
-"""
-    return prompt
-
-def create_revision_prompt(original_draft, review_comments, portfolio_prompt_content):
-    """Gemini에게 보낼 수정 프롬프트를 생성합니다."""
-    prompt = f"""다음은 당신이 작성한 포트폴리오 보고서 초안과 리뷰 코멘트입니다.
-
-**원본 보고서**:
-{original_draft}
-
-**리뷰 코멘트**:
-{review_comments}
-
-리뷰 코멘트를 검토하고:
-1. 타당한 지적은 반영하여 보고서를 개선하세요
-2. 부적절하거나 불필요한 제안은 반박하며 원래 내용을 유지하세요
-3. 추가 제안이 유용하면 반영하세요
-
-최종 보고서를 작성해주세요. 모든 섹션을 빠짐없이 포함하고, 개선된 내용을 반영하세요.
-
-**포트폴리오 프롬프트 (참고용)**:
-{portfolio_prompt_content}
-"""
-    return prompt
+    models_to_try.insert(0, model_name)
+    return ai_providers.call_gemini(
+        api_key, prompt, system_content=system_content, temperature=0.7, max_output_tokens=16384, use_search=False,
+        generation_config={"topP": 0.95, "topK": 40}, models_to_try=models_to_try,
+    )
+
+def call_grok_api(api_key, prompt, system_content=None):
+    """Grok API를 호출합니다. (ai_providers 공통 클라이언트, Chat Completions 모델 폴백). 반환: (text, model)"""
+    text, model = ai_providers.call_grok(
+        api_key, prompt, use_web_search=False, system_content=system_content or ai_providers.DEFAULT_SYSTEM["grok"],
+        temperature=0.7, max_output_tokens=8000,
+    )
+    if text is None:
+        print(f"   xAI 공식 문서 확인: https://docs.x.ai/")
+    return text, model
 
 def main():
     """메인 함수"""
@@ -336,37 +145,34 @@ def main():
         print(f"\n[WARNING] {report_filename} 파일이 이미 존재합니다.")
         print("   자동 모드: 기존 파일을 덮어씁니다.")
     
-    # Step 1: Gemini가 초안 작성
-    print("\n[3/5] Gemini가 보고서 초안 작성 중...")
-    initial_prompt = create_initial_prompt(portfolio_prompt)
-    draft_report = call_gemini_api(gemini_key, initial_prompt)
-    
-    if not draft_report:
+    # Step 1~3: Gemini 초안 → Grok 리뷰 → Gemini 수정 (prompts/pipelines.json: collaborative)
+    try:
+        pipeline = pipeline_engine.load_pipeline("collaborative")
+    except pipeline_engine.PipelineError as e:
+        print(f"[ERROR] {e}")
+        return 1
+    print("\n[3/5] 파이프라인 실행: Gemini 초안 → Grok 리뷰 → Gemini 수정")
+    today = datetime.now()
+    context = {
+        "portfolio": portfolio_prompt,
+        "date_str": today.strftime("%Y년 %m월 %d일"),
+        "yesterday_str": (today - timedelta(days=1)).strftime("%Y년 %m월 %d일"),
+    }
+    run = pipeline_engine.run_pipeline(
+        pipeline, context, {"gemini": call_gemini_api, "grok": call_grok_api}, keys={"gemini": gemini_key, "grok": grok_key},
+        hooks={"on_step_end": lambda step, res: print(
+            f"[OK] {step['label']} 완료 ({len(res['text'])} 문자)" if res["status"] == "ok" else f"[WARNING] {step['label']} 실패"
+        )},
+    )
+    results = run["results"]
+    if run["aborted"]:
         print("[ERROR] 초안 작성 실패")
         return 1
-    
-    print(f"[OK] 초안 작성 완료 ({len(draft_report)} 문자)")
-    
-    # Step 2: Grok이 리뷰
-    print("\n[4/5] Grok이 초안 리뷰 중...")
-    review_prompt = create_review_prompt(draft_report, portfolio_prompt)
-    review_comments = call_grok_api(grok_key, review_prompt)
-    
-    if not review_comments:
-        print("[WARNING] Grok 리뷰 실패 - 초안을 그대로 사용합니다.")
-        review_comments = "리뷰를 받지 못했습니다."
-        final_report = draft_report
-    else:
-        print(f"[OK] 리뷰 완료 ({len(review_comments)} 문자)")
-        
-        # Step 3: Gemini가 리뷰 반영하여 최종 보고서 작성
-        print("\n[5/5] Gemini가 리뷰 반영하여 최종 보고서 작성 중...")
-        revision_prompt = create_revision_prompt(draft_report, review_comments, portfolio_prompt)
-        final_report = call_gemini_api(gemini_key, revision_prompt)
-        
-        if not final_report:
-            print("[WARNING] 최종 보고서 작성 실패 - 초안을 사용합니다.")
-            final_report = draft_report
+    draft_report = results["draft"]["text"]
+    review_comments = results["review"]["text"]
+    final_report = run["final_text"]
+    if run["final_step"] != "final":
+        print("[WARNING] 최종 보고서 없음 - 초안을 그대로 사용합니다.")
     
     # 보고서 저장
     with open(report_path, 'w', encoding='utf-8') as f:
@@ -17,17 +17,8 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
-# Google Gemini API 사용
-try:
-    import google.genai as genai
-except ImportError:
-    try:
-        import google.generativeai as genai
-        print("[WARNING] google.generativeai는 deprecated되었습니다. google-genai로 업그레이드하세요.")
-    except ImportError:
-        print("[ERROR] google-genai 또는 google-generativeai 라이브러리가 설치되지 않았습니다.")
-        print("다음 명령으로 설치하세요: pip install google-genai")
-        sys.exit(1)
+sys.path.insert(0, str(Path(__file__).parent))
+import ai_providers
 
 # 프로젝트 루트 디렉토리
 PROJECT_ROOT = Path(__file__).parent.parent
@@ -118,102 +109,35 @@ def create_report_prompt(portfolio_prompt_content):
 """
     return prompt
 
+# Gemini 3 Pro 우선. 목록 조회에 없는 모델은 건너뛴다
+PREFERRED_MODELS = ['gemini-3-pro-preview', 'gemini-3-pro']
+FALLBACK_MODELS = ['gemini-3-pro-preview', 'gemini-2.5-pro', 'gemini-2.5-flash', 'gemini-2.0-flash', 'gemini-pro']
+
 def generate_report_with_gemini(api_key, prompt):
-    """Google Gemini API를 사용하여 보고서를 생성합니다."""
+    """Google Gemini API를 사용하여 보고서를 생성합니다. (ai_providers 공통 클라이언트, REST 호출)"""
     print("Google Gemini API 호출 중...")
-    
-    try:
-        # REST API 직접 호출 (가장 안정적)
-        import requests
-        
-        # 먼저 사용 가능한 모델 확인
-        try:
-            models_url = f"https://generativelanguage.googleapis.com/v1beta/models?key={api_key}"
-            models_response = requests.get(models_url, timeout=30)
-            if models_response.status_code == 200:
-                models_data = models_response.json()
-                available_models = [m['name'].split('/')[-1] for m in models_data.get('models', []) if 'generateContent' in m.get('supportedGenerationMethods', [])]
-                print(f"   사용 가능한 모델: {', '.join(available_models[:5])}")
-                
-                # Gemini 3 Pro를 우선적으로 찾기
-                preferred_models = ['gemini-3-pro-preview', 'gemini-3-pro']
-                model_names = []
-                
-                # 우선 모델이 있으면 먼저 추가
-                for preferred in preferred_models:
-                    if preferred in available_models:
-                        model_names.append(preferred)
-                        print(f"   Gemini 3 Pro 발견: {preferred}")
-                
-                # 나머지 모델 추가
-                for model in available_models[:5]:
-                    if model not in model_names:
-                        model_names.append(model)
-                
-                if not model_names:
-                    model_names = available_models[:3] if available_models else []
-            else:
-                model_names = []
-        except:
-            model_names = []
-        
-        # 기본 모델 목록 (fallback) - Gemini 3 Pro 우선
-        if not model_names:
-            model_names = [
-                'gemini-3-pro-preview',  # Gemini 3 Pro 우선 사용
-                'gemini-2.5-pro',
-                'gemini-2.5-flash',
-                'gemini-2.0-flash',
-                'gemini-pro'
-            ]
-        
-        for model_name in model_names:
-            try:
-                url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={api_key}"
-                headers = {"Content-Type": "application/json"}
-                data = {
-                    "contents": [{"parts": [{"text": prompt}]}],
-                    "generationConfig": {
-                        "temperature": 0.7,
-                        "topP": 0.95,
-                        "topK": 40,
-                        "maxOutputTokens": 16384,  # 더 긴 보고서를 위해 증가
-                    }
-                }
-                
-                print(f"   모델 시도: {model_name}")
-                response = requests.post(url, headers=headers, json=data, timeout=120)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if 'candidates' in result and len(result['candidates']) > 0:
-                        report_content = result['candidates'][0]['content']['parts'][0]['text']
-                        print(f"   성공: {model_name}")
-                        return report_content
-                    else:
-                        print(f"   응답 형식 오류: {response.text[:200]}")
-                elif response.status_code == 404:
-                    # 모델을 찾을 수 없음, 다음 모델 시도
-                    print(f"   404 오류: {model_name}")
-                    continue
-                else:
-                    # 다른 오류
-                    print(f"   오류 ({response.status_code}): {response.text[:200]}")
-                    if response.status_code != 404:
-                        response.raise_for_status()
-                    
-            except requests.exceptions.RequestException as e:
-                print(f"   요청 오류: {str(e)[:100]}")
-                if '404' not in str(e):
-                    continue  # 다음 모델 시도
-        
-        # 모든 모델 실패
-        raise Exception("사용 가능한 Gemini 모델을 찾을 수 없습니다. API 키를 확인해주세요.")
-        
-    except Exception as e:
+    # 먼저 사용 가능한 모델 확인
+    available_models, err = ai_providers.list_models("gemini", api_key)
+    model_names = []
+    if available_models:
+        print(f"   사용 가능한 모델: {', '.join(available_models[:5])}")
+        for preferred in PREFERRED_MODELS:
+            if preferred in available_models:
+                model_names.append(preferred)
+                print(f"   Gemini 3 Pro 발견: {preferred}")
+        model_names += [m for m in available_models[:5] if m not in model_names]
+    elif err:
+        print(f"   모델 목록 조회 실패 ({err}) - 기본 목록 사용")
+    text, model_name = ai_providers.call_gemini(
+        api_key, prompt, temperature=0.7, max_output_tokens=16384, use_search=False,
+        generation_config={"topP": 0.95, "topK": 40}, models_to_try=model_names or FALLBACK_MODELS,
+    )
+    if text is None:
         print(f"[ERROR] Google Gemini API 호출 실패")
-        print(f"   {str(e)}")
+        print(f"   사용 가능한 Gemini 모델을 찾을 수 없습니다. API 키를 확인해주세요.")
         return None
+    print(f"   성공: {model_name}")
+    return text
 
 def main():
     """메인 함수"""
@@ -17,13 +17,8 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
-# OpenAI API 사용
-try:
-    from openai import OpenAI
-except ImportError:
-    print("[ERROR] openai 라이브러리가 설치되지 않았습니다.")
-    print("다음 명령으로 설치하세요: pip install openai")
-    sys.exit(1)
+sys.path.insert(0, str(Path(__file__).parent))
+import ai_providers
 
 # 프로젝트 루트 디렉토리
 PROJECT_ROOT = Path(__file__).parent.parent
@@ -113,34 +108,18 @@ def create_report_prompt(portfolio_prompt_content):
 """
     return prompt
 
-def generate_report_with_openai(client, prompt):
-    """OpenAI API를 사용하여 보고서를 생성합니다."""
+def generate_report_with_openai(api_key, prompt):
+    """OpenAI API를 사용하여 보고서를 생성합니다. (ai_providers 공통 클라이언트, Chat Completions)"""
     print("OpenAI API 호출 중...")
-    
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # 비용 효율적인 모델 사용
-            messages=[
-                {
-                    "role": "system",
-                    "content": "당신은 전문적인 포트폴리오 매니저입니다. 정확하고 상세한 포트폴리오 보고서를 작성합니다."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=8000  # 긴 보고서를 위해 충분한 토큰 할당
-        )
-        
-        report_content = response.choices[0].message.content
-        return report_content
-        
-    except Exception as e:
+    # 비용 효율적인 모델 사용, 긴 보고서를 위해 충분한 토큰 할당
+    report_content, _ = ai_providers.call_openai(
+        api_key, prompt, system_content=ai_providers.DEFAULT_SYSTEM["openai"],
+        temperature=0.7, max_output_tokens=8000, models_to_try=["gpt-4o-mini"],
+    )
+    if report_content is None:
         print(f"[ERROR] OpenAI API 호출 실패")
-        print(f"   {str(e)}")
         return None
+    return report_content
 
 def main():
     """메인 함수"""
@@ -154,9 +133,6 @@ def main():
     api_key = load_env()
     print("[OK] API 키 로드 완료")
     
-    # OpenAI 클라이언트 초기화
-    client = OpenAI(api_key=api_key)
-    
     print("\n[2/4] 포트폴리오 프롬프트 파일 읽는 중...")
     portfolio_prompt = read_portfolio_prompt()
     print("[OK] 파일 읽기 완료")
@@ -177,7 +153,7 @@ def main():
     
     # OpenAI API로 보고서 생성
     print("\n[4/4] OpenAI API로 보고서 생성 중...")
-    report_content = generate_report_with_openai(client, report_prompt)
+    report_content = generate_report_with_openai(api_key, report_prompt)
     
     if report_content:
         # 보고서 저장
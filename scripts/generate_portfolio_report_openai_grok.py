@@ -14,6 +14,9 @@
     --grok-model MODEL       Grok 모델 지정 (기본값: grok-4)
     --prompt-file FILE        프롬프트 파일 경로 (기본값: prompts/config.json의 portfolio_prompt_file)
     --output-file FILE        결과 파일 경로 (기본값: 자동 생성)
+
+단계·유저 템플릿(draft/review/revision_user_template.md)은 prompts/pipelines.json의 openai_grok 파이프라인,
+실행은 pipeline_engine.py
 """
 
 import os
@@ -22,7 +25,10 @@ import argparse
 from datetime import datetime, timedelta
 from pathlib import Path
 import json
-import requests
+
+sys.path.insert(0, str(Path(__file__).parent))
+import ai_providers
+import pipeline_engine
 
 # Windows 콘솔 인코딩 설정
 if sys.platform == 'win32':
@@ -132,293 +138,19 @@ def generate_report_filename(openai_model=None, grok_model=None, output_file=Non
     filepath = REPORTS_DIR / filename
     return filename, filepath
 
-def create_initial_prompt(portfolio_prompt_content):
-    """OpenAI에게 보낼 초기 프롬프트를 생성합니다."""
-    today = datetime.now()
-    date_str = today.strftime("%Y년 %m월 %d일")
-    yesterday_str = (today - timedelta(days=1)).strftime("%Y년 %m월 %d일")
-    
-    prompt = f"""너는 '위웨이크 주식회사'의 포트폴리오 매니저야.
-
-작성일: {date_str} (어제 종가 기준: {yesterday_str})
-
-{portfolio_prompt_content}
-
-위 지침에 따라 포트폴리오 보고서 초안을 작성해주세요. 보고서는 마크다운 형식으로 작성하고, 모든 섹션을 빠짐없이 포함해야 합니다.
-
-보고서 구조:
-1. 포트폴리오 운영 목표
-2. 어제 기준 마켓 현황 (실시간 환율, 주요 종목 등락, 리스크 요인)
-3. 어제 기준 자산 현황표 (모든 종목 포함)
-4. 목표 달성 로드맵 점검
-5. 정리 코멘트
-
-중요: 환율과 주가는 웹 검색을 통해 최신 정보를 사용하되, 정확하지 않은 경우 이전 보고서의 패턴을 참고하여 작성하세요.
-"""
-    return prompt
-
-def call_openai_api(api_key, prompt, model='gpt-5.2', preferred_model=None):
-    """OpenAI API를 호출합니다. 사용된 모델명을 반환합니다."""
-    import time
-    
-    url = "https://api.openai.com/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    # 여러 모델을 순서대로 시도
-    models_to_try = [
-        'gpt-5.2',  # 최신 모델 (최우선)
-        'gpt-4o',
-        'gpt-4-turbo',
-        'gpt-4',
-        'gpt-3.5-turbo',
-    ]
-    
-    # 사용자가 지정한 모델이 있으면 최우선
-    if preferred_model:
-        if preferred_model in models_to_try:
-            models_to_try.remove(preferred_model)
-        models_to_try.insert(0, preferred_model)
-    elif model in models_to_try:
-        models_to_try.remove(model)
-        models_to_try.insert(0, model)
-    
-    data_template = {
-        "messages": [
-            {
-                "role": "system",
-                "content": "당신은 전문적인 포트폴리오 매니저입니다. 정확하고 상세한 포트폴리오 보고서를 작성합니다."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "temperature": 0.7,
-        "max_tokens": 16000
-    }
-    
-    for model_name in models_to_try:
-        data = data_template.copy()
-        data["model"] = model_name
-        
-        # 최대 3번 재시도
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(url, headers=headers, json=data, timeout=180)
-                if response.status_code == 200:
-                    result = response.json()
-                    if 'choices' in result and len(result['choices']) > 0:
-                        if model_name != models_to_try[0]:
-                            print(f"   Fallback 모델 사용: {model_name}")
-                        return result['choices'][0]['message']['content'], model_name
-                elif response.status_code == 503 or response.status_code == 429:
-                    # 서버 오류 또는 할당량 초과 - 재시도
-                    if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 2
-                        print(f"   서버 오류 ({response.status_code}) - {wait_time}초 후 재시도... (시도 {attempt + 1}/{max_retries})")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        print(f"   모델 {model_name} 재시도 실패 - 다음 모델 시도")
-                        break
-                else:
-                    response.raise_for_status()
-            except requests.exceptions.RequestException as e:
-                if attempt < max_retries - 1:
-                    wait_time = (attempt + 1) * 2
-                    print(f"   네트워크 오류 - {wait_time}초 후 재시도... (시도 {attempt + 1}/{max_retries})")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    print(f"   모델 {model_name} 호출 실패: {str(e)}")
-                    break
-    
-    print(f"[ERROR] 모든 OpenAI 모델 시도 실패")
-    return None, None
-
-def call_grok_api(api_key, prompt, preferred_model=None):
-    """Grok API를 호출합니다. 사용된 모델명을 반환합니다."""
-    import time
-    
-    # grok-4 모델 우선 사용
-    possible_models = [
-        "grok-4",  # grok-4 기본 모델 (최우선)
-        "grok-4-1-fast-reasoning",  # grok-4 최신 버전 (2025년 11월)
-        "grok-4-1-fast-non-reasoning",  # grok-4 최신 버전 (2025년 11월)
-        "grok-4-fast-reasoning",  # grok-4 (2025년 9월)
-        "grok-4-fast-non-reasoning",  # grok-4 (2025년 9월)
-        "grok-4-0709",  # grok-4 (2025년 7월)
-        "grok-3",  # 폴백
-        "grok-3-mini",  # 폴백
-        "grok-3-beta",  # 폴백
-        "grok-code-fast-1",  # 코드 전용
-        "grok-2-image-1212",  # 폴백
-        "grok-2-vision-1212",  # 폴백
-    ]
-    
-    # 사용자가 지정한 모델이 있으면 최우선
-    if preferred_model:
-        if preferred_model in possible_models:
-            possible_models.remove(preferred_model)
-        possible_models.insert(0, preferred_model)
-    
-    # Grok API 엔드포인트 (xAI API 사용)
-    base_url = "https://api.x.ai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    last_error = None
-    for model_name in possible_models:
-        data = {
-            "model": model_name,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "당신은 전문적인 포트폴리오 보고서 리뷰어입니다. 보고서의 정확성, 완성도, 논리성을 검토하고 구체적인 개선 사항을 제안합니다."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "temperature": 0.7,
-            "max_tokens": 8000
-        }
-        
-        # 최대 3번 재시도
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(base_url, headers=headers, json=data, timeout=180)
-                if response.status_code == 200:
-                    result = response.json()
-                    if 'choices' in result and len(result['choices']) > 0:
-                        print(f"   Grok 모델 사용: {model_name}")
-                        return result['choices'][0]['message']['content'], model_name
-                elif response.status_code == 404:
-                    # 모델을 찾을 수 없음 - 다음 모델 시도
-                    last_error = f"모델 {model_name}을 찾을 수 없음 (404)"
-                    break
-                elif response.status_code == 403:
-                    # 권한 오류 - 에러 메시지 출력 후 종료
-                    error_detail = response.text
-                    try:
-                        error_json = response.json()
-                        if 'error' in error_json:
-                            last_error = f"권한 오류 (403): {error_json['error']}"
-                        else:
-                            last_error = f"권한 오류 (403): {error_detail[:200]}"
-                    except:
-                        last_error = f"권한 오류 (403): {error_detail[:200]}"
-                    
-                    if model_name == possible_models[-1]:
-                        print(f"[ERROR] Grok API 권한 오류 (403)")
-                        print(f"   시도한 모델: {model_name}")
-                        print(f"   에러: {last_error}")
-                        print(f"   모든 모델 시도 실패. xAI 공식 문서에서 최신 모델명을 확인하세요.")
-                        print(f"   또는 크레딧이 충분한지 확인하세요: https://console.x.ai/")
-                        return None, None
-                    break
-                elif response.status_code == 503 or response.status_code == 429:
-                    # 서버 오류 또는 할당량 초과 - 재시도
-                    if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 2
-                        print(f"   서버 오류 ({response.status_code}) - {wait_time}초 후 재시도... (시도 {attempt + 1}/{max_retries})")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        last_error = f"서버 오류 ({response.status_code}) - 재시도 실패"
-                        print(f"   모델 {model_name} 재시도 실패 - 다음 모델 시도")
-                        break
-                else:
-                    last_error = f"HTTP {response.status_code}: {response.text[:200]}"
-                    response.raise_for_status()
-            except requests.exceptions.RequestException as e:
-                if attempt < max_retries - 1:
-                    wait_time = (attempt + 1) * 2
-                    print(f"   네트워크 오류 - {wait_time}초 후 재시도... (시도 {attempt + 1}/{max_retries})")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    last_error = f"네트워크 오류: {str(e)}"
-                    if model_name == possible_models[-1]:
-                        print(f"[ERROR] Grok API 호출 실패: {str(e)}")
-                        print(f"   참고: Grok API 엔드포인트나 모델명이 변경되었을 수 있습니다.")
-                        print(f"   xAI 공식 문서 확인: https://docs.x.ai/")
-                    break
-            except Exception as e:
-                last_error = f"예외 발생: {str(e)}"
-                if model_name == possible_models[-1]:
-                    print(f"[ERROR] Grok API 예외 발생: {str(e)}")
-                    import traceback
-                    print(f"   상세: {traceback.format_exc()[:500]}")
-                break
-    
-    if last_error:
-        print(f"[WARNING] Grok API 호출 실패: {last_error}")
-    return None, None
-
-def create_review_prompt(draft_report, portfolio_prompt_content):
-    """Grok에게 보낼 리뷰 프롬프트를 생성합니다."""
-    prompt = f"""다음은 포트폴리오 보고서 초안입니다. 이 보고서를 검토하고 다음 관점에서 코멘트를 제공해주세요:
-
-1. **정확성**: 데이터와 계산이 정확한가?
-2. **완성도**: 필수 섹션이 모두 포함되었는가?
-3. **논리성**: 분석과 결론이 논리적으로 연결되어 있는가?
-4. **개선점**: 더 명확하거나 구체적으로 개선할 수 있는 부분은?
-
-아래 형식으로 코멘트를 제공해주세요:
-
-## 리뷰 코멘트
-
-### 강점
-- (보고서의 잘된 부분)
-
-### 개선 필요 사항
-- (구체적인 개선 제안)
-
-### 추가 제안
-- (보고서에 추가하면 좋을 내용)
-
----
-
-**포트폴리오 프롬프트 (참고용)**:
-{portfolio_prompt_content[:500]}...
-
----
-
-**보고서 초안**:
-{draft_report}
-"""
-    return prompt
-
-def create_revision_prompt(original_draft, review_comments, portfolio_prompt_content):
-    """OpenAI에게 보낼 수정 프롬프트를 생성합니다."""
-    prompt = f"""다음은 당신이 작성한 포트폴리오 보고서 초안과 리뷰 코멘트입니다.
-
-**원본 보고서**:
-{original_draft}
-
-**리뷰 코멘트**:
-{review_comments}
-
-리뷰 코멘트를 검토하고:
-1. 타당한 지적은 반영하여 보고서를 개선하세요
-2. 부적절하거나 불필요한 제안은 반박하며 원래 내용을 유지하세요
-3. 추가 제안이 유용하면 반영하세요
-
-최종 보고서를 작성해주세요. 모든 섹션을 빠짐없이 포함하고, 개선된 내용을 반영하세요.
+def call_openai_api(api_key, prompt, model='gpt-5.2', preferred_model=None, system_content=None):
+    """OpenAI API를 호출합니다. 사용된 모델명을 반환합니다. (ai_providers 공통 클라이언트·모델 폴백)"""
+    return ai_providers.call_openai(
+        api_key, prompt, preferred_model=preferred_model or model,
+        system_content=system_content or ai_providers.DEFAULT_SYSTEM["openai"], temperature=0.7, max_output_tokens=16000,
+    )
 
-**포트폴리오 프롬프트 (참고용)**:
-{portfolio_prompt_content}
-"""
-    return prompt
+def call_grok_api(api_key, prompt, preferred_model=None, system_content=None):
+    """Grok API를 호출합니다. 사용된 모델명을 반환합니다. (ai_providers 공통 클라이언트, Chat Completions 모델 폴백)"""
+    return ai_providers.call_grok(
+        api_key, prompt, preferred_model=preferred_model, use_web_search=False,
+        system_content=system_content or ai_providers.DEFAULT_SYSTEM["grok"], temperature=0.7, max_output_tokens=8000,
+    )
 
 def parse_arguments():
     """명령줄 인자 파싱"""
@@ -496,47 +228,37 @@ def main():
     portfolio_prompt = read_portfolio_prompt(args.prompt_file)
     print("[OK] 파일 읽기 완료")
     
-    # Step 1: OpenAI가 초안 작성
-    print("\n[3/5] OpenAI가 보고서 초안 작성 중...")
-    initial_prompt = create_initial_prompt(portfolio_prompt)
-    draft_result = call_openai_api(openai_key, initial_prompt, preferred_model=args.openai_model)
-    
-    if draft_result[0] is None:
+    # Step 1~3: OpenAI 초안 → Grok 리뷰 → OpenAI 수정 (prompts/pipelines.json: openai_grok)
+    try:
+        pipeline = pipeline_engine.load_pipeline("openai_grok")
+    except pipeline_engine.PipelineError as e:
+        print(f"[ERROR] {e}")
+        return 1
+    print("\n[3/5] 파이프라인 실행: OpenAI 초안 → Grok 리뷰 → OpenAI 수정")
+    today = datetime.now()
+    context = {
+        "portfolio": portfolio_prompt,
+        "date_str": today.strftime("%Y년 %m월 %d일"),
+        "yesterday_str": (today - timedelta(days=1)).strftime("%Y년 %m월 %d일"),
+    }
+    run = pipeline_engine.run_pipeline(
+        pipeline, context, {"openai": call_openai_api, "grok": call_grok_api},
+        keys={"openai": openai_key, "grok": grok_key},
+        # Grok 모델 지정 (기본값: grok-4)
+        models={"openai": args.openai_model, "grok": args.grok_model or 'grok-4'},
+        hooks={"on_step_end": lambda step, res: print(
+            f"[OK] {step['label']} 완료 ({len(res['text'])} 문자)" if res["status"] == "ok" else f"[WARNING] {step['label']} 실패"
+        )},
+    )
+    results = run["results"]
+    if run["aborted"]:
         print("[ERROR] 초안 작성 실패")
         return 1
-    
-    draft_report, openai_model_draft = draft_result
-    print(f"[OK] 초안 작성 완료 ({len(draft_report)} 문자)")
-    
-    # Step 2: Grok이 리뷰
-    print("\n[4/5] Grok이 초안 리뷰 중...")
-    review_prompt = create_review_prompt(draft_report, portfolio_prompt)
-    # Grok 모델 지정 (기본값: grok-4)
-    grok_model_to_use = args.grok_model if args.grok_model else 'grok-4'
-    review_result = call_grok_api(grok_key, review_prompt, preferred_model=grok_model_to_use)
-    
-    review_comments = review_result[0]
-    grok_model = review_result[1]
-    
-    if not review_comments:
-        print("[WARNING] Grok 리뷰 실패 - 초안을 그대로 사용합니다.")
-        review_comments = "리뷰를 받지 못했습니다."
-        final_report = draft_report
-        openai_model_final = openai_model_draft
-    else:
-        print(f"[OK] 리뷰 완료 ({len(review_comments)} 문자)")
-        
-        # Step 3: OpenAI가 리뷰 반영하여 최종 보고서 작성
-        print("\n[5/5] OpenAI가 리뷰 반영하여 최종 보고서 작성 중...")
-        revision_prompt = create_revision_prompt(draft_report, review_comments, portfolio_prompt)
-        final_result = call_openai_api(openai_key, revision_prompt, preferred_model=args.openai_model)
-        
-        if final_result[0] is None:
-            print("[WARNING] 최종 보고서 작성 실패 - 초안을 사용합니다.")
-            final_report = draft_report
-            openai_model_final = openai_model_draft
-        else:
-            final_report, openai_model_final = final_result
+    draft_report = results["draft"]["text"]
+    review_comments, grok_model = results["review"]["text"], results["review"]["model"]
+    final_report, openai_model_final = run["final_text"], run["final_model"]
+    if run["final_step"] != "final":
+        print("[WARNING] 최종 보고서 없음 - 초안을 사용합니다.")
     
     # 보고서 파일명 생성 (모델 정보 포함)
     report_filename, report_path = generate_report_filename(
@@ -6,9 +6,11 @@
 
 import os
 import sys
-import requests
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+import ai_providers
+
 # 프로젝트 루트 디렉토리
 PROJECT_ROOT = Path(__file__).parent.parent
 ENV_FILE = PROJECT_ROOT / ".env"
@@ -45,10 +47,8 @@ def load_api_key():
 
 def list_models(api_key):
     """사용 가능한 모델 목록 조회"""
-    url = f"https://generativelanguage.googleapis.com/v1beta/models?key={api_key}"
-    
     try:
-        response = requests.get(url, timeout=30)
+        response = ai_providers.http_get("gemini", "/models", api_key=api_key, timeout=30)
         response.raise_for_status()
         
         data = response.json()
@@ -4,9 +4,11 @@
 
 import os
 import sys
-import requests
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+import ai_providers
+
 # Windows 콘솔 인코딩 설정
 if sys.platform == 'win32':
     import io
@@ -43,15 +45,9 @@ print("Grok API 사용 가능한 모델 목록 조회")
 print("=" * 60)
 
 # 방법 1: Models API 엔드포인트 사용
-models_url = "https://api.x.ai/v1/models"
-headers = {
-    "Authorization": f"Bearer {grok_key}",
-    "Content-Type": "application/json"
-}
-
 try:
     print("\n[방법 1] Models API 엔드포인트로 조회 중...")
-    response = requests.get(models_url, headers=headers, timeout=30)
+    response = ai_providers.http_get("grok", "/models", api_key=grok_key, timeout=30)
     
     if response.status_code == 200:
         models_data = response.json()
@@ -79,23 +75,9 @@ print("\n" + "=" * 60)
 print("[방법 2] 최신 모델명 직접 테스트")
 print("=" * 60)
 
-# 최신 모델명 후보들
-latest_models = [
-    "grok-2",
-    "grok-2-latest",
-    "grok-2-2025",
-    "grok-2-beta",
-    "grok-2.5",
-    "grok-2.5-beta",
-    "grok-2.5-latest",
-    "grok-3",
-    "grok-3-beta",
-    "grok-beta",
-    "grok-2-vision-1212",  # 현재 사용 중인 모델
-    "grok-2-1212",
-]
+# 보고서 스크립트가 폴백으로 쓰는 모델 전체 (ai_providers.MODEL_CHAINS)
+latest_models = ai_providers.models("grok", "web_search")
 
-base_url = "https://api.x.ai/v1/chat/completions"
 working_models = []
 
 for model_name in latest_models:
@@ -111,7 +93,7 @@ for model_name in latest_models:
     }
     
     try:
-        response = requests.post(base_url, headers=headers, json=data, timeout=10)
+        response = ai_providers.http_post("grok", "/chat/completions", data, api_key=grok_key, timeout=10)
         if response.status_code == 200:
             print(f"✅ {model_name}: 사용 가능")
             working_models.append(model_name)
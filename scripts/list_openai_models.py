@@ -4,9 +4,11 @@
 
 import os
 import sys
-import requests
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+import ai_providers
+
 # Windows 콘솔 인코딩 설정
 if sys.platform == 'win32':
     import io
@@ -45,16 +47,9 @@ print("=" * 60)
 print("OpenAI API 사용 가능한 모델 목록 조회")
 print("=" * 60)
 
-# OpenAI Models API 엔드포인트
-url = "https://api.openai.com/v1/models"
-headers = {
-    "Authorization": f"Bearer {api_key}",
-    "Content-Type": "application/json"
-}
-
 try:
     print("\n[1] Models API 엔드포인트로 조회 중...")
-    response = requests.get(url, headers=headers, timeout=30)
+    response = ai_providers.http_get("openai", "/models", api_key=api_key, timeout=30)
     
     if response.status_code == 200:
         models_data = response.json()
@@ -146,7 +141,7 @@ try:
         print(f"❌ HTTP {response.status_code}: {response.text[:200]}")
         response.raise_for_status()
         
-except requests.exceptions.RequestException as e:
+except ai_providers.RequestException as e:
     print(f"❌ 네트워크 오류: {str(e)}")
 except Exception as e:
     print(f"❌ 오류 발생: {str(e)}")
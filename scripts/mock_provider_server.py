@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+로컬 모의 AI API 서버 (OpenAI · xAI(Grok) · Gemini)
+
+실제 과금 없이 파이프라인 처리량·지연·장애(폴백) 동작을 시험하기 위한 로컬 HTTP 서버.
+스크립트가 쓰는 엔드포인트만 흉내 낸다.
+
+- OpenAI  : {base}/openai/v1/responses, /chat/completions, /models
+- xAI     : {base}/xai/v1/responses, /chat/completions, /models
+- Gemini  : {base}/gemini/v1beta/models/{model}:generateContent, /models
+- 관리    : GET /_mock/stats (요청 집계), POST /_mock/config (설정 일부 변경), POST /_mock/reset
+
+스크립트를 이 서버로 돌리려면 .env 또는 환경 변수에 (서버 시작 시 출력됨):
+    OPENAI_BASE_URL=http://127.0.0.1:8765/openai/v1
+    GROK_BASE_URL=http://127.0.0.1:8765/xai/v1
+    GEMINI_BASE_URL=http://127.0.0.1:8765/gemini/v1beta
+
+사용법:
+    python mock_provider_server.py [--port 8765] [--latency 0.5] [--jitter 0.2] [--tokens-per-s 200]
+        [--error-rate 0.1] [--error-codes 429,503] [--missing-models gpt-5.2,grok-3]
+        [--output-chars 4000] [--cagr-file cagr.json] [--config mock.json] [--seed 1] [--quiet]
+
+응답 본문:
+- 구조화 출력 요청(text.format / response_format / responseJsonSchema)이면 요청 스키마의 필드만 채운 JSON
+- 그 외에는 논의 자리표시 텍스트 + 하단 ```json (alpha/beta CAGR 등) + "Base: X%  Final: Y%" 한 줄
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# Windows 콘솔 인코딩 설정
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+DEFAULT_PORT = 8765
+
+# /models 응답에 노출할 모델 (missing_models에 있으면 제외 + 호출 시 404)
+MODELS = {
+    "openai": ["gpt-5.2", "gpt-5.2-2025-12-11", "gpt-5.2-pro", "gpt-4o", "gpt-4o-mini", "gpt-4-turbo", "gpt-4", "gpt-3.5-turbo"],
+    "grok": [
+        "grok-4-1-fast-reasoning", "grok-4-1-fast", "grok-4-1-fast-non-reasoning",
+        "grok-4-fast-reasoning", "grok-4-fast", "grok-4-fast-non-reasoning", "grok-3", "grok-3-mini",
+    ],
+    "gemini": ["gemini-3-flash-preview", "gemini-3-flash", "gemini-3-pro-preview", "gemini-2.5-flash", "gemini-2.5-pro", "gemini-pro"],
+}
+
+# 기본 CAGR 응답값 (--cagr-file로 덮어씀). prompts/cagr_schema.json 필드와 동일
+DEFAULT_CAGR = {
+    "alpha_cagr": 17.5,
+    "beta_cagr": 16.0,
+    "base_cagr": 16.5,
+    "final_cagr": 15.8,
+    "current_total_krw": 1_500_000_000,
+    "risk_level": "mid",
+    "audit_notes": "모의 서버 응답 (실제 감사 아님)",
+    "decay_rates": {"y2034": 90.0, "y2035_2039": 75.0, "y2040_plus": 60.0},
+    "swing_triggers": [
+        {"symbol": "TSLA", "action": "buy", "price_usd": 380.0, "condition": "3개월 고점 대비 -15%"},
+        {"symbol": "TSLA", "action": "sell", "price_usd": 470.0, "condition": "고점 -2% 이내"},
+    ],
+}
+
+DEFAULT_CONFIG = {
+    "latency": 0.0,          # 응답당 고정 지연(초)
+    "jitter": 0.0,           # 0~jitter 균등 추가 지연(초)
+    "tokens_per_s": 0.0,     # >0이면 출력 토큰 / tokens_per_s 만큼 추가 지연
+    "error_rate": 0.0,       # 0~1, 생성 요청 중 무작위 오류 비율
+    "error_codes": [429, 503],
+    "missing_models": [],    # 404로 응답할 모델 (폴백 경로 시험)
+    "output_chars": 4000,    # 논의 본문 길이(문자). max_output_tokens×4로 상한
+    "cagr": DEFAULT_CAGR,
+}
+
+FILLER = "모의 응답 본문입니다. 시장 해석·리스크·CAGR 근거 논의 자리표시. "
+
+
+class MockState:
+    """서버 설정 + 요청 집계 (핸들러 스레드 간 공유)."""
+
+    def __init__(self, config, seed=None):
+        self.config = dict(DEFAULT_CONFIG)
+        self.config.update(config or {})
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def count(self, provider, endpoint, status):
+        key = f"{provider} {endpoint} {status}"
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def random(self):
+        with self.lock:
+            return self.rng.random()
+
+    def choice(self, seq):
+        with self.lock:
+            return self.rng.choice(seq)
+
+
+def _route(path):
+    """경로 → (provider, rest). /openai/v1/x, /xai/v1/x, /gemini/v1beta/x. 접두사 없이 /v1·/v1beta도 허용."""
+    parts = path.strip("/").split("/")
+    prefixes = {"openai": "openai", "xai": "grok", "grok": "grok", "gemini": "gemini"}
+    if parts and parts[0] in prefixes:
+        provider = prefixes[parts[0]]
+        parts = parts[1:]
+    elif parts and parts[0] == "v1beta":
+        provider = "gemini"
+    else:
+        provider = "openai"
+    if parts and parts[0] in ("v1", "v1beta"):
+        parts = parts[1:]
+    return provider, "/".join(parts)
+
+
+def _request_schema(body):
+    """요청 본문에서 구조화 출력 JSON 스키마 추출 (Responses text.format / Chat response_format / Gemini responseJsonSchema)."""
+    fmt = (body.get("text") or {}).get("format") or {}
+    if fmt.get("type") == "json_schema":
+        return fmt.get("schema")
+    rf = body.get("response_format") or {}
+    if rf.get("type") == "json_schema":
+        return (rf.get("json_schema") or {}).get("schema")
+    gc = body.get("generationConfig") or {}
+    return gc.get("responseJsonSchema") or gc.get("responseSchema")
+
+
+def _max_output_tokens(body):
+    gc = body.get("generationConfig") or {}
+    return body.get("max_output_tokens") or body.get("max_tokens") or gc.get("maxOutputTokens")
+
+
+def build_output_text(config, schema=None, max_tokens=None):
+    """모의 출력 텍스트. schema가 있으면 그 필드만 채운 JSON 문자열."""
+    chars = int(config.get("output_chars") or 0)
+    if max_tokens:
+        chars = min(chars, int(max_tokens) * 4)
+    discussion = (FILLER * (chars // len(FILLER) + 1))[:chars]
+    cagr = config.get("cagr") or DEFAULT_CAGR
+    if schema:
+        obj = {}
+        for key in (schema.get("properties") or {}):
+            obj[key] = discussion if key == "discussion" else cagr.get(key)
+        return json.dumps(obj, ensure_ascii=False)
+    block = {k: cagr.get(k) for k in ("alpha_cagr", "beta_cagr", "current_total_krw", "risk_level", "audit_notes", "decay_rates")}
+    return (
+        discussion
+        + "\n\n```json\n" + json.dumps(block, ensure_ascii=False) + "\n```\n\n"
+        + f"Base: {cagr.get('base_cagr')}%  Final: {cagr.get('final_cagr')}%"
+    )
+
+
+def _estimate_tokens(text):
+    return max(1, len(text) // 4) if text else 0
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """요청 1건 처리. server.state(MockState) 사용."""
+
+    server_version = "MockProvider/1.0"
+
+    def log_message(self, fmt, *args):
+        if not getattr(self.server, "quiet", False):
+            sys.stdout.write(f"   [mock] {self.address_string()} {fmt % args}\n")
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, provider, endpoint, status, message):
+        self.server.state.count(provider, endpoint, status)
+        if provider == "gemini":
+            payload = {"error": {"code": status, "message": message, "status": {404: "NOT_FOUND", 429: "RESOURCE_EXHAUSTED", 503: "UNAVAILABLE"}.get(status, "UNKNOWN")}}
+        else:
+            payload = {"error": {"message": message, "type": "mock_error", "code": status}}
+        self._send_json(status, payload)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(raw.decode("utf-8")) if raw else {}, len(raw)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None, len(raw)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        state = self.server.state
+        if path == "/_mock/stats":
+            with state.lock:
+                stats = dict(state.stats)
+            return self._send_json(200, {"stats": stats, "config": state.config})
+        provider, rest = _route(path)
+        if rest != "models":
+            return self._send_error(provider, rest, 404, f"unknown path: {path}")
+        missing = set(state.config.get("missing_models") or [])
+        models = [m for m in MODELS.get(provider, []) if m not in missing]
+        state.count(provider, "models", 200)
+        if provider == "gemini":
+            return self._send_json(200, {"models": [
+                {"name": f"models/{m}", "displayName": m, "supportedGenerationMethods": ["generateContent", "countTokens"]} for m in models
+            ]})
+        owner = "xai" if provider == "grok" else "openai"
+        return self._send_json(200, {"object": "list", "data": [{"id": m, "object": "model", "created": 0, "owned_by": owner} for m in models]})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        state = self.server.state
+        body, body_bytes = self._read_body()
+        if path == "/_mock/config":
+            with state.lock:
+                state.config.update(body or {})
+            return self._send_json(200, {"config": state.config})
+        if path == "/_mock/reset":
+            with state.lock:
+                state.stats.clear()
+            return self._send_json(200, {"ok": True})
+
+        provider, rest = _route(path)
+        if body is None:
+            return self._send_error(provider, rest, 400, "invalid JSON body")
+        if provider == "gemini" and rest.startswith("models/") and rest.endswith(":generateContent"):
+            endpoint = "generateContent"
+            model = rest[len("models/"):-len(":generateContent")]
+        elif rest in ("responses", "chat/completions"):
+            endpoint = rest
+            model = body.get("model") or ""
+        else:
+            return self._send_error(provider, rest, 404, f"unknown path: {path}")
+
+        config = state.config
+        if model in (config.get("missing_models") or []) or model not in MODELS.get(provider, []):
+            return self._send_error(provider, endpoint, 404, f"model not found: {model}")
+        if config.get("error_rate") and state.random() < float(config["error_rate"]):
+            code = int(state.choice(config.get("error_codes") or [503]))
+            time.sleep(float(config.get("latency") or 0))
+            return self._send_error(provider, endpoint, code, f"mock injected error {code}")
+
+        text = build_output_text(config, _request_schema(body), _max_output_tokens(body))
+        inp, out = max(1, body_bytes // 4), _estimate_tokens(text)
+        delay = float(config.get("latency") or 0) + float(config.get("jitter") or 0) * state.random()
+        if config.get("tokens_per_s"):
+            delay += out / float(config["tokens_per_s"])
+        if delay > 0:
+            time.sleep(delay)
+
+        state.count(provider, endpoint, 200)
+        now = int(time.time())
+        if endpoint == "generateContent":
+            return self._send_json(200, {
+                "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+                "usageMetadata": {"promptTokenCount": inp, "candidatesTokenCount": out, "totalTokenCount": inp + out},
+                "modelVersion": model,
+            })
+        if endpoint == "responses":
+            return self._send_json(200, {
+                "id": f"resp_mock_{now}", "object": "response", "created_at": now, "model": model, "status": "completed",
+                "output": [{
+                    "type": "message", "id": f"msg_mock_{now}", "role": "assistant", "status": "completed",
+                    "content": [{"type": "output_text", "text": text, "annotations": []}],
+                }],
+                "usage": {"input_tokens": inp, "output_tokens": out, "total_tokens": inp + out, "output_tokens_details": {"reasoning_tokens": 0}},
+            })
+        return self._send_json(200, {
+            "id": f"chatcmpl-mock-{now}", "object": "chat.completion", "created": now, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": inp, "completion_tokens": out, "total_tokens": inp + out},
+        })
+
+
+def base_url_env(host, port):
+    """이 서버를 가리키는 *_BASE_URL 환경 변수 dict."""
+    root = f"http://{host}:{port}"
+    return {
+        "OPENAI_BASE_URL": f"{root}/openai/v1",
+        "GROK_BASE_URL": f"{root}/xai/v1",
+        "GEMINI_BASE_URL": f"{root}/gemini/v1beta",
+    }
+
+
+def make_server(host="127.0.0.1", port=DEFAULT_PORT, config=None, seed=None, quiet=False):
+    """서버 객체 생성 (port=0이면 빈 포트 자동). 벤치마크 등에서 스레드로 띄울 때 사용."""
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.state = MockState(config, seed=seed)
+    server.quiet = quiet
+    return server
+
+
+def start_in_thread(host="127.0.0.1", port=0, config=None, seed=None, quiet=True):
+    """백그라운드 스레드로 서버 시작. 반환: (server, base_url_env dict). 종료: server.shutdown()."""
+    server = make_server(host, port, config, seed=seed, quiet=quiet)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, base_url_env(host, server.server_address[1])
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="로컬 모의 AI API 서버 (OpenAI · xAI · Gemini)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--config", default=None, help="설정 JSON 파일 (키: latency, jitter, tokens_per_s, error_rate, error_codes, missing_models, output_chars, cagr)")
+    parser.add_argument("--latency", type=float, default=None, help="응답당 고정 지연(초)")
+    parser.add_argument("--jitter", type=float, default=None, help="0~N초 무작위 추가 지연")
+    parser.add_argument("--tokens-per-s", type=float, default=None, help="출력 토큰 처리 속도 (지연에 출력토큰/속도 추가)")
+    parser.add_argument("--error-rate", type=float, default=None, help="생성 요청 오류 비율 0~1")
+    parser.add_argument("--error-codes", default=None, help="무작위 오류 코드 (예: 429,503)")
+    parser.add_argument("--missing-models", default=None, help="404로 응답할 모델 (쉼표 구분)")
+    parser.add_argument("--output-chars", type=int, default=None, help="논의 본문 길이(문자)")
+    parser.add_argument("--cagr-file", default=None, help="CAGR 응답값 JSON 파일 (DEFAULT_CAGR 키 일부만 있어도 됨)")
+    parser.add_argument("--seed", type=int, default=None, help="오류·지터 난수 시드")
+    parser.add_argument("--quiet", action="store_true", help="요청 로그 출력 안 함")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    config = {}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            config.update(json.load(f))
+    if args.cagr_file:
+        with open(args.cagr_file, "r", encoding="utf-8") as f:
+            config["cagr"] = {**DEFAULT_CAGR, **json.load(f)}
+    for key in ("latency", "jitter", "tokens_per_s", "error_rate", "output_chars"):
+        if getattr(args, key) is not None:
+            config[key] = getattr(args, key)
+    if args.error_codes:
+        config["error_codes"] = [int(c) for c in args.error_codes.split(",") if c.strip()]
+    if args.missing_models:
+        config["missing_models"] = [m.strip() for m in args.missing_models.split(",") if m.strip()]
+
+    server = make_server(args.host, args.port, config, seed=args.seed, quiet=args.quiet)
+    print("=" * 60)
+    print(f"모의 AI API 서버 실행 중: http://{args.host}:{server.server_address[1]}  (종료: Ctrl+C)")
+    print("=" * 60)
+    print("스크립트 .env 또는 환경 변수에 설정:")
+    for k, v in base_url_env(args.host, server.server_address[1]).items():
+        print(f"  {k}={v}")
+    print(f"설정: {json.dumps({k: v for k, v in server.state.config.items() if k != 'cagr'}, ensure_ascii=False)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n종료")
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
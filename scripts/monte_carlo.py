@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+목표 달성 확률 몬테카를로 (calc_2030.py 일반화)
+
+calc_2030.py는 고정 CAGR 몇 개로 2030년 25억 하나만 봤다. 여기서는 현재 보유 종목의 과거 월 수익률·공분산으로
+포트폴리오 월 수익률 분포를 만들고, 지출 시나리오 1~4(asset_projection 설정)의 월 인출·추가투자를 반영해
+경로 N개를 100세까지 시뮬레이션한 뒤 마일스톤(2030년 25억, 2035년 50억, 100세까지 고갈 없음) 달성 확률을 낸다.
+
+- 수익률: 보유 종목(원화 환산, USD 종목은 USDKRW 반영) 월 로그수익률 평균 μ·공분산 Σ, 현재 비중 w (현금 0%)
+  → 월 리밸런싱 고정 비중 가정, 포트폴리오 월 로그수익률 ~ N(wᵀμ, wᵀΣw)
+- 기대수익: 과거 평균(또는 --cagr 지정값)을 연 기대수익률로 보고, asset_projection 구간별 감쇠(2034/2035~2039/2040+) 적용
+- 흐름: 50세 전 시나리오별 월 흐름(첫 해 공통 지출 포함), 50세부터 매년 1월 연초자산 × 4%(최소 9,600만)를 12개월 분할 인출
+- 메모리: 경로를 chunk개씩 나눠 시뮬레이션, 마일스톤 연도 말 값(float32)만 보관 → 1M 경로 × 75년도 수백 MB 이내
+- numpy 필수 (없으면 None 반환·경고), 과거 수익률 조회는 yfinance (없으면 --cagr·--vol로 직접 지정)
+
+사용법:
+    python monte_carlo.py                                   # config.json 보유 종목 5년 이력, 20만 경로
+    python monte_carlo.py --paths 1000000 --chunk 50000 --seed 7
+    python monte_carlo.py --start-krw 1600000000 --cagr 15 --vol 40     # 이력 조회 없이 직접 지정
+    python monte_carlo.py --milestone 2030:25 --milestone 2035:50 --json
+"""
+
+import sys
+import json
+import math
+import time
+import argparse
+from datetime import date
+
+import common
+import asset_projection
+
+DEFAULT_PATHS = 200_000
+DEFAULT_CHUNK = 50_000
+DEFAULT_SEED = 42
+HISTORY_YEARS = 5
+FX_TICKER = "KRW=X"
+# label, 연도(말), 목표(원). 목표 0 = 고갈 없음(0원 초과). year None = 마지막 연도(end_age)
+DEFAULT_MILESTONES = [
+    {"label": "2030년 말 25억", "year": 2030, "target_krw": 2_500_000_000},
+    {"label": "2035년 말 50억", "year": 2035, "target_krw": 5_000_000_000},
+    {"label": "100세까지 고갈 없음", "year": None, "target_krw": 0},
+]
+
+
+def load_history(holdings, years=HISTORY_YEARS):
+    """보유 종목 월 종가(원화 환산) → {"symbols", "returns"(월 로그수익률 [월×종목]), "last_krw"(종목별 최근 원화가)}.
+    yfinance·numpy가 없거나 조회 실패 시 None."""
+    np = common.numpy()
+    try:
+        import yfinance as yf
+    except ImportError:
+        print("[WARNING] yfinance 미설치. 과거 수익률 조회 불가 (--cagr·--vol로 직접 지정). 설치: pip install yfinance pandas")
+        return None
+    if np is None:
+        return None
+    positions = holdings.get("positions") or []
+    symbols = sorted({p["symbol"] for p in positions})
+    usd = {p["symbol"] for p in positions if (p.get("currency") or "USD").upper() == "USD"}
+    try:
+        close = yf.download(symbols + [FX_TICKER], period=f"{years}y", interval="1mo",
+                            auto_adjust=True, progress=False)["Close"]
+    except Exception as e:
+        print(f"[WARNING] 과거 주가 조회 실패: {e}")
+        return None
+    close = close.ffill().dropna(how="any")
+    if len(close) < 13:
+        print(f"[WARNING] 과거 주가 {len(close)}개월 — 수익률 추정에 부족 (최소 13개월)")
+        return None
+    fx = close[FX_TICKER].to_numpy(dtype=float)
+    prices = np.column_stack([close[s].to_numpy(dtype=float) * (fx if s in usd else 1.0) for s in symbols])
+    return {"symbols": symbols, "returns": np.diff(np.log(prices), axis=0), "last_krw": prices[-1].tolist(),
+            "months": len(close) - 1}
+
+
+def portfolio_params(holdings, history):
+    """현재 비중 w(현금 포함)와 월 로그수익률 μ·σ. 반환: {"weights", "mu_month", "sigma_month", "annual_return", "annual_vol", "start_krw"}."""
+    np = common.numpy()
+    value = {s: 0.0 for s in history["symbols"]}
+    for p in holdings.get("positions") or []:
+        i = history["symbols"].index(p["symbol"])
+        value[p["symbol"]] += float(p.get("qty") or 0) * history["last_krw"][i]
+    cash = float(holdings.get("cash_krw") or 0)
+    total = cash + sum(value.values())
+    w = np.array([value[s] / total for s in history["symbols"]])
+    r = history["returns"]
+    mu = float(w @ r.mean(axis=0))
+    sigma = math.sqrt(max(float(w @ np.cov(r, rowvar=False) @ w), 0.0))
+    return {
+        "weights": {s: round(float(x) * 100, 2) for s, x in zip(history["symbols"], w)}, "cash_pct": round(cash / total * 100, 2),
+        "mu_month": mu, "sigma_month": sigma, "start_krw": total, "history_months": history["months"],
+        "annual_return": (math.exp(12 * (mu + sigma ** 2 / 2)) - 1) * 100, "annual_vol": sigma * math.sqrt(12) * 100,
+    }
+
+
+def _schedule(settings, start_date):
+    """월 단위 일정: 연도·월, 시나리오별 계획 흐름 [시나리오×월], 은퇴 여부, 연초(1월) 여부."""
+    s = settings
+    last_year = s["birth_year"] + s["end_age"]
+    ym = [(start_date.year, m) for m in range(start_date.month, 13)]
+    ym += [(y, m) for y in range(start_date.year + 1, last_year + 1) for m in range(1, 13)]
+    fys = s.get("first_year_spending") or {}
+    flows = []
+    for sc in s["scenarios"]:
+        steps = sorted(sc.get("flows") or [], key=lambda f: f["from_year"])
+        row = []
+        for y, m in ym:
+            if y == fys.get("year"):
+                row.append(-float(fys["monthly_krw"]) if m >= int(fys.get("from_month") or 1) else 0.0)
+                continue
+            monthly = 0.0
+            for f in steps:
+                if f["from_year"] <= y:
+                    monthly = float(f["monthly_krw"])
+            row.append(monthly)
+        flows.append(row)
+    retired = [y - s["birth_year"] >= s["retire_age"] for y, _ in ym]
+    return ym, flows, retired
+
+
+def simulate(start_krw, mu_month, sigma_month, paths=DEFAULT_PATHS, chunk=DEFAULT_CHUNK, seed=DEFAULT_SEED,
+             settings=None, milestones=None, cagr=None, decay=None, start_date=None):
+    """시나리오 × 경로 몬테카를로. cagr(%)를 주면 기대수익률을 그 값으로 (σ는 그대로).
+    반환: {"scenarios": [{"name", "milestones": [{"label", "year", "target_krw", "prob", "p10", "p50", "p90"}]}], ...}. numpy 없으면 None."""
+    np = common.numpy()
+    if np is None:
+        print("[WARNING] numpy 미설치. 몬테카를로 생략. 설치: pip install numpy")
+        return None
+    s = asset_projection.load_settings(settings)
+    start_date = start_date or date.today()
+    decay, _ = asset_projection.resolve_decay(decay, s)
+    ym, flows, retired = _schedule(s, start_date)
+    last_year = ym[-1][0]
+    milestones = [dict(m, year=m.get("year") or last_year) for m in (milestones or DEFAULT_MILESTONES)]
+    milestones = [m for m in milestones if start_date.year <= m["year"] <= last_year]
+    # 월별 로그 드리프트: 연 기대수익률 g(과거 또는 cagr) × 구간 감쇠 → ln(1+g_y)/12 - σ²/2
+    var = sigma_month ** 2
+    base_g = cagr / 100 if cagr is not None else math.exp(12 * (mu_month + var / 2)) - 1
+    drift = np.array([math.log(1 + base_g * asset_projection.decay_factor(y, decay)) / 12 - var / 2 for y, _ in ym])
+    flow = np.asarray(flows, dtype=float)  # [시나리오×월]
+    reset = [r and (m == 1 or t == 0) for t, ((_, m), r) in enumerate(zip(ym, retired))]
+    dec_idx = {m["year"]: next(t for t, (y, mm) in enumerate(ym) if y == m["year"] and (mm == 12 or t == len(ym) - 1))
+               for m in milestones}
+    wr, min_w = s["withdrawal_rate"] / 100, float(s["min_annual_withdrawal_krw"])
+    n_sc = flow.shape[0]
+    rng = np.random.default_rng(seed)
+    kept = {year: [] for year in dec_idx}
+    save_at = {idx: year for year, idx in dec_idx.items()}
+    t0 = time.perf_counter()
+    done = 0
+    while done < paths:
+        n = min(chunk, paths - done)
+        a = np.full((n_sc, n), float(start_krw))
+        monthly_wd = np.zeros((n_sc, n))
+        z = np.empty(n, dtype=np.float32)
+        for t in range(len(ym)):
+            if reset[t]:
+                monthly_wd = np.maximum(a * wr, min_w) / 12
+            # 수익률 난수·exp는 float32 (경로 수만큼 매월 생성하는 부분이 대부분의 비용), 자산 누적은 float64
+            rng.standard_normal(n, dtype=np.float32, out=z)
+            z *= sigma_month
+            z += drift[t]
+            np.exp(z, out=z)
+            a *= z
+            if retired[t]:
+                a -= monthly_wd
+            else:
+                a += flow[:, t:t + 1]
+            np.maximum(a, 0.0, out=a)
+            if t in save_at:
+                kept[save_at[t]].append(a.astype(np.float32))
+        done += n
+    elapsed = time.perf_counter() - t0
+    values = {year: np.concatenate(v, axis=1) for year, v in kept.items()}
+    scenarios = []
+    for i, sc in enumerate(s["scenarios"]):
+        rows = []
+        for m in milestones:
+            v = values[m["year"]][i]
+            hit = v >= m["target_krw"] if m["target_krw"] > 0 else v > 0
+            p10, p50, p90 = (float(x) for x in np.percentile(v, [10, 50, 90]))
+            rows.append({"label": m["label"], "year": m["year"], "target_krw": m["target_krw"],
+                         "prob": float(hit.mean()) * 100, "p10": p10, "p50": p50, "p90": p90})
+        scenarios.append({"name": sc["name"], "desc": sc.get("desc", ""), "milestones": rows})
+    return {
+        "start_date": start_date.isoformat(), "start_krw": float(start_krw), "paths": paths, "chunk": chunk, "seed": seed,
+        "months": len(ym), "elapsed_s": round(elapsed, 2),
+        "expected_return": base_g * 100, "return_source": "지정 CAGR" if cagr is not None else "과거 평균",
+        "annual_vol": sigma_month * math.sqrt(12) * 100, "decay": decay, "scenarios": scenarios,
+    }
+
+
+def _eok(v):
+    return f"{v / asset_projection.EOK:,.1f}억"
+
+
+def format_markdown(result):
+    """CLI·프롬프트 공용 요약 표 (시나리오 × 마일스톤 달성 확률, 중앙값·10~90% 구간)."""
+    d = result["decay"]
+    lines = [
+        f"경로 {result['paths']:,}개, 기준 {result['start_date']} 자산 {_eok(result['start_krw'])}, "
+        f"연 기대수익률 {result['expected_return']:.1f}% ({result['return_source']}, 감쇠 {d['y2034']:g}/{d['y2035_2039']:g}/{d['y2040_plus']:g}%), "
+        f"연 변동성 {result['annual_vol']:.1f}%",
+        "",
+        "| 시나리오 | " + " | ".join(m["label"] for m in result["scenarios"][0]["milestones"]) + " |",
+        "|---|" + "---|" * len(result["scenarios"][0]["milestones"]),
+    ]
+    for sc in result["scenarios"]:
+        cells = [f"**{m['prob']:.1f}%** (중앙 {_eok(m['p50'])}, 10~90% {_eok(m['p10'])}~{_eok(m['p90'])})" for m in sc["milestones"]]
+        lines.append(f"| {sc['name']} ({sc['desc']}) | " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+
+def format_for_prompt(result, params=None):
+    """{{realtime_data}}에 넣을 블록 (스크립트 계산 확률 — AI가 재계산하지 않도록)."""
+    head = "**목표 달성 확률 (몬테카를로, 스크립트 계산 — 확률·구간은 이 값을 인용할 것)**\n"
+    if params:
+        head += (f"- 과거 {params['history_months']}개월 월 수익률·공분산 기준 (현재 비중, 현금 {params['cash_pct']}%), "
+                 f"과거 연 기대수익률 {params['annual_return']:.1f}%, 연 변동성 {params['annual_vol']:.1f}%\n")
+    return head + format_markdown(result) + "\n"
+
+
+def parse_milestones(values):
+    """["2030:25", "2035:50", "100세:0"] → 마일스톤 목록 (억원). "100세"처럼 세 표기는 마지막 연도."""
+    out = []
+    for v in values:
+        when, target = v.split(":", 1)
+        eok = float(target)
+        year = None if when.endswith("세") else int(when)
+        label = (f"{when} 고갈 없음" if eok == 0 else f"{when} {eok:g}억") if year is None else (
+            f"{year}년 말 고갈 없음" if eok == 0 else f"{year}년 말 {eok:g}억")
+        out.append({"label": label, "year": year, "target_krw": eok * asset_projection.EOK})
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="지출 시나리오별 목표 달성 확률 몬테카를로")
+    parser.add_argument("--paths", type=int, default=DEFAULT_PATHS, help=f"경로 수 (기본 {DEFAULT_PATHS:,})")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help=f"한 번에 시뮬레이션할 경로 수 (메모리 상한, 기본 {DEFAULT_CHUNK:,})")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"난수 시드 (기본 {DEFAULT_SEED})")
+    parser.add_argument("--years", type=int, default=HISTORY_YEARS, help=f"과거 수익률 조회 기간(년, 기본 {HISTORY_YEARS})")
+    parser.add_argument("--start-krw", type=float, default=None, help="기준 자산(원). 기본: 보유 종목 × 최근 종가 + 현금")
+    parser.add_argument("--cagr", type=float, default=None, help="연 기대수익률(%%) 직접 지정 (기본: 과거 평균)")
+    parser.add_argument("--vol", type=float, default=None, help="연 변동성(%%) 직접 지정 — --start-krw·--cagr와 함께면 이력 조회 생략")
+    parser.add_argument("--milestone", action="append", default=None, help="연도:억원 (예: 2030:25, 100세:0=고갈 없음). 반복 지정")
+    parser.add_argument("--json", action="store_true", help="결과 JSON 출력")
+    args = parser.parse_args()
+    common.utf8_stdout()
+
+    cfg = common.load_config()
+    settings = cfg.get("projection")
+    params = None
+    if args.vol is not None and args.start_krw is not None and args.cagr is not None:
+        start_krw, mu, sigma = args.start_krw, 0.0, args.vol / 100 / math.sqrt(12)
+    else:
+        holdings = cfg.get("portfolio_holdings")
+        if not holdings:
+            print("[ERROR] config.json에 portfolio_holdings 없음 (--start-krw·--cagr·--vol로 직접 지정)")
+            return 1
+        history = load_history(holdings, args.years)
+        if history is None:
+            print("[ERROR] 과거 수익률 없이 실행하려면 --start-krw·--cagr·--vol을 모두 지정하세요.")
+            return 1
+        params = portfolio_params(holdings, history)
+        mu, sigma = params["mu_month"], params["sigma_month"]
+        if args.vol is not None:
+            sigma = args.vol / 100 / math.sqrt(12)
+        start_krw = args.start_krw or params["start_krw"]
+    try:
+        milestones = parse_milestones(args.milestone) if args.milestone else None
+    except ValueError:
+        print(f"[ERROR] --milestone 형식 오류: {args.milestone} (예: 2030:25)")
+        return 1
+    result = simulate(start_krw, mu, sigma, args.paths, max(1, args.chunk), args.seed, settings, milestones, cagr=args.cagr)
+    if result is None:
+        return 1
+    if args.json:
+        print(json.dumps({"params": params, **result}, ensure_ascii=False, indent=2))
+    else:
+        print(format_for_prompt(result, params))
+        print(f"(시뮬레이션 {result['months']}개월 × {result['paths']:,}경로 × {len(result['scenarios'])}시나리오, {result['elapsed_s']}초)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
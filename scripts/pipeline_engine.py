@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+선언형 보고서 파이프라인 엔진 (prompts/pipelines.json)
+
+보고서 흐름(3ai·3ai_fast·collaborative·openai_grok)을 단계·역할·템플릿·의존성·파서로 설정 파일에 적고,
+스크립트는 이 엔진 하나로 실행한다. 새 흐름·축소 흐름은 pipelines.json에 항목만 추가하면 된다.
+
+- 단계(step): id, provider(openai|grok|gemini), system(시스템 프롬프트 파일)·fallback_system, template(유저 템플릿 파일),
+  inputs(템플릿 치환값), after(추가 선행 단계), requires(실패 시 건너뛸 선행 단계), required(실패 시 파이프라인 중단),
+  fallback_text(실패 시 뒤 단계에 넘길 문구), options(호출 인자, 예: use_web_search, OpenAI reasoning_effort low|medium|high —
+  없으면 medium, 예산 스케줄러·--plan도 이 값 기준), parser(출력 → 값 추출)
+- inputs 값: "$portfolio"·"$date_str"·"$risk_metrics"(스크립트 계산 블록 키) 등 실행 컨텍스트, "<단계>.text"·"<단계>.model"·"<단계>.<파서 키>"
+  또는 {"ref", "format": "percent", "max_chars", "strip", "default"}, 고정 문구는 {"value": "..."}
+- 실행: 의존성으로 묶은 웨이브 순서. 같은 웨이브에 단계가 둘 이상이면 스레드 풀로 동시 호출 (max_parallel)
+- 캐시·재시도·속도 제한: 호출은 모두 ai_providers를 거치므로 AI_RESPONSE_CACHE_DIR·*_MAX_RPM이 모든 흐름에 같이 적용
+
+사용법 (정의 확인):
+    python pipeline_engine.py                 # 파이프라인 목록
+    python pipeline_engine.py 3ai             # 단계·웨이브(병렬 묶음) 출력
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import common
+import run_trace
+import ai_providers
+
+PROJECT_ROOT = Path(__file__).parent.parent
+PROMPTS_DIR = PROJECT_ROOT / "prompts"
+PIPELINES_FILE = PROMPTS_DIR / "pipelines.json"
+
+PROVIDERS = ("openai", "grok", "gemini")
+REASONING_EFFORTS = ("low", "medium", "high")
+DEFAULT_MAX_PARALLEL = 3
+PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")  # 템플릿 치환 자리 {{이름}}
+STEP_FIELDS = {
+    "id", "provider", "label", "system", "fallback_system", "template", "inputs", "after", "requires",
+    "required", "fallback_text", "options", "parser", "schema_role", "report_label", "readme",
+}
+
+
+class PipelineError(ValueError):
+    """pipelines.json 정의 오류 (알 수 없는 단계·순환 의존·템플릿 없음 등)."""
+
+
+def load_pipelines(path=None):
+    """pipelines.json → {이름: 파이프라인 dict}. 파일이 없거나 JSON이 깨졌으면 PipelineError."""
+    path = Path(path) if path else PIPELINES_FILE
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        raise PipelineError(f"파이프라인 정의 파일 없음: {path}")
+    except ValueError as e:
+        raise PipelineError(f"파이프라인 정의 JSON 오류 ({path.name}): {e}")
+    pipelines = data.get("pipelines") if isinstance(data, dict) else None
+    if not isinstance(pipelines, dict) or not pipelines:
+        raise PipelineError(f"{path.name}에 pipelines 항목이 없습니다.")
+    return pipelines
+
+
+def load_pipeline(name, path=None, prompts_dir=None):
+    """이름으로 파이프라인을 읽고 검증. 반환: 파이프라인 dict (name 키 포함)."""
+    pipelines = load_pipelines(path)
+    if name not in pipelines:
+        raise PipelineError(f"알 수 없는 파이프라인: {name} (사용 가능: {', '.join(pipelines)})")
+    pipeline = dict(pipelines[name], name=name)
+    errors = validate(pipeline, prompts_dir)
+    if errors:
+        raise PipelineError(f"파이프라인 {name} 정의 오류:\n  - " + "\n  - ".join(errors))
+    return pipeline
+
+
+def _spec(spec):
+    """inputs 값 → dict (문자열이면 {"ref": 문자열})."""
+    return {"ref": spec} if isinstance(spec, str) else dict(spec or {})
+
+
+def _ref_step(ref):
+    """"<단계>.<필드>" → 단계 id. 컨텍스트 참조("$...")는 None."""
+    if not ref or ref.startswith("$") or "." not in ref:
+        return None
+    return ref.split(".", 1)[0]
+
+
+def dependencies(step):
+    """단계의 선행 단계 id 목록 (after + requires + inputs가 참조하는 단계, 정의 순서 유지)."""
+    deps = list(step.get("after") or []) + list(step.get("requires") or [])
+    for spec in (step.get("inputs") or {}).values():
+        dep = _ref_step(_spec(spec).get("ref"))
+        if dep:
+            deps.append(dep)
+    return list(dict.fromkeys(deps))
+
+
+def validate(pipeline, prompts_dir=None):
+    """정의 검증. 반환: 오류 문자열 목록 (비어 있으면 정상)."""
+    prompts_dir = Path(prompts_dir) if prompts_dir else PROMPTS_DIR
+    steps = pipeline.get("steps") or []
+    errors = []
+    if not steps:
+        return ["steps가 비어 있습니다."]
+    ids = [s.get("id") for s in steps]
+    if len(set(ids)) != len(ids) or None in ids:
+        errors.append(f"단계 id 누락·중복: {ids}")
+    for step in steps:
+        sid = step.get("id")
+        unknown = set(step) - STEP_FIELDS
+        if unknown:
+            errors.append(f"{sid}: 알 수 없는 필드 {sorted(unknown)}")
+        if step.get("provider") not in PROVIDERS:
+            errors.append(f"{sid}: provider는 {'|'.join(PROVIDERS)} 중 하나 ({step.get('provider')})")
+        effort = (step.get("options") or {}).get("reasoning_effort")
+        if effort is not None and (step.get("provider") != "openai" or effort not in REASONING_EFFORTS):
+            errors.append(f"{sid}: options.reasoning_effort는 openai 단계에서 {'|'.join(REASONING_EFFORTS)} 중 하나 ({effort})")
+        if not step.get("template"):
+            errors.append(f"{sid}: template 없음")
+        elif not (prompts_dir / step["template"]).exists():
+            errors.append(f"{sid}: 템플릿 파일 없음 ({step['template']})")
+        for dep in dependencies(step):
+            if dep not in ids:
+                errors.append(f"{sid}: 알 수 없는 선행 단계 {dep}")
+            elif ids.index(dep) >= ids.index(sid):
+                errors.append(f"{sid}: 선행 단계 {dep}가 뒤에 정의됨 (순환 또는 순서 오류)")
+    final = pipeline.get("final") or {}
+    for key in ("step", "fallback"):
+        if final.get(key) and final[key] not in ids:
+            errors.append(f"final.{key}: 알 수 없는 단계 {final[key]}")
+    return errors
+
+
+def waves(pipeline):
+    """의존성 기준 실행 웨이브 [[단계 id, ...], ...]. 같은 웨이브 단계끼리는 서로 의존하지 않는다."""
+    level = {}
+    for step in pipeline["steps"]:
+        deps = dependencies(step)
+        level[step["id"]] = 1 + max((level[d] for d in deps), default=-1)
+    out = []
+    for step in pipeline["steps"]:
+        n = level[step["id"]]
+        while len(out) <= n:
+            out.append([])
+        out[n].append(step["id"])
+    return out
+
+
+def provider_steps_left(pipeline, step_id):
+    """step_id 포함 남은 같은 provider 단계 수 (예산 스케줄러 steps_left용)."""
+    steps = pipeline["steps"]
+    idx = next(i for i, s in enumerate(steps) if s["id"] == step_id)
+    provider = steps[idx]["provider"]
+    return sum(1 for s in steps[idx:] if s["provider"] == provider)
+
+
+def _read(prompts_dir, name):
+    if not name:
+        return None
+    path = Path(prompts_dir) / name
+    try:
+        if path.exists():
+            text = path.read_text(encoding="utf-8").strip()
+            return text or None
+    except Exception as e:
+        print(f"[WARNING] 프롬프트 파일 로드 실패 ({name}): {e}")
+    return None
+
+
+def load_system(step, prompts_dir=None):
+    """단계 시스템 프롬프트: system 파일 → fallback_system 파일 → None."""
+    prompts_dir = prompts_dir or PROMPTS_DIR
+    return _read(prompts_dir, step.get("system")) or _read(prompts_dir, step.get("fallback_system"))
+
+
+def resolve(ref, context, results):
+    """참조 하나의 값. "$이름" → context[이름], "<단계>.text|model|<파서 키>" → 단계 결과. 없으면 None."""
+    if ref.startswith("$"):
+        return context.get(ref[1:])
+    sid, field = ref.split(".", 1)
+    res = results.get(sid)
+    if not res:
+        return None
+    if field in ("text", "model"):
+        return res.get(field)
+    return (res.get("data") or {}).get(field)
+
+
+def render_value(spec, context, results):
+    """inputs 값 하나를 템플릿에 넣을 문자열로."""
+    spec = _spec(spec)
+    value = resolve(spec["ref"], context, results) if spec.get("ref") else spec.get("value")
+    if value is None or value == "":
+        return spec.get("default", "")
+    if spec.get("format") == "percent":
+        value = f"{value}%"
+    value = str(value)
+    if spec.get("strip"):
+        value = value.strip() or spec.get("default", "")
+    if spec.get("max_chars"):
+        value = value[:spec["max_chars"]]
+    return value
+
+
+def render_prompt(step, context, results, prompts_dir=None):
+    """유저 템플릿의 {{이름}}을 inputs 값으로 치환. 원본 템플릿을 한 번만 훑음 — 치환된 값(보고서·포트폴리오 본문) 안의
+    {{...}}는 다시 치환하지 않고, inputs에 없는 {{이름}}은 그대로 둠."""
+    path = Path(prompts_dir or PROMPTS_DIR) / step["template"]
+    inputs = step.get("inputs") or {}
+    values = {}
+
+    def _value(m):
+        name = m.group(1)
+        if name not in inputs:
+            return m.group(0)
+        if name not in values:
+            values[name] = render_value(inputs[name], context, results)
+        return values[name]
+
+    return PLACEHOLDER.sub(_value, path.read_text(encoding="utf-8"))
+
+
+def _run_step(step, pipeline, context, results, call_fns, keys, models, hooks, prompts_dir):
+    """단계 1개 실행 (프롬프트 렌더 → 호출 → 후처리·파서). 반환: 결과 dict."""
+    sid, provider = step["id"], step["provider"]
+    t0 = time.perf_counter()
+    system = load_system(step, prompts_dir)
+    prompt = render_prompt(step, context, results, prompts_dir)
+    kwargs = dict(step.get("options") or {})
+    if models.get(provider):
+        kwargs["preferred_model"] = models[provider]
+    if hooks.get("before_call"):
+        prompt, extra = hooks["before_call"](step, prompt, system, kwargs)
+        kwargs.update(extra or {})
+    text, model = call_fns[provider](keys.get(provider), prompt, system_content=system, **kwargs)
+    structured = None
+    if text and hooks.get("after_call"):
+        text, structured = hooks["after_call"](step, text)
+    res = {
+        "id": sid, "provider": provider, "status": "ok" if text else "failed",
+        "text": text or None, "model": model, "system": system, "prompt": prompt,
+        "data": {}, "elapsed_s": 0.0,
+    }
+    parser = (hooks.get("parsers") or {}).get(step.get("parser"))
+    if text and parser:
+        res["data"] = parser(text, structured) or {}
+    if not text and step.get("fallback_text"):
+        res["text"] = step["fallback_text"]
+    res["elapsed_s"] = time.perf_counter() - t0
+    return res
+
+
+def _run_in_worker(step, parent_span, *args):
+    """작업 스레드: 추적 span을 parent 아래에 쌓고 사용량 원장 단계명을 스레드 단위로 건다."""
+    with run_trace.attach(parent_span):
+        run_trace.enter("step", step["id"])
+        ai_providers.set_thread_step(step["id"])
+        try:
+            return _run_step(step, *args)
+        finally:
+            ai_providers.set_thread_step(None)
+
+
+def run_pipeline(pipeline, context, call_fns, keys=None, models=None, hooks=None, prompts_dir=None,
+                 max_parallel=None, log=print):
+    """파이프라인 실행. 반환: {"results": {단계 id: 결과}, "order", "aborted", "final_text", "final_model", "final_step"}.
+
+    - call_fns: {provider: fn(api_key, prompt, system_content=..., preferred_model=..., **options) → (text, model)}
+      (스크립트의 call_*_api를 실행 시점에 넘기므로 벤치마크 래퍼 등도 그대로 적용)
+    - hooks (모두 선택):
+        on_step_start(step_id)                      순차 실행 단계 시작 (사용량 단계명·추적·프로파일 전환)
+        before_call(step, prompt, system, kwargs)   → (prompt, 추가 kwargs) (예산 스케줄러·구조화 출력 지시)
+        after_call(step, text)                      → (text, structured) (구조화 출력 정리)
+        parsers: {이름: fn(text, structured) → dict}  단계 parser 이름으로 조회, 결과는 "<단계>.<키>"로 참조
+        on_step_end(step, result)                   결과 출력 등
+    - 결과 status: ok | failed | skipped (requires 실패·required 실패로 중단)
+    """
+    keys, models, hooks = keys or {}, models or {}, hooks or {}
+    prompts_dir = prompts_dir or PROMPTS_DIR
+    max_parallel = max(1, int(max_parallel or pipeline.get("max_parallel") or DEFAULT_MAX_PARALLEL))
+    by_id = {s["id"]: s for s in pipeline["steps"]}
+    results, order, aborted = {}, [], False
+    args = (pipeline, context, results, call_fns, keys, models, hooks, prompts_dir)
+
+    for wave in waves(pipeline):
+        runnable = []
+        for sid in wave:
+            step = by_id[sid]
+            failed = [d for d in step.get("requires") or [] if results.get(d, {}).get("status") != "ok"]
+            if aborted or failed:
+                results[sid] = {"id": sid, "provider": step["provider"], "status": "skipped", "text": None,
+                                "model": None, "data": {}, "elapsed_s": 0.0}
+                if failed and not aborted:
+                    log(f"  [WARNING] {step.get('label', sid)} 건너뜀 (선행 단계 실패: {', '.join(failed)})")
+                continue
+            runnable.append(step)
+        if not runnable:
+            continue
+
+        if len(runnable) == 1 or max_parallel == 1:
+            for step in runnable:
+                log(f"\n  [{step['id']}] {step.get('label', step['id'])} 중...")
+                if hooks.get("on_step_start"):
+                    hooks["on_step_start"](step["id"])
+                results[step["id"]] = _run_step(step, *args)
+        else:
+            log(f"\n  [{' + '.join(s['id'] for s in runnable)}] 병렬 실행 ({min(len(runnable), max_parallel)}개 동시)")
+            for step in runnable:
+                log(f"    - {step.get('label', step['id'])}")
+            run_trace.close("step")
+            parent = run_trace.root()
+            with ThreadPoolExecutor(max_workers=min(len(runnable), max_parallel)) as pool:
+                futures = {s["id"]: pool.submit(_run_in_worker, s, parent, *args) for s in runnable}
+                for sid, fut in futures.items():
+                    results[sid] = fut.result()
+
+        for step in runnable:
+            res = results[step["id"]]
+            order.append(step["id"])
+            if hooks.get("on_step_end"):
+                hooks["on_step_end"](step, res)
+            if res["status"] != "ok" and step.get("required"):
+                log(f"  [ERROR] {step.get('label', step['id'])} 실패 - 파이프라인 중단")
+                aborted = True
+
+    final = pipeline.get("final") or {}
+    final_step = None
+    for sid in (final.get("step"), final.get("fallback")):
+        if sid and results.get(sid, {}).get("status") == "ok":
+            final_step = sid
+            break
+    return {
+        "results": results, "order": order, "aborted": aborted, "final_step": final_step,
+        "final_text": results[final_step]["text"] if final_step else None,
+        "final_model": results[final_step]["model"] if final_step else None,
+    }
+
+
+def format_plan(pipeline):
+    """단계·웨이브 요약 문자열 (python pipeline_engine.py <이름>)."""
+    by_id = {s["id"]: s for s in pipeline["steps"]}
+    lines = [f"[{pipeline['name']}] {pipeline.get('description', '')}".rstrip()]
+    for n, wave in enumerate(waves(pipeline), 1):
+        tag = " (병렬)" if len(wave) > 1 else ""
+        lines.append(f"  웨이브 {n}{tag}")
+        for sid in wave:
+            step = by_id[sid]
+            deps = dependencies(step)
+            flags = [f for f, on in (("required", step.get("required")), ("parser=" + str(step.get("parser")), step.get("parser"))) if on]
+            lines.append(f"    {sid:<16} {step['provider']:<7} {step.get('template')}"
+                         + (f"  ← {', '.join(deps)}" if deps else "") + (f"  [{', '.join(flags)}]" if flags else ""))
+    final = pipeline.get("final") or {}
+    if final:
+        lines.append(f"  최종 본문: {final.get('step')}" + (f" (실패 시 {final['fallback']})" if final.get("fallback") else ""))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="prompts/pipelines.json 파이프라인 목록·실행 계획 출력")
+    parser.add_argument("name", nargs="?", help="파이프라인 이름 (생략 시 목록)")
+    parser.add_argument("--file", default=None, help="정의 파일 (기본: prompts/pipelines.json)")
+    args = parser.parse_args()
+    common.utf8_stdout()
+    try:
+        if not args.name:
+            for name, p in load_pipelines(args.file).items():
+                print(f"  {name:<16} {len(p.get('steps') or [])}단계  {p.get('description', '')}")
+            return 0
+        print(format_plan(load_pipeline(args.name, args.file)))
+    except PipelineError as e:
+        print(f"[ERROR] {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
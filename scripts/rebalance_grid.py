@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+비중 조정·스윙 시나리오 그리드 (tsla_strategy.py 일반화)
+
+tsla_strategy.py는 TSLA 보유량·총자산·환율을 하드코딩하고 목표 비중 4개 × 스윙 3개만 반복 계산했다.
+여기서는 config.json 보유 종목(계좌별)과 현재 가격·환율로 평가한 뒤, 모든 종목에 대해
+목표 비중 × 가격 변동 × 환율 × 스윙 크기 그리드를 numpy 브로드캐스트 한 번으로 계산한다.
+
+- 셀 하나: (종목, 목표 비중 w, 가격 배수 m, 환율 fx, 스윙 s)
+  · 종목 평가액 V = 보유 합계 × 가격 × m (USD는 × fx), 총자산 T = 현금 + 다른 종목(기준 가격, USD는 × fx) + V
+  · 목표 매매 주수 = (w·T − V) / 주가 (0 방향 절사, 음수 = 매도), 매매 후 비중
+  · 스윙: 매매 후 보유량의 s%를 매도했을 때 주수·확보 현금·비중
+  · 계좌별(법인/개인): 매매 주수를 보유 비율로 나눈 값, 계좌 내 비중
+- 가격이 없는 종목은 평가액 0으로 두고 그리드에서 제외 (경고 출력)
+- numpy 필요. 수백만 셀도 수십~수백 ms
+
+사용법:
+    python rebalance_grid.py --symbols TSLA                     # 현재 가격·환율 조회 (yfinance·환율 API)
+    python rebalance_grid.py --symbols TSLA,MSTR --targets 50,55,60,65 --swings 10,15,20
+    python rebalance_grid.py --fx-base 1450 --price TSLA=430 --price MSTR=160 ...   # 오프라인 (가격 직접 지정)
+    python rebalance_grid.py --targets 0:100:1 --price-moves=-50:50:1 --fx 1300:1600:10 --swings 5:50:5   # 대형 그리드
+"""
+
+import sys
+import json
+import time
+import argparse
+
+import common
+import valuation
+
+EOK = 100_000_000
+DEFAULT_TARGETS = "0:100:5"
+DEFAULT_PRICE_MOVES = "-30:30:5"
+DEFAULT_SWINGS = "10,15,20"
+DEFAULT_FX_SPREAD = "-10:10:2.5"  # --fx 미지정 시 기준 환율 대비 %
+
+
+def parse_axis(text):
+    """"50,55,60" 또는 "시작:끝:간격"(끝 포함) → float 목록."""
+    text = str(text).strip()
+    if ":" in text:
+        start, stop, step = (float(x) for x in text.split(":"))
+        if step <= 0:
+            raise ValueError(f"간격은 0보다 커야 함: {text}")
+        n = int(round((stop - start) / step)) + 1
+        return [round(start + i * step, 6) for i in range(max(n, 0))]
+    return [float(x) for x in text.split(",") if x.strip()]
+
+
+def build_book(holdings, usd_krw_rate, prices):
+    """보유 종목 + 종목별 현지 통화 가격(prices: {symbol: price}) → 계산용 장부.
+    반환: {"positions": [{"account", "symbol", "name", "qty", "currency", "price"}], "cash_krw", "fx", "missing": [가격 없는 종목]}."""
+    positions, missing = [], []
+    for p in holdings.get("positions") or []:
+        price = prices.get(p["symbol"])
+        if price is None:
+            if p["symbol"] not in missing:
+                missing.append(p["symbol"])
+            continue
+        positions.append({"account": p.get("account") or "", "symbol": p["symbol"], "name": p.get("name") or p["symbol"],
+                          "qty": float(p.get("qty") or 0), "currency": (p.get("currency") or "USD").upper(), "price": float(price)})
+    return {"positions": positions, "cash_krw": float(holdings.get("cash_krw") or 0), "fx": float(usd_krw_rate), "missing": missing}
+
+
+def evaluate(book, targets, price_moves, fx_rates, swings, symbols=None):
+    """그리드 계산. targets·swings는 %, price_moves는 기준가 대비 %, fx_rates는 원/달러.
+    반환: 축·종목 목록과 배열 dict (numpy 없으면 None).
+      symbol 축 [Y], value/total/weight_now [Y,M,F], trade/weight_after [Y,W,M,F],
+      swing_shares/swing_cash/weight_after_swing [Y,W,M,F,S], swing_now_shares [Y,S],
+      weight_after_swing_now [Y,M,F,S] (현재 보유 기준 스윙), account_trade·account_weight_* [P,...]."""
+    np = common.numpy()
+    if np is None:
+        print("[WARNING] numpy 미설치. 리밸런싱 그리드 계산 불가. 설치: pip install numpy")
+        return None
+    pos = book["positions"]
+    all_syms = list(dict.fromkeys(p["symbol"] for p in pos))
+    syms = [s for s in (symbols or all_syms) if s in all_syms]
+    qty_all = np.array([sum(p["qty"] for p in pos if p["symbol"] == s) for s in all_syms])
+    px_all = np.array([next(p["price"] for p in pos if p["symbol"] == s) for s in all_syms])
+    usd_all = np.array([next(p["currency"] for p in pos if p["symbol"] == s) == "USD" for s in all_syms])
+    W = np.asarray(targets, dtype=float) / 100
+    M = 1 + np.asarray(price_moves, dtype=float) / 100
+    F = np.asarray(fx_rates, dtype=float)
+    S = np.asarray(swings, dtype=float) / 100
+
+    # 기준 가격에서 환율별 종목 원화 평가액 [전체 종목, F] → 총자산 [F]
+    base_val_all = (qty_all * px_all)[:, None] * np.where(usd_all[:, None], F[None, :], 1.0)
+    base_total = book["cash_krw"] + base_val_all.sum(axis=0)
+    idx = np.array([all_syms.index(s) for s in syms], dtype=int)
+    qty, fx_mult = qty_all[idx], np.where(usd_all[idx][:, None], F[None, :], 1.0)        # [Y], [Y,F]
+    price = px_all[idx][:, None, None] * M[None, :, None] * fx_mult[:, None, :]          # [Y,M,F] 원화 주가
+    value = qty[:, None, None] * price                                                   # [Y,M,F]
+    total = base_total[None, None, :] - base_val_all[idx][:, None, :] + value            # [Y,M,F]
+    weight_now = value / total
+
+    # 목표 비중 매매 [Y,W,M,F] (+ 0.0: -0 제거)
+    trade = np.trunc((W[None, :, None, None] * total[:, None] - value[:, None]) / price[:, None]) + 0.0
+    trade = np.maximum(trade, -qty[:, None, None, None])
+    held = qty[:, None, None, None] + trade
+    weight_after = held * price[:, None] / total[:, None]
+    # 스윙: 매매 후 보유량의 s% 매도 [Y,W,M,F,S] — 셀 수가 가장 큰 배열이라 float32
+    swing_shares = np.floor(held[..., None] * S).astype(np.float32)
+    px5 = price[:, None, :, :, None].astype(np.float32)
+    swing_cash = swing_shares * px5
+    weight_after_swing = (held[..., None].astype(np.float32) - swing_shares) * px5 / total[:, None, :, :, None].astype(np.float32)
+    # 현재 보유 그대로 스윙했을 때 [Y,S], [Y,M,F,S]
+    swing_now_shares = np.floor(qty[:, None] * S)
+    weight_after_swing_now = (qty[:, None, None, None] - swing_now_shares[:, None, None, :]) * price[..., None] / total[..., None]
+
+    # 계좌별: 매매 주수를 계좌 보유 비율로 배분 (절사 나머지는 보유량이 가장 큰 계좌), 계좌 내 비중 (같은 가격·환율 축)
+    accounts = list(dict.fromkeys(p["account"] for p in pos))
+    acct_rows = [p for p in pos if p["symbol"] in syms]
+    acct_value = {a: np.zeros((len(M), len(F))) for a in accounts}
+    acct_cash = {a: 0.0 for a in accounts}
+    if valuation.CASH_ACCOUNT in acct_cash:
+        acct_cash[valuation.CASH_ACCOUNT] = book["cash_krw"]  # config cash_krw는 법인 계좌 현금 — 평가 표 현금 행과 같은 계좌
+    for p in pos:
+        mult = np.where(p["currency"] == "USD", F, 1.0)[None, :]
+        acct_value[p["account"]] = acct_value[p["account"]] + p["qty"] * p["price"] * mult
+    acct_total_base = {a: acct_value[a] + acct_cash[a] for a in accounts}                # [M,F] (기준가)
+    account_trade, account_weight_now, account_weight_after = [None] * len(acct_rows), [], []
+    for y, sym in enumerate(syms):
+        rows = [i for i, p in enumerate(acct_rows) if p["symbol"] == sym]
+        main_row = max(rows, key=lambda i: acct_rows[i]["qty"])
+        for i in rows:
+            if i != main_row:
+                share = acct_rows[i]["qty"] / qty[y] if qty[y] else 0.0
+                account_trade[i] = np.trunc(trade[y] * share) + 0.0                     # [W,M,F]
+        account_trade[main_row] = trade[y] - sum(account_trade[i] for i in rows if i != main_row)
+    for i, p in enumerate(acct_rows):
+        y = syms.index(p["symbol"])
+        pv = p["qty"] * price[y]                                                         # [M,F]
+        base_pv = p["qty"] * p["price"] * (F[None, :] if p["currency"] == "USD" else 1.0)
+        a_total = acct_total_base[p["account"]] - base_pv + pv
+        account_weight_now.append(pv / a_total)
+        account_weight_after.append((p["qty"] + account_trade[i]) * price[y][None] / a_total[None])
+    cells = len(syms) * W.size * M.size * F.size * S.size
+    return {
+        "symbols": syms, "targets": list(targets), "price_moves": list(price_moves), "fx_rates": list(fx_rates),
+        "swings": list(swings), "cells": cells, "missing": book["missing"],
+        "positions": [{"account": p["account"], "symbol": p["symbol"], "name": p["name"], "qty": p["qty"]} for p in acct_rows],
+        "price_krw": price, "value": value, "total": total, "weight_now": weight_now,
+        "trade": trade, "weight_after": weight_after,
+        "swing_shares": swing_shares, "swing_cash": swing_cash, "weight_after_swing": weight_after_swing,
+        "swing_now_shares": swing_now_shares, "weight_after_swing_now": weight_after_swing_now,
+        "account_trade": account_trade, "account_weight_now": account_weight_now, "account_weight_after": account_weight_after,
+    }
+
+
+def _nearest(values, x):
+    return min(range(len(values)), key=lambda i: abs(values[i] - x))
+
+
+def format_symbol(result, symbol, base_fx, focus_target=None):
+    """종목 하나 요약: (1) 기준가·기준 환율에서 목표 비중별 매매 (2) 스윙 크기별 (3) 목표 비중 하나의 가격 × 환율 민감도."""
+    y = result["symbols"].index(symbol)
+    m0, f0 = _nearest(result["price_moves"], 0.0), _nearest(result["fx_rates"], base_fx)
+    price, total = result["price_krw"][y, m0, f0], result["total"][y, m0, f0]
+    pos = [(i, p) for i, p in enumerate(result["positions"]) if p["symbol"] == symbol]
+    lines = [f"### {symbol}  보유 {sum(p['qty'] for _, p in pos):,.0f}주, 현재 비중 {result['weight_now'][y, m0, f0] * 100:.1f}% "
+             f"(총자산 {total / EOK:,.2f}억, 주가 {price:,.0f}원, 환율 {result['fx_rates'][f0]:,.1f})",
+             "", "| 목표 비중 | 매매 주수 | " + " | ".join(f"{p['account']}" for _, p in pos) + " | 매매 금액(억) | 매매 후 비중 |",
+             "|---|---|" + "---|" * len(pos) + "---|---|"]
+    for w, target in enumerate(result["targets"]):
+        t = result["trade"][y, w, m0, f0]
+        accts = " | ".join(f"{result['account_trade'][i][w, m0, f0]:+,.0f}" for i, _ in pos)
+        lines.append(f"| {target:g}% | {t:+,.0f} | {accts} | {t * price / EOK:+,.2f} | {result['weight_after'][y, w, m0, f0] * 100:.1f}% |")
+    w_cur = _nearest(result["targets"], result["weight_now"][y, m0, f0] * 100)
+    lines += ["", "스윙 (현재 보유 기준)", "", "| 스윙 | 매도 주수 | 확보 현금(억) | 매도 후 비중 |", "|---|---|---|---|"]
+    for s, swing in enumerate(result["swings"]):
+        n = result["swing_now_shares"][y, s]
+        lines.append(f"| {swing:g}% | {n:,.0f} | {n * price / EOK:,.2f} | {result['weight_after_swing_now'][y, m0, f0, s] * 100:.1f}% |")
+    wf = _nearest(result["targets"], focus_target if focus_target is not None else result["targets"][w_cur])
+    fx_cols = result["fx_rates"]
+    lines += ["", f"목표 {result['targets'][wf]:g}% 매매 주수 — 가격 변동 × 환율", "",
+              "| 가격 \\ 환율 | " + " | ".join(f"{fx:,.0f}" for fx in fx_cols) + " |", "|---|" + "---|" * len(fx_cols)]
+    for m, move in enumerate(result["price_moves"]):
+        lines.append(f"| {move:+g}% | " + " | ".join(f"{result['trade'][y, wf, m, f]:+,.0f}" for f in range(len(fx_cols))) + " |")
+    return "\n".join(lines)
+
+
+def summary_json(result, base_fx):
+    """기준가·기준 환율 셀만 추린 JSON용 dict (전체 배열은 크므로 제외)."""
+    m0, f0 = _nearest(result["price_moves"], 0.0), _nearest(result["fx_rates"], base_fx)
+    out = {"cells": result["cells"], "missing": result["missing"], "fx": result["fx_rates"][f0], "symbols": {}}
+    for y, sym in enumerate(result["symbols"]):
+        out["symbols"][sym] = {
+            "weight_now": float(result["weight_now"][y, m0, f0]) * 100,
+            "targets": {f"{t:g}": {"trade": int(result["trade"][y, w, m0, f0]),
+                                   "weight_after": float(result["weight_after"][y, w, m0, f0]) * 100}
+                        for w, t in enumerate(result["targets"])},
+        }
+    return out
+
+
+def load_live(args):
+    """config.json 보유 종목 + 현재 가격·환율 (3ai 스크립트와 같은 조회·평가 함수). --price·--fx-base가 있으면 그 값 우선."""
+    import generate_portfolio_report_3ai as gen
+    holdings = gen.get_portfolio_holdings()
+    if not holdings:
+        print("[ERROR] config.json에 portfolio_holdings 없음")
+        return None, None, None
+    prices = {}
+    for item in args.price or []:
+        sym, _, val = item.partition("=")
+        prices[sym.strip()] = float(val)
+    fx = args.fx_base or gen.fetch_usd_krw_rate()
+    if not fx:
+        print("[ERROR] 환율 조회 실패 (--fx-base로 지정)")
+        return None, None, None
+    need = {p["symbol"]: (p.get("currency") or "USD").upper() for p in holdings["positions"] if p["symbol"] not in prices}
+    us = [s for s, c in need.items() if c == "USD"]
+    kr = [s for s, c in need.items() if c != "USD"]
+    if us:
+        for sym, px in gen.fetch_us_stock_prices(us).items():
+            if gen._best_usd_price(px) is not None:
+                prices[sym] = gen._best_usd_price(px)
+    if kr:
+        prices.update(gen.fetch_kr_stock_prices(kr))
+    return holdings, fx, prices
+
+
+def main():
+    parser = argparse.ArgumentParser(description="보유 종목 목표 비중 × 가격 × 환율 × 스윙 그리드")
+    parser.add_argument("--symbols", default=None, help="쉼표 구분 종목 (기본: 가격 있는 전 종목)")
+    parser.add_argument("--targets", default=DEFAULT_TARGETS, help=f"목표 비중 %% (기본 {DEFAULT_TARGETS})")
+    parser.add_argument("--price-moves", default=DEFAULT_PRICE_MOVES, help=f"기준가 대비 가격 변동 %% (기본 {DEFAULT_PRICE_MOVES}, 음수로 시작하면 --price-moves=-20:20:5)")
+    parser.add_argument("--fx", default=None, help=f"환율 목록 또는 범위 (기본: 기준 환율 {DEFAULT_FX_SPREAD}%%)")
+    parser.add_argument("--swings", default=DEFAULT_SWINGS, help=f"스윙 크기 %% (기본 {DEFAULT_SWINGS})")
+    parser.add_argument("--focus-target", type=float, default=None, help="민감도 표에 쓸 목표 비중 %% (기본: 현재 비중에 가장 가까운 값)")
+    parser.add_argument("--price", action="append", default=None, help="SYMBOL=현지 통화 가격 (조회 대신 지정, 반복)")
+    parser.add_argument("--fx-base", type=float, default=None, help="기준 USD/KRW 환율 (조회 대신 지정)")
+    parser.add_argument("--json", action="store_true", help="기준가·기준 환율 셀 요약 JSON 출력")
+    args = parser.parse_args()
+    common.utf8_stdout()
+    try:
+        targets, moves, swings = parse_axis(args.targets), parse_axis(args.price_moves), parse_axis(args.swings)
+    except ValueError as e:
+        print(f"[ERROR] 축 형식 오류: {e}")
+        return 1
+    holdings, fx, prices = load_live(args)
+    if holdings is None:
+        return 1
+    book = build_book(holdings, fx, prices)
+    if book["missing"]:
+        print(f"[WARNING] 가격 없는 종목 제외 (평가액 0): {', '.join(book['missing'])} — --price SYMBOL=가격으로 지정 가능")
+    fx_rates = parse_axis(args.fx) if args.fx else [round(fx * (1 + d / 100), 2) for d in parse_axis(DEFAULT_FX_SPREAD)]
+    symbols = [s.strip() for s in args.symbols.split(",")] if args.symbols else None
+    if common.numpy() is None:
+        print("[ERROR] numpy 미설치. 설치: pip install numpy")
+        return 1
+    t0 = time.perf_counter()  # numpy 임포트 제외, 그리드 계산만
+    result = evaluate(book, targets, moves, fx_rates, swings, symbols)
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    if result is None:
+        return 1
+    if not result["symbols"]:
+        print("[ERROR] 계산할 종목 없음 (가격 조회 실패 또는 --symbols 확인)")
+        return 1
+    if args.json:
+        print(json.dumps(summary_json(result, fx), ensure_ascii=False, indent=2))
+        return 0
+    for sym in result["symbols"]:
+        print(format_symbol(result, sym, fx, args.focus_target))
+        print()
+    print(f"(그리드 {result['cells']:,}셀 = 종목 {len(result['symbols'])} × 목표 {len(targets)} × 가격 {len(moves)} × "
+          f"환율 {len(fx_rates)} × 스윙 {len(swings)}, {elapsed_ms:.1f}ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
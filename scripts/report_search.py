@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+보고서 전문 검색 색인 (SQLite FTS5 + BM25, 증분)
+
+report/portfolio_report_*.md 전체와 중간 데이터(report/YYYYMMDD_HHMM/step*.md의 '## 출력' 이후)를 제목 단위 구절(최대 약 1,500자)로
+나눠 report/cache/report_search.sqlite3 에 역색인으로 저장한다. discuss_report.py --search가 질문마다 관련 구절만 꺼내 프롬프트에 붙임.
+- 토큰: 영문·숫자는 단어(소문자, '12.8' 같은 소수는 한 토큰), 한글은 2글자 단위(bigram) → 조사가 붙어도 '감쇠를'·'감쇠' 매칭
+- 순위: FTS5 bm25 (구절 제목 가중 2배), 보고서와 step3 출력처럼 본문이 같은 구절은 한 번만
+- 증분: 파일 (mtime, 크기)가 색인과 같으면 건너뛰고, 바뀐 파일은 구절을 지우고 다시 넣음, 없어진 파일은 삭제
+- 중간 데이터의 시스템·유저 프롬프트는 실행마다 거의 같아 색인하지 않음 (출력만)
+- usage_ledger.py·snapshot_store.py와 같은 WAL + busy_timeout. FTS5가 없는 SQLite면 경고 후 검색 없이 동작
+
+사용법:
+    python report_search.py                              # 색인 갱신 + 통계
+    python report_search.py "TSLA 감쇠 75%" -k 5          # 관련 구절 상위 5개
+    python report_search.py "Bear 시나리오 비중" --kind report --json
+    python report_search.py --rebuild                    # 색인 전체 다시 만들기
+"""
+
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from pathlib import Path
+
+import common
+import cagr_archive
+
+PROJECT_ROOT = Path(__file__).parent.parent
+REPORTS_DIR = PROJECT_ROOT / "report"
+INDEX_FILE = REPORTS_DIR / "cache" / "report_search.sqlite3"
+# 토큰화·구절 나누기가 바뀌면 올림 → 기존 색인을 지우고 다시 만듦
+INDEX_VERSION = 1
+
+# 동시 실행 시 잠금 대기 (ms). usage_ledger.py와 같음.
+BUSY_TIMEOUT_MS = 30000
+PASSAGE_CHARS = 1500
+DEFAULT_K = 8
+DEFAULT_CONTEXT_CHARS = 6000
+HEADING_WEIGHT = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    path     TEXT    NOT NULL UNIQUE,
+    run_key  TEXT,
+    kind     TEXT    NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size     INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS passages (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    doc_ref INTEGER NOT NULL REFERENCES docs (id),
+    line    INTEGER NOT NULL,
+    heading TEXT,
+    text    TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_passages_doc ON passages (doc_ref);
+CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5 (heading, body, tokenize = "unicode61 tokenchars '.'");
+"""
+
+_RUN_DIR = re.compile(r"^\d{8}_\w+$")
+_HEADING = re.compile(r"^(#{1,4})\s+(.+?)\s*#*\s*$")
+_WORD = re.compile(r"\d+(?:\.\d+)?|[a-z][a-z0-9]*|[가-힣]+")
+_OUTPUT_MARK = "\n## 출력\n"
+
+
+def tokens(text):
+    """검색 토큰 목록 (색인·질의 공용). 영문·숫자 단어 + 한글 2글자 단위."""
+    out = []
+    for w in _WORD.findall(text.lower()):
+        if len(w) > 2 and "가" <= w[0] <= "힣":
+            out.extend(w[i:i + 2] for i in range(len(w) - 1))
+        else:
+            out.append(w)
+    return out
+
+
+def _fts_query(query):
+    """질문 → FTS5 MATCH 식 (토큰 OR, 따옴표로 감싸 문법 문자 무시). 토큰이 없으면 None."""
+    terms = list(dict.fromkeys(tokens(query)))
+    return " OR ".join(f'"{t}"' for t in terms) if terms else None
+
+
+def split_passages(text, first_line=1):
+    """마크다운 → [(시작 줄 번호, 제목 경로, 본문), ...]. 제목(#~####)마다 나누고, 길면 빈 줄에서 PASSAGE_CHARS 근처로 나눔."""
+    out, stack, buf, size, start = [], [], [], 0, first_line
+
+    def flush():
+        body = "\n".join(buf).strip()
+        if body:
+            out.append((start, " › ".join(h for _, h in stack), body))
+
+    for i, line in enumerate(text.split("\n"), first_line):
+        m = _HEADING.match(line)
+        if m:
+            flush()
+            level = len(m.group(1))
+            stack = [(lv, h) for lv, h in stack if lv < level] + [(level, m.group(2))]
+            buf, size, start = [], 0, i + 1
+            continue
+        if size >= PASSAGE_CHARS and (not line.strip() or size >= 2 * PASSAGE_CHARS):
+            flush()
+            buf, size, start = [], 0, i
+        buf.append(line)
+        size += len(line) + 1
+    flush()
+    return out
+
+
+def _documents(reports_dir):
+    """색인 대상 → [(파일, 실행 키, 종류 'report' 또는 단계 id), ...]."""
+    docs = [(p, cagr_archive.run_key(p.name), "report") for p in sorted(reports_dir.glob("portfolio_report_*.md"))]
+    for d in sorted(reports_dir.iterdir()):
+        if d.is_dir() and _RUN_DIR.match(d.name):
+            docs += [(f, d.name, f.stem) for f in sorted(d.glob("step*.md"))]
+    return docs
+
+
+def _read_passages(path, kind):
+    text = path.read_text(encoding="utf-8", errors="replace")
+    if kind == "report":
+        return split_passages(text)
+    i = text.rfind(_OUTPUT_MARK)
+    if i < 0:
+        return []
+    return split_passages(text[i + len(_OUTPUT_MARK):], text.count("\n", 0, i) + 3)
+
+
+def connect(path=None):
+    """검색 색인 DB 연결. 없거나 INDEX_VERSION이 다르면 스키마 (다시) 생성. FTS5가 없으면 sqlite3.OperationalError."""
+    path = Path(path) if path else INDEX_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+        conn.executescript("DROP TABLE IF EXISTS passages_fts; DROP TABLE IF EXISTS passages; DROP TABLE IF EXISTS docs;")
+        conn.executescript(_SCHEMA)
+        conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+    return conn
+
+
+def _drop_doc(conn, doc_id):
+    conn.execute("DELETE FROM passages_fts WHERE rowid IN (SELECT id FROM passages WHERE doc_ref = ?)", (doc_id,))
+    conn.execute("DELETE FROM passages WHERE doc_ref = ?", (doc_id,))
+    conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+
+
+def update(reports_dir=None, path=None, rebuild=False):
+    """새로 생기거나 바뀐 파일만 다시 색인하고 없어진 파일은 삭제. 파일 단위 트랜잭션.
+    반환: {"indexed", "removed", "docs", "passages"} 또는 None (FTS5 없음 등 실패 시 경고만)."""
+    reports_dir = Path(reports_dir) if reports_dir else REPORTS_DIR
+    try:
+        conn = connect(path)
+    except sqlite3.Error as e:
+        print(f"[WARNING] 보고서 검색 색인 사용 불가: {e}")
+        return None
+    stats = {"indexed": 0, "removed": 0}
+    try:
+        if rebuild:
+            with conn:
+                conn.executescript("DELETE FROM passages_fts; DELETE FROM passages; DELETE FROM docs;")
+        known = {r["path"]: (r["id"], r["mtime_ns"], r["size"]) for r in conn.execute("SELECT id, path, mtime_ns, size FROM docs")}
+        seen = set()
+        for f, key, kind in _documents(reports_dir):
+            rel = f.relative_to(reports_dir).as_posix()
+            seen.add(rel)
+            st = f.stat()
+            prev = known.get(rel)
+            if prev and prev[1:] == (st.st_mtime_ns, st.st_size):
+                continue
+            try:
+                passages = _read_passages(f, kind)
+            except OSError as e:
+                print(f"[WARNING] 검색 색인 읽기 실패 ({rel}): {e}")
+                continue
+            with conn:
+                if prev:
+                    _drop_doc(conn, prev[0])
+                doc_id = conn.execute(
+                    "INSERT INTO docs (path, run_key, kind, mtime_ns, size) VALUES (?, ?, ?, ?, ?)",
+                    (rel, key, kind, st.st_mtime_ns, st.st_size),
+                ).lastrowid
+                for line, heading, body in passages:
+                    pid = conn.execute("INSERT INTO passages (doc_ref, line, heading, text) VALUES (?, ?, ?, ?)",
+                                       (doc_id, line, heading, body)).lastrowid
+                    conn.execute("INSERT INTO passages_fts (rowid, heading, body) VALUES (?, ?, ?)",
+                                 (pid, " ".join(tokens(heading)), " ".join(tokens(body))))
+            stats["indexed"] += 1
+        with conn:
+            for rel in set(known) - seen:
+                _drop_doc(conn, known[rel][0])
+                stats["removed"] += 1
+        stats["docs"] = conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        stats["passages"] = conn.execute("SELECT COUNT(*) FROM passages").fetchone()[0]
+        return stats
+    except sqlite3.Error as e:
+        print(f"[WARNING] 보고서 검색 색인 갱신 실패: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def search(query, k=DEFAULT_K, kind=None, exclude_runs=(), path=None):
+    """질문과 관련된 구절 상위 k개 (BM25 순). kind: 'report' | 'step' | None(전체), exclude_runs: 뺄 실행 키.
+    반환: [{"path", "run_key", "kind", "line", "heading", "text", "score"}, ...] (score 클수록 관련, 실패 시 [])."""
+    match = _fts_query(query)
+    if not match or k <= 0:
+        return []
+    sql = ("SELECT d.path, d.run_key, d.kind, p.line, p.heading, p.text, bm25(passages_fts, ?, 1.0) AS score"
+           " FROM passages_fts JOIN passages p ON p.id = passages_fts.rowid JOIN docs d ON d.id = p.doc_ref"
+           " WHERE passages_fts MATCH ?")
+    params = [HEADING_WEIGHT, match]
+    if kind == "report":
+        sql += " AND d.kind = 'report'"
+    elif kind == "step":
+        sql += " AND d.kind != 'report'"
+    if exclude_runs:
+        sql += f" AND d.run_key NOT IN ({', '.join('?' * len(exclude_runs))})"
+        params += list(exclude_runs)
+    sql += " ORDER BY score LIMIT ?"
+    params.append(k * 3)  # 같은 본문(보고서·step3 출력) 중복 제거 여유분
+    try:
+        conn = connect(path)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"[WARNING] 보고서 검색 실패: {e}")
+        return []
+    hits, seen = [], set()
+    for r in rows:
+        if r["text"] in seen:
+            continue
+        seen.add(r["text"])
+        hits.append({**dict(r), "score": round(-r["score"], 3)})
+        if len(hits) >= k:
+            break
+    return hits
+
+
+def run_label(run_key):
+    """실행 키 → 표시용 날짜 ('20260204_1016' → '2026-02-04 10:16', '20260123_auto' → '2026-01-23 (auto)')."""
+    m = re.match(r"^(\d{4})(\d{2})(\d{2})_(\d{2})(\d{2})$", run_key or "")
+    if m:
+        return "{}-{}-{} {}:{}".format(*m.groups())
+    m = re.match(r"^(\d{4})(\d{2})(\d{2})_(.+)$", run_key or "")
+    return "{}-{}-{} ({})".format(*m.groups()) if m else (run_key or "-")
+
+
+def format_for_prompt(hits, max_chars=DEFAULT_CONTEXT_CHARS):
+    """검색 구절 → 대화 사용자 메시지에 붙일 블록 (작성순 정렬, 합계 max_chars 이내). hits가 비면 None."""
+    if not hits:
+        return None
+    picked, used = [], 0
+    for h in hits:  # 관련도 순으로 예산 안에서 고른 뒤 작성순으로 표시
+        if picked and used + len(h["text"]) > max_chars:
+            continue
+        picked.append(h)
+        used += len(h["text"])
+    picked.sort(key=lambda h: (h["run_key"] or "", h["path"], h["line"]))
+    lines = [f"=== 관련 과거 보고서 구절 (검색 색인 상위 {len(picked)}개, 작성순) ==="]
+    for n, h in enumerate(picked, 1):
+        text = h["text"] if len(h["text"]) <= max_chars else h["text"][:max_chars] + " …"
+        lines += [f"[{n}] {run_label(h['run_key'])} · {h['path']}:{h['line']} · {h['heading'] or '-'}", text, ""]
+    lines.append("=== 구절 끝 ===")
+    return "\n".join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="보고서 전문 검색 (report/ 증분 BM25 색인)")
+    parser.add_argument("query", nargs="?", default=None, help="검색어 (없으면 색인 갱신·통계만)")
+    parser.add_argument("-k", type=int, default=DEFAULT_K, help=f"구절 수 (기본 {DEFAULT_K})")
+    parser.add_argument("--kind", choices=["report", "step"], default=None, help="보고서만 또는 중간 데이터만")
+    parser.add_argument("--rebuild", action="store_true", help="색인 전체 다시 만들기")
+    parser.add_argument("--json", action="store_true", help="JSON 출력")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    common.utf8_stdout()
+    t0 = time.perf_counter()
+    stats = update(rebuild=args.rebuild)
+    if stats is None:
+        return 1
+    t1 = time.perf_counter()
+    if not args.query:
+        print(f"[검색 색인] 파일 {stats['docs']}개 · 구절 {stats['passages']}개 (이번에 색인 {stats['indexed']}개, 삭제 {stats['removed']}개, "
+              f"{(t1 - t0) * 1000:.0f}ms) → {INDEX_FILE}")
+        return 0
+    hits = search(args.query, args.k, args.kind)
+    elapsed_ms = (time.perf_counter() - t1) * 1000
+    if args.json:
+        print(json.dumps(hits, ensure_ascii=False, indent=2))
+        return 0
+    print(f"[검색] \"{args.query}\" → {len(hits)}개 ({elapsed_ms:.1f}ms, 색인 갱신 {stats['indexed']}개)")
+    for h in hits:
+        preview = " ".join(h["text"].split())
+        print(f"\n  {h['score']:6.2f}  {run_label(h['run_key'])}  {h['path']}:{h['line']}\n          {h['heading'] or '-'}\n"
+              f"          {preview[:200]}{' …' if len(preview) > 200 else ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+포트폴리오 리스크 지표 (Step 1 실시간 데이터·Step 2 리스크 감사용)
+
+Gemini(리스크 감사관)가 검색·서술만으로 하던 리스크 판단에 근거 숫자를 준다. 캐시된 일봉(swing_rules.load_daily_history,
+보유 종목 + SPY + USDKRW)을 날짜 합집합으로 맞춘 원화 환산 일간 수익률 행렬 [일×종목] 하나로 종목 축을 한 번에 계산한다.
+
+- 종목: 연 변동성(√252), SPY 베타(원화 환산 SPY 대비), 위험 기여도(wᵢ(Σw)ᵢ / wᵀΣw), 상관행렬
+- 포트폴리오: 연 변동성, 1일 VaR·CVaR 95/99% (과거 수익률 분포, 현재 비중 고정), 베타, 구간 최대 낙폭
+- 집중도: 최대 종목·상위 3종목 비중, HHI(Σw², 현금 포함), 유효 종목 수(1/HHI)
+- 비중: 마지막 공통 거래일 종가 × 수량 (같은 계좌 종목은 합산), 현금 비중 포함 (수익률 0)
+- 결과는 거래일·보유 구성별로 report/cache/risk_metrics.json에 저장, 같은 날 다시 부르면 재사용
+- numpy 필수
+
+사용법:
+    python risk_metrics.py                        # config.json 보유 종목, 최근 252거래일
+    python risk_metrics.py --lookback 504 --json
+"""
+
+import sys
+import json
+import math
+import hashlib
+import argparse
+from pathlib import Path
+
+import common
+import swing_rules
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CACHE_FILE = PROJECT_ROOT / "report" / "cache" / "risk_metrics.json"
+
+BENCHMARK = "SPY"
+FX_TICKER = "KRW=X"
+LOOKBACK_DAYS = 252
+TRADING_DAYS = 252
+VAR_LEVELS = (95, 99)
+MIN_DAYS = 60  # 이보다 짧으면 지표 생략 (분위수·상관이 불안정)
+
+
+def _align(np, history, symbols):
+    """{symbol: {"dates", "close"}} → (날짜 합집합, 종가 [일×종목]). 휴장일은 직전 종가로 채우고, 전 종목 값이 생긴 날부터."""
+    dates = sorted({d for s in symbols for d in history[s]["dates"]})
+    index = {d: i for i, d in enumerate(dates)}
+    close = np.full((len(dates), len(symbols)), np.nan)
+    for k, s in enumerate(symbols):
+        close[[index[d] for d in history[s]["dates"]], k] = history[s]["close"]
+    for i in range(1, len(dates)):
+        gap = np.isnan(close[i])
+        close[i, gap] = close[i - 1, gap]
+    start = int(np.argmax(~np.isnan(close).any(axis=1)))
+    return dates[start:], close[start:]
+
+
+def holdings_key(holdings, lookback):
+    """캐시 키: 보유 종목·수량·현금·기간."""
+    positions = sorted((p.get("symbol") or "", (p.get("currency") or "USD").upper(), float(p.get("qty") or 0))
+                       for p in holdings.get("positions") or [])
+    raw = json.dumps([positions, float(holdings.get("cash_krw") or 0), lookback])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def compute(history, holdings, lookback=LOOKBACK_DAYS):
+    """리스크 지표 dict. history는 보유 종목 + BENCHMARK + FX_TICKER 일봉. numpy 없거나 이력이 짧으면 None."""
+    np = common.numpy()
+    if np is None:
+        print("[WARNING] numpy 미설치. 리스크 지표 계산 생략. 설치: pip install numpy")
+        return None
+    positions = holdings.get("positions") or []
+    qty, usd, names = {}, set(), {}
+    for p in positions:
+        s = p["symbol"]
+        qty[s] = qty.get(s, 0.0) + float(p.get("qty") or 0)
+        names.setdefault(s, p.get("name") or s)
+        if (p.get("currency") or "USD").upper() == "USD":
+            usd.add(s)
+    missing = [s for s in list(qty) + [BENCHMARK, FX_TICKER] if s not in history]
+    if FX_TICKER in missing or BENCHMARK in missing:
+        print(f"[WARNING] {', '.join(s for s in (FX_TICKER, BENCHMARK) if s in missing)} 일봉 없음 - 리스크 지표 생략")
+        return None
+    symbols = [s for s in qty if s in history]
+    if missing:
+        print(f"[WARNING] 일봉 없는 종목은 리스크 지표에서 빠짐: {', '.join(missing)}")
+    if not symbols:
+        return None
+    dates, close = _align(np, history, symbols + [BENCHMARK, FX_TICKER])
+    dates, close = dates[-(lookback + 1):], close[-(lookback + 1):]
+    if len(dates) <= MIN_DAYS:
+        print(f"[WARNING] 공통 일봉 {len(dates)}일 — 리스크 지표에 부족 (최소 {MIN_DAYS + 1}일)")
+        return None
+    fx = close[:, -1:]
+    is_usd = np.array([s in usd for s in symbols] + [True])
+    krw = close[:, :-1] * np.where(is_usd, fx, 1.0)  # [일×(종목+SPY)] 원화 환산
+    ret = krw[1:] / krw[:-1] - 1
+    r, bench = ret[:, :-1], ret[:, -1]
+
+    value = krw[-1, :-1] * np.array([qty[s] for s in symbols])
+    cash = float(holdings.get("cash_krw") or 0)
+    total = float(value.sum()) + cash
+    w = value / total
+    cov = np.cov(r, rowvar=False).reshape(len(symbols), len(symbols))
+    sd = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = np.where(np.outer(sd, sd) > 0, cov / np.outer(sd, sd), 0.0)
+    np.fill_diagonal(corr, 1.0)
+    b_var = float(bench.var(ddof=1))
+    beta = ((r - r.mean(axis=0)).T @ (bench - bench.mean())) / (len(bench) - 1) / b_var if b_var > 0 else np.zeros(len(symbols))
+    port_var = float(w @ cov @ w)
+    contrib = w * (cov @ w) / port_var if port_var > 0 else np.zeros(len(symbols))
+
+    port = r @ w
+    var_cvar = {}
+    for level in VAR_LEVELS:
+        q = float(np.percentile(port, 100 - level))
+        tail = port[port <= q]
+        var_cvar[str(level)] = {"var_pct": -q * 100, "cvar_pct": -float(tail.mean()) * 100,
+                                   "var_krw": -q * total, "cvar_krw": -float(tail.mean()) * total}
+    curve = np.cumprod(1 + port)
+    drawdown = curve / np.maximum.accumulate(np.concatenate([[1.0], curve]))[1:] - 1
+
+    weights = np.append(w, cash / total)
+    hhi = float((weights ** 2).sum())
+    order = np.argsort(-w)
+    return {
+        "start": dates[0], "end": dates[-1], "days": len(port), "total_krw": total, "cash_pct": cash / total * 100,
+        "symbols": symbols, "names": [names[s] for s in symbols],
+        "weight_pct": (w * 100).tolist(), "vol_pct": (sd * math.sqrt(TRADING_DAYS) * 100).tolist(),
+        "beta": [float(x) for x in beta], "risk_contrib_pct": (contrib * 100).tolist(), "corr": corr.round(3).tolist(),
+        "portfolio": {
+            "vol_pct": math.sqrt(max(port_var, 0.0) * TRADING_DAYS) * 100, "beta": float(w @ beta),
+            "max_drawdown_pct": float(drawdown.min()) * 100, "var": var_cvar,
+        },
+        "concentration": {
+            "top": [{"symbol": symbols[i], "name": names[symbols[i]], "weight_pct": float(w[i] * 100)} for i in order[:3]],
+            "top3_pct": float(w[order[:3]].sum() * 100), "hhi": hhi, "effective_n": 1 / hhi if hhi > 0 else 0.0,
+        },
+    }
+
+
+def history_request(holdings, lookback=LOOKBACK_DAYS):
+    """필요한 일봉 (종목 목록, 연수): 보유 종목 + BENCHMARK + FX_TICKER, 스윙 스캔보다 짧지 않은 기간."""
+    symbols = list(dict.fromkeys(p["symbol"] for p in holdings.get("positions") or []))
+    return symbols + [BENCHMARK, FX_TICKER], max(swing_rules.SIGNAL_HISTORY_YEARS, math.ceil(lookback / TRADING_DAYS) + 1)
+
+
+def load(holdings, lookback=LOOKBACK_DAYS, cache_file=None, refresh=False, history=None):
+    """일봉 캐시 로드 → compute. 같은 거래일·같은 보유 구성 결과는 report/cache/risk_metrics.json에서 재사용.
+    history를 주면(3ai 스크립트가 스윙 스캔과 함께 한 번 조회) 다시 조회하지 않음."""
+    path = Path(cache_file) if cache_file else CACHE_FILE
+    key = holdings_key(holdings, lookback)
+    if history is None:
+        symbols, years = history_request(holdings, lookback)
+        history = swing_rules.load_daily_history(symbols, years, refresh=refresh)
+    if not history:
+        return None
+    last = max(d for h in history.values() for d in h["dates"][-1:])
+    cache = {}
+    if path.exists() and not refresh:
+        try:
+            cache = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            cache = {}
+    hit = (cache.get(key) or {})
+    if hit.get("last_date") == last and hit.get("result"):
+        return dict(hit["result"], cached=True)
+    result = compute(history, holdings, lookback)
+    if result is None:
+        return None
+    cache = {k: v for k, v in cache.items() if v.get("last_date") == last}  # 지난 거래일 항목은 버림
+    cache[key] = {"last_date": last, "result": result}
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(cache, ensure_ascii=False), encoding="utf-8")
+    except Exception as e:
+        print(f"[WARNING] 리스크 지표 캐시 저장 실패: {e}")
+    return dict(result, cached=False)
+
+
+def _eok(v):
+    return f"{v / 100_000_000:,.2f}억"
+
+
+def format_markdown(result, corr_pairs=5):
+    """종목 표 + 포트폴리오·집중도 요약 + 상관 높은 쌍."""
+    p, c = result["portfolio"], result["concentration"]
+    lines = [
+        f"기간 {result['start']} ~ {result['end']} ({result['days']}거래일, 원화 환산 일간 수익률), "
+        f"비중 기준 {result['end']} 종가, 현금 {result['cash_pct']:.1f}%",
+        "",
+        f"- 포트폴리오: 연 변동성 **{p['vol_pct']:.1f}%**, SPY 베타 **{p['beta']:.2f}**, 기간 최대 낙폭 {p['max_drawdown_pct']:.1f}%",
+    ]
+    for level, v in sorted(p["var"].items(), key=lambda kv: int(kv[0])):
+        lines.append(f"- 1일 VaR {level}%: **-{v['var_pct']:.2f}%** (약 {_eok(v['var_krw'])}), "
+                     f"CVaR {level}%: -{v['cvar_pct']:.2f}% (약 {_eok(v['cvar_krw'])})")
+    top = ", ".join(f"{t['name']} {t['weight_pct']:.1f}%" for t in c["top"])
+    lines.append(f"- 집중도: 상위 {top} (상위 3종목 {c['top3_pct']:.1f}%), HHI {c['hhi']:.3f}, 유효 종목 수 {c['effective_n']:.1f}")
+    lines += ["", "| 종목 | 비중 | 연 변동성 | SPY 베타 | 위험 기여도 |", "|---|---|---|---|---|"]
+    order = sorted(range(len(result["symbols"])), key=lambda i: -result["weight_pct"][i])
+    for i in order:
+        lines.append(f"| {result['names'][i]} | {result['weight_pct'][i]:.1f}% | {result['vol_pct'][i]:.1f}% | "
+                     f"{result['beta'][i]:.2f} | {round(result['risk_contrib_pct'][i], 1) + 0.0:.1f}% |")
+    n = len(result["symbols"])
+    pairs = sorted(((result["corr"][i][j], i, j) for i in range(n) for j in range(i + 1, n)), reverse=True)[:corr_pairs]
+    if pairs:
+        lines += ["", "상관 높은 쌍: " + ", ".join(f"{result['names'][i]}–{result['names'][j]} {v:.2f}" for v, i, j in pairs)]
+    return "\n".join(lines)
+
+
+def format_for_prompt(result):
+    """{{realtime_data}}·Step 2에 넣을 블록 (스크립트 계산 — 변동성·VaR·집중도는 이 값을 인용)."""
+    head = "**포트폴리오 리스크 지표 (스크립트 계산 — 변동성·VaR·베타·집중도는 이 값을 인용하고 별도 검색하지 말 것)**\n"
+    return head + format_markdown(result) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="포트폴리오 리스크 지표 (변동성·상관·VaR·베타·집중도)")
+    parser.add_argument("--lookback", type=int, default=LOOKBACK_DAYS, help=f"거래일 수 (기본 {LOOKBACK_DAYS})")
+    parser.add_argument("--cache", default=None, help="결과 캐시 JSON 경로 (기본 report/cache/risk_metrics.json)")
+    parser.add_argument("--refresh", action="store_true", help="캐시 무시하고 일봉·지표 다시 계산")
+    parser.add_argument("--json", action="store_true", help="JSON 출력")
+    args = parser.parse_args()
+    common.utf8_stdout()
+    holdings = common.load_config().get("portfolio_holdings") or {}
+    if not holdings.get("positions"):
+        print("[ERROR] config.json portfolio_holdings.positions 없음")
+        return 1
+    result = load(holdings, args.lookback, args.cache, args.refresh)
+    if result is None:
+        return 1
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(format_markdown(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+보고서 실행 메트릭 내보내기 (Prometheus textfile + JSON)
+
+3-AI 스크립트가 실행 끝에 run_trace span 목록을 넘기면 누적 카운터·히스토그램을 갱신해
+report/metrics/ 에 두 파일로 쓴다 (REPORT_METRICS_DIR로 변경 가능).
+- portfolio_report.prom : node_exporter textfile collector 등에서 그대로 수집
+- portfolio_report.json : 같은 누적값 (다음 실행이 읽어 이어서 누적)
+
+지표: 실행 수·실패, 실행/단계 소요 히스토그램(data_fetch 포함), HTTP 상태별 요청 수, 재시도·대기,
+폴백 모델 사용, provider 호출 실패, 토큰, 비용, 마지막 실행 시각·성공 여부·비용.
+
+사용법:
+    python run_metrics.py              # 현재 누적값을 Prometheus 형식으로 출력
+    python run_metrics.py --json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import common
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_METRICS_DIR = PROJECT_ROOT / "report" / "metrics"
+METRICS_ENV = "REPORT_METRICS_DIR"
+BASENAME = "portfolio_report"
+
+STEP_BUCKETS = [0.5, 1, 2, 5, 10, 20, 30, 60, 120, 180, 300, 600]
+RUN_BUCKETS = [30, 60, 120, 180, 300, 450, 600, 900, 1200, 1800]
+
+# 이름 → (type, help, buckets)
+METRICS = {
+    "portfolio_report_runs_total": ("counter", "보고서 실행 수 (mode, status별)", None),
+    "portfolio_report_run_duration_seconds": ("histogram", "실행 1회 전체 소요(초)", RUN_BUCKETS),
+    "portfolio_report_step_duration_seconds": ("histogram", "단계별 소요(초). step=data_fetch는 환율·주가 조회", STEP_BUCKETS),
+    "portfolio_report_http_requests_total": ("counter", "AI API HTTP 시도 수 (provider, status_code별)", None),
+    "portfolio_report_retries_total": ("counter", "429/503·네트워크 오류 재시도 수", None),
+    "portfolio_report_retry_wait_seconds_total": ("counter", "재시도 대기 합계(초)", None),
+    "portfolio_report_fallback_total": ("counter", "첫 후보가 아닌 모델/경로로 성공한 호출 수 (사용 모델별)", None),
+    "portfolio_report_call_failures_total": ("counter", "모든 폴백이 실패한 provider 호출 수", None),
+    "portfolio_report_tokens_total": ("counter", "토큰 수 (provider, model, direction=input|output)", None),
+    "portfolio_report_cost_usd_total": ("counter", "추정 비용 USD (provider, model)", None),
+    "portfolio_report_last_run_timestamp_seconds": ("gauge", "마지막 실행 종료 시각 (unix)", None),
+    "portfolio_report_last_run_success": ("gauge", "마지막 실행 성공 1 / 실패 0", None),
+    "portfolio_report_last_run_duration_seconds": ("gauge", "마지막 실행 소요(초)", None),
+    "portfolio_report_last_run_cost_usd": ("gauge", "마지막 실행 추정 비용 USD", None),
+}
+
+
+def metrics_dir(default=None):
+    """메트릭 출력 디렉터리 (REPORT_METRICS_DIR 우선)."""
+    return Path(os.environ.get(METRICS_ENV) or default or DEFAULT_METRICS_DIR)
+
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels):
+    """라벨 dict → Prometheus 라벨 문자열 (상태 파일 키로도 사용)."""
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items()) if v is not None)
+
+
+def load_state(directory):
+    path = Path(directory) / f"{BASENAME}.json"
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {"counters": {}, "histograms": {}, "gauges": {}}
+
+
+def _inc(state, name, value=1, **labels):
+    c = state["counters"].setdefault(name, {})
+    key = _labels(**labels)
+    c[key] = c.get(key, 0) + value
+
+
+def _observe(state, name, value, **labels):
+    buckets = METRICS[name][2]
+    h = state["histograms"].setdefault(name, {})
+    key = _labels(**labels)
+    cur = h.setdefault(key, {"buckets": [0] * len(buckets), "sum": 0.0, "count": 0})
+    for i, le in enumerate(buckets):
+        if value <= le:
+            cur["buckets"][i] += 1
+    cur["sum"] += value
+    cur["count"] += 1
+
+
+def _set(state, name, value, **labels):
+    state["gauges"].setdefault(name, {})[_labels(**labels)] = value
+
+
+def apply_spans(state, spans, mode="full"):
+    """run_trace span 목록 하나(실행 1회)를 누적 상태에 반영."""
+    by_parent = {}
+    for sp in spans:
+        by_parent.setdefault(sp["parent_id"], []).append(sp)
+    root = next((sp for sp in spans if sp["kind"] == "run"), None)
+    status = root["status"] if root else "error"
+    run_s = (root or {}).get("duration_s") or 0.0
+    _inc(state, "portfolio_report_runs_total", mode=mode, status=status)
+    _observe(state, "portfolio_report_run_duration_seconds", run_s, mode=mode)
+
+    run_cost = 0.0
+    for sp in spans:
+        kind, attrs = sp["kind"], sp["attrs"]
+        if kind == "step" and sp.get("duration_s") is not None:
+            _observe(state, "portfolio_report_step_duration_seconds", sp["duration_s"], step=sp["name"])
+        elif kind == "call":
+            models = [c for c in by_parent.get(sp["span_id"], []) if c["kind"] == "model"]
+            if sp["status"] != "ok":
+                _inc(state, "portfolio_report_call_failures_total", provider=sp["name"])
+            elif len(models) > 1:
+                _inc(state, "portfolio_report_fallback_total", provider=sp["name"], model=attrs.get("model"))
+        elif kind == "model":
+            provider = attrs.get("provider")
+            if attrs.get("retries"):
+                _inc(state, "portfolio_report_retries_total", attrs["retries"], provider=provider)
+                _inc(state, "portfolio_report_retry_wait_seconds_total", attrs.get("retry_wait_s", 0), provider=provider)
+            if attrs.get("input_tokens") is not None:
+                _inc(state, "portfolio_report_tokens_total", attrs["input_tokens"], provider=provider, model=sp["name"], direction="input")
+                _inc(state, "portfolio_report_tokens_total", attrs.get("output_tokens", 0), provider=provider, model=sp["name"], direction="output")
+            if attrs.get("cost_usd") is not None:
+                _inc(state, "portfolio_report_cost_usd_total", attrs["cost_usd"], provider=provider, model=sp["name"])
+                run_cost += attrs["cost_usd"]
+            for h in by_parent.get(sp["span_id"], []):
+                if h["kind"] == "http":
+                    code = h["attrs"].get("status_code", "error")
+                    _inc(state, "portfolio_report_http_requests_total", provider=provider, status_code=code)
+
+    _set(state, "portfolio_report_last_run_timestamp_seconds", int(time.time()), mode=mode)
+    _set(state, "portfolio_report_last_run_success", 1 if status == "ok" else 0, mode=mode)
+    _set(state, "portfolio_report_last_run_duration_seconds", round(run_s, 3), mode=mode)
+    _set(state, "portfolio_report_last_run_cost_usd", round(run_cost, 6), mode=mode)
+    return state
+
+
+def format_prometheus(state):
+    """누적 상태 → Prometheus text exposition 형식."""
+    lines = []
+    for name, (mtype, help_text, buckets) in METRICS.items():
+        series = (state["histograms"] if mtype == "histogram" else state["counters"] if mtype == "counter" else state["gauges"]).get(name)
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {mtype}")
+        for key, val in sorted(series.items()):
+            if mtype != "histogram":
+                lines.append(f"{name}{{{key}}} {val}" if key else f"{name} {val}")
+                continue
+            sep = "," if key else ""
+            for le, cnt in zip(buckets, val["buckets"]):
+                lines.append(f'{name}_bucket{{{key}{sep}le="{le}"}} {cnt}')
+            lines.append(f'{name}_bucket{{{key}{sep}le="+Inf"}} {val["count"]}')
+            lines.append(f"{name}_sum{{{key}}} {round(val['sum'], 6)}" if key else f"{name}_sum {round(val['sum'], 6)}")
+            lines.append(f"{name}_count{{{key}}} {val['count']}" if key else f"{name}_count {val['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def _atomic_write(path, text):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def record_run(spans, mode="full", directory=None):
+    """실행 1회 반영 후 .prom·.json 갱신. 반환: .prom 경로 (실패 시 None, 경고만 출력)."""
+    try:
+        d = metrics_dir(directory)
+        d.mkdir(parents=True, exist_ok=True)
+        state = apply_spans(load_state(d), spans, mode=mode)
+        state["updated_at"] = int(time.time())
+        _atomic_write(d / f"{BASENAME}.json", json.dumps(state, ensure_ascii=False, indent=1))
+        prom = d / f"{BASENAME}.prom"
+        _atomic_write(prom, format_prometheus(state))
+        return prom
+    except Exception as e:
+        print(f"[WARNING] 메트릭 기록 실패: {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="보고서 실행 누적 메트릭 출력")
+    parser.add_argument("--dir", default=None, help=f"메트릭 디렉터리 (기본: {DEFAULT_METRICS_DIR}, 환경 변수 {METRICS_ENV})")
+    parser.add_argument("--json", action="store_true", help="JSON 상태 그대로 출력")
+    args = parser.parse_args()
+    common.utf8_stdout()
+    state = load_state(metrics_dir(args.dir))
+    print(json.dumps(state, ensure_ascii=False, indent=2) if args.json else format_prometheus(state), end="")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+실행 전 비용·소요 시간 예측 (--plan 드라이런용)
+
+generate_portfolio_report_3ai.py --plan 이 단계별 프롬프트를 실제와 똑같이 만든 뒤,
+여기서 과거 실행의 출력 크기·지연을 찾아 예상 비용·시간·임계 경로를 계산한다. LLM 호출 없음.
+
+과거 값 조회 순서:
+1. 사용량 원장(usage_ledger) 최근 실행의 (step, model) 평균 출력 토큰·지연
+2. report/YYYYMMDD_HHMM/stepN_*.md 의 "## 출력" 길이 (문자/4)
+3. budget_scheduler.DEFAULT_OUTPUT_TOKENS + provider별 기본 처리 속도
+"""
+
+from pathlib import Path
+
+import os
+
+import usage_ledger
+import budget_scheduler
+
+PROJECT_ROOT = Path(__file__).parent.parent
+REPORTS_DIR = PROJECT_ROOT / "report"
+
+HISTORY_RUNS = 10
+
+# 중간 데이터 파일명 (main()이 저장하는 이름과 동일)
+STEP_FILES = {
+    "step1_grok": "step1_grok.md",
+    "step2_gemini": "step2_gemini.md",
+    "step2b_grok": "step2b_grok.md",
+    "step2b_gemini": "step2b_gemini.md",
+    "step3_openai": "step3_openai.md",
+}
+OUTPUT_MARKER = "\n\n---\n\n## 출력\n\n"
+
+# 이력이 없을 때 지연 추정: 고정 오버헤드(초) + 출력 토큰 / 초당 토큰 (reasoning·검색 포함 관측치 기준 대략값)
+DEFAULT_OVERHEAD_S = {"grok": 15.0, "gemini": 10.0, "openai": 10.0}
+DEFAULT_TOKENS_PER_S = {"grok": 60.0, "gemini": 80.0, "openai": 40.0}
+
+
+def _intermediate_output_tokens(last_runs=HISTORY_RUNS):
+    """report/ 중간 데이터 디렉터리 최근 N개에서 단계별 평균 출력 토큰 (문자/4)."""
+    dirs = sorted((p for p in REPORTS_DIR.glob("[0-9]" * 8 + "_" + "[0-9]" * 4) if p.is_dir()), reverse=True)[:last_runs]
+    sums, counts = {}, {}
+    for d in dirs:
+        for step, fname in STEP_FILES.items():
+            path = d / fname
+            if not path.exists():
+                continue
+            try:
+                text = path.read_text(encoding="utf-8", errors="replace")
+            except Exception:
+                continue
+            if OUTPUT_MARKER not in text:
+                continue
+            out = text.split(OUTPUT_MARKER, 1)[1]
+            sums[step] = sums.get(step, 0) + max(1, len(out) // 4)
+            counts[step] = counts.get(step, 0) + 1
+    return {s: sums[s] // counts[s] for s in sums}
+
+
+def load_step_history(last_runs=HISTORY_RUNS):
+    """단계별 과거 값. {step: {"by_model": {model: (avg_out, avg_latency_s)}, "out": avg_out, "latency_s": avg_latency|None, "source": ...}}"""
+    history = {}
+    for r in usage_ledger.step_stats(last_runs=last_runs):
+        h = history.setdefault(r["step"], {"by_model": {}, "out_sum": 0.0, "lat_sum": 0.0, "lat_n": 0, "n": 0})
+        h["by_model"][r["model"]] = (r["avg_out"], r["avg_latency_s"])
+        h["out_sum"] += r["avg_out"] * r["calls"]
+        h["n"] += r["calls"]
+        if r["avg_latency_s"] is not None:
+            h["lat_sum"] += r["avg_latency_s"] * r["calls"]
+            h["lat_n"] += r["calls"]
+    result = {}
+    for step, h in history.items():
+        result[step] = {
+            "by_model": h["by_model"],
+            "out": h["out_sum"] / max(1, h["n"]),
+            "latency_s": h["lat_sum"] / h["lat_n"] if h["lat_n"] else None,
+            "source": "원장",
+        }
+    for step, out in _intermediate_output_tokens(last_runs).items():
+        if step not in result:
+            result[step] = {"by_model": {}, "out": out, "latency_s": None, "source": "중간파일"}
+    return result
+
+
+def estimate_step(step, provider, model, input_tokens, history, price_fn, effort=None):
+    """단계 1회 예측. effort: Responses API reasoning effort (출력 토큰을 medium 대비 EFFORT_OUTPUT_FACTOR배로, 이력은 medium 기준).
+    반환: {"step", "provider", "model", "effort", "input_tokens", "output_tokens", "cost", "latency_s", "source"}"""
+    h = history.get(step) or {}
+    by_model = (h.get("by_model") or {}).get(model)
+    if by_model:
+        out, latency = by_model[0], by_model[1]
+        source = "원장(동일 모델)"
+    elif h:
+        out, latency, source = h["out"], h.get("latency_s"), h.get("source", "이력")
+    else:
+        out, latency, source = budget_scheduler.DEFAULT_OUTPUT_TOKENS.get(step, 4000), None, "기본값"
+    out = int(out * budget_scheduler.EFFORT_OUTPUT_FACTOR.get(effort, 1.0)) if effort else int(out)
+    if latency is None:
+        latency = DEFAULT_OVERHEAD_S.get(provider, 10.0) + out / DEFAULT_TOKENS_PER_S.get(provider, 50.0)
+    p_in, p_out = price_fn(provider, model)
+    cost = (input_tokens / 1_000_000) * p_in + (out / 1_000_000) * p_out
+    return {
+        "step": step, "provider": provider, "model": model, "effort": effort, "input_tokens": int(input_tokens),
+        "output_tokens": out, "cost": cost, "latency_s": float(latency), "source": source,
+    }
+
+
+def _monthly_budget(provider):
+    try:
+        b = os.environ.get(budget_scheduler.BUDGET_ENV.get(provider, ""))
+        return float(b) if b else None
+    except ValueError:
+        return None
+
+
+def format_plan(estimates, usd_krw_rate=None, data_fetch_s=None):
+    """예측 표 + 합계 + 임계 경로 문자열. 단계는 모두 앞 단계 출력에 의존하므로 순차 = 임계 경로."""
+    lines = [
+        "",
+        "| 단계 | AI | 모델 | 입력 토큰 | 예상 출력 토큰 | 예상 비용(USD) | 예상 소요 | 근거 |",
+        "|------|----|------|---------:|-------------:|-------------:|---------:|------|",
+    ]
+    total_cost, total_s = 0.0, float(data_fetch_s or 0.0)
+    by_provider = {}
+    for e in estimates:
+        total_cost += e["cost"]
+        total_s += e["latency_s"]
+        by_provider[e["provider"]] = by_provider.get(e["provider"], 0.0) + e["cost"]
+        lines.append(
+            f"| {e['step']} | {e['provider']} | {e['model']}{' (' + e['effort'] + ')' if e.get('effort') else ''} | {e['input_tokens']:,} | {e['output_tokens']:,} | "
+            f"${e['cost']:.4f} | {e['latency_s']:.1f}초 | {e['source']} |"
+        )
+    lines.append("")
+    krw = f" (약 {round(total_cost * usd_krw_rate):,}원)" if usd_krw_rate else ""
+    lines.append(f"**예상 비용 합계: ${total_cost:.4f}{krw}**")
+    for prov, c in sorted(by_provider.items()):
+        b = _monthly_budget(prov)
+        if b:
+            mtd = usage_ledger.month_totals().get(prov, {}).get("cost", 0.0)
+            lines.append(f"  {prov}: ${c:.4f} (이번 달 ${mtd:.2f} / 예산 ${b:.2f}, 실행 후 잔여 ~${max(0.0, b - mtd - c):.2f})")
+        else:
+            lines.append(f"  {prov}: ${c:.4f}")
+    m, s = int(total_s // 60), total_s % 60
+    lines.append(f"**예상 총 소요: {m}분 {s:.1f}초**" + (f" (데이터 조회 {data_fetch_s:.1f}초 포함)" if data_fetch_s else ""))
+    if estimates:
+        slowest = max(estimates, key=lambda e: e["latency_s"])
+        path = " → ".join(e["step"] for e in estimates)
+        lines.append(f"**임계 경로:** 데이터 조회 → {path} (전 단계 순차 의존, 최장 단계: {slowest['step']} {slowest['latency_s']:.1f}초)")
+    return "\n".join(lines)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+단계별 CPU·wall 프로파일 (--profile)
+
+보고서 스크립트가 --profile로 실행되면 단계(import, startup, read_prompt, data_fetch, step1_grok …
+save_report)마다 별도 cProfile을 켜고, 실행 끝에 디렉터리에 저장한다.
+- profile_<단계>.prof : 단계별 cProfile 결과 (python -m pstats, snakeviz 등으로 열기)
+- profile_summary.txt : 단계별 wall·CPU·대기(wall−CPU), 관심 구간(임포트·프롬프트·정규식·평가·쓰기) 합계,
+                        전체·단계별 누적 시간 상위 함수
+
+- start_if_requested("import"): sys.argv에 --profile이 있으면 모듈 임포트 시점부터 프로파일 시작
+- switch(step): 현재 단계 프로파일을 멈추고 step 프로파일 시작 (같은 단계 재진입 시 누적). None이면 일시 정지
+- write(directory, focus): 프로파일을 멈추고 파일 저장 + 요약 출력
+- 시작 전에는 모두 아무 일도 하지 않음 (cProfile·pstats도 --profile일 때만 임포트)
+"""
+
+import os
+import sys
+import time
+import atexit
+from pathlib import Path
+
+PROFILE_FLAG = "--profile"
+SUMMARY_FILE_NAME = "profile_summary.txt"
+TOP_N = 15
+TOP_N_PER_STEP = 5
+
+_STATE = {"active": False, "current": None, "profiles": {}, "times": {}, "order": [],
+          "t_wall": 0.0, "t_cpu": 0.0, "default_dir": None, "focus": None, "written": False}
+
+
+def is_requested(argv=None):
+    return PROFILE_FLAG in (sys.argv if argv is None else argv)
+
+
+def active():
+    return _STATE["active"]
+
+
+def start(step, default_dir=None, focus=None):
+    """프로파일 시작 (이미 켜져 있으면 step으로 전환). default_dir: write 없이 종료될 때 저장할 디렉터리(callable 가능)."""
+    if default_dir is not None:
+        _STATE["default_dir"] = default_dir
+    if focus is not None:
+        _STATE["focus"] = focus
+    if not _STATE["active"]:
+        _STATE["active"] = True
+        atexit.register(_write_at_exit)
+    switch(step)
+
+
+def start_if_requested(step="import"):
+    """sys.argv에 --profile이 있으면 시작 (인자 파싱 전, 무거운 모듈 임포트 전에 호출)."""
+    if is_requested() and not _STATE["active"]:
+        start(step)
+
+
+def _stop_current():
+    step = _STATE["current"]
+    if step is None:
+        return
+    _STATE["profiles"][step].disable()
+    t = _STATE["times"][step]
+    t["wall_s"] += time.perf_counter() - _STATE["t_wall"]
+    t["cpu_s"] += time.process_time() - _STATE["t_cpu"]
+    _STATE["current"] = None
+
+
+def switch(step):
+    """현재 단계 프로파일을 멈추고 step 프로파일 시작. step=None이면 일시 정지 (입력 대기 등)."""
+    if not _STATE["active"] or step == _STATE["current"]:
+        return
+    _stop_current()
+    if step is None:
+        return
+    if step not in _STATE["profiles"]:
+        import cProfile
+        _STATE["profiles"][step] = cProfile.Profile()
+        _STATE["times"][step] = {"wall_s": 0.0, "cpu_s": 0.0}
+        _STATE["order"].append(step)
+    _STATE["current"] = step
+    _STATE["t_wall"] = time.perf_counter()
+    _STATE["t_cpu"] = time.process_time()
+    _STATE["profiles"][step].enable()
+
+
+def _func_label(func):
+    filename, lineno, name = func
+    if filename == "~":
+        return name
+    base = os.path.basename(filename)
+    if base == "__init__.py":
+        base = f"{os.path.basename(os.path.dirname(filename))}/{base}"
+    return f"{name} ({base}:{lineno})"
+
+
+def _top_functions(stats, n):
+    """pstats.Stats → 누적 시간 상위 n개 [(cumtime, tottime, ncalls, label)]."""
+    rows = [(ct, tt, nc, _func_label(func)) for func, (cc, nc, tt, ct, callers) in stats.stats.items()]
+    rows.sort(key=lambda r: r[0], reverse=True)
+    return rows[:n]
+
+
+def _focus_totals(stats, focus):
+    """관심 구간별 시간 합계. focus: [(label, "cum"|"tot", [함수 라벨 부분 문자열, ...])].
+    cum은 진입 함수 누적 시간 합(서로 호출하지 않는 함수만 나열), tot는 자체 시간 합(정규식 내부 등)."""
+    totals = {}
+    for label, mode, patterns in focus or []:
+        total = 0.0
+        for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+            text = f"{func[0]}:{func[2]}"
+            if any(p in text for p in patterns):
+                total += ct if mode == "cum" else tt
+        totals[label] = total
+    return totals
+
+
+def format_summary(n=TOP_N, per_step=TOP_N_PER_STEP, focus=None):
+    """단계별 시간표 + 관심 구간 + 상위 함수 요약 문자열."""
+    import pstats
+    focus = focus if focus is not None else _STATE["focus"]
+    lines = ["[프로파일] 단계별 소요 (wall / CPU / 대기 = wall − CPU, 대기는 주로 네트워크)"]
+    lines.append(f"  {'단계':<16} {'wall(s)':>9} {'CPU(s)':>9} {'대기(s)':>9}")
+    total_wall = total_cpu = 0.0
+    for step in _STATE["order"]:
+        t = _STATE["times"][step]
+        total_wall += t["wall_s"]
+        total_cpu += t["cpu_s"]
+        lines.append(f"  {step:<16} {t['wall_s']:>9.3f} {t['cpu_s']:>9.3f} {max(t['wall_s'] - t['cpu_s'], 0):>9.3f}")
+    lines.append(f"  {'합계':<16} {total_wall:>9.3f} {total_cpu:>9.3f} {max(total_wall - total_cpu, 0):>9.3f}")
+
+    merged = None
+    for step in _STATE["order"]:
+        st = pstats.Stats(_STATE["profiles"][step])
+        if merged is None:
+            merged = st
+        else:
+            merged.add(st)
+    if merged is None:
+        return "\n".join(lines)
+
+    if "import" in _STATE["times"] or focus:
+        lines.append("\n[프로파일] 비네트워크 구간 (전체 단계 합계, 초)")
+        if "import" in _STATE["times"]:
+            lines.append(f"  {'모듈 임포트':<16} {_STATE['times']['import']['wall_s']:>9.3f}")
+        for label, total in _focus_totals(merged, focus).items():
+            lines.append(f"  {label:<16} {total:>9.3f}")
+
+    lines.append(f"\n[프로파일] 누적 시간 상위 {n}개 함수 (전체)")
+    lines.append(f"  {'cumtime':>9} {'tottime':>9} {'calls':>8}  함수")
+    for ct, tt, nc, label in _top_functions(merged, n):
+        lines.append(f"  {ct:>9.3f} {tt:>9.3f} {nc:>8}  {label}")
+    if per_step:
+        for step in _STATE["order"]:
+            lines.append(f"\n  [{step}] 상위 {per_step}개")
+            for ct, tt, nc, label in _top_functions(pstats.Stats(_STATE["profiles"][step]), per_step):
+                lines.append(f"  {ct:>9.3f} {tt:>9.3f} {nc:>8}  {label}")
+    return "\n".join(lines)
+
+
+def write(directory, focus=None, print_summary=True):
+    """프로파일을 멈추고 directory에 단계별 .prof + profile_summary.txt 저장. 반환: 디렉터리 (미실행 시 None)."""
+    if not _STATE["active"] or _STATE["written"]:
+        return None
+    _stop_current()
+    _STATE["written"] = True
+    try:
+        d = Path(directory)
+        d.mkdir(parents=True, exist_ok=True)
+        for step in _STATE["order"]:
+            _STATE["profiles"][step].dump_stats(str(d / f"profile_{step}.prof"))
+        summary = format_summary(focus=focus)
+        (d / SUMMARY_FILE_NAME).write_text(summary + "\n", encoding="utf-8")
+    except Exception as e:
+        print(f"[WARNING] 프로파일 저장 실패: {e}")
+        return None
+    if print_summary:
+        print("\n" + format_summary(per_step=0, focus=focus))
+    print(f"  프로파일: {d}/profile_<단계>.prof, {SUMMARY_FILE_NAME}")
+    return d
+
+
+def _write_at_exit():
+    """write 없이 끝난 실행(확인 모드·조기 종료 등)은 기본 디렉터리에 저장."""
+    if _STATE["written"] or not _STATE["active"]:
+        return
+    d = _STATE["default_dir"]
+    if callable(d):
+        d = d()
+    if d is not None:
+        write(d)
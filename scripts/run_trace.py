@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+실행 추적 (중첩 span → JSON lines)
+
+run → step → call(provider 호출) → model(폴백 모델 시도) → http(HTTP 시도 1회) 계층으로
+어디서 시간이 쓰였는지 기록한다. 보고서 실행이 끝나면 중간 데이터 디렉터리에 trace.jsonl로 저장.
+
+- enter(kind, name): 같은 계층 이하의 열린 span을 닫고 새 span 시작 (단계·폴백 모델 전환처럼 끝 지점이 여러 곳인 경우)
+- span(kind, name): with 블록 span (HTTP 시도 1회 등)
+- set_attrs / add_attrs: 현재(가장 안쪽) 열린 span에 속성 기록·누적 (모델, 상태, 토큰, 바이트, 재시도 대기)
+- attach(parent): 작업 스레드(pipeline_engine 병렬 단계)가 parent 아래에 자기 span 스택을 쌓도록 연결
+- start_run 전에는 모두 아무 일도 하지 않음 (discuss_report 등 다른 스크립트가 같은 함수를 써도 무방)
+
+trace.jsonl 한 줄 = span 1개:
+    {"trace_id", "span_id", "parent_id", "kind", "name", "start", "offset_s", "duration_s", "status", "attrs"}
+
+사용법 (저장된 추적을 트리로 보기):
+    python run_trace.py report/20260204_1016/trace.jsonl [--min-ms 50]
+"""
+
+import sys
+import json
+import time
+import argparse
+import functools
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import common
+
+TRACE_FILE_NAME = "trace.jsonl"
+
+# 계층: 숫자가 클수록 안쪽
+LEVELS = {"run": 0, "step": 1, "call": 2, "model": 3, "http": 4}
+
+_STATE = {"run_id": None, "stack": [], "spans": [], "seq": 0, "t0": 0.0}
+# 작업 스레드별 스택 (attach 안에서만 설정, 없으면 메인 스택 사용). seq·spans 추가는 잠금
+_LOCAL = threading.local()
+_LOCK = threading.Lock()
+
+
+def _active():
+    return _STATE["run_id"] is not None
+
+
+def _stack():
+    stack = getattr(_LOCAL, "stack", None)
+    return stack if stack is not None else _STATE["stack"]
+
+
+def _open(kind, name, attrs):
+    stack = _stack()
+    now = time.perf_counter()
+    with _LOCK:
+        _STATE["seq"] += 1
+        span_id = _STATE["seq"]
+    sp = {
+        "trace_id": _STATE["run_id"],
+        "span_id": span_id,
+        "parent_id": stack[-1]["span_id"] if stack else None,
+        "kind": kind,
+        "name": name,
+        "start": datetime.now().isoformat(timespec="milliseconds"),
+        "offset_s": round(now - _STATE["t0"], 6),
+        "duration_s": None,
+        "status": "ok",
+        "attrs": {k: v for k, v in attrs.items() if v is not None},
+        "_t": now,
+    }
+    stack.append(sp)
+    with _LOCK:
+        _STATE["spans"].append(sp)
+    return sp
+
+
+def _close_to_level(level):
+    """level 이상(안쪽)인 열린 span을 모두 닫는다. attach 스택에서는 연결한 부모 span은 닫지 않는다."""
+    stack = _stack()
+    floor = getattr(_LOCAL, "floor", 0) if stack is not _STATE["stack"] else 0
+    now = time.perf_counter()
+    while len(stack) > floor and LEVELS[stack[-1]["kind"]] >= level:
+        sp = stack.pop()
+        sp["duration_s"] = round(now - sp.pop("_t"), 6)
+
+
+def start_run(run_id, **attrs):
+    """새 추적 시작 (이전 기록은 버림). 루트 span "run"을 연다."""
+    _STATE.update({"run_id": run_id, "stack": [], "spans": [], "seq": 0, "t0": time.perf_counter()})
+    _open("run", "run", attrs)
+
+
+def enter(kind, name, **attrs):
+    """같은 계층 이하 열린 span을 닫고 kind span을 새로 연다. 반환: span dict (미추적 시 None)."""
+    if not _active():
+        return None
+    _close_to_level(LEVELS[kind])
+    return _open(kind, name, attrs)
+
+
+@contextmanager
+def span(kind, name, **attrs):
+    """with 블록 동안만 열리는 span. 예외가 나면 status=error로 기록하고 그대로 전파."""
+    if not _active():
+        yield {"attrs": {}}
+        return
+    sp = enter(kind, name, **attrs)
+    try:
+        yield sp
+    except BaseException as e:
+        sp["status"] = "error"
+        sp["attrs"]["error"] = f"{type(e).__name__}: {str(e)[:200]}"
+        raise
+    finally:
+        if any(s is sp for s in _stack()):
+            _close_to_level(LEVELS[kind])
+
+
+def traced(kind, name, result_attrs=None):
+    """함수 전체를 span으로 감싸는 데코레이터. result_attrs(result) → 반환값에서 뽑은 속성 dict."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _active():
+                return fn(*args, **kwargs)
+            with span(kind, name) as sp:
+                result = fn(*args, **kwargs)
+                if result_attrs:
+                    extra = result_attrs(result) or {}
+                    sp["attrs"].update({k: v for k, v in extra.items() if v is not None})
+                    if extra.get("ok") is False:
+                        sp["status"] = "error"
+                return result
+        return wrapper
+    return deco
+
+
+@contextmanager
+def attach(parent):
+    """with 블록 동안 현재 스레드의 span을 parent 아래에 쌓는다 (병렬 작업 스레드용).
+    블록이 끝나면 이 스레드에서 연 span을 모두 닫는다. parent가 None이거나 미추적이면 아무 일도 하지 않음."""
+    if not _active() or parent is None:
+        yield
+        return
+    _LOCAL.stack = [parent]
+    _LOCAL.floor = 1
+    try:
+        yield
+    finally:
+        _close_to_level(0)
+        _LOCAL.stack = None
+        _LOCAL.floor = 0
+
+
+def root():
+    """루트 span "run" (미추적이면 None)."""
+    return _STATE["stack"][0] if _active() and _STATE["stack"] else None
+
+
+def close(kind):
+    """kind 계층 이하 열린 span을 닫는다 (병렬 구간 전에 메인 스레드의 단계 span 정리 등)."""
+    if _active():
+        _close_to_level(LEVELS[kind])
+
+
+def current():
+    """가장 안쪽 열린 span (없으면 None)."""
+    stack = _stack()
+    return stack[-1] if _active() and stack else None
+
+
+def set_attrs(**attrs):
+    """현재 span 속성 설정. status="error" 등 status 키는 span 상태로 반영."""
+    sp = current()
+    if sp is None:
+        return
+    if "status" in attrs:
+        sp["status"] = attrs.pop("status")
+    sp["attrs"].update({k: v for k, v in attrs.items() if v is not None})
+
+
+def add_attrs(**counts):
+    """현재 span 숫자 속성 누적 (예: retries=1, retry_wait_s=2)."""
+    sp = current()
+    if sp is None:
+        return
+    for k, v in counts.items():
+        sp["attrs"][k] = sp["attrs"].get(k, 0) + v
+
+
+def finish_run(**attrs):
+    """열린 span을 모두 닫는다 (루트 포함). status 키는 루트 span 상태로 반영. 반환: span 목록."""
+    if not _active():
+        return []
+    if _STATE["stack"]:
+        root = _STATE["stack"][0]
+        if "status" in attrs:
+            root["status"] = attrs.pop("status")
+        root["attrs"].update({k: v for k, v in attrs.items() if v is not None})
+    _close_to_level(0)
+    return list(_STATE["spans"])
+
+
+def spans():
+    """기록된 span 목록 (finish_run·write_jsonl 이후에는 닫힌 상태)."""
+    return list(_STATE["spans"])
+
+
+def write_jsonl(directory):
+    """추적을 마무리하고 directory/trace.jsonl로 저장. 반환: 경로 (미추적이면 None)."""
+    if not _active():
+        return None
+    spans = finish_run()
+    path = Path(directory) / TRACE_FILE_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for sp in spans:
+            f.write(json.dumps(sp, ensure_ascii=False) + "\n")
+    return path
+
+
+def load_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def format_tree(spans, min_ms=0.0):
+    """span 목록 → 들여쓴 트리 문자열 (duration이 min_ms 미만인 http·model span은 생략)."""
+    children = {}
+    for sp in spans:
+        children.setdefault(sp["parent_id"], []).append(sp)
+    skip_keys = {"url"}
+    lines = []
+
+    def walk(sp, depth):
+        dur = sp.get("duration_s") or 0.0
+        if depth > 1 and dur * 1000 < min_ms and sp["kind"] in ("http", "model"):
+            return
+        attrs = ", ".join(f"{k}={v}" for k, v in sp["attrs"].items() if k not in skip_keys)
+        mark = " [ERROR]" if sp["status"] != "ok" else ""
+        lines.append(f"{'  ' * depth}{sp['kind']}:{sp['name']}  {dur:.3f}s{mark}" + (f"  ({attrs})" if attrs else ""))
+        for c in children.get(sp["span_id"], []):
+            walk(c, depth + 1)
+
+    for root in children.get(None, []):
+        walk(root, 0)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="trace.jsonl을 트리로 출력")
+    parser.add_argument("path", help="trace.jsonl 경로 또는 중간 데이터 디렉터리")
+    parser.add_argument("--min-ms", type=float, default=0.0, help="이보다 짧은 model·http span 생략 (ms)")
+    args = parser.parse_args()
+    common.utf8_stdout()
+    path = Path(args.path)
+    if path.is_dir():
+        path = path / TRACE_FILE_NAME
+    if not path.exists():
+        print(f"[ERROR] 추적 파일 없음: {path}")
+        return 1
+    print(format_tree(load_jsonl(path), args.min_ms))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
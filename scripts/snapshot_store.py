@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+일별 포트폴리오 스냅샷 저장소 (SQLite, append-only)
+
+3ai 스크립트 실행 1회마다 평가(계좌·종목별 수량·평가액·비중·손익)·환율·주가·CAGR(α·β·최종)을
+report/.snapshots.sqlite3 에 추가한다. 총자산 추이·종목 비중 추이·CAGR 변화를 보고서 마크다운을 다시 파싱하지 않고 조회.
+- usage_ledger.py와 같은 방식: WAL 모드 + busy_timeout, 기록 실패는 경고만 (보고서 생성은 계속)
+- 인덱스: runs(date), positions(symbol, run_ref), quotes(symbol, run_ref) → 기간·종목 조회가 전체 스캔 없이 됨
+- 하루 여러 번 실행하면 모두 저장하고, 추이 조회는 날짜별로 해당 값이 있는 마지막 실행만 사용
+- run_id는 사용량 원장과 같은 값 (usage_ledger.new_run_id) → 실행별 비용과 연결 가능
+- --import-reports: 예전 보고서(report/portfolio_report_*.md 머리말 환율·CAGR + 중간 데이터 step1 평가 표)를 1회 이관
+
+사용법:
+    python snapshot_store.py                        # 최근 10회 실행 (총자산·환율·CAGR)
+    python snapshot_store.py --total --days 90      # 최근 90일 총자산 추이
+    python snapshot_store.py --weight TSLA          # 종목 비중 추이 (계좌 합산)
+    python snapshot_store.py --cagr                 # α·β·최종 CAGR 변화
+    python snapshot_store.py --quote TSLA           # 주가 추이
+    python snapshot_store.py --import-reports       # 기존 보고서 이관 (이미 있는 실행은 건너뜀)
+"""
+
+import re
+import sys
+import json
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import cagr_archive
+import common
+
+PROJECT_ROOT = Path(__file__).parent.parent
+REPORTS_DIR = PROJECT_ROOT / "report"
+SNAPSHOT_FILE = REPORTS_DIR / ".snapshots.sqlite3"
+
+# 동시 실행 시 잠금 대기 (ms). usage_ledger.py와 같음.
+BUSY_TIMEOUT_MS = 30000
+DEFAULT_DAYS = 90
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id      TEXT    NOT NULL UNIQUE,
+    ts          TEXT    NOT NULL,
+    date        TEXT    NOT NULL,
+    source      TEXT    NOT NULL DEFAULT 'run',
+    pipeline    TEXT,
+    usd_krw     REAL,
+    total_krw   REAL,
+    cash_krw    REAL,
+    cost_krw    REAL,
+    pnl_krw     REAL,
+    alpha_cagr  REAL,
+    beta_cagr   REAL,
+    final_cagr  REAL,
+    report_file TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_date ON runs (date);
+CREATE TABLE IF NOT EXISTS positions (
+    run_ref    INTEGER NOT NULL REFERENCES runs (id),
+    account    TEXT,
+    symbol     TEXT,
+    name       TEXT,
+    currency   TEXT,
+    qty        INTEGER,
+    value_krw  REAL,
+    pct        REAL,
+    cost_krw   REAL,
+    pnl_krw    REAL,
+    return_pct REAL
+);
+CREATE INDEX IF NOT EXISTS idx_positions_symbol ON positions (symbol, run_ref);
+CREATE INDEX IF NOT EXISTS idx_positions_run ON positions (run_ref);
+CREATE TABLE IF NOT EXISTS quotes (
+    run_ref  INTEGER NOT NULL REFERENCES runs (id),
+    symbol   TEXT    NOT NULL,
+    currency TEXT    NOT NULL,
+    regular  REAL,
+    pre      REAL,
+    post     REAL
+);
+CREATE INDEX IF NOT EXISTS idx_quotes_symbol ON quotes (symbol, run_ref);
+CREATE INDEX IF NOT EXISTS idx_quotes_run ON quotes (run_ref, symbol);
+"""
+
+
+def connect(path=None):
+    """스냅샷 DB 연결. 없으면 스키마 생성."""
+    path = Path(path) if path else SNAPSHOT_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _float(v):
+    return float(v) if v is not None else None
+
+
+def _insert(conn, run_id, now, rows, total_krw, usd_krw_rate, us_stock_prices, kr_stock_prices, cagr, pipeline, report_file, source):
+    """실행 1건 + 평가 행 + 주가를 한 트랜잭션으로. 같은 run_id가 있으면 건너뜀. 반환: 추가 여부."""
+    rows, cagr = rows or [], cagr or {}
+    priced = [r for r in rows if r.get("cost_krw") is not None]
+    cur = conn.execute(
+        "INSERT OR IGNORE INTO runs (run_id, ts, date, source, pipeline, usd_krw, total_krw, cash_krw, cost_krw, pnl_krw,"
+        " alpha_cagr, beta_cagr, final_cagr, report_file) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (run_id, now.isoformat(timespec="seconds"), now.date().isoformat(), source, pipeline, _float(usd_krw_rate),
+         _float(total_krw) if total_krw else None,
+         next((_float(r["value_krw"]) for r in rows if r.get("symbol") is None), None),
+         sum(r["cost_krw"] for r in priced) if priced else None, sum(r["pnl_krw"] for r in priced) if priced else None,
+         _float(cagr.get("alpha")), _float(cagr.get("beta")), _float(cagr.get("final")), report_file),
+    )
+    if not cur.rowcount:
+        return False
+    ref = cur.lastrowid
+    conn.executemany(
+        "INSERT INTO positions (run_ref, account, symbol, name, currency, qty, value_krw, pct, cost_krw, pnl_krw, return_pct)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(ref, r.get("account"), r.get("symbol"), r.get("name"), r.get("currency"), r.get("qty"), _float(r.get("value_krw")),
+          _float(r.get("pct")), _float(r.get("cost_krw")), _float(r.get("pnl_krw")), _float(r.get("return_pct"))) for r in rows],
+    )
+    quotes = [(ref, s, "USD", _float(p.get("regular")), _float(p.get("pre")), _float(p.get("post")))
+              for s, p in (us_stock_prices or {}).items() if p]
+    quotes += [(ref, s, "KRW", _float(p), None, None) for s, p in (kr_stock_prices or {}).items() if p is not None]
+    conn.executemany("INSERT INTO quotes (run_ref, symbol, currency, regular, pre, post) VALUES (?, ?, ?, ?, ?, ?)", quotes)
+    return True
+
+
+def record_run(run_id, rows, total_krw, usd_krw_rate, us_stock_prices=None, kr_stock_prices=None, cagr=None,
+               pipeline=None, report_file=None, now=None, path=None):
+    """실행 1회 스냅샷 기록 (append-only). rows: compute_portfolio_valuation 행, cagr: {"alpha", "beta", "final"} (없으면 None).
+    실패해도 보고서 생성은 계속되도록 경고만 출력. 반환: 추가 여부."""
+    try:
+        conn = connect(path)
+        try:
+            with conn:
+                return _insert(conn, run_id, now or datetime.now(), rows, total_krw, usd_krw_rate, us_stock_prices,
+                               kr_stock_prices, cagr, pipeline, report_file, "run")
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[WARNING] 스냅샷 기록 실패: {e}")
+        return False
+
+
+def _query(sql, params=(), path=None):
+    """읽기 전용 조회. 저장소가 없으면 빈 목록."""
+    p = Path(path) if path else SNAPSHOT_FILE
+    if not p.exists():
+        return []
+    try:
+        conn = connect(p)
+        try:
+            return [dict(r) for r in conn.execute(sql, params).fetchall()]
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[WARNING] 스냅샷 조회 실패: {e}")
+        return []
+
+
+def _since(days, today=None):
+    """최근 days일 시작 날짜 'YYYY-MM-DD' (오늘 포함)."""
+    return ((today or datetime.now()).date() - timedelta(days=max(int(days), 1) - 1)).isoformat()
+
+
+def _daily(where):
+    """날짜별로 조건(where)을 만족하는 마지막 실행 id 서브쿼리 (date >= ? 파라미터 1개 + where 파라미터)."""
+    return f"SELECT MAX(id) FROM runs WHERE date >= ? AND {where} GROUP BY date"
+
+
+def total_series(days=DEFAULT_DAYS, path=None):
+    """날짜별 총자산·환율·원가·손익 (총자산 있는 날짜별 마지막 실행, 오래된 순)."""
+    return _query(
+        "SELECT date, run_id, total_krw, usd_krw, cash_krw, cost_krw, pnl_krw FROM runs"
+        f" WHERE id IN ({_daily('total_krw IS NOT NULL')}) ORDER BY date",
+        (_since(days),), path,
+    )
+
+
+def weight_series(symbol, days=DEFAULT_DAYS, path=None):
+    """날짜별 종목 수량·평가액·비중 (계좌 합산, 평가 행 있는 날짜별 마지막 실행). symbol은 종목 코드 또는 이름 (현금은 '현금')."""
+    return _query(
+        "SELECT r.date, SUM(p.qty) AS qty, SUM(p.value_krw) AS value_krw, ROUND(SUM(p.pct), 2) AS pct, SUM(p.pnl_krw) AS pnl_krw"
+        " FROM runs r JOIN positions p ON p.run_ref = r.id"
+        f" WHERE r.id IN ({_daily('EXISTS (SELECT 1 FROM positions WHERE run_ref = runs.id)')}) AND (p.symbol = ? OR (p.symbol IS NULL AND p.name = ?))"
+        " GROUP BY r.date ORDER BY r.date",
+        (_since(days), symbol, symbol), path,
+    )
+
+
+def cagr_series(days=DEFAULT_DAYS, path=None):
+    """날짜별 α(Grok)·β(Gemini)·최종 CAGR (하나라도 있는 날짜별 마지막 실행)."""
+    return _query(
+        "SELECT date, run_id, alpha_cagr, beta_cagr, final_cagr FROM runs"
+        f" WHERE id IN ({_daily('COALESCE(alpha_cagr, beta_cagr, final_cagr) IS NOT NULL')}) ORDER BY date",
+        (_since(days),), path,
+    )
+
+
+def quote_series(symbol, days=DEFAULT_DAYS, path=None):
+    """날짜별 주가 (미국: 정규장·프리·애프터, 한국: regular, 해당 종목 주가 있는 날짜별 마지막 실행)."""
+    return _query(
+        "SELECT r.date, q.currency, q.regular, q.pre, q.post FROM runs r JOIN quotes q ON q.run_ref = r.id"
+        f" WHERE r.id IN ({_daily('EXISTS (SELECT 1 FROM quotes WHERE run_ref = runs.id AND symbol = ?)')}) AND q.symbol = ? ORDER BY r.date",
+        (_since(days), symbol, symbol), path,
+    )
+
+
+def recent_runs(limit=10, path=None):
+    """최근 실행 (최신순)."""
+    return _query(
+        "SELECT run_id, ts, source, pipeline, usd_krw, total_krw, alpha_cagr, beta_cagr, final_cagr FROM runs"
+        " ORDER BY id DESC LIMIT ?",
+        (int(limit),), path,
+    )
+
+
+# ---- 기존 보고서 이관 ----
+
+_FX = re.compile(r"USD/KRW 환율:\s*([\d,.]+)\s*원")
+_VAL_ROW = re.compile(r"^\|\s*([^|]+?)\s*\|\s*([^|]+?)\s*\|\s*(-|\d+)\s*\|\s*([^|]*?)\s*\|\s*([\d,.]+)\s*\|\s*([\d.]+%|-)\s*\|\s*$")
+_VAL_TOTAL = re.compile(r"총자산\(API·스크립트 계산\):\s*([\d,]+)원")
+
+
+def _parse_valuation_table(text, symbols):
+    """step1 프롬프트의 '포트폴리오 평가' 표 → (rows, total_krw). 표가 없으면 ([], None). symbols: {이름: 종목 코드}."""
+    head = text.find("| 계좌 | 종목 | 수량 | 단가/환산 |")
+    if head < 0:
+        return [], None
+    rows = []
+    for line in text[head:].splitlines()[2:]:
+        m = _VAL_ROW.match(line.strip())
+        if not m:
+            break
+        acct, name, qty, unit, value, pct = m.groups()
+        cash = qty == "-"
+        rows.append({
+            "account": acct, "symbol": None if cash else symbols.get(name, name), "name": name,
+            "currency": "KRW" if cash or unit.endswith("원") else "USD", "qty": None if cash else int(qty),
+            "value_krw": float(value.replace(",", "")), "pct": None if pct == "-" else float(pct.rstrip("%")),
+        })
+    m = _VAL_TOTAL.search(text)
+    return rows, int(m.group(1).replace(",", "")) if m else None
+
+
+def _parse_quotes(text):
+    """step1 프롬프트의 미국 주가 목록(- TICKER: / • 정규장: $X) → {ticker: {"regular", "pre", "post"}}."""
+    quotes, cur = {}, None
+    keys = {"정규장": "regular", "프리마켓": "pre", "애프터마켓": "post"}
+    for line in text.splitlines():
+        m = re.match(r"^- ([A-Z][A-Z0-9.\-]*):\s*$", line.strip())
+        if m:
+            cur = quotes.setdefault(m.group(1), {})
+            continue
+        m = re.match(r"^•\s*(정규장|프리마켓|애프터마켓):\s*\$([\d.]+)", line.strip())
+        if m and cur is not None:
+            cur[keys[m.group(1)]] = float(m.group(2))
+        elif line.strip() and not line.strip().startswith("•"):
+            cur = None
+    return {s: q for s, q in quotes.items() if q}
+
+
+def parse_report(report_path, symbols=None):
+    """보고서 1개 → record_run 인자 dict 또는 None (파일명 형식이 다르면). 작성 시각·CAGR은 cagr_archive.parse_run과 같은 파싱,
+    중간 데이터 디렉터리(report/YYYYMMDD_HHMM/step1*.md)가 있으면 평가 표·총자산·미국 주가도."""
+    report_path = Path(report_path)
+    entry = cagr_archive.parse_run(report_path)
+    if entry is None:
+        return None
+    fx = _FX.search(report_path.read_text(encoding="utf-8", errors="replace")[:3000])
+    rows, total, quotes = [], None, {}
+    step1 = sorted((report_path.parent / entry["step_dir"]).glob("step1*.md")) if entry["step_dir"] else []
+    if step1:
+        prompt = step1[0].read_text(encoding="utf-8", errors="replace")
+        rows, total = _parse_valuation_table(prompt, symbols or {})
+        quotes = _parse_quotes(prompt)
+    return {
+        "run_id": f"report_{report_path.stem[len('portfolio_report_'):]}", "now": datetime.fromisoformat(entry["written"]),
+        "rows": rows, "total_krw": total, "usd_krw_rate": float(fx.group(1).replace(",", "")) if fx else None,
+        "us_stock_prices": quotes, "cagr": {"alpha": entry["alpha"], "beta": entry["beta"], "final": entry["final"]},
+        "report_file": report_path.name,
+    }
+
+
+def _config_symbols():
+    """config.json 보유 종목 이름 → 종목 코드 (이관 시 평가 표의 이름을 코드로)."""
+    positions = (common.load_config().get("portfolio_holdings") or {}).get("positions") or []
+    return {p.get("name") or p["symbol"]: p["symbol"] for p in positions if p.get("symbol")}
+
+
+def import_reports(reports_dir=None, path=None):
+    """report/portfolio_report_*.md를 작성 시각 순으로 이관. 이미 있는 run_id는 건너뜀. 반환: (추가, 건너뜀)."""
+    reports_dir = Path(reports_dir) if reports_dir else REPORTS_DIR
+    symbols = _config_symbols()
+    parsed = []
+    for p in sorted(reports_dir.glob("portfolio_report_*.md")):
+        try:
+            item = parse_report(p, symbols)
+        except Exception as e:
+            print(f"[WARNING] 보고서 파싱 실패 ({p.name}): {e}")
+            continue
+        if item:
+            parsed.append(item)
+    parsed.sort(key=lambda d: d["now"])
+    added = 0
+    conn = connect(path)
+    try:
+        with conn:
+            for d in parsed:
+                added += _insert(conn, d["run_id"], d["now"], d["rows"], d["total_krw"], d["usd_krw_rate"], d["us_stock_prices"],
+                                 None, d["cagr"], None, d["report_file"], "report")
+    finally:
+        conn.close()
+    return added, len(parsed) - added
+
+
+# ---- CLI ----
+
+def _won(v):
+    return f"{v:,.0f}" if v is not None else "-"
+
+
+def _pct(v):
+    return f"{v:.1f}%" if v is not None else "-"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="일별 포트폴리오 스냅샷 조회 (report/.snapshots.sqlite3)")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help=f"조회 기간 일수 (기본 {DEFAULT_DAYS})")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--total", action="store_true", help="총자산 추이")
+    group.add_argument("--weight", metavar="SYMBOL", default=None, help="종목 비중 추이 (계좌 합산, 코드 또는 이름)")
+    group.add_argument("--cagr", action="store_true", help="α·β·최종 CAGR 변화")
+    group.add_argument("--quote", metavar="SYMBOL", default=None, help="주가 추이")
+    group.add_argument("--import-reports", action="store_true", help="report/portfolio_report_*.md 이관 (이미 있는 실행은 건너뜀)")
+    parser.add_argument("--runs", type=int, default=10, metavar="N", help="인자 없을 때 최근 N회 실행 출력 (기본 10)")
+    parser.add_argument("--json", action="store_true", help="JSON 출력")
+    return parser.parse_args()
+
+
+def main():
+    # Windows 콘솔 인코딩 설정 (모듈 import 시에는 건드리지 않음)
+    common.utf8_stdout()
+    args = parse_args()
+    if args.import_reports:
+        added, skipped = import_reports()
+        print(f"[이관] 보고서 {added}개 추가, {skipped}개 건너뜀 (이미 있음) → {SNAPSHOT_FILE}")
+        return 0
+    if args.total:
+        title, rows = f"[최근 {args.days}일 총자산]", total_series(args.days)
+        lines = [f"  {r['date']}  {_won(r['total_krw']):>15}원  환율 {r['usd_krw'] or '-':>8}  손익 {_won(r['pnl_krw']):>14}" for r in rows]
+    elif args.weight:
+        title, rows = f"[최근 {args.days}일 {args.weight} 비중]", weight_series(args.weight, args.days)
+        lines = [f"  {r['date']}  {_pct(r['pct']):>7}  {_won(r['value_krw']):>15}원  수량 {r['qty'] if r['qty'] is not None else '-'}"
+                 for r in rows]
+    elif args.cagr:
+        title, rows = f"[최근 {args.days}일 CAGR]", cagr_series(args.days)
+        first = next((r["final_cagr"] for r in rows if r["final_cagr"] is not None), None)
+        lines = [f"  {r['date']}  α {_pct(r['alpha_cagr']):>6}  β {_pct(r['beta_cagr']):>6}  최종 {_pct(r['final_cagr']):>6}"
+                 + (f"  (기간 첫 값 대비 {r['final_cagr'] - first:+.1f}%p)" if first is not None and r["final_cagr"] is not None else "")
+                 for r in rows]
+    elif args.quote:
+        title, rows = f"[최근 {args.days}일 {args.quote} 주가]", quote_series(args.quote, args.days)
+        lines = [f"  {r['date']}  {r['currency']}  정규 {r['regular'] if r['regular'] is not None else '-'}"
+                 + (f"  프리 {r['pre']}" if r["pre"] is not None else "") + (f"  애프터 {r['post']}" if r["post"] is not None else "")
+                 for r in rows]
+    else:
+        title, rows = f"[최근 {args.runs}회 실행]", recent_runs(args.runs)
+        lines = [f"  {r['run_id']:<26} {r['source']:<6} {_won(r['total_krw']):>15}원  환율 {r['usd_krw'] or '-':>8}  "
+                 f"α {_pct(r['alpha_cagr'])} β {_pct(r['beta_cagr'])} 최종 {_pct(r['final_cagr'])}" for r in rows]
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return 0
+    print(title)
+    print("\n".join(lines) if lines else "  (기록 없음)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
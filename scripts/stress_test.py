@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bear/Base/Bull 스트레스 테스트 (Step 3 최종 프롬프트용)
+
+OpenAI가 머릿속으로 하던 "Bear/Bull이면 평가액이 얼마" 계산을 스크립트가 한다. compute_portfolio_valuation 행(종목별
+원화 평가액)에 충격 벡터를 적용해 시나리오별 충격 후 총자산·비중을 낸다.
+
+- 충격 모델: 종목 수익률 = Σ 노출도[종목, 요인] × 요인 충격 (요인: market 미국 시장, semis 반도체, kr 한국 시장, btc 비트코인 등)
+  → 시나리오에 종목별 충격(tickers)이 있으면 그 종목은 그 값으로 대체 → 하한 -100%
+  → 환율: 평가액 × (1 + USD/KRW 변동 × 환 노출도) (USD 종목 기본 1, 원화 상장 미국 ETF는 설정으로 1)
+- 노출도·시나리오·그리드: 아래 DEFAULT_* 기본값, config.json `stress`에는 바꿀 항목만. MSTR은 btc 요인으로 BTC 연동
+- 이름 붙은 시나리오(Bear/Base/Bull 등) + 요인 축 그리드(기본 약 1.5만 셀)를 [시나리오×종목] 행렬 한 번으로 계산
+- numpy 필수
+
+사용법:
+    python stress_test.py                                   # config.json 보유 종목, 현재가 조회
+    python stress_test.py --price TSLA=250 --fx-base 1400   # 조회 대신 지정 (rebalance_grid.py와 같은 인자)
+    python stress_test.py --json
+"""
+
+import sys
+import json
+import argparse
+
+import common
+from rebalance_grid import parse_axis
+
+CASH_LABEL = "현금"
+FACTOR_LABELS = {"market": "미국 시장", "semis": "반도체", "kr": "한국 시장", "btc": "BTC", "fx": "USD/KRW"}
+# 종목별 요인 노출도 (없는 종목: USD → market 1.0, KRW → kr 1.0). "fx": 환 노출도 (기본 USD 1, KRW 0)
+DEFAULT_EXPOSURES = {
+    "TSLA": {"market": 1.5},
+    "MSTR": {"btc": 1.3, "market": 0.4},
+    "MAGS": {"market": 1.2},
+    "SMH": {"semis": 1.0},
+    "PLTR": {"market": 1.6},
+    "000660.KS": {"semis": 1.0},
+    "005930.KS": {"semis": 0.6, "kr": 0.4},
+    "360750.KS": {"market": 1.0, "fx": 1.0},
+    "458730.KS": {"market": 0.7, "fx": 1.0},
+}
+# 요인 충격 %, fx = USD/KRW 변동 %, tickers = 종목 충격 % (요인 모델 대신)
+DEFAULT_SCENARIOS = [
+    {"name": "Bear", "desc": "위험회피: 미국 -35%, 반도체 -40%, 한국 -25%, BTC -60%, 원화 약세",
+     "factors": {"market": -35, "semis": -40, "kr": -25, "btc": -60}, "fx": 10},
+    {"name": "Base", "desc": "현재가 유지", "factors": {}, "fx": 0},
+    {"name": "Bull", "desc": "위험선호: 미국 +30%, 반도체 +40%, 한국 +20%, BTC +80%, 원화 강세",
+     "factors": {"market": 30, "semis": 40, "kr": 20, "btc": 80}, "fx": -5},
+    {"name": "TSLA 단독 급락", "desc": "TSLA -50%, 나머지 유지", "tickers": {"TSLA": -50}},
+    {"name": "원화 강세", "desc": "USD/KRW -15%", "fx": -15},
+]
+DEFAULT_GRID = {"market": "-40:40:10", "semis": "-40:40:20", "kr": "-30:30:10", "btc": "-60:60:20", "fx": "-15:15:5"}
+LOSS_LEVELS = (20, 30)  # 그리드 셀 중 이 % 이상 손실 비율
+
+
+def load_settings():
+    """config.json `stress` + 기본값. 반환: {"exposures", "scenarios", "grid"}."""
+    cfg = common.load_config().get("stress") or {}
+    exposures = dict(DEFAULT_EXPOSURES)
+    exposures.update(cfg.get("exposures") or {})
+    return {"exposures": exposures, "scenarios": cfg.get("scenarios") or DEFAULT_SCENARIOS, "grid": cfg.get("grid") or DEFAULT_GRID}
+
+
+def build_book(rows):
+    """compute_portfolio_valuation 행 → 종목별 합산 장부 (계좌 합산, 현금 한 줄).
+    반환: {"symbols", "names", "currency", "values"(원)} — 현금은 symbol None."""
+    index, book = {}, {"symbols": [], "names": [], "currency": [], "values": []}
+    for r in rows:
+        sym = r.get("symbol")
+        key = sym or CASH_LABEL
+        if key not in index:
+            index[key] = len(book["symbols"])
+            book["symbols"].append(sym)
+            book["names"].append((r.get("name") or sym) if sym else CASH_LABEL)
+            book["currency"].append((r.get("currency") or "KRW").upper())
+            book["values"].append(0.0)
+        book["values"][index[key]] += float(r.get("value_krw") or 0)
+    return book
+
+
+def _factors(settings):
+    """시나리오·그리드·노출도에 나오는 요인 + 기본 노출 요인(market·kr) (fx 제외), 정렬."""
+    keys = {"market", "kr"}
+    for e in settings["exposures"].values():
+        keys.update(e)
+    for sc in settings["scenarios"]:
+        keys.update(sc.get("factors") or {})
+    keys.update(settings["grid"])
+    keys.discard("fx")
+    return sorted(keys)
+
+
+def exposure_matrix(np, book, settings, factors):
+    """노출도 L [종목×요인]과 환 노출도 [종목]. 현금은 0."""
+    K = len(book["symbols"])
+    L, fx_exp = np.zeros((K, len(factors))), np.zeros(K)
+    for k, (sym, cur) in enumerate(zip(book["symbols"], book["currency"])):
+        if sym is None:
+            continue
+        e = settings["exposures"].get(sym) or {("market" if cur == "USD" else "kr"): 1.0}
+        for f, x in e.items():
+            if f != "fx":
+                L[k, factors.index(f)] = float(x)
+        fx_exp[k] = float(e.get("fx", 1.0 if cur == "USD" else 0.0))
+    return L, fx_exp
+
+
+def apply(np, values, L, fx_exp, F, fx, overrides=None):
+    """충격 후 종목별 평가액 [시나리오×종목]. F: 요인 충격 % [시나리오×요인], fx: USD/KRW 변동 % [시나리오],
+    overrides: 종목 충격 % [시나리오×종목] (nan = 요인 모델)."""
+    R = (F @ L.T) / 100
+    if overrides is not None:
+        R = np.where(np.isnan(overrides), R, overrides / 100)
+    return values * np.maximum(1 + R, 0.0) * (1 + np.outer(fx, fx_exp) / 100)
+
+
+def run(rows, settings=None):
+    """이름 붙은 시나리오 + 요인 그리드. numpy 없거나 평가액 0이면 None.
+    반환: {"total_krw", "weights"(현재 %), "scenarios": [{"name", "desc", "total_krw", "change_pct", "weights"}], "grid": {...}}."""
+    np = common.numpy()
+    if np is None:
+        print("[WARNING] numpy 미설치. 스트레스 테스트 생략. 설치: pip install numpy")
+        return None
+    settings = settings or load_settings()
+    book = build_book(rows)
+    values = np.array(book["values"])
+    total = float(values.sum())
+    if total <= 0:
+        return None
+    factors = _factors(settings)
+    L, fx_exp = exposure_matrix(np, book, settings, factors)
+    names = book["names"]
+
+    scs = settings["scenarios"]
+    F = np.array([[float((sc.get("factors") or {}).get(f, 0)) for f in factors] for sc in scs]).reshape(len(scs), len(factors))
+    fx = np.array([float(sc.get("fx") or 0) for sc in scs])
+    ov = np.full((len(scs), len(values)), np.nan)
+    for i, sc in enumerate(scs):
+        for sym, move in (sc.get("tickers") or {}).items():
+            if sym in book["symbols"]:
+                ov[i, book["symbols"].index(sym)] = float(move)
+    post = apply(np, values, L, fx_exp, F, fx, ov)
+    totals = post.sum(axis=1)
+    scenarios = []
+    for i, sc in enumerate(scs):
+        scenarios.append({
+            "name": sc["name"], "desc": sc.get("desc") or "", "total_krw": float(totals[i]),
+            "change_pct": float((totals[i] / total - 1) * 100),
+            "weights": {n: float(v / totals[i] * 100) for n, v in zip(names, post[i])} if totals[i] > 0 else {},
+        })
+
+    axes_keys = [f for f in factors if f in settings["grid"]] + (["fx"] if "fx" in settings["grid"] else [])
+    axes = [parse_axis(settings["grid"][f]) for f in axes_keys]
+    grid = None
+    if axes:
+        cells = np.stack(np.meshgrid(*[np.array(a, dtype=float) for a in axes], indexing="ij"), axis=-1).reshape(-1, len(axes))
+        Fg = np.zeros((len(cells), len(factors)))
+        for j, f in enumerate(axes_keys):
+            if f != "fx":
+                Fg[:, factors.index(f)] = cells[:, j]
+        fxg = cells[:, axes_keys.index("fx")] if "fx" in axes_keys else np.zeros(len(cells))
+        change = (apply(np, values, L, fx_exp, Fg, fxg).sum(axis=1) / total - 1) * 100
+        worst, best = int(np.argmin(change)), int(np.argmax(change))
+        grid = {
+            "cells": len(cells), "axes": {f: settings["grid"][f] for f in axes_keys},
+            "percentiles": {str(q): float(np.percentile(change, q)) for q in (5, 25, 50, 75, 95)},
+            "loss_share": {str(x): float((change <= -x).mean() * 100) for x in LOSS_LEVELS},
+            "worst": {"change_pct": float(change[worst]), "shocks": dict(zip(axes_keys, cells[worst].tolist()))},
+            "best": {"change_pct": float(change[best]), "shocks": dict(zip(axes_keys, cells[best].tolist()))},
+        }
+    return {"total_krw": total, "weights": {n: float(v / total * 100) for n, v in zip(names, values)},
+            "factors": factors, "scenarios": scenarios, "grid": grid}
+
+
+def _eok(v):
+    return f"{v / 100_000_000:,.2f}억"
+
+
+def _shocks(shocks):
+    return ", ".join(f"{FACTOR_LABELS.get(f, f)} {v:+g}%" for f, v in shocks.items())
+
+
+def format_markdown(result, top=3):
+    """시나리오 표(충격 후 총자산·변화·상위 비중) + 그리드 분포 요약."""
+    lines = [f"현재 총자산 {_eok(result['total_krw'])} 기준", "",
+             "| 시나리오 | 가정 | 충격 후 총자산 | 변화 | 충격 후 비중 상위 |", "|---|---|---|---|---|"]
+    for sc in result["scenarios"]:
+        w = sorted(sc["weights"].items(), key=lambda kv: -kv[1])[:top]
+        lines.append(f"| {sc['name']} | {sc['desc']} | {_eok(sc['total_krw'])} | {sc['change_pct'] + 0.0:+.1f}% | "
+                     + ", ".join(f"{n} {v:.1f}%" for n, v in w) + " |")
+    g = result.get("grid")
+    if g:
+        p = g["percentiles"]
+        lines += [
+            "",
+            f"요인 그리드 {g['cells']:,}셀 ({'·'.join(FACTOR_LABELS.get(f, f) for f in g['axes'])} 축 조합) 총자산 변화: "
+            f"5% {p['5']:+.1f}%, 25% {p['25']:+.1f}%, 중앙 {p['50']:+.1f}%, 75% {p['75']:+.1f}%, 95% {p['95']:+.1f}%",
+            "- " + ", ".join(f"{x}% 이상 손실 셀 {v:.1f}%" for x, v in g["loss_share"].items())
+            + f"; 최악 {g['worst']['change_pct']:+.1f}% ({_shocks(g['worst']['shocks'])}), "
+              f"최선 {g['best']['change_pct']:+.1f}% ({_shocks(g['best']['shocks'])})",
+        ]
+    return "\n".join(lines)
+
+
+def format_for_prompt(result):
+    """create_final_prompt에 넣을 블록 (스크립트 계산 — Bear/Bull 평가액·비중은 이 값을 인용)."""
+    head = ("**스트레스 테스트 (스크립트 계산 — Bear/Base/Bull 충격 후 총자산·비중은 이 값을 인용하고 직접 계산하지 말 것)**\n"
+            "요인 노출도(미국 시장·반도체·한국 시장·BTC)와 USD/KRW 변동을 현재 평가액에 적용한 결과. 장기 CAGR 가정이 아니라 즉시 충격.\n\n")
+    return head + format_markdown(result) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="보유 종목 Bear/Base/Bull 스트레스 테스트")
+    parser.add_argument("--price", action="append", default=None, help="SYMBOL=현지 통화 가격 (조회 대신 지정, 반복)")
+    parser.add_argument("--fx-base", type=float, default=None, help="기준 USD/KRW 환율 (조회 대신 지정)")
+    parser.add_argument("--json", action="store_true", help="JSON 출력")
+    args = parser.parse_args()
+    common.utf8_stdout()
+    import generate_portfolio_report_3ai as gen
+    from rebalance_grid import load_live
+    holdings, fx, prices = load_live(args)
+    if holdings is None:
+        return 1
+    currency = {p["symbol"]: (p.get("currency") or "USD").upper() for p in holdings["positions"]}
+    us = {s: {"regular": v} for s, v in prices.items() if currency.get(s) == "USD"}
+    kr = {s: v for s, v in prices.items() if currency.get(s) == "KRW"}
+    missing = [s for s in currency if s not in prices]
+    if missing:
+        print(f"[WARNING] 가격 없는 종목은 0원으로 계산: {', '.join(missing)}")
+    rows, _ = gen.compute_portfolio_valuation(holdings, fx, us, kr)
+    result = run(rows)
+    if result is None:
+        print("[ERROR] 평가액 없음 (가격·환율 확인)")
+        return 1
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(format_markdown(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
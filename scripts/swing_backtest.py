@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+스윙 규칙 백테스트·파라미터 스윕 (tsla_swing_analysis.py 규칙을 과거 일봉으로 재생)
+
+swing_rules.py 규칙(3개월 최고가 대비 -15%/-20% 매수, -10% 복구, -2% 이내 또는 주봉 RSI>75 매도)을
+보유 종목 일봉 수년치에 그대로 적용하고, 파라미터 조합 수천 개를 한 번에 비교한다.
+
+- 레인 = 종목 × 파라미터 조합. 날짜 루프 1회 동안 모든 레인을 numpy 배열 연산으로 갱신 (단계 전이는 경로 의존이라 날짜 축만 순차)
+- 종목마다 시작일(최고가 기간 확보 후) 종가로 보유 1단위(평가액 1.0)에서 시작, 스윙 현금은 0
+- 체결: 신호가 난 날 종가, 수수료 --fee-bps (기본 10bp)
+- 지표: 수익률, 보유만 했을 때 대비 초과(= 주식 수 환산 증감), 매도·매수 횟수, 최대 낙폭(MDD)
+- 종목 휴장일은 가격을 이어 쓰되 신호는 보지 않음 (미국·한국 종목 혼합 가능)
+- numpy 필수, 일봉은 swing_rules.load_daily_history (yfinance, report/cache 캐시)
+
+사용법:
+    python swing_backtest.py                                   # config.json 보유 종목 5년, 기본 스윕
+    python swing_backtest.py --symbols TSLA,MSTR --years 8 --top 10
+    python swing_backtest.py --symbols TSLA --buy1=-12 --buy2=-18 --recovery=-8 --sell-within 3 --rsi-sell 80   # 제안 트리거 1개 검증
+    python swing_backtest.py --window 42,63,126 --rsi-period 10,14 --json > sweep.json
+"""
+
+import sys
+import json
+import time
+import argparse
+import itertools
+from datetime import date, timedelta
+
+import common
+import swing_rules
+from rebalance_grid import parse_axis
+
+# 스윕 축: 규칙 키 → (CLI 옵션, 기본 스윕 값)
+SWEEP_AXES = {
+    "buy1_pct": ("buy1", "-20:-10:2.5"),
+    "buy2_pct": ("buy2", "-30:-15:5"),
+    "recovery_pct": ("recovery", "-12.5:-5:2.5"),
+    "sell_within_pct": ("sell_within", "1,2,3,5"),
+    "rsi_sell": ("rsi_sell", "70,75,80"),
+    "sell_fraction_pct": ("sell_fraction", "10,20"),
+    "high_window_days": ("window", "63"),
+    "rsi_period": ("rsi_period", "14"),
+    "buy1_cash_pct": ("buy1_cash", None),
+    "buy2_cash_pct": ("buy2_cash", None),
+}
+DEFAULT_YEARS = 5
+DEFAULT_FEE_BPS = 10.0
+
+
+def build_grid(axes, base_rules):
+    """축 값 목록 dict → 조합 목록 (지정 안 한 키는 base_rules 값). 2차 < 1차 < 복구 < 0 이 아닌 조합은 제외."""
+    keys = list(swing_rules.DEFAULT_RULES)
+    values = [axes.get(k) or [base_rules[k]] for k in keys]
+    combos = []
+    for vals in itertools.product(*values):
+        r = dict(zip(keys, vals))
+        if r["buy2_pct"] < r["buy1_pct"] < r["recovery_pct"] < 0:
+            r["high_window_days"], r["rsi_period"] = int(r["high_window_days"]), int(r["rsi_period"])
+            combos.append(r)
+    return combos
+
+
+def _align(np, history, symbols, windows, periods):
+    """종목별 일봉 → 공통 날짜 축 배열. 가격·최고가·RSI는 휴장일에 앞 값 유지, trade는 그 종목 거래일만 True."""
+    dates = sorted({d for s in symbols for d in history[s]["dates"]})
+    pos = {d: i for i, d in enumerate(dates)}
+    K, D = len(symbols), len(dates)
+    px = np.full((K, D), np.nan)
+    hi = np.full((K, len(windows), D), np.nan)
+    rsi = np.full((K, len(periods), D), np.nan)
+    trade = np.zeros((K, D), dtype=bool)
+    start = np.zeros(K, dtype=int)
+    for k, s in enumerate(symbols):
+        idx = np.array([pos[d] for d in history[s]["dates"]])
+        close = np.asarray(history[s]["close"], dtype=float)
+        px[k, idx] = close
+        for w, win in enumerate(windows):
+            hi[k, w, idx] = swing_rules.rolling_high(np, close, win)
+        for p, per in enumerate(periods):
+            rsi[k, p, idx] = swing_rules.weekly_rsi_series(history[s]["dates"], close, per)
+        first = idx[min(max(windows) - 1, len(idx) - 1)]
+        start[k] = first
+        trade[k, idx] = True
+        trade[k, :first] = False
+    # 앞 값 채우기 (휴장일)
+    for arr in (px, hi, rsi):
+        flat = arr.reshape(-1, D)
+        valid = ~np.isnan(flat)
+        last = np.where(valid, np.arange(D), 0)
+        np.maximum.accumulate(last, axis=1, out=last)
+        filled = np.take_along_axis(flat, last, axis=1)
+        arr[...] = filled.reshape(arr.shape)
+    return dates, px, hi, rsi, trade, start
+
+
+def run(history, combos, fee_bps=DEFAULT_FEE_BPS):
+    """종목 × 조합 레인 백테스트. 반환: {"symbols", "combos", "return", "bh_return", "excess", "sells", "buys", "mdd",
+    "bh_mdd", "days", "start", "end", "elapsed_s"} (지표는 [종목, 조합] 배열, % 단위). numpy 없으면 None."""
+    np = common.numpy()
+    if np is None:
+        print("[WARNING] numpy 미설치. 스윙 백테스트 불가. 설치: pip install numpy")
+        return None
+    t0 = time.perf_counter()
+    symbols = [s for s in history if len(history[s]["close"]) > 1]
+    windows = sorted({c["high_window_days"] for c in combos})
+    periods = sorted({c["rsi_period"] for c in combos})
+    dates, px, hi, rsi, trade, start = _align(np, history, symbols, windows, periods)
+    K, C, D = len(symbols), len(combos), len(dates)
+    lane_k = np.repeat(np.arange(K), C)
+    lane_c = np.tile(np.arange(C), K)
+    rules = {key: np.array([c[key] for c in combos], dtype=float)[lane_c] for key in swing_rules.DEFAULT_RULES}
+    w_idx = np.array([windows.index(c["high_window_days"]) for c in combos])[lane_c]
+    p_idx = np.array([periods.index(c["rsi_period"]) for c in combos])[lane_c]
+    sell_frac, b1_frac, b2_frac = rules["sell_fraction_pct"] / 100, rules["buy1_cash_pct"] / 100, rules["buy2_cash_pct"] / 100
+    fee = fee_bps / 10000
+    L = K * C
+    shares = (1.0 / px[np.arange(K), start])[lane_k]
+    cash = np.zeros(L)
+    stage = np.zeros(L)
+    peak, mdd = np.ones(L), np.zeros(L)
+    sells, buys = np.zeros(L, dtype=np.int32), np.zeros(L, dtype=np.int32)
+    for t in range(int(start.min()), D):
+        act = trade[:, t][lane_k]
+        if not act.any():
+            continue
+        p, h, r = px[:, t][lane_k], hi[lane_k, w_idx, t], rsi[lane_k, p_idx, t]
+        c = swing_rules.conditions(p, h, r, stage, rules)
+        sell = c["sell"] & act
+        qty = shares * sell_frac * sell
+        shares -= qty
+        cash += qty * p * (1 - fee)
+        stage[sell] = 1
+        sells += sell
+        # 1차 → (같은 날 2차 기준 이하면) 2차 → 복구 순. 매수 금액은 수수료 차감 후 주식으로
+        b1 = c["buy1"] & act
+        spend = cash * b1_frac * b1
+        cash -= spend
+        shares += spend * (1 - fee) / p
+        stage[b1] = 2
+        b2 = swing_rules.conditions(p, h, r, stage, rules)["buy2"] & act
+        spend = cash * b2_frac * b2
+        cash -= spend
+        shares += spend * (1 - fee) / p
+        stage[b2] = 3
+        rec = c["recovery"] & act
+        spend = cash * rec
+        cash -= spend
+        shares += spend * (1 - fee) / p
+        stage[rec] = 0
+        buys += b1.astype(np.int32) + b2 + rec
+        started = (t >= start)[lane_k]
+        equity = np.where(started, shares * p + cash, 1.0)
+        np.maximum(peak, equity, out=peak)
+        np.maximum(mdd, 1 - equity / peak, out=mdd)
+    last = px[:, -1]
+    equity = (shares * last[lane_k] + cash).reshape(K, C)
+    bh = last / px[np.arange(K), start]
+    bh_mdd = np.zeros(K)
+    for k in range(K):
+        path = px[k, start[k]:]
+        bh_mdd[k] = float((1 - path / np.maximum.accumulate(path)).max())
+    return {
+        "symbols": symbols, "combos": combos, "fee_bps": fee_bps,
+        "return": (equity - 1) * 100, "bh_return": (bh - 1) * 100, "excess": (equity / bh[:, None] - 1) * 100,
+        "sells": sells.reshape(K, C), "buys": buys.reshape(K, C), "mdd": mdd.reshape(K, C) * 100, "bh_mdd": bh_mdd * 100,
+        "days": [int(D - start[k]) for k in range(K)], "start": [dates[start[k]] for k in range(K)], "end": dates[-1],
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+    }
+
+
+def _rule_text(r):
+    return (f"창 {r['high_window_days']}일, 매도 -{r['sell_within_pct']:g}%/RSI>{r['rsi_sell']:g} ({r['sell_fraction_pct']:g}%), "
+            f"매수 {r['buy1_pct']:g}%/{r['buy2_pct']:g}%, 복구 {r['recovery_pct']:g}%")
+
+
+def _find(combos, rules):
+    keys = swing_rules.DEFAULT_RULES
+    return next((i for i, c in enumerate(combos) if all(float(c[k]) == float(rules[k]) for k in keys)), None)
+
+
+def format_markdown(result, base_rules, top=5):
+    """종목별 상위 조합(초과 수익 기준) + 현재 규칙 행, 전 종목 평균 상위 조합."""
+    np = common.numpy()
+    combos = result["combos"]
+    base_i = _find(combos, base_rules)
+    head = "| 규칙 | 수익률 | 보유 대비 | 매도/매수 | MDD |"
+    sep = "|---|---|---|---|---|"
+
+    def row(k, i, tag=""):
+        return (f"| {tag}{_rule_text(combos[i])} | {result['return'][k, i]:+.1f}% | {result['excess'][k, i]:+.1f}%p | "
+                f"{result['sells'][k, i]}/{result['buys'][k, i]} | {result['mdd'][k, i]:.1f}% |")
+
+    lines = [f"조합 {len(combos):,}개 × 종목 {len(result['symbols'])}개, 수수료 {result['fee_bps']:g}bp, "
+             f"계산 {result['elapsed_s']:.2f}초", ""]
+    for k, sym in enumerate(result["symbols"]):
+        lines += [f"### {sym}  ({result['start'][k]} ~ {result['end']}, {result['days'][k]}일) — 보유만: "
+                  f"{result['bh_return'][k]:+.1f}%, MDD {result['bh_mdd'][k]:.1f}%", "", head, sep]
+        if base_i is not None:
+            lines.append(row(k, base_i, "**현재 규칙** "))
+        for i in np.argsort(-result["excess"][k])[:top]:
+            if i != base_i:
+                lines.append(row(k, int(i)))
+        lines.append("")
+    if len(result["symbols"]) > 1:
+        mean = result["excess"].mean(axis=0)
+        lines += ["### 전 종목 평균 보유 대비 상위", "", "| 규칙 | 평균 보유 대비 | 최저 종목 |", "|---|---|---|"]
+        order = [int(i) for i in np.argsort(-mean)[:top]]
+        if base_i is not None and base_i not in order:
+            order = [base_i] + order
+        for i in order:
+            worst = int(np.argmin(result["excess"][:, i]))
+            tag = "**현재 규칙** " if i == base_i else ""
+            lines.append(f"| {tag}{_rule_text(combos[i])} | {mean[i]:+.1f}%p | "
+                         f"{result['symbols'][worst]} {result['excess'][worst, i]:+.1f}%p |")
+    return "\n".join(lines)
+
+
+def to_json(result, top=20):
+    """종목별 상위 top 조합과 지표 (전체 배열은 크므로 상위만)."""
+    np = common.numpy()
+    out = {"fee_bps": result["fee_bps"], "end": result["end"], "combos": len(result["combos"]),
+           "elapsed_s": result["elapsed_s"], "symbols": {}}
+    for k, sym in enumerate(result["symbols"]):
+        out["symbols"][sym] = {
+            "start": result["start"][k], "bh_return": float(result["bh_return"][k]), "bh_mdd": float(result["bh_mdd"][k]),
+            "top": [dict(result["combos"][i], **{"return": float(result["return"][k, i]), "excess": float(result["excess"][k, i]),
+                                                 "sells": int(result["sells"][k, i]), "buys": int(result["buys"][k, i]),
+                                                 "mdd": float(result["mdd"][k, i])})
+                    for i in (int(j) for j in np.argsort(-result["excess"][k])[:top])],
+        }
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="스윙 규칙 백테스트·파라미터 스윕")
+    parser.add_argument("--symbols", default=None, help="쉼표 구분 종목 (기본: config.json 보유 종목 전체)")
+    parser.add_argument("--years", type=int, default=DEFAULT_YEARS, help=f"일봉 기간(년, 기본 {DEFAULT_YEARS})")
+    for key, (opt, default) in SWEEP_AXES.items():
+        hint = f"기본 스윕 {default}" if default else "기본: 현재 규칙 값"
+        parser.add_argument(f"--{opt.replace('_', '-')}", dest=opt, default=None,
+                            help=f"{key} 값 목록 또는 시작:끝:간격 ({hint}; 음수로 시작하면 --{opt.replace('_', '-')}=-20)")
+    parser.add_argument("--rules-only", action="store_true", help="스윕 없이 현재 규칙(config.json swing.rules) 1개만")
+    parser.add_argument("--fee-bps", type=float, default=DEFAULT_FEE_BPS, help=f"매매 수수료 bp (기본 {DEFAULT_FEE_BPS:g})")
+    parser.add_argument("--top", type=int, default=5, help="종목별 표시할 상위 조합 수 (기본 5)")
+    parser.add_argument("--cache", default=None, help="일봉 캐시 JSON 경로 (기본 report/cache/daily_closes.json)")
+    parser.add_argument("--refresh", action="store_true", help="캐시 무시하고 일봉 다시 조회")
+    parser.add_argument("--json", action="store_true", help="JSON 출력")
+    args = parser.parse_args()
+    common.utf8_stdout()
+    if common.numpy() is None:
+        print("[ERROR] numpy 미설치. 설치: pip install numpy")
+        return 1
+    base = swing_rules.load_rules()
+    axes = {}
+    try:
+        for key, (opt, default) in SWEEP_AXES.items():
+            text = getattr(args, opt)
+            if text is None and not args.rules_only:
+                text = default
+            if text is not None:
+                axes[key] = parse_axis(text)
+    except ValueError as e:
+        print(f"[ERROR] 축 형식 오류: {e}")
+        return 1
+    combos = build_grid(axes, base)
+    if not combos:
+        print("[ERROR] 유효한 조합 없음 (2차 < 1차 < 복구 < 0 이어야 함)")
+        return 1
+    if args.symbols:
+        symbols = [s.strip() for s in args.symbols.split(",") if s.strip()]
+    else:
+        holdings = common.load_config().get("portfolio_holdings") or {}
+        symbols = list(dict.fromkeys(p["symbol"] for p in holdings.get("positions") or []))
+    history = swing_rules.load_daily_history(symbols, args.years, args.cache, args.refresh)
+    cutoff = (date.today() - timedelta(days=365 * args.years)).isoformat()
+    history = {s: {"dates": [d for d in history[s]["dates"] if d >= cutoff],
+                   "close": [c for d, c in zip(history[s]["dates"], history[s]["close"]) if d >= cutoff]}
+               for s in symbols if s in history}
+    if not history:
+        print("[ERROR] 일봉 이력 없음 (yfinance 설치·네트워크 확인)")
+        return 1
+    result = run(history, combos, args.fee_bps)
+    if args.json:
+        print(json.dumps(to_json(result, max(args.top, 1)), ensure_ascii=False, indent=2))
+    else:
+        print(format_markdown(result, base, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+실시간 스윙 신호 모니터 (tsla_swing_analysis.py의 고정 현재가 → 장중 시세)
+
+보유 종목 시세를 프리·정규·애프터 세션 동안 주기적으로 받아, swing_rules.py 규칙(보고서·백테스트와 동일 정의)의
+기준가를 넘는 순간 알림을 낸다.
+
+- 상태(종목당 고정 크기): 직전 (창-1)일 종가 deque와 그 최고가, 완료 주봉 RSI(Wilder) 상태, 오늘 정규장 마지막 가격, 직전 틱 가격·RSI
+  · 틱: 최고가 = max(직전 일 최고가, 현재가), RSI = 완료 주 상태 + 현재가 → O(1)
+  · 날짜가 바뀌면 전일 정규장 마지막 가격을 종가로 deque에 넣고, 주가 바뀌면 RSI 상태 갱신
+- 단계: 종목마다 swing_rules 단계(대기 → 현금 확보 → 1차 → 2차 → 복구)를 유지. 시작 시 일봉으로
+  백테스트와 같이 재생(replay_stage)해 현재 단계를 정하고, 틱마다 evaluate_signal(stage=...)로 진행
+- 알림: 단계가 바뀌는 틱에만 1건 — 매도(대기에서 최고가 -2% 이내·주봉 RSI 75 초과), 1·2차 매수(현금 확보 후),
+  복구(매수 후 -10% 회복). 매도는 가격·RSI 조건을 한 알림에 함께 표시.
+  알림마다 보고서와 같은 위치 판정(단계 없이) 포함. 콘솔 + report/swing_alerts.jsonl
+- 세션: 미국 종목 뉴욕 시간 프리 04:00~09:30·정규~16:00·애프터~20:00, 한국 종목 서울 09:00~15:30 (주말 제외)
+- 시세: 3ai 스크립트와 같은 조회 함수 (미국: 세션별 프리/정규/애프터 가격, 한국: 현재가)
+- --replay: 기록된 틱 CSV(시각,종목,가격[,세션])를 순서대로 재생 (장 밖 점검·규칙 확인용)
+
+사용법:
+    python swing_monitor.py                                  # 보유 종목 전체, 60초 간격
+    python swing_monitor.py --symbols TSLA,MSTR --interval 30 --verbose
+    python swing_monitor.py --once                           # 1회 조회·판정 후 종료 (작업 스케줄러용)
+    python swing_monitor.py --replay ticks.csv               # 틱 재생
+"""
+
+import sys
+import csv
+import json
+import time
+import argparse
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import common
+import swing_rules
+
+PROJECT_ROOT = Path(__file__).parent.parent
+ALERT_LOG = PROJECT_ROOT / "report" / "swing_alerts.jsonl"
+DEFAULT_INTERVAL = 60
+# (세션, 시작 분, 끝 분) — 현지 시각 기준
+SESSIONS = {
+    "USD": [("pre", 4 * 60, 9 * 60 + 30), ("regular", 9 * 60 + 30, 16 * 60), ("post", 16 * 60, 20 * 60)],
+    "KRW": [("regular", 9 * 60, 15 * 60 + 30)],
+}
+MARKET_TZ = {"USD": ("America/New_York", -5), "KRW": ("Asia/Seoul", 9)}
+SESSION_LABEL = {"pre": "프리마켓", "regular": "정규장", "post": "애프터마켓"}
+
+
+def market_tz(currency):
+    """시장 시간대. zoneinfo 데이터가 없으면(Windows에서 tzdata 미설치) 고정 오프셋 (서머타임 미반영)."""
+    name, offset = MARKET_TZ.get(currency, MARKET_TZ["USD"])
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(name)
+    except Exception:
+        return timezone(timedelta(hours=offset))
+
+
+def market_session(currency, now):
+    """now(aware) 기준 세션명 또는 None (주말·장 밖)."""
+    local = now.astimezone(market_tz(currency))
+    if local.weekday() >= 5:
+        return None
+    minute = local.hour * 60 + local.minute
+    for name, start, end in SESSIONS.get(currency, SESSIONS["USD"]):
+        if start <= minute < end:
+            return name
+    return None
+
+
+def seed_state(symbol, currency, history, rules, today):
+    """일봉 이력으로 종목 상태 초기화. today(시장 현지 날짜 ISO) 이후 봉은 진행 중으로 보고 제외.
+    단계는 같은 일봉을 백테스트 순서로 재생한 값 (이력이 없으면 대기)."""
+    window, period = int(rules["high_window_days"]), int(rules["rsi_period"])
+    dates = [d for d in history.get("dates", []) if d < today]
+    closes = history.get("close", [])[:len(dates)]
+    prior = deque(closes[-(window - 1):], maxlen=max(window - 1, 1))
+    cur_week = swing_rules.week_key(today)
+    weeks = {}
+    for d, c in zip(dates, closes):
+        wk = swing_rules.week_key(d)
+        if wk < cur_week:
+            weeks[wk] = c
+    return {
+        "symbol": symbol, "currency": currency, "prior": prior, "prior_high": max(prior) if prior else float("-inf"),
+        "day": today, "week": cur_week, "close_today": None,
+        "rsi": swing_rules.rsi_seed([weeks[k] for k in sorted(weeks)], period),
+        # 가장 최근 완료 일 종가 (주, 가격) — 이미 RSI 상태에 들어간 주면 다시 넣지 않음
+        "week_close": (swing_rules.week_key(dates[-1]), closes[-1]) if dates else None,
+        "stage": swing_rules.replay_stage(dates, closes, rules), "ticks": 0,
+    }
+
+
+def on_tick(st, price, day, session, rules):
+    """틱 하나 반영·판정. day는 시장 현지 날짜 ISO. 반환: (알림 목록, 판정 dict)."""
+    period = int(rules["rsi_period"])
+    if day != st["day"]:
+        # 전일 정규장 마지막 가격 = 일 종가
+        if st["close_today"] is not None:
+            st["prior"].append(st["close_today"])
+            st["prior_high"] = max(st["prior"])
+            st["week_close"] = (st["week"], st["close_today"])
+        wk = swing_rules.week_key(day)
+        if wk != st["week"] and st["week_close"] and st["week_close"][0] == st["week"]:
+            swing_rules.rsi_roll(st["rsi"], st["week_close"][1], period)
+        st["day"], st["week"], st["close_today"] = day, wk, None
+    if session == "regular":
+        st["close_today"] = price
+    high = max(st["prior_high"], price)
+    rsi = swing_rules.rsi_with(st["rsi"], price, period)
+    signal, _ = swing_rules.evaluate_signal(price, high, rsi, rules)
+    stage = st["stage"]
+    action, nxt = swing_rules.evaluate_signal(price, high, rsi, rules, stage=stage)
+    st["ticks"] += 1
+    th = swing_rules.thresholds(high, rules)
+    view = {"symbol": st["symbol"], "price": price, "high": high, "gap_pct": (price / high - 1) * 100 if high > 0 else None,
+            "rsi": rsi, "signal": signal, "session": session, "thresholds": th, "stage": swing_rules.STAGES[stage]}
+    # 단계가 바뀔 때만 알림 (같은 단계에서 기준가 근처 등락은 무시, 복구 전 재매도·매수 전 복구 없음)
+    if nxt == stage:
+        return [], view
+    st["stage"] = nxt
+    if action == swing_rules.SIGNAL_SELL:
+        # 가격·RSI 조건이 같은 틱에 함께 맞으면 한 알림으로
+        triggers = [name for name, hit in (("sell", price >= th["sell"]), ("rsi", rsi > rules["rsi_sell"])) if hit]
+    else:
+        triggers = [{swing_rules.SIGNAL_BUY1: "buy1", swing_rules.SIGNAL_BUY2: "buy2"}.get(action, "recovery")]
+    return [dict(view, alert=action, triggers=triggers, stage=swing_rules.STAGES[nxt])], view
+
+
+def _money(currency, v):
+    return f"${v:,.2f}" if currency == "USD" else f"{v:,.0f}원"
+
+
+def format_alert(a, currency, ts):
+    th = a["thresholds"]
+    what = " · ".join(f"주봉 RSI {a['rsi']:.1f} > 기준" if name == "rsi" else f"기준가 {_money(currency, th[name])} 돌파"
+                      for name in a["triggers"])
+    return (f"[ALERT] {ts} {a['symbol']} {a['alert']} — {_money(currency, a['price'])} ({SESSION_LABEL.get(a['session'], a['session'])}), "
+            f"{what}; 3개월 최고가 {_money(currency, a['high'])} 대비 {a['gap_pct']:+.1f}%, → {a['stage']}, 위치 판정 {a['signal']}")
+
+
+def emit(alerts, currency, ts, log_path):
+    for a in alerts:
+        print(format_alert(a, currency, ts))
+    if not alerts or log_path is None:
+        return
+    try:
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(log_path, "a", encoding="utf-8") as f:
+            for a in alerts:
+                f.write(json.dumps(dict(a, ts=ts), ensure_ascii=False) + "\n")
+    except Exception as e:
+        print(f"[WARNING] 알림 로그 기록 실패: {e}")
+
+
+def fetch_quotes(states, now):
+    """세션 중인 종목 시세 {symbol: (가격, 세션)} (3ai 스크립트 조회 함수 재사용)."""
+    import generate_portfolio_report_3ai as gen
+    live = {s: market_session(st["currency"], now) for s, st in states.items()}
+    us = [s for s, sess in live.items() if sess and states[s]["currency"] == "USD"]
+    kr = [s for s, sess in live.items() if sess and states[s]["currency"] != "USD"]
+    quotes = {}
+    for sym, px in (gen.fetch_us_stock_prices(us) if us else {}).items():
+        price = px.get(live[sym]) or px.get("regular")
+        if price is not None:
+            quotes[sym] = (float(price), live[sym])
+    for sym, price in (gen.fetch_kr_stock_prices(kr) if kr else {}).items():
+        quotes[sym] = (float(price), live[sym])
+    return quotes
+
+
+def read_replay(path):
+    """틱 CSV (시각,종목,가격[,세션]) → [(aware datetime, symbol, price, session 또는 None)]. 헤더 줄은 건너뜀."""
+    ticks = []
+    with open(path, encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith("#"):
+                continue
+            try:
+                ts = datetime.fromisoformat(row[0].strip())
+                price = float(row[2])
+            except ValueError:
+                continue
+            ticks.append((ts, row[1].strip(), price, row[3].strip() if len(row) > 3 and row[3].strip() else None))
+    return ticks
+
+
+def _local(ts, currency):
+    tz = market_tz(currency)
+    return ts.astimezone(tz) if ts.tzinfo else ts.replace(tzinfo=tz)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="실시간 스윙 신호 모니터")
+    parser.add_argument("--symbols", default=None, help="쉼표 구분 종목 (기본: config.json 보유 종목 전체)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help=f"조회 간격 초 (기본 {DEFAULT_INTERVAL})")
+    parser.add_argument("--once", action="store_true", help="1회 조회·판정 후 종료")
+    parser.add_argument("--replay", default=None, help="틱 CSV 재생 (시각,종목,가격[,세션])")
+    parser.add_argument("--cache", default=None, help="일봉 캐시 JSON 경로 (기본 report/cache/daily_closes.json)")
+    parser.add_argument("--no-log", action="store_true", help="report/swing_alerts.jsonl 기록 안 함")
+    parser.add_argument("--verbose", action="store_true", help="조회마다 종목별 현재 판정 출력")
+    args = parser.parse_args()
+    common.utf8_stdout(line_buffering=True)
+
+    rules = swing_rules.load_rules()
+    holdings = common.load_config().get("portfolio_holdings") or {}
+    currency = {p["symbol"]: (p.get("currency") or "USD").upper() for p in holdings.get("positions") or []}
+    symbols = [s.strip() for s in args.symbols.split(",")] if args.symbols else list(currency)
+    if not symbols:
+        print("[ERROR] 감시할 종목 없음 (config.json portfolio_holdings 또는 --symbols)")
+        return 1
+    history = swing_rules.load_daily_history(symbols, swing_rules.SIGNAL_HISTORY_YEARS, args.cache)
+    now = datetime.now(timezone.utc)
+    ticks = read_replay(args.replay) if args.replay else None
+    states = {}
+    for s in symbols:
+        cur = currency.get(s, "KRW" if s.endswith((".KS", ".KQ")) else "USD")
+        start = _local(ticks[0][0], cur) if ticks else now.astimezone(market_tz(cur))
+        states[s] = seed_state(s, cur, history.get(s) or {}, rules, start.date().isoformat())
+        if not history.get(s):
+            print(f"[WARNING] {s} 일봉 이력 없음 — 최고가·RSI는 감시 중 받은 가격으로만 계산")
+    log_path = None if args.no_log else ALERT_LOG
+    print(f"[스윙 모니터] {len(states)}종목, 규칙: 3개월({rules['high_window_days']}일) 최고가 -{rules['sell_within_pct']:g}% 이내·"
+          f"주봉 RSI>{rules['rsi_sell']:g} 매도, {rules['buy1_pct']:g}%/{rules['buy2_pct']:g}% 매수, {rules['recovery_pct']:g}% 복구")
+    eval_s, n_eval = 0.0, 0
+
+    def process(sym, price, ts, session):
+        nonlocal eval_s, n_eval
+        st = states[sym]
+        local = _local(ts, st["currency"])
+        t0 = time.perf_counter()
+        alerts, view = on_tick(st, price, local.date().isoformat(), session or market_session(st["currency"], ts) or "regular", rules)
+        eval_s += time.perf_counter() - t0
+        n_eval += 1
+        emit(alerts, st["currency"], local.isoformat(timespec="seconds"), log_path)
+        return view
+
+    if ticks is not None:
+        for ts, sym, price, session in ticks:
+            if sym in states:
+                process(sym, price, ts if ts.tzinfo else _local(ts, states[sym]["currency"]), session)
+        print(f"(재생 {n_eval:,}틱, 틱당 평균 {eval_s / max(n_eval, 1) * 1e6:.0f}µs)")
+        return 0
+
+    try:
+        while True:
+            now = datetime.now(timezone.utc)
+            quotes = fetch_quotes(states, now)
+            views = [process(sym, price, now, session) for sym, (price, session) in quotes.items()]
+            if args.verbose:
+                stamp = now.astimezone().strftime("%H:%M:%S")
+                cells = [f"{v['symbol']} {_money(states[v['symbol']]['currency'], v['price'])} {v['gap_pct']:+.1f}% "
+                         f"RSI {v['rsi']:.0f} {v['signal']} ({v['stage']})" for v in views]
+                print(f"[{stamp}] " + (" | ".join(cells) if cells else "시세 없음 (장 밖 또는 조회 실패)"))
+            if args.once:
+                break
+            time.sleep(max(args.interval, 1.0))
+    except KeyboardInterrupt:
+        pass
+    if n_eval:
+        print(f"(판정 {n_eval:,}회, 틱당 평균 {eval_s / n_eval * 1e6:.0f}µs)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
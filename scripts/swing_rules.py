@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+스윙트레이딩 규칙 정의 (tsla_swing_analysis.py 규칙 공용화)
+
+tsla_swing_analysis.py의 규칙을 한 곳에 두고 백테스트·모니터·보고서 스캔이 같은 정의를 쓰도록 한다.
+  - 기준: 3개월(기본 63거래일) 최고가(일 종가, 당일 포함)
+  - 매도: 최고가 -2% 이내 또는 주봉 RSI > 75 → 보유량 10% 매도, 현금 확보
+  - 1차 매수: 최고가 -15% 이하 → 확보 현금 50% 매수
+  - 2차 매수: 최고가 -20% 이하 → 남은 현금 50% 매수
+  - 복구: 매수 후 최고가 -10% 회복 → 남은 현금 전액 매수 (대기로 복귀)
+수치 기본값은 DEFAULT_RULES이고, 바꿀 키만 prompts/config.json의 "swing" 섹션에 적는다.
+
+- 단계(stage): 0 대기(스윙 현금 없음) → 1 현금 확보 → 2 1차 매수 → 3 2차 매수 → (복구) 0
+- conditions()는 float·numpy 배열 모두 받음 (백테스트는 파라미터 조합 배열, 모니터·스캔은 단일 값)
+- 주봉 RSI: Wilder(기본 14주), 진행 중인 주는 현재가를 주 종가로 본 값 (차트 표시와 동일)
+"""
+
+import json
+from collections import deque
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import common
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CACHE_FILE = PROJECT_ROOT / "report" / "cache" / "daily_closes.json"
+
+DEFAULT_RULES = {
+    "high_window_days": 63,     # 3개월 최고가 기간 (거래일)
+    "sell_within_pct": 2.0,     # 최고가 대비 이 % 이내면 매도
+    "rsi_period": 14,           # 주봉 RSI 기간 (주)
+    "rsi_sell": 75.0,           # 주봉 RSI 초과 시 매도
+    "buy1_pct": -15.0,          # 1차 매수 (최고가 대비 %)
+    "buy2_pct": -20.0,          # 2차 매수
+    "recovery_pct": -10.0,      # 추세 복귀
+    "sell_fraction_pct": 10.0,  # 매도 시 보유량 대비 %
+    "buy1_cash_pct": 50.0,      # 1차 매수 시 확보 현금 대비 %
+    "buy2_cash_pct": 50.0,      # 2차 매수 시 남은 현금 대비 %
+}
+DEFAULT_SLEEVE = ["TSLA", "MSTR"]  # 스윙 활용분 종목 (portfolio_prompt.txt: 현금 10% + TSLA 10% + MSTR 10%)
+SIGNAL_HISTORY_YEARS = 2  # 보고서 스캔·모니터 초기화 공통 일봉 기간 (주봉 RSI 평활 시작점이 같아야 값이 일치)
+STAGES = ["대기", "현금 확보", "1차 매수 후", "2차 매수 후"]
+SIGNAL_SELL, SIGNAL_BUY1, SIGNAL_BUY2, SIGNAL_RECOVERY, SIGNAL_HOLD = "매도", "1차매수", "2차매수", "복구", "홀딩"
+
+
+def load_rules(overrides=None):
+    """DEFAULT_RULES ← config.json swing.rules ← overrides."""
+    rules = dict(DEFAULT_RULES)
+    swing = common.load_config().get("swing")
+    if isinstance(swing, dict) and isinstance(swing.get("rules"), dict):
+        rules.update({k: v for k, v in swing["rules"].items() if k in DEFAULT_RULES})
+    if overrides:
+        rules.update({k: v for k, v in overrides.items() if k in DEFAULT_RULES and v is not None})
+    return rules
+
+
+def load_sleeve():
+    """스윙 활용분 종목 목록 (config.json swing.sleeve_symbols, 없으면 DEFAULT_SLEEVE)."""
+    swing = common.load_config().get("swing")
+    if isinstance(swing, dict) and isinstance(swing.get("sleeve_symbols"), list):
+        return list(swing["sleeve_symbols"])
+    return list(DEFAULT_SLEEVE)
+
+
+def thresholds(high, rules):
+    """최고가 → 매매 기준가 dict (sell, buy1, buy2, recovery)."""
+    return {
+        "sell": high * (1 - rules["sell_within_pct"] / 100),
+        "buy1": high * (1 + rules["buy1_pct"] / 100),
+        "buy2": high * (1 + rules["buy2_pct"] / 100),
+        "recovery": high * (1 + rules["recovery_pct"] / 100),
+    }
+
+
+def conditions(price, high, rsi, stage, rules):
+    """단계별 신호 조건. float·numpy 배열 공용 (rules 값도 배열 가능). rsi가 nan이면 RSI 조건은 거짓.
+    반환: {"sell", "buy1", "buy2", "recovery"} (bool 또는 bool 배열)."""
+    th = thresholds(high, rules)
+    return {
+        "sell": (stage == 0) & ((price >= th["sell"]) | (rsi > rules["rsi_sell"])),
+        "buy1": (stage == 1) & (price <= th["buy1"]),
+        "buy2": ((stage == 1) | (stage == 2)) & (price <= th["buy2"]),
+        "recovery": ((stage == 2) | (stage == 3)) & (price >= th["recovery"]),
+    }
+
+
+def position_conditions(price, high, rsi, rules):
+    """단계 없이 위치만 본 조건 (tsla_swing_analysis.py·보고서 스캔). float·numpy 배열 공용.
+    판정 우선순위: 매도 > 2차 > 1차 > 홀딩."""
+    th = thresholds(high, rules)
+    return {"sell": (price >= th["sell"]) | (rsi > rules["rsi_sell"]), "buy2": price <= th["buy2"], "buy1": price <= th["buy1"]}
+
+
+def evaluate_signal(price, high, rsi, rules, stage=None):
+    """단일 가격 신호. stage를 모르면(None) tsla_swing_analysis.py와 같이 위치만으로 판정
+    (position_conditions). 반환: (신호, 다음 단계 또는 None)."""
+    rsi_v = float("nan") if rsi is None else rsi
+    if stage is None:
+        c = position_conditions(price, high, rsi_v, rules)
+        for key, signal in (("sell", SIGNAL_SELL), ("buy2", SIGNAL_BUY2), ("buy1", SIGNAL_BUY1)):
+            if c[key]:
+                return signal, None
+        return SIGNAL_HOLD, None
+    # 1차 전에 2차 기준까지 내려가면 1·2차를 함께 집행 (백테스트와 동일)
+    c = conditions(price, high, rsi_v, stage, rules)
+    if c["sell"]:
+        return SIGNAL_SELL, 1
+    if c["buy2"]:
+        return SIGNAL_BUY2, 3
+    if c["buy1"]:
+        return SIGNAL_BUY1, 2
+    if c["recovery"]:
+        return SIGNAL_RECOVERY, 0
+    return SIGNAL_HOLD, stage
+
+
+def replay_stage(dates, closes, rules):
+    """일봉 종가로 단계 재생 → 마지막 날 이후 단계 (0~3). 순서·조건은 swing_backtest.run과 같음
+    (창이 찰 때부터, 하루에 매도 → 1차 → 2차 → 복구)."""
+    window, period = int(rules["high_window_days"]), int(rules["rsi_period"])
+    rsi = weekly_rsi_series(dates, closes, period)
+    recent = deque(maxlen=window)
+    stage = 0
+    for i, p in enumerate(closes):
+        recent.append(p)
+        if i < window - 1:
+            continue
+        h = max(recent)
+        c = conditions(p, h, rsi[i], stage, rules)
+        if c["sell"]:
+            stage = 1
+        if c["buy1"]:
+            stage = 2
+        if conditions(p, h, rsi[i], stage, rules)["buy2"]:
+            stage = 3
+        if c["recovery"]:
+            stage = 0
+    return stage
+
+
+# ----- 주봉 RSI (Wilder) -----
+
+def week_key(d):
+    """ISO 연·주 (주봉 구분 키)."""
+    if isinstance(d, str):
+        d = date.fromisoformat(d[:10])
+    elif isinstance(d, datetime):
+        d = d.date()
+    y, w, _ = d.isocalendar()
+    return y * 100 + w
+
+
+def rsi_seed(week_closes, period):
+    """완료된 주봉 종가 → Wilder 상태 {"avg_gain", "avg_loss", "last_close", "weeks"}. 주 수가 period+1 미만이면 평균 None."""
+    state = {"avg_gain": None, "avg_loss": None, "last_close": None, "weeks": 0}
+    for c in week_closes:
+        rsi_roll(state, c, period)
+    return state
+
+
+def rsi_roll(state, week_close, period):
+    """주 마감 시 상태 갱신 (in-place). 처음 period개 변화는 단순 평균, 이후 Wilder 평활."""
+    prev = state["last_close"]
+    state["last_close"] = float(week_close)
+    state["weeks"] += 1
+    if prev is None:
+        return state
+    gain, loss = max(week_close - prev, 0.0), max(prev - week_close, 0.0)
+    n = state["weeks"] - 1  # 변화 개수
+    if n < period:
+        state.setdefault("_gains", []).append(gain)
+        state.setdefault("_losses", []).append(loss)
+    elif n == period:
+        gains, losses = state.pop("_gains", []) + [gain], state.pop("_losses", []) + [loss]
+        state["avg_gain"], state["avg_loss"] = sum(gains) / period, sum(losses) / period
+    else:
+        state["avg_gain"] = (state["avg_gain"] * (period - 1) + gain) / period
+        state["avg_loss"] = (state["avg_loss"] * (period - 1) + loss) / period
+    return state
+
+
+def rsi_value(avg_gain, avg_loss):
+    if avg_gain is None or avg_loss is None:
+        return float("nan")
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else 50.0
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def rsi_with(state, price, period):
+    """완료 주 상태 + 진행 중인 주 현재가 → 주봉 RSI (상태는 바꾸지 않음). 계산 불가면 nan."""
+    if state["avg_gain"] is None or state["last_close"] is None:
+        return float("nan")
+    gain, loss = max(price - state["last_close"], 0.0), max(state["last_close"] - price, 0.0)
+    return rsi_value((state["avg_gain"] * (period - 1) + gain) / period,
+                     (state["avg_loss"] * (period - 1) + loss) / period)
+
+
+def weekly_rsi_series(dates, closes, period):
+    """일봉 → 날짜별 주봉 RSI 목록 (진행 중인 주는 그날 종가 기준, rsi_with와 동일). 순수 파이썬 O(일 수)."""
+    out = []
+    state = {"avg_gain": None, "avg_loss": None, "last_close": None, "weeks": 0}
+    cur_week, cur_close = None, None
+    for d, c in zip(dates, closes):
+        wk = week_key(d)
+        if cur_week is not None and wk != cur_week:
+            rsi_roll(state, cur_close, period)
+        cur_week, cur_close = wk, c
+        out.append(rsi_with(state, c, period))
+    return out
+
+
+def rolling_high(np, closes, window):
+    """당일 포함 최근 window일 종가 최고가 (앞부분은 가능한 만큼)."""
+    c = np.asarray(closes, dtype=float)
+    if len(c) == 0:
+        return c
+    pad = np.concatenate([np.full(window - 1, -np.inf), c])
+    return np.lib.stride_tricks.sliding_window_view(pad, window).max(axis=1)
+
+
+# ----- 일봉 종가 이력 (캐시) -----
+
+def load_daily_history(symbols, years=5, cache_file=None, refresh=False):
+    """일봉 종가 {symbol: {"dates": [ISO], "close": [float]}}. 오늘 받은 캐시(report/cache/daily_closes.json)에
+    기간이 충분하면 재사용, 없으면 yfinance로 받아 캐시 갱신. 조회 실패 종목은 빠짐 (경고)."""
+    path = Path(cache_file) if cache_file else CACHE_FILE
+    cache = {}
+    if path.exists():
+        try:
+            cache = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            cache = {}
+    today = date.today().isoformat()
+    need_from = (date.today() - timedelta(days=365 * years - 7)).isoformat()  # 주말·휴장 여유
+    result, missing = {}, []
+    for s in symbols:
+        c = (cache.get("symbols") or {}).get(s)
+        fresh = c and not refresh and c.get("fetched") == today and c.get("dates") and c["dates"][0] <= need_from
+        if fresh:
+            result[s] = {"dates": c["dates"], "close": c["close"]}
+        else:
+            missing.append(s)
+    if missing:
+        fetched = _download_daily(missing, years)
+        if fetched:
+            cache.setdefault("symbols", {})
+            for s, data in fetched.items():
+                cache["symbols"][s] = dict(data, fetched=today)
+                result[s] = data
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(json.dumps(cache, ensure_ascii=False), encoding="utf-8")
+            except Exception as e:
+                print(f"[WARNING] 일봉 캐시 저장 실패: {e}")
+        for s in missing:
+            if s not in result:
+                c = (cache.get("symbols") or {}).get(s)
+                if c and c.get("dates"):
+                    print(f"[WARNING] {s} 일봉 조회 실패 — {c.get('fetched')} 캐시 사용")
+                    result[s] = {"dates": c["dates"], "close": c["close"]}
+                else:
+                    print(f"[WARNING] {s} 일봉 이력 없음")
+    return result
+
+
+def _download_daily(symbols, years):
+    try:
+        import yfinance as yf
+    except ImportError:
+        print("[WARNING] yfinance 미설치. 일봉 이력 조회 불가. 설치: pip install yfinance pandas")
+        return {}
+    try:
+        close = yf.download(symbols, period=f"{years}y", interval="1d", auto_adjust=True, progress=False)["Close"]
+    except Exception as e:
+        print(f"[WARNING] 일봉 이력 조회 실패: {e}")
+        return {}
+    out = {}
+    for s in symbols:
+        try:
+            col = (close[s] if s in getattr(close, "columns", []) else close).dropna()
+        except Exception:
+            continue
+        if len(col):
+            out[s] = {"dates": [d.strftime("%Y-%m-%d") for d in col.index], "close": [float(x) for x in col.to_numpy()]}
+    return out
+
+
+def crossings(prev_price, price, prev_rsi, rsi, high, rules):
+    """직전 → 현재 사이에 넘은 기준 목록 [(신호, 기준명)]. 매도(최고가 -2% 위로·RSI 상향 돌파),
+    1·2차 매수(아래로), 복구(위로). 기준가는 현재 최고가 기준. 직전 값이 없으면 빈 목록."""
+    if prev_price is None:
+        return []
+    th = thresholds(high, rules)
+    out = []
+    if prev_price < th["sell"] <= price:
+        out.append((SIGNAL_SELL, "sell"))
+    if prev_rsi is not None and rsi is not None and prev_rsi <= rules["rsi_sell"] < rsi:
+        out.append((SIGNAL_SELL, "rsi"))
+    if prev_price > th["buy1"] >= price:
+        out.append((SIGNAL_BUY1, "buy1"))
+    if prev_price > th["buy2"] >= price:
+        out.append((SIGNAL_BUY2, "buy2"))
+    if prev_price < th["recovery"] <= price:
+        out.append((SIGNAL_RECOVERY, "recovery"))
+    return out
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+보유 전 종목 스윙 신호 스캔 (Step 1 프롬프트용)
+
+TSLA에만 있던 스윙 분석(tsla_swing_analysis.py)을 portfolio_holdings 전 종목으로 넓힌다.
+캐시된 일봉(swing_rules.load_daily_history)을 종목 × 날짜 행렬로 쌓아 한 번에
+3개월 최고가·주봉 RSI·매매 기준가·현재 위치 판정을 계산하고, Grok이 검색 대신 인용할 표로 만든다.
+
+- 규칙·판정: swing_rules.py (백테스트·모니터와 같은 정의), 판정은 단계 없이 위치만 (매도 > 2차 > 1차 > 홀딩)
+- 현재가: 3ai 스크립트가 조회한 가격(미국 정규장 종가 우선, 한국 현재가), 없으면 마지막 일봉 종가
+- 최고가: 시장 현지 오늘 이전 (창-1)일 종가 + 현재가, 주봉 RSI: 완료 주 Wilder 평활 + 진행 중인 주 현재가
+  (swing_monitor.py 틱 판정과 같은 값)
+- numpy 필수
+
+사용법:
+    python swing_scanner.py                     # config.json 보유 종목, 마지막 종가 기준
+    python swing_scanner.py --symbols TSLA,MSTR --json
+"""
+
+import sys
+import json
+import argparse
+from datetime import datetime, timezone
+
+import common
+import swing_rules
+from swing_monitor import market_tz
+
+
+def _wilder_rows(np, week_closes, period):
+    """오른쪽 정렬 주봉 종가 [종목, 주] (왼쪽 nan) → 행별 Wilder 평균 (avg_gain, avg_loss, 준비 여부).
+    swing_rules.rsi_roll과 같은 방식 (처음 period개 변화 단순 평균, 이후 평활)을 종목 축으로 벡터화."""
+    K = week_closes.shape[0]
+    diff = np.diff(week_closes, axis=1)
+    cnt = np.zeros(K, dtype=int)
+    sum_g, sum_l = np.zeros(K), np.zeros(K)
+    avg_g, avg_l = np.zeros(K), np.zeros(K)
+    for j in range(diff.shape[1]):
+        d = diff[:, j]
+        valid = ~np.isnan(d)
+        g = np.where(valid, np.maximum(np.nan_to_num(d), 0.0), 0.0)
+        l = np.where(valid, np.maximum(-np.nan_to_num(d), 0.0), 0.0)
+        cnt += valid
+        init = valid & (cnt <= period)
+        sum_g += np.where(init, g, 0.0)
+        sum_l += np.where(init, l, 0.0)
+        at = valid & (cnt == period)
+        avg_g = np.where(at, sum_g / period, avg_g)
+        avg_l = np.where(at, sum_l / period, avg_l)
+        after = valid & (cnt > period)
+        avg_g = np.where(after, (avg_g * (period - 1) + g) / period, avg_g)
+        avg_l = np.where(after, (avg_l * (period - 1) + l) / period, avg_l)
+    return avg_g, avg_l, cnt >= period
+
+
+def scan(history, rules=None, prices=None, currency=None, now=None):
+    """종목별 스윙 상태. history: {symbol: {"dates", "close"}}, prices: {symbol: 현재가}, currency: {symbol: "USD"|"KRW"}.
+    반환: [{"symbol", "currency", "price", "price_source", "high", "gap_pct", "rsi", "buy1", "buy2", "recovery", "sell", "signal"}]
+    (history 순서). numpy 없으면 None."""
+    np = common.numpy()
+    if np is None:
+        print("[WARNING] numpy 미설치. 스윙 신호 스캔 생략. 설치: pip install numpy")
+        return None
+    rules = rules or swing_rules.load_rules()
+    prices, currency = prices or {}, currency or {}
+    now = now or datetime.now(timezone.utc)
+    window, period = int(rules["high_window_days"]), int(rules["rsi_period"])
+    symbols = [s for s in history if history[s].get("close")]
+    if not symbols:
+        return []
+    K = len(symbols)
+    prior = np.full((K, max(window - 1, 1)), np.nan)
+    weekly_rows, price, source = [], np.zeros(K), []
+    for k, s in enumerate(symbols):
+        cur = currency.get(s) or ("KRW" if s.endswith((".KS", ".KQ")) else "USD")
+        today = now.astimezone(market_tz(cur)).date().isoformat()
+        this_week = swing_rules.week_key(today)
+        dates, closes = history[s]["dates"], history[s]["close"]
+        n = sum(1 for d in dates if d < today)
+        past = closes[:n][-(window - 1):]
+        if past:
+            prior[k, -len(past):] = past
+        weeks = {}
+        for d, c in zip(dates[:n], closes[:n]):
+            wk = swing_rules.week_key(d)
+            if wk < this_week:
+                weeks[wk] = c
+        weekly_rows.append([weeks[w] for w in sorted(weeks)])
+        live = prices.get(s)
+        price[k] = float(live) if live is not None else float(closes[-1])
+        source.append("조회" if live is not None else f"{dates[-1]} 종가")
+    W = max(len(r) for r in weekly_rows)
+    week_closes = np.full((K, max(W, 1)), np.nan)
+    for k, r in enumerate(weekly_rows):
+        if r:
+            week_closes[k, -len(r):] = r
+    avg_g, avg_l, ready = _wilder_rows(np, week_closes, period)
+    # 진행 중인 주: 마지막 완료 주 종가 대비 현재가 변화로 한 번 더 평활 (swing_rules.rsi_with)
+    last_week = week_closes[:, -1]
+    chg = np.nan_to_num(price - last_week)
+    g = (avg_g * (period - 1) + np.maximum(chg, 0.0)) / period
+    l = (avg_l * (period - 1) + np.maximum(-chg, 0.0)) / period
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(l == 0, np.where(g > 0, 100.0, 50.0), 100 - 100 / (1 + g / l))
+    rsi = np.where(ready & ~np.isnan(last_week), rsi, np.nan)
+    high = np.fmax(np.nanmax(np.where(np.isnan(prior), -np.inf, prior), axis=1), price)
+    th = swing_rules.thresholds(high, rules)
+    c = swing_rules.position_conditions(price, high, rsi, rules)
+    signal = np.select([c["sell"], c["buy2"], c["buy1"]],
+                       [swing_rules.SIGNAL_SELL, swing_rules.SIGNAL_BUY2, swing_rules.SIGNAL_BUY1], swing_rules.SIGNAL_HOLD)
+    rows = []
+    for k, s in enumerate(symbols):
+        rows.append({
+            "symbol": s, "currency": currency.get(s) or ("KRW" if s.endswith((".KS", ".KQ")) else "USD"),
+            "price": float(price[k]), "price_source": source[k], "high": float(high[k]),
+            "gap_pct": float((price[k] / high[k] - 1) * 100), "rsi": None if np.isnan(rsi[k]) else round(float(rsi[k]), 1),
+            "buy1": float(th["buy1"][k]), "buy2": float(th["buy2"][k]), "recovery": float(th["recovery"][k]),
+            "sell": float(th["sell"][k]), "signal": str(signal[k]),
+        })
+    return rows
+
+
+def _money(currency, v):
+    return f"${v:,.2f}" if currency == "USD" else f"{v:,.0f}원"
+
+
+def format_markdown(rows, rules, sleeve=None, names=None):
+    """종목별 스윙 표. sleeve 종목은 ★ (스윙 활용분)."""
+    sleeve, names = set(sleeve or []), names or {}
+    lines = [f"| 종목 | 현재가 | 3개월 최고가 | 괴리 | 주봉 RSI | 1차({rules['buy1_pct']:g}%) | 2차({rules['buy2_pct']:g}%) | "
+             f"복구({rules['recovery_pct']:g}%) | 매도(-{rules['sell_within_pct']:g}%·RSI>{rules['rsi_sell']:g}) | 판정 |",
+             "|---|---|---|---|---|---|---|---|---|---|"]
+    for r in rows:
+        label = ("★ " if r["symbol"] in sleeve else "") + (names.get(r["symbol"]) or r["symbol"])
+        rsi = f"{r['rsi']:.1f}" if r["rsi"] is not None else "-"
+        money = [_money(r["currency"], r[k]) for k in ("price", "high", "buy1", "buy2", "recovery", "sell")]
+        lines.append(f"| {label} | {money[0]} | {money[1]} | {r['gap_pct']:+.1f}% | {rsi} | {money[2]} | {money[3]} | "
+                     f"{money[4]} | {money[5]} | **{r['signal']}** |")
+    return "\n".join(lines)
+
+
+def format_for_prompt(rows, rules, sleeve=None, names=None):
+    """{{realtime_data}}에 넣을 블록 (스크립트 계산 기준가·판정 — 스윙 조언은 이 표를 근거로)."""
+    head = ("**스윙 신호 (스크립트 계산 — 기준가·RSI·판정은 이 값을 사용하고 별도 검색하지 말 것)**\n"
+            f"규칙: 3개월({rules['high_window_days']}거래일) 종가 최고가 기준. 매도 = 최고가 -{rules['sell_within_pct']:g}% 이내 또는 "
+            f"주봉 RSI > {rules['rsi_sell']:g} (보유 {rules['sell_fraction_pct']:g}% 매도), 1차 매수 {rules['buy1_pct']:g}% "
+            f"(확보 현금 {rules['buy1_cash_pct']:g}%), 2차 매수 {rules['buy2_pct']:g}% (남은 현금 {rules['buy2_cash_pct']:g}%), "
+            f"복구 {rules['recovery_pct']:g}% (남은 현금 전액). ★ = 스윙 활용분 종목.\n\n")
+    return head + format_markdown(rows, rules, sleeve, names) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="보유 전 종목 스윙 신호 스캔")
+    parser.add_argument("--symbols", default=None, help="쉼표 구분 종목 (기본: config.json 보유 종목 전체)")
+    parser.add_argument("--cache", default=None, help="일봉 캐시 JSON 경로 (기본 report/cache/daily_closes.json)")
+    parser.add_argument("--refresh", action="store_true", help="캐시 무시하고 일봉 다시 조회")
+    parser.add_argument("--json", action="store_true", help="JSON 출력")
+    args = parser.parse_args()
+    common.utf8_stdout()
+    holdings = common.load_config().get("portfolio_holdings") or {}
+    positions = holdings.get("positions") or []
+    currency = {p["symbol"]: (p.get("currency") or "USD").upper() for p in positions}
+    names = {p["symbol"]: p.get("name") or p["symbol"] for p in positions}
+    symbols = [s.strip() for s in args.symbols.split(",")] if args.symbols else list(currency)
+    rules = swing_rules.load_rules()
+    history = swing_rules.load_daily_history(symbols, swing_rules.SIGNAL_HISTORY_YEARS, args.cache, args.refresh)
+    rows = scan({s: history[s] for s in symbols if s in history}, rules, currency=currency)
+    if rows is None:
+        return 1
+    if not rows:
+        print("[ERROR] 일봉 이력 없음 (yfinance 설치·네트워크 확인)")
+        return 1
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    else:
+        print(format_markdown(rows, rules, swing_rules.load_sleeve(), names))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,9 +4,11 @@
 
 import os
 import sys
-import requests
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+import ai_providers
+
 # Windows 콘솔 인코딩 설정
 if sys.platform == 'win32':
     import io
@@ -38,23 +40,8 @@ if not grok_key:
     print("[ERROR] GROK_API_KEY가 설정되지 않았습니다.")
     sys.exit(1)
 
-# 가능한 모델명들
-possible_models = [
-    "grok-beta",
-    "grok-2",
-    "grok-2-latest",
-    "grok-2-1212",
-    "grok",
-    "grok-1",
-    "grok-2-vision-1212",
-    "grok-2-1212-preview",
-]
-
-base_url = "https://api.x.ai/v1/chat/completions"
-headers = {
-    "Authorization": f"Bearer {grok_key}",
-    "Content-Type": "application/json"
-}
+# 보고서 스크립트가 폴백으로 쓰는 모델 전체 (ai_providers.MODEL_CHAINS)
+possible_models = ai_providers.models("grok", "web_search")
 
 print("=" * 60)
 print("Grok API 모델 테스트")
@@ -76,7 +63,7 @@ for model_name in possible_models:
     }
     
     try:
-        response = requests.post(base_url, headers=headers, json=data, timeout=30)
+        response = ai_providers.http_post("grok", "/chat/completions", data, api_key=grok_key, timeout=30)
         if response.status_code == 200:
             print(f"✅ {model_name}: 성공")
             working_models.append(model_name)
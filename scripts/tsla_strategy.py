@@ -3,6 +3,7 @@
 
 현재 테슬라 포지션을 분석하고, 목표 비중 달성을 위한 매도 전략과
 스윙 트레이딩 시나리오를 계산합니다.
+(config.json 보유 종목·현재 가격 기준 전 종목 그리드: rebalance_grid.py)
 """
 
 # 포트폴리오 현황 (2026.01.16 기준)
@@ -1,5 +1,6 @@
 """
 테슬라 스윙 트레이딩 분석 스크립트
+(규칙 공용 정의: swing_rules.py, 과거 일봉 백테스트: swing_backtest.py, 장중 알림: swing_monitor.py)
 """
 
 high_3m = 498.83  # 3개월 최고가
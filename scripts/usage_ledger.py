@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API 사용량·비용 원장 (SQLite, append-only)
+
+report/.usage_ledger.sqlite3 에 호출 1건당 1행을 추가만 한다. (기존 report/.usage_cache.json 대체)
+- WAL 모드 + busy_timeout: 스케줄러·수동 실행이 동시에 돌아도 쓰기 충돌 없이 직렬화
+- 인덱스: month, provider, model, run_id, step → 월별·단계별·모델별 집계가 전체 스캔 없이 조회됨
+
+사용법:
+    python usage_ledger.py                      # 이번 달 provider별 합계
+    python usage_ledger.py --month 2026-02 --by model
+    python usage_ledger.py --by step            # 단계별 평균 토큰·지연
+    python usage_ledger.py --runs 5             # 최근 5회 실행별 합계
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import common
+
+PROJECT_ROOT = Path(__file__).parent.parent
+REPORTS_DIR = PROJECT_ROOT / "report"
+LEDGER_FILE = REPORTS_DIR / ".usage_ledger.sqlite3"
+LEGACY_CACHE_FILE = REPORTS_DIR / ".usage_cache.json"
+
+# 동시 실행 시 잠금 대기 (ms). 쓰기는 수 ms 수준이라 30초면 충분.
+BUSY_TIMEOUT_MS = 30000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts            TEXT    NOT NULL,
+    month         TEXT    NOT NULL,
+    run_id        TEXT    NOT NULL,
+    step          TEXT,
+    provider      TEXT    NOT NULL,
+    model         TEXT    NOT NULL,
+    input_tokens  INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cost_usd      REAL    NOT NULL DEFAULT 0,
+    latency_s     REAL
+);
+CREATE INDEX IF NOT EXISTS idx_usage_month_provider ON usage (month, provider);
+CREATE INDEX IF NOT EXISTS idx_usage_month_model ON usage (month, model);
+CREATE INDEX IF NOT EXISTS idx_usage_run ON usage (run_id);
+CREATE INDEX IF NOT EXISTS idx_usage_step ON usage (step, provider);
+CREATE TABLE IF NOT EXISTS schedule (
+    id                INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts                TEXT    NOT NULL,
+    run_id            TEXT    NOT NULL,
+    step              TEXT,
+    provider          TEXT    NOT NULL,
+    requested_model   TEXT,
+    model             TEXT    NOT NULL,
+    effort            TEXT,
+    max_output_tokens INTEGER,
+    projected_cost    REAL,
+    allowance         REAL,
+    mtd_cost          REAL,
+    budget            REAL
+);
+CREATE INDEX IF NOT EXISTS idx_schedule_run ON schedule (run_id);
+"""
+
+
+def month_key(now=None):
+    """'YYYY-MM' 형식의 월 키."""
+    now = now or datetime.now()
+    return f"{now.year}-{now.month:02d}"
+
+
+def new_run_id():
+    """실행 1회를 구분하는 ID (시각 + PID). 동시 실행도 충돌하지 않음."""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+
+
+def connect(path=None):
+    """원장 DB 연결. 없으면 스키마 생성, 비어 있으면 기존 .usage_cache.json 월 합계를 1회 이관."""
+    path = Path(path) if path else LEDGER_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.executescript(_SCHEMA)
+    if path == LEDGER_FILE:
+        _import_legacy_cache(conn)
+    return conn
+
+
+def _import_legacy_cache(conn):
+    """report/.usage_cache.json(월별 provider 합계)을 원장이 비어 있을 때만 월 합계 행으로 옮긴다."""
+    if not LEGACY_CACHE_FILE.exists():
+        return
+    if conn.execute("SELECT 1 FROM usage LIMIT 1").fetchone():
+        return
+    try:
+        with conn:
+            # 동시 실행이 같이 이관하지 않도록 쓰기 잠금 후 다시 확인
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM usage LIMIT 1").fetchone():
+                return
+            data = json.loads(LEGACY_CACHE_FILE.read_text(encoding="utf-8"))
+            if not isinstance(data, dict):
+                return
+            for month, by_provider in data.items():
+                if not isinstance(by_provider, dict):
+                    continue
+                for provider, d in by_provider.items():
+                    if not isinstance(d, dict) or not (d.get("cost") or d.get("inp") or d.get("out")):
+                        continue
+                    conn.execute(
+                        "INSERT INTO usage (ts, month, run_id, step, provider, model, input_tokens, output_tokens, cost_usd)"
+                        " VALUES (?, ?, 'usage_cache_import', NULL, ?, 'unknown', ?, ?, ?)",
+                        (f"{month}-01T00:00:00", month, provider, int(d.get("inp") or 0), int(d.get("out") or 0), float(d.get("cost") or 0)),
+                    )
+    except Exception as e:
+        print(f"[WARNING] .usage_cache.json 이관 실패: {e}")
+
+
+def record_usage(run_id, provider, model, input_tokens, output_tokens, cost_usd, step=None, latency_s=None, path=None):
+    """호출 1건 기록 (append-only). 실패해도 보고서 생성은 계속되도록 경고만 출력."""
+    now = datetime.now()
+    try:
+        conn = connect(path)
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO usage (ts, month, run_id, step, provider, model, input_tokens, output_tokens, cost_usd, latency_s)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (now.isoformat(timespec="seconds"), month_key(now), run_id, step, provider, model or "unknown",
+                     int(input_tokens or 0), int(output_tokens or 0), float(cost_usd or 0),
+                     float(latency_s) if latency_s is not None else None),
+                )
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[WARNING] 사용량 원장 기록 실패: {e}")
+
+
+def record_schedule(run_id, step, provider, requested_model, model, effort, max_output_tokens,
+                    projected_cost, allowance, mtd_cost, budget, path=None):
+    """예산 스케줄러(budget_scheduler.py)의 단계별 모델 선택 기록."""
+    try:
+        conn = connect(path)
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO schedule (ts, run_id, step, provider, requested_model, model, effort, max_output_tokens,"
+                    " projected_cost, allowance, mtd_cost, budget) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (datetime.now().isoformat(timespec="seconds"), run_id, step, provider, requested_model, model, effort,
+                     max_output_tokens, projected_cost, allowance, mtd_cost, budget),
+                )
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[WARNING] 스케줄 기록 실패: {e}")
+
+
+def _query(sql, params=(), path=None):
+    """읽기 전용 조회. 원장이 없으면 빈 목록."""
+    p = Path(path) if path else LEDGER_FILE
+    if not p.exists():
+        return []
+    try:
+        conn = connect(p)
+        try:
+            return [dict(r) for r in conn.execute(sql, params).fetchall()]
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[WARNING] 사용량 원장 조회 실패: {e}")
+        return []
+
+
+def month_totals(month=None, path=None):
+    """월별 provider 합계. {provider: {"inp", "out", "cost"}}"""
+    rows = _query(
+        "SELECT provider, SUM(input_tokens) AS inp, SUM(output_tokens) AS out, SUM(cost_usd) AS cost"
+        " FROM usage WHERE month = ? GROUP BY provider",
+        (month or month_key(),), path,
+    )
+    return {r["provider"]: {"inp": r["inp"] or 0, "out": r["out"] or 0, "cost": r["cost"] or 0.0} for r in rows}
+
+
+def model_totals(month=None, path=None):
+    """월별 provider·model 합계 (비용 내림차순)."""
+    return _query(
+        "SELECT provider, model, COUNT(*) AS calls, SUM(input_tokens) AS inp, SUM(output_tokens) AS out, SUM(cost_usd) AS cost"
+        " FROM usage WHERE month = ? GROUP BY provider, model ORDER BY cost DESC",
+        (month or month_key(),), path,
+    )
+
+
+def run_totals(run_id, path=None):
+    """실행 1회의 provider·model별 합계."""
+    return _query(
+        "SELECT provider, model, COUNT(*) AS calls, SUM(input_tokens) AS inp, SUM(output_tokens) AS out, SUM(cost_usd) AS cost"
+        " FROM usage WHERE run_id = ? GROUP BY provider, model",
+        (run_id,), path,
+    )
+
+
+def step_stats(month=None, last_runs=None, path=None):
+    """단계별 평균 입력·출력 토큰, 평균 지연(초), 평균 비용. last_runs가 있으면 최근 N회 실행만 대상으로 한다.
+    month=None이고 last_runs=None이면 전체 기간."""
+    where, params = ["step IS NOT NULL"], []
+    if month:
+        where.append("month = ?")
+        params.append(month)
+    if last_runs:
+        where.append("run_id IN (SELECT run_id FROM usage WHERE run_id != 'usage_cache_import'"
+                     " GROUP BY run_id ORDER BY MAX(ts) DESC LIMIT ?)")
+        params.append(int(last_runs))
+    return _query(
+        "SELECT step, provider, model, COUNT(*) AS calls, AVG(input_tokens) AS avg_inp, AVG(output_tokens) AS avg_out,"
+        " AVG(latency_s) AS avg_latency_s, AVG(cost_usd) AS avg_cost"
+        f" FROM usage WHERE {' AND '.join(where)} GROUP BY step, provider, model ORDER BY step",
+        tuple(params), path,
+    )
+
+
+def recent_runs(limit=10, path=None):
+    """최근 실행별 합계 (최신순)."""
+    return _query(
+        "SELECT run_id, MIN(ts) AS started, COUNT(*) AS calls, SUM(input_tokens) AS inp, SUM(output_tokens) AS out, SUM(cost_usd) AS cost"
+        " FROM usage WHERE run_id != 'usage_cache_import' GROUP BY run_id ORDER BY MAX(ts) DESC LIMIT ?",
+        (int(limit),), path,
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="API 사용량·비용 원장 조회 (report/.usage_ledger.sqlite3)")
+    parser.add_argument("--month", type=str, default=None, help="조회 월 YYYY-MM (기본값: 이번 달)")
+    parser.add_argument("--by", choices=["provider", "model", "step"], default="provider", help="집계 기준 (기본값: provider)")
+    parser.add_argument("--runs", type=int, default=None, metavar="N", help="최근 N회 실행별 합계 출력")
+    return parser.parse_args()
+
+
+def main():
+    # Windows 콘솔 인코딩 설정 (모듈 import 시에는 건드리지 않음)
+    common.utf8_stdout()
+    args = parse_args()
+    month = args.month or month_key()
+    if args.runs:
+        print(f"[최근 {args.runs}회 실행]")
+        for r in recent_runs(args.runs):
+            print(f"  {r['run_id']:<24} 호출 {r['calls']:>3}  입력 {r['inp']:>9,}  출력 {r['out']:>9,}  ${r['cost']:.4f}")
+        return 0
+    if args.by == "provider":
+        print(f"[{month} provider별]")
+        for prov, d in sorted(month_totals(month).items()):
+            print(f"  {prov:<8} 입력 {d['inp']:>10,}  출력 {d['out']:>10,}  ${d['cost']:.4f}")
+    elif args.by == "model":
+        print(f"[{month} 모델별]")
+        for r in model_totals(month):
+            print(f"  {r['provider']:<8} {r['model']:<28} 호출 {r['calls']:>4}  입력 {r['inp']:>10,}  출력 {r['out']:>10,}  ${r['cost']:.4f}")
+    else:
+        print(f"[{month} 단계별 평균]")
+        for r in step_stats(month):
+            lat = f"{r['avg_latency_s']:.1f}s" if r["avg_latency_s"] is not None else "-"
+            print(f"  {r['step']:<16} {r['provider']:<8} {r['model']:<28} 호출 {r['calls']:>4}  입력 {r['avg_inp']:>9,.0f}  출력 {r['avg_out']:>8,.0f}  {lat:>7}  ${r['avg_cost']:.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
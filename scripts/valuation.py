@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+포트폴리오 평가 엔진 (열 단위)
+
+generate_portfolio_report_3ai.compute_portfolio_valuation의 계산부. 보유 종목(계좌별 lot)을 열(계좌·종목·수량·통화·가격)로
+펼치고 원화 환산·평가액·비중·계좌별/통화별 소계와 평단 대비 손익을 한 번에 계산한다. 가격은 고유 종목당 한 번만 고른다.
+
+- 규칙 (기존 함수와 같음): USD = round(수량 × 가격(정규장 우선) × 환율), KRW = 수량 × int(가격), 가격·환율 없으면 0원,
+  수량은 int, 현금은 법인 계좌 한 줄, 비중 = 평가액 / 총자산 (0원 이하 행은 없음)
+- numpy가 있으면 배열 연산, 없으면 같은 계산을 순수 파이썬으로 (asset_projection.py와 같은 방식)
+- 손익 (positions[].avg_cost = 현지 통화 평단, USD는 선택 cost_fx = 매수 평균 환율, 없으면 portfolio_holdings.default_cost_fx 가정):
+  원가(원) = 수량 × 평단 × (cost_fx, 둘 다 없으면 현재 환율), 손익 = 평가액 - 원가,
+  환율 효과 = 수량 × 현재가 × (현재 환율 - cost_fx) (cost_fx 있는 USD만), 가격 효과 = 손익 - 환율 효과
+- to_rows()는 기존 행 형식·타입(USD 평가액 float, KRW int, 비중 소수 2자리) 그대로 + 손익 키 → 평가 표가 바뀌지 않음
+
+사용법 (모듈):
+    book = valuation.value_book(holdings, usd_krw_rate, us_stock_prices, kr_stock_prices)
+    rows, total_krw = valuation.to_rows(book)
+"""
+
+import common
+
+CASH_ACCOUNT = "법인 Active"  # 현금 행 계좌 (config cash_krw는 법인 계좌 현금)
+CASH_NAME = "현금"
+PRICE_FAILED = "(가격 조회 실패)"
+PNL_KEYS = ("cost_krw", "pnl_krw", "return_pct", "return_krw_pct", "pnl_price_krw", "pnl_fx_krw")
+
+
+def best_usd_price(prices):
+    """미국 주가 dict에서 정규장 종가 우선, 없으면 애프터·프리 순으로 단일 가격(USD) 반환. 보고서 평가·계산용."""
+    if not prices:
+        return None
+    for key in ("regular", "post", "pre"):
+        if key in prices and prices[key] is not None:
+            return float(prices[key])
+    return None
+
+
+def _columns(holdings, usd_krw_rate, us_stock_prices, kr_stock_prices):
+    """보유 종목 → 열 dict. 가격은 (종목, 통화)당 한 번 조회. priced: 가격(USD는 환율도)이 있어 평가 가능한 lot."""
+    positions = holdings.get("positions") or []
+    cols = {
+        "account": [p.get("account") or "" for p in positions],
+        "symbol": [p.get("symbol") or "" for p in positions],
+        "qty": [int(p.get("qty") or 0) for p in positions],
+        "currency": [(p.get("currency") or "USD").upper() for p in positions],
+    }
+    cols["name"] = [p.get("name") or s for p, s in zip(positions, cols["symbol"])]
+    cols["avg_cost"] = [float(p["avg_cost"]) if p.get("avg_cost") is not None else None for p in positions]
+    default_fx = float(holdings.get("default_cost_fx") or 0) or None
+    cols["cost_fx"] = [(float(p["cost_fx"]) if p.get("cost_fx") else default_fx) if c == "USD" else None
+                       for p, c in zip(positions, cols["currency"])]
+    cols["cost_fx_assumed"] = [c == "USD" and not p.get("cost_fx") and default_fx is not None
+                               for p, c in zip(positions, cols["currency"])]
+    quotes = {}
+    for key in set(zip(cols["symbol"], cols["currency"])):
+        sym, cur = key
+        if cur == "USD":
+            quotes[key] = best_usd_price(us_stock_prices.get(sym)) if us_stock_prices else None
+        else:
+            px = kr_stock_prices.get(sym) if kr_stock_prices else None
+            quotes[key] = int(px) if px is not None else None
+    cols["price"] = [quotes[k] for k in zip(cols["symbol"], cols["currency"])]
+    cols["usd"] = [c == "USD" for c in cols["currency"]]
+    cols["priced"] = [px is not None and (not u or bool(usd_krw_rate)) for px, u in zip(cols["price"], cols["usd"])]
+    return cols
+
+
+def _value_numpy(np, cols, usd_krw_rate, cash_krw):
+    q = np.array(cols["qty"], dtype=float)
+    px = np.array([p if p is not None else 0.0 for p in cols["price"]], dtype=float)
+    usd, priced = np.array(cols["usd"], dtype=bool), np.array(cols["priced"], dtype=bool)
+    fx = float(usd_krw_rate or 0)
+    value = np.where(priced, np.where(usd, np.round(q * px * fx, 0), q * px), 0.0)
+    total = cash_krw + float(value.sum())
+    weight = 100.0 * value / total if total > 0 else np.zeros(len(value))
+    return value.tolist(), total, weight.tolist()
+
+
+def _value_python(cols, usd_krw_rate, cash_krw):
+    value = [
+        (round(q * px * usd_krw_rate, 0) if u else q * px) if ok else 0
+        for q, px, u, ok in zip(cols["qty"], cols["price"], cols["usd"], cols["priced"])
+    ]
+    total = cash_krw + sum(value)
+    weight = [100.0 * v / total if total > 0 else 0.0 for v in value]
+    return value, total, weight
+
+
+def _pnl_numpy(np, cols, value, usd_krw_rate):
+    """평단 있는 평가 가능 lot의 원가·손익·수익률·가격/환율 효과 (없으면 None)."""
+    has = np.array([c is not None and ok for c, ok in zip(cols["avg_cost"], cols["priced"])], dtype=bool)
+    if not has.any():
+        return {k: [None] * len(value) for k in PNL_KEYS}
+    q = np.array(cols["qty"], dtype=float)
+    px = np.array([p if p is not None else 0.0 for p in cols["price"]], dtype=float)
+    avg = np.array([c if c is not None else np.nan for c in cols["avg_cost"]], dtype=float)
+    cfx = np.array([c if c is not None else np.nan for c in cols["cost_fx"]], dtype=float)
+    usd = np.array(cols["usd"], dtype=bool)
+    fx = float(usd_krw_rate or 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cost = q * avg * np.where(usd, np.where(np.isnan(cfx), fx, cfx), 1.0)
+        pnl = np.array(value, dtype=float) - cost
+        fx_eff = np.where(usd & ~np.isnan(cfx), q * px * (fx - cfx), np.where(usd, np.nan, 0.0))
+        out = {
+            "cost_krw": cost, "pnl_krw": pnl, "return_pct": (px / avg - 1) * 100, "return_krw_pct": pnl / cost * 100,
+            "pnl_fx_krw": fx_eff, "pnl_price_krw": pnl - np.nan_to_num(fx_eff),
+        }
+    return {k: [float(x) if h and np.isfinite(x) else None for x, h in zip(v.tolist(), has)] for k, v in out.items()}
+
+
+def _pnl_python(cols, value, usd_krw_rate):
+    out = {k: [] for k in PNL_KEYS}
+    for q, px, avg, cfx, u, ok, v in zip(cols["qty"], cols["price"], cols["avg_cost"], cols["cost_fx"], cols["usd"], cols["priced"], value):
+        if avg is None or not ok:
+            for k in PNL_KEYS:
+                out[k].append(None)
+            continue
+        cost = q * avg * ((cfx if cfx is not None else usd_krw_rate) if u else 1.0)
+        pnl = v - cost
+        fx_eff = (q * px * (usd_krw_rate - cfx) if cfx is not None else None) if u else 0.0
+        out["cost_krw"].append(cost)
+        out["pnl_krw"].append(pnl)
+        out["return_pct"].append((px / avg - 1) * 100 if avg else None)
+        out["return_krw_pct"].append(pnl / cost * 100 if cost else None)
+        out["pnl_fx_krw"].append(fx_eff)
+        out["pnl_price_krw"].append(pnl - (fx_eff or 0.0))
+    return out
+
+
+def _subtotals(keys, values, extra=None):
+    out = {}
+    for k, v in zip(keys, values):
+        out[k] = out.get(k, 0) + v
+    for k, v in (extra or {}).items():
+        out[k] = out.get(k, 0) + v
+    return out
+
+
+def value_book(holdings, usd_krw_rate, us_stock_prices, kr_stock_prices):
+    """보유 종목 평가. 반환: 열 dict ("account", "symbol", "name", "qty", "currency", "price", "priced", "value_krw", "weight_pct",
+    "avg_cost", "cost_fx", "cost_fx_assumed"(default_cost_fx를 쓴 lot) + PNL_KEYS — 평단 없거나 가격 없는 lot은 None) + "cash_krw", "total_krw", "by_account"·"by_currency"(원, 현금 포함 소계)."""
+    holdings = holdings or {}
+    cash_krw = int(holdings.get("cash_krw") or 0)
+    cols = _columns(holdings, usd_krw_rate, us_stock_prices, kr_stock_prices)
+    np = common.numpy()
+    if np is not None and cols["qty"]:
+        value, total, weight = _value_numpy(np, cols, usd_krw_rate, cash_krw)
+        pnl = _pnl_numpy(np, cols, value, usd_krw_rate)
+    else:
+        value, total, weight = _value_python(cols, usd_krw_rate, cash_krw)
+        pnl = _pnl_python(cols, value, usd_krw_rate)
+    cols.update(value_krw=value, weight_pct=weight, cash_krw=cash_krw, total_krw=total, **pnl)
+    cash = {CASH_ACCOUNT: cash_krw} if cash_krw > 0 else {}
+    cols["by_account"] = _subtotals(cols["account"], value, cash)
+    cols["by_currency"] = _subtotals(cols["currency"], value, {"KRW": cash_krw} if cash_krw > 0 else {})
+    return cols
+
+
+def to_rows(book):
+    """value_book 결과 → 기존 compute_portfolio_valuation 반환값 (rows, total_krw).
+    rows: [{"account", "symbol", "currency", "name", "qty", "unit", "value_krw", "pct", "avg_cost", "cost_fx", "cost_fx_assumed", PNL_KEYS...}, ...]
+    (현금 행 symbol None·손익 None)."""
+    if not book["symbol"]:
+        return [], 0
+    total = book["total_krw"]
+    rows = []
+    if book["cash_krw"] > 0:
+        rows.append({
+            "account": CASH_ACCOUNT, "symbol": None, "currency": "KRW", "name": CASH_NAME, "qty": None, "unit": "원",
+            "value_krw": book["cash_krw"], "pct": round(100.0 * book["cash_krw"] / total, 2) if total > 0 else None,
+            "avg_cost": None, "cost_fx": None, "cost_fx_assumed": False, **dict.fromkeys(PNL_KEYS),
+        })
+    units = {}  # 단가 문자열은 (가격, 통화)당 한 번
+    pnl_cols = [book[k] for k in PNL_KEYS]
+    for i, (acct, sym, cur, name, qty, px, usd, ok, v, w) in enumerate(zip(
+            book["account"], book["symbol"], book["currency"], book["name"], book["qty"], book["price"], book["usd"],
+            book["priced"], book["value_krw"], book["weight_pct"])):
+        if not ok:
+            unit, v = PRICE_FAILED, 0
+        else:
+            unit = units.get((px, usd))
+            if unit is None:
+                unit = units[(px, usd)] = f"${px:.2f}" if usd else f"{px:,}원"
+            v = float(v) if usd else int(v)
+        rows.append({
+            "account": acct, "symbol": sym, "currency": cur, "name": name, "qty": qty, "unit": unit, "value_krw": v,
+            "pct": round(w, 2) if v > 0 and total > 0 else None,
+            "avg_cost": book["avg_cost"][i], "cost_fx": book["cost_fx"][i], "cost_fx_assumed": book["cost_fx_assumed"][i], **{k: c[i] for k, c in zip(PNL_KEYS, pnl_cols)},
+        })
+    return rows, int(total)
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""scripts/ 모듈은 패키지가 아니라 평면 모듈 (스크립트끼리 `import common`) → 테스트도 같은 경로로 임포트."""
+
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+
+def weekdays(n, end="2026-10-16"):
+    """end(포함)까지 평일 n개 ISO 날짜 (오름차순). 일봉 테스트 데이터용."""
+    out, d = [], date.fromisoformat(end)
+    while len(out) < n:
+        if d.weekday() < 5:
+            out.append(d.isoformat())
+        d -= timedelta(days=1)
+    return out[::-1]
+
+
+def history(closes, end="2026-10-16"):
+    """일봉 종가 목록 → {"dates", "close"} (end까지 평일)."""
+    return {"dates": weekdays(len(closes), end), "close": list(closes)}
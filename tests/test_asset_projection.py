@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""asset_projection: 감쇠 구간, 첫 해 부분 연도, numpy·순수 파이썬 경로 일치, 고갈 연도, 보고서 표."""
+
+from datetime import date
+
+import pytest
+
+import common
+import asset_projection as ap
+
+START = date(2026, 10, 1)
+
+
+def settings(flows, **kw):
+    s = {
+        "birth_year": 1990, "retire_age": 50, "end_age": 60, "step_years": 5,
+        "first_year_spending": {},
+        "scenarios": [{"name": "S", "desc": "테스트", "flows": flows}],
+        "withdrawal_rate": 4.0, "min_annual_withdrawal_krw": 10_000_000,
+    }
+    s.update(kw)
+    return s
+
+
+def test_resolve_decay_fills_missing_bands():
+    decay, defaulted = ap.resolve_decay({"y2034": 80, "y2035_2039": 0, "y2040_plus": "x"})
+    assert decay == {"y2034": 80.0, "y2035_2039": 75.0, "y2040_plus": 50.0}
+    assert defaulted == ["y2035_2039", "y2040_plus"]
+
+
+def test_decay_factor_bands():
+    decay = {"y2034": 90, "y2035_2039": 75, "y2040_plus": 50}
+    assert ap.decay_factor(2033, decay) == 1.0
+    assert ap.decay_factor(2034, decay) == 0.9
+    assert ap.decay_factor(2039, decay) == 0.75
+    assert ap.decay_factor(2060, decay) == 0.5
+
+
+def test_first_year_is_partial():
+    proj = ap.project(1_000_000_000, 10, settings=settings([]), start_date=START)
+    assert proj["years"][0] == 2026 and proj["months"][:2] == [3, 12]
+    sc = proj["scenarios"][0]
+    assert sc["growth"][0] == pytest.approx(1_000_000_000 * (1.1 ** 0.25 - 1))
+    assert sc["end"][0] == pytest.approx(sc["begin"][1])
+
+
+def test_numpy_and_python_paths_agree(monkeypatch):
+    s = settings([{"from_year": 2027, "monthly_krw": -3_000_000}, {"from_year": 2030, "monthly_krw": 1_000_000}])
+    with_np = ap.project(500_000_000, 12, decay={"y2034": 90, "y2035_2039": 75, "y2040_plus": 50}, settings=s, start_date=START)
+    monkeypatch.setattr(common, "numpy", lambda: None)
+    pure = ap.project(500_000_000, 12, decay={"y2034": 90, "y2035_2039": 75, "y2040_plus": 50}, settings=s, start_date=START)
+    a, b = with_np["scenarios"][0], pure["scenarios"][0]
+    for key in ("begin", "growth", "flow", "end"):
+        assert a[key] == pytest.approx(b[key])
+
+
+def test_withdrawal_stops_at_zero_and_marks_depletion():
+    proj = ap.project(100_000_000, 0, settings=settings([{"from_year": 2027, "monthly_krw": -5_000_000}]), start_date=START)
+    sc = proj["scenarios"][0]
+    assert min(sc["end"]) >= 0
+    assert sc["depleted_year"] == 2028  # 2027년 6,000만 인출 → 2028년에 남은 4,000만 소진
+
+
+def test_temporary_depletion_is_not_depletion():
+    assert ap.depleted_year([2030, 2031, 2032, 2033], [5.0, 0.0, 3.0, 0.0]) == 2033
+    assert ap.depleted_year([2030, 2031, 2032], [0.0, 0.0, 3.0]) is None
+    flows = [{"from_year": 2027, "monthly_krw": -5_000_000}, {"from_year": 2030, "monthly_krw": 2_000_000}]
+    proj = ap.project(100_000_000, 0, settings=settings(flows, retire_age=60), start_date=START)
+    sc = proj["scenarios"][0]
+    assert 0.0 in sc["end"] and sc["end"][-1] > 0  # 2028년 소진 후 추가 투자로 회복
+    assert sc["depleted_year"] is None
+
+
+def test_sub_won_residue_is_zero(monkeypatch):
+    s = settings([{"from_year": 2027, "monthly_krw": -1_000_000}])
+    for numpy in (True, False):
+        if not numpy:
+            monkeypatch.setattr(common, "numpy", lambda: None)
+        sc = ap.project(12_000_000.4, 0, settings=s, start_date=START)["scenarios"][0]
+        j = next(i for i, v in enumerate(sc["end"]) if v < 1.0)
+        assert sc["end"][j] == 0.0 and sc["depleted_year"] == 2027 + j - 1
+
+
+def test_retired_years_use_withdrawal_rule():
+    proj = ap.project(1_000_000_000, 0, settings=settings([], retire_age=36), start_date=START)
+    sc = proj["scenarios"][0]
+    j = proj["years"].index(2027)
+    assert sc["flow"][0] == pytest.approx(-10_000_000)  # 첫 해 3개월분
+    assert sc["flow"][j] == pytest.approx(-sc["begin"][j] * 0.04)  # 연초자산 × 4%
+    assert ap.independence_year(proj, sc) == 2026
+
+
+def test_format_markdown_lists_scenarios():
+    proj = ap.project(1_500_000_000, 15, start_date=START)
+    md = ap.format_markdown(proj)
+    assert "감쇠 제안 없음 → 기본값" in md
+    for sc in proj["scenarios"]:
+        assert f"**{sc['name']}**" in md
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""budget_scheduler: 회당 허용액 계산과 모델 → effort → max_output_tokens 하향 순서."""
+
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import budget_scheduler as bs
+import usage_ledger
+
+RUNS_LEFT = bs._runs_left_this_month  # 픽스처가 바꾸기 전 원래 함수
+PRICES = {"gpt-5.2-pro": (15.0, 120.0), "gpt-5.2": (1.75, 14.0), "gpt-4o": (2.5, 10.0), "gpt-3.5-turbo": (0.5, 1.5)}
+
+
+def price(provider, model):
+    return PRICES[model]
+
+
+@pytest.fixture(autouse=True)
+def ledger(tmp_path, monkeypatch):
+    path = tmp_path / ".usage_ledger.sqlite3"
+    monkeypatch.setattr(usage_ledger, "LEDGER_FILE", path)
+    monkeypatch.setattr(usage_ledger, "LEGACY_CACHE_FILE", tmp_path / ".usage_cache.json")
+    monkeypatch.setattr(bs, "_runs_left_this_month", lambda now=None: 1)
+    monkeypatch.delenv("OPENAI_MONTHLY_BUDGET", raising=False)
+    return path
+
+
+def plan(budget, monkeypatch, model="gpt-5.2", input_tokens=10_000, **kw):
+    if budget is not None:
+        monkeypatch.setenv("OPENAI_MONTHLY_BUDGET", str(budget))
+    return bs.plan_step("openai", "step3_openai", model, input_tokens, price, "run1", **kw)
+
+
+def test_runs_left_this_month(monkeypatch):
+    monkeypatch.setenv("REPORT_RUNS_PER_DAY", "2")
+    assert RUNS_LEFT(datetime(2026, 2, 27)) == 4      # 27·28일 × 2회
+    monkeypatch.setenv("REPORT_RUNS_PER_DAY", "x")
+    assert RUNS_LEFT(datetime(2026, 10, 31)) == 1
+
+
+def test_no_budget_no_schedule(monkeypatch):
+    assert plan(None, monkeypatch) is None
+    assert plan(0, monkeypatch) is None
+
+
+def test_fits_keeps_requested_model(monkeypatch):
+    chosen = plan(1.0, monkeypatch)
+    assert (chosen["model"], chosen["effort"], chosen["max_output_tokens"]) == ("gpt-5.2", None, 8000)
+    assert chosen["projected_cost"] == pytest.approx(0.0175 + 20_000 * 14 / 1e6)  # 이력 없으면 DEFAULT_OUTPUT_TOKENS
+
+
+def test_fits_caps_output_to_allowance(monkeypatch):
+    # 예상 출력(20000)은 맞지만 상한 64000까지 쓰면 허용액 초과 → 상한을 허용액 안으로
+    chosen = plan(0.5, monkeypatch, default_max_output=64_000)
+    assert chosen["model"] == "gpt-5.2" and chosen["over_budget"] is False
+    assert chosen["max_output_tokens"] == int((0.5 - 0.0175) / 14 * 1e6)
+    assert plan(10.0, monkeypatch, default_max_output=64_000)["max_output_tokens"] == 64_000
+
+
+@pytest.mark.parametrize("budget, model", [(0.25, "gpt-4o"), (0.1, "gpt-3.5-turbo")])
+def test_downgrades_model_by_price(monkeypatch, budget, model):
+    chosen = plan(budget, monkeypatch)
+    assert chosen["model"] == model and chosen["projected_cost"] <= chosen["allowance"]
+
+
+def test_never_upgrades_to_pricier_model(monkeypatch):
+    chosen = plan(0.02, monkeypatch, model="gpt-4o")
+    assert chosen["model"] == "gpt-3.5-turbo"
+    assert plan(100.0, monkeypatch, model="gpt-4o")["model"] == "gpt-4o"
+
+
+def test_lowers_effort_before_model(monkeypatch):
+    chosen = plan(0.2, monkeypatch, requested_effort="high", effort_models=("gpt-5.2",))
+    assert (chosen["model"], chosen["effort"]) == ("gpt-5.2", "medium")  # 출력 20000 × 1.0/1.6
+    chosen = plan(0.13, monkeypatch, requested_effort="high", effort_models=("gpt-5.2",))
+    assert (chosen["model"], chosen["effort"]) == ("gpt-5.2", "low")
+
+
+def test_caps_output_when_nothing_fits(monkeypatch):
+    chosen = plan(0.015, monkeypatch)
+    assert chosen["model"] == "gpt-3.5-turbo"  # 가장 싼 모델, 출력 상한을 허용액에 맞춤
+    assert chosen["max_output_tokens"] == int((0.015 - 0.005) / 1.5 * 1e6)
+    assert chosen["over_budget"] is False
+
+
+def test_floor_over_allowance_warns(monkeypatch, capsys):
+    chosen = plan(0.008, monkeypatch)
+    assert chosen["max_output_tokens"] == bs.MIN_OUTPUT_TOKENS and chosen["over_budget"] is True
+    assert chosen["projected_cost"] > chosen["allowance"]
+    out = capsys.readouterr().out
+    assert "[WARNING]" in out and "(예산 초과)" in out
+
+
+def test_allowance_from_month_to_date(monkeypatch, ledger):
+    monkeypatch.setattr(bs, "_runs_left_this_month", lambda now=None: 10)
+    usage_ledger.record_usage("earlier", "openai", "gpt-5.2", 0, 0, 40.0)
+    usage_ledger.record_usage("run1", "openai", "gpt-5.2", 0, 0, 2.0, step="cagr_openai")
+    chosen = plan(100.0, monkeypatch, steps_left=2)
+    # 실행 시작 시점 잔여 (100 - 42 + 2) / 10회 = 6, 이번 실행 사용 2 → 4, 남은 단계 2 → 2
+    assert chosen["mtd"] == pytest.approx(42.0)
+    assert chosen["allowance"] == pytest.approx(2.0)
+    conn = sqlite3.connect(str(ledger))
+    row = conn.execute("SELECT step, requested_model, model, max_output_tokens FROM schedule").fetchone()
+    conn.close()
+    assert row == ("step3_openai", "gpt-5.2", "gpt-5.2", 8000)
+
+
+def test_expected_output_from_history(monkeypatch):
+    for run in ("a", "b"):
+        usage_ledger.record_usage(run, "openai", "gpt-5.2", 10_000, 4_000, 0.0, step="step3_openai")
+    assert bs._expected_output_tokens("step3_openai", "gpt-5.2") == 4000
+    assert bs._expected_output_tokens("step3_openai", "gpt-4o") == 4000  # 같은 단계 다른 모델 평균
+    assert bs._expected_output_tokens("step1_grok", "grok-4") == bs.DEFAULT_OUTPUT_TOKENS["step1_grok"]
+    chosen = plan(0.1, monkeypatch)
+    assert chosen["model"] == "gpt-5.2" and chosen["projected_cost"] == pytest.approx(0.0175 + 0.056)
+
+
+def test_fallback_models_within_scheduled_price(monkeypatch):
+    assert bs.allowed_models("openai", "gpt-4o", price, ["gpt-5.2", "gpt-3.5-turbo"]) == ["gpt-4o", "gpt-3.5-turbo"]
+    assert bs.allowed_models("openai", "gpt-5.2", price) == ["gpt-5.2", "gpt-3.5-turbo"]  # gpt-4o는 입력 단가가 더 비쌈
+    assert plan(0.25, monkeypatch, fallback_models=["gpt-5.2-pro", "gpt-5.2"])["models"] == ["gpt-4o", "gpt-3.5-turbo"]
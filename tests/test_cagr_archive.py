@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""cagr_archive: 보고서·중간 데이터 파싱(parse_run), 구조화 출력 병합, 증분 색인."""
+
+import json
+
+import pytest
+
+import cagr_archive as ca
+
+REPORT = """# 위웨이크 주식회사 포트폴리오 보고서 (3-AI 협업)
+**작성일: 2026년 02월 03일 07시 35분 (어제 종가 기준: 2026년 02월 02일)**
+
+**성장률:** Base(Grok) 12.0% | Base(Gemini) 11.2% → GPT 세 Base 비교 후 Bear/Bull 반영해 최종 확정
+
+**사용 모델:**
+- Grok (1차 예측·초안): `grok-4-1-fast-reasoning`
+- Gemini (2차 예측·감사): `gemini-3-flash-preview`
+- OpenAI (최종 확정): `gpt-5.2`
+
+---
+
+## 최종 보고서
+
+수석 매니저 Base CAGR은 13.5%로 봅니다.
+세 Base 비교 후 최종 전략적 CAGR(계획용): **11.0%** 초안
+...
+최종 전략적 CAGR(계획용): **12.8%**
+"""
+
+
+def write_step(step_dir, name, output):
+    (step_dir / name).write_text(f"## 시스템 프롬프트\n\n예시 {{\"alpha_cagr\": 99.0}}\n\n## 출력\n{output}\n", encoding="utf-8")
+
+
+@pytest.fixture
+def reports(tmp_path):
+    (tmp_path / "portfolio_report_20260203_0735_3ai.md").write_text(REPORT, encoding="utf-8")
+    return tmp_path
+
+
+def test_parse_run_report_only(reports):
+    e = ca.parse_run(reports / "portfolio_report_20260203_0735_3ai.md")
+    assert e["key"] == "20260203_0735"
+    assert e["written"] == "2026-02-03T07:35"
+    assert e["alpha"] == 12.0
+    assert e["beta"] == 11.2
+    assert (e["final"], e["final_source"]) == (12.8, "보고서 본문")  # 마지막 언급
+    assert e["openai_base"] == 13.5
+    assert e["models"]["OpenAI (최종 확정)"] == "gpt-5.2"
+    assert e["step_dir"] is None and e["decay"] == {}
+
+
+def test_parse_run_step_outputs(reports):
+    report = reports / "portfolio_report_20260203_0735_3ai.md"
+    report.write_text(REPORT.replace("Base(Grok) 12.0%", "Base(Grok) N/A%"), encoding="utf-8")
+    d = reports / "20260203_0735"
+    d.mkdir()
+    (d / "README.md").write_text("파이프라인: `default`\n", encoding="utf-8")
+    write_step(d, "step1_grok.md", '```json\n{"alpha_cagr": 14.5, "current_total_krw": 2100000000}\n```')
+    write_step(d, "step3_openai.md", "본문\nPROJECTION: Final 12.1% | 2034 10% | 2035~2039 7.5% | 2040+ 5%\n")
+    e = ca.parse_run(report)
+    assert e["step_dir"] == "20260203_0735" and e["pipeline"] == "default"
+    assert e["alpha"] == 14.5     # 보고서 머리말이 N/A면 step1 출력 (프롬프트의 JSON 예시는 무시)
+    assert (e["final"], e["final_source"]) == (12.1, "PROJECTION")
+    assert e["decay"] == {"y2034": 10.0, "y2035_2039": 7.5, "y2040_plus": 5.0}
+
+
+def test_parse_run_projection_json(reports):
+    d = reports / "20260203_0735"
+    d.mkdir()
+    (d / "projection.json").write_text(json.dumps({"base_cagr": 13.1, "decay": {"y2034": 9.0, "other": 1}}), encoding="utf-8")
+    e = ca.parse_run(reports / "portfolio_report_20260203_0735_3ai.md")
+    assert e["final"] == pytest.approx(13.1)
+    assert (e["final_source"], e["decay"]) == ("projection.json", {"y2034": 9.0})
+
+
+def test_parse_run_unknown_name(tmp_path):
+    p = tmp_path / "notes.md"
+    p.write_text(REPORT, encoding="utf-8")
+    assert ca.run_key(p.name) is None and ca.parse_run(p) is None
+    assert ca.run_key("portfolio_report_20260123_auto.md") == "20260123_auto"
+
+
+def test_structured_overrides_regex_per_field():
+    text = '```json\n{"alpha_cagr": 14.5, "current_total_krw": 2100000000, "market_data": {"TSLA": 431}}\n```'
+    assert ca.parse_alpha_json(text, {"alpha_cagr": 15.0, "current_total_krw": None}) == (15.0, 2100000000, {"TSLA": 431})
+    assert ca.parse_beta_json("", {"beta_cagr": 11.0, "risk_level": "mid"}) == (11.0, "mid", None)
+    assert ca.parse_openai_cagr_minimal("Base: 13.5%  Final: 12.9%", {"final_cagr": 12.5}) == (13.5, 12.5)
+
+
+def test_values_kept_as_percent_numbers():
+    # 단위는 프롬프트·스키마에서 고정 (% 단위) — 파서는 작은 값도 그대로 둠
+    assert ca.parse_alpha_json('{"alpha_cagr": 0.12}')[0] == 0.12
+    assert ca.parse_beta_json("", {"beta_cagr": 1}) == (1, None, None)
+    assert (ca._cagr(0.12), ca._cagr(1), ca._cagr("N/A")) == (0.12, 1.0, None)
+
+
+def test_update_incremental(reports, tmp_path):
+    index_file = tmp_path / "cache" / "cagr_archive.json"
+    index, parsed = ca.update(reports, index_file)
+    assert parsed == 1 and list(index["runs"]) == ["20260203_0735"]
+    assert ca.update(reports, index_file)[1] == 0  # 바뀐 파일 없음 → 다시 읽지 않음
+    (reports / "portfolio_report_20260204_1016_3ai.md").write_text(
+        REPORT.replace("02월 03일 07시 35분", "02월 04일 10시 16분"), encoding="utf-8")
+    index, parsed = ca.update(reports, index_file)
+    assert parsed == 1
+    assert [e["key"] for e in ca.last_runs(5, index=index)] == ["20260204_1016", "20260203_0735"]
+    assert ca.update(reports, index_file, rebuild=True)[1] == 2
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""common: .env 로드(BOM·주석·인코딩), 키 필수 여부."""
+
+import pytest
+
+import common
+
+KEYS = ("OPENAI_API_KEY", "GROK_API_KEY", "GEMINI_API_KEY")
+
+
+@pytest.fixture
+def env_file(tmp_path, monkeypatch):
+    for k in KEYS:
+        monkeypatch.delenv(k, raising=False)
+    path = tmp_path / ".env"
+    monkeypatch.setattr(common, "ENV_FILE", path)
+    return path
+
+
+def test_load_env_reads_file(env_file):
+    env_file.write_text("\ufeffOPENAI_API_KEY=sk-o\n# GROK_API_KEY=주석\nGROK_API_KEY = xai-g \nGEMINI_API_KEY=g=1\n", encoding="utf-8")
+    assert common.load_env() == ("sk-o", "xai-g", "g=1")
+
+
+def test_missing_keys(env_file, capsys):
+    assert common.load_env(require_keys=False) == (None, None, None)
+    with pytest.raises(SystemExit):
+        common.load_env()
+    assert "OPENAI_API_KEY" in capsys.readouterr().out
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""monte_carlo: 현재 비중·μ·σ 추정, 변동성 0일 때 확정 결과, 시드 재현, 마일스톤 파싱."""
+
+from datetime import date
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import common
+import monte_carlo as mc
+
+START = date(2026, 10, 1)
+
+
+def settings(flows=()):
+    return {
+        "birth_year": 1990, "retire_age": 50, "end_age": 60, "step_years": 5,
+        "first_year_spending": {},
+        "scenarios": [{"name": "S", "desc": "테스트", "flows": list(flows)}],
+        "withdrawal_rate": 4.0, "min_annual_withdrawal_krw": 10_000_000,
+    }
+
+
+def test_portfolio_params_weights_include_cash():
+    history = {"symbols": ["A", "B"], "returns": np.array([[0.01, 0.02], [0.03, -0.01], [0.0, 0.01]]),
+               "last_krw": [1000.0, 2000.0], "months": 3}
+    holdings = {"positions": [{"symbol": "A", "qty": 300}, {"symbol": "B", "qty": 100}], "cash_krw": 500_000}
+    p = mc.portfolio_params(holdings, history)
+    assert p["start_krw"] == 1_000_000
+    assert p["weights"] == {"A": 30.0, "B": 20.0} and p["cash_pct"] == 50.0
+    assert p["mu_month"] == pytest.approx(0.3 * 0.04 / 3 + 0.2 * 0.02 / 3)
+
+
+def test_zero_volatility_is_deterministic():
+    milestones = [{"label": "낮은 목표", "year": 2030, "target_krw": 1_000_000_000},
+                  {"label": "높은 목표", "year": 2030, "target_krw": 2_000_000_000}]
+    res = mc.simulate(1_000_000_000, 0.0, 0.0, paths=100, chunk=30, settings=settings(), milestones=milestones,
+                      cagr=10, start_date=START)
+    low, high = res["scenarios"][0]["milestones"]
+    assert low["prob"] == 100.0 and high["prob"] == 0.0
+    assert low["p10"] == pytest.approx(low["p90"], rel=1e-6)
+    assert res["expected_return"] == pytest.approx(10.0)
+
+
+def test_same_seed_same_result():
+    kw = dict(paths=2000, chunk=500, settings=settings([{"from_year": 2027, "monthly_krw": -2_000_000}]), cagr=8, start_date=START)
+    a = mc.simulate(300_000_000, 0.0, 0.05, **kw)
+    b = mc.simulate(300_000_000, 0.0, 0.05, **kw)
+    assert a["scenarios"] == b["scenarios"]
+    probs = [m["prob"] for m in a["scenarios"][0]["milestones"]]
+    assert all(0 <= p <= 100 for p in probs)
+
+
+def test_simulate_without_numpy(monkeypatch):
+    monkeypatch.setattr(common, "numpy", lambda: None)
+    assert mc.simulate(1, 0.0, 0.0, paths=10, settings=settings(), start_date=START) is None
+
+
+def test_parse_milestones():
+    out = mc.parse_milestones(["2030:25", "100세:0"])
+    assert out[0] == {"label": "2030년 말 25억", "year": 2030, "target_krw": 2_500_000_000}
+    assert out[1]["year"] is None and out[1]["label"] == "100세 고갈 없음"
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""pipeline_engine: 템플릿 치환(한 번만 훑음), 기본 파이프라인 정의 검증."""
+
+import pipeline_engine as pe
+
+
+def test_render_prompt_single_pass(tmp_path):
+    (tmp_path / "t.md").write_text("{{draft}} | {{alpha}} | {{draft}} | {{unknown}}", encoding="utf-8")
+    step = {"template": "t.md", "inputs": {
+        "draft": "step1.text",
+        "alpha": {"ref": "step1.alpha_cagr", "format": "percent", "default": "(미제시)"},
+    }}
+    results = {"step1": {"text": "초안에 {{alpha}} 문자열", "data": {"alpha_cagr": 12.5}}}
+    out = pe.render_prompt(step, {}, results, prompts_dir=tmp_path)
+    # 치환된 본문 안의 {{alpha}}는 그대로, inputs에 없는 자리도 그대로
+    assert out == "초안에 {{alpha}} 문자열 | 12.5% | 초안에 {{alpha}} 문자열 | {{unknown}}"
+    assert pe.render_prompt(step, {}, {}, prompts_dir=tmp_path) == " | (미제시) |  | {{unknown}}"
+
+
+def test_bundled_pipelines_validate():
+    for name in pe.load_pipelines():
+        pe.load_pipeline(name)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""rebalance_grid: 축 파싱, 가격 없는 종목 제외, 목표 비중 매매·스윙·계좌 배분."""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import rebalance_grid as rg
+import valuation
+
+
+def book():
+    holdings = {
+        "cash_krw": 1_000_000,
+        "positions": [
+            {"account": "법인 Active", "symbol": "AAA", "qty": 60, "currency": "USD"},
+            {"account": "개인", "symbol": "AAA", "qty": 40, "currency": "USD"},
+            {"account": "개인", "symbol": "KKK", "qty": 10, "currency": "KRW"},
+            {"account": "개인", "symbol": "NOPX", "qty": 5, "currency": "USD"},
+        ],
+    }
+    return rg.build_book(holdings, 1000, {"AAA": 10.0, "KKK": 100_000})
+
+
+def test_parse_axis():
+    assert rg.parse_axis("50,55,60") == [50.0, 55.0, 60.0]
+    assert rg.parse_axis("-10:10:5") == [-10.0, -5.0, 0.0, 5.0, 10.0]
+    with pytest.raises(ValueError):
+        rg.parse_axis("0:10:0")
+
+
+def test_build_book_skips_missing_prices():
+    b = book()
+    assert b["missing"] == ["NOPX"]
+    assert [p["symbol"] for p in b["positions"]] == ["AAA", "AAA", "KKK"]
+
+
+def test_target_trade_and_weights():
+    # 총자산 = 현금 100만 + AAA 100주 × $10 × 1000원 = 100만 + KKK 100만 = 300만
+    res = rg.evaluate(book(), [0, 50], [0], [1000], [10], symbols=["AAA"])
+    assert res["symbols"] == ["AAA"] and res["cells"] == 2
+    assert res["total"][0, 0, 0] == pytest.approx(3_000_000)
+    assert res["weight_now"][0, 0, 0] == pytest.approx(1 / 3)
+    assert list(res["trade"][0, :, 0, 0]) == [-100, 50]  # 0% → 전량 매도, 50% → 150만 / 1만원
+    assert res["weight_after"][0, 1, 0, 0] == pytest.approx(0.5)
+    assert res["swing_shares"][0, 1, 0, 0, 0] == 15  # 매매 후 150주의 10%
+
+
+def test_price_and_fx_axes_move_value():
+    res = rg.evaluate(book(), [50], [-50, 0], [1000, 2000], [10], symbols=["AAA"])
+    assert res["value"][0, 0, 0] == pytest.approx(500_000)
+    assert res["value"][0, 1, 1] == pytest.approx(2_000_000)
+    assert res["total"][0, 1, 1] == pytest.approx(1_000_000 + 1_000_000 + 2_000_000)
+
+
+def test_account_trade_split_sums_to_total():
+    res = rg.evaluate(book(), [0, 50], [0], [1000], [10], symbols=["AAA"])
+    corp, personal = res["account_trade"]
+    assert corp[1, 0, 0] + personal[1, 0, 0] == res["trade"][0, 1, 0, 0]
+    assert personal[1, 0, 0] == 20  # 50주 × 40%
+    assert corp[0, 0, 0] == -60 and personal[0, 0, 0] == -40
+
+
+def test_cash_goes_to_cash_account_not_first_account():
+    holdings = {"cash_krw": 1_000_000, "positions": [
+        {"account": "개인", "symbol": "AAA", "qty": 40, "currency": "USD"},
+        {"account": valuation.CASH_ACCOUNT, "symbol": "AAA", "qty": 60, "currency": "USD"},
+    ]}
+    res = rg.evaluate(rg.build_book(holdings, 1000, {"AAA": 10.0}), [50], [0], [1000], [10], symbols=["AAA"])
+    personal, corp = res["account_weight_now"]
+    assert personal[0, 0] == pytest.approx(1.0)  # 개인 계좌는 AAA뿐
+    assert corp[0, 0] == pytest.approx(600_000 / 1_600_000)  # 현금 100만은 법인 계좌
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""3ai 스크립트 main(): 모드·종료 코드·예외와 관계없이 실행 추적 저장·메트릭 반영."""
+
+import sys
+
+import pytest
+
+import common
+import generate_portfolio_report_3ai as gen
+import run_metrics
+import run_trace
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+    monkeypatch.setattr(gen, "REPORTS_DIR", tmp_path)
+    monkeypatch.delenv(run_metrics.METRICS_ENV, raising=False)
+    monkeypatch.setattr(common, "load_env", lambda require_keys=True: ("o", "g", "m"))
+
+    def _run(*argv):
+        monkeypatch.setattr(sys, "argv", ["generate_portfolio_report_3ai.py", *argv])
+        return gen.main()
+    return _run
+
+
+def root(path):
+    return next(sp for sp in run_trace.load_jsonl(path) if sp["kind"] == "run")
+
+
+def metrics_text(tmp_path):
+    state = run_metrics.load_state(tmp_path / "metrics")
+    return run_metrics.format_prometheus(state)
+
+
+def test_mode_trace_written(run, tmp_path, monkeypatch):
+    monkeypatch.setattr(gen, "run_list_models", lambda *keys: 0)
+    assert run("--list-models") == 0
+    [path] = (tmp_path / "traces").glob("*_list_models/trace.jsonl")
+    r = root(path)
+    assert (r["status"], r["attrs"]["mode"]) == ("ok", "list_models")
+    assert 'portfolio_report_runs_total{mode="list_models",status="ok"} 1' in metrics_text(tmp_path)
+
+
+def test_exception_trace_written(run, tmp_path, monkeypatch):
+    def boom(*keys):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(gen, "run_test_models", boom)
+    with pytest.raises(RuntimeError):
+        run("--test-models")
+    [path] = (tmp_path / "traces").glob("*_test_models/trace.jsonl")
+    r = root(path)
+    assert (r["status"], r["attrs"]["error"]) == ("error", "RuntimeError")
+    assert 'portfolio_report_runs_total{mode="test_models",status="error"} 1' in metrics_text(tmp_path)
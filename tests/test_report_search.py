@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""report_search: 토큰화, 제목 단위 구절 나누기, 증분 색인·검색."""
+
+import sqlite3
+
+import pytest
+
+import report_search as rs
+
+
+def test_tokens():
+    assert rs.tokens("TSLA 감쇠 75%") == ["tsla", "감쇠", "75"]
+    assert rs.tokens("감쇠를 12.8% 적용") == ["감쇠", "쇠를", "12.8", "적용"]  # 한글 3자 이상은 2글자 단위
+    assert rs.tokens("Bear/Bull 시나리오") == ["bear", "bull", "시나", "나리", "리오"]
+    assert rs.tokens("MSTR-10x, 2034년") == ["mstr", "10", "x", "2034", "년"]
+    assert rs.tokens("— ** |") == []
+    # 질의 토큰이 색인 토큰에 포함 → 조사가 붙어도 매칭
+    assert set(rs.tokens("감쇠")) <= set(rs.tokens("감쇠를"))
+
+
+def test_fts_query():
+    assert rs._fts_query('TSLA "감쇠" tsla') == '"tsla" OR "감쇠"'
+    assert rs._fts_query("?!") is None
+
+
+def test_split_passages_headings():
+    text = "서문\n# 보고서\n## 1. 목표\n25억 원\n\n### 세부\n본문\n## 2. 시장\n환율 1,350원\n# 부록 #\n끝"
+    assert rs.split_passages(text) == [
+        (1, "", "서문"),
+        (4, "보고서 › 1. 목표", "25억 원"),
+        (7, "보고서 › 1. 목표 › 세부", "본문"),
+        (9, "보고서 › 2. 시장", "환율 1,350원"),
+        (11, "부록", "끝"),
+    ]
+    assert rs.split_passages("## 빈 제목\n\n## 다음\n내용", first_line=10) == [(13, "다음", "내용")]
+
+
+def test_split_passages_long_body():
+    para = "가" * 400
+    text = "# 제목\n" + "\n\n".join([para] * 10)
+    parts = rs.split_passages(text)
+    assert len(parts) > 1
+    assert all(h == "제목" for _, h, _ in parts)
+    assert all(len(body) <= 2 * rs.PASSAGE_CHARS + len(para) for _, _, body in parts)
+    assert "".join(body.replace("\n", "") for _, _, body in parts) == para * 10  # 빈 줄에서만 나뉘고 빠지는 내용 없음
+    lines = [line for line, _, _ in parts]
+    assert lines == sorted(lines) and text.split("\n")[lines[1] - 1] in ("", para)
+    # 빈 줄이 없어도 2배를 넘으면 나눔
+    assert len(rs.split_passages("\n".join([para] * 10))) > 1
+
+
+def test_update_and_search(tmp_path):
+    reports = tmp_path / "report"
+    reports.mkdir()
+    (reports / "portfolio_report_20260203_0735_3ai.md").write_text(
+        "# 보고서\n## TSLA 감쇠\nTSLA 2034년 감쇠를 75%로 가정\n## 현금\n법인 현금 비중 10%\n", encoding="utf-8")
+    run = reports / "20260203_0735"
+    run.mkdir()
+    (run / "step1_grok.md").write_text("## 시스템 프롬프트\nTSLA 감쇠 지시\n\n## 출력\n## 초안\nMSTR 비중 축소\n", encoding="utf-8")
+    db = tmp_path / "search.sqlite3"
+    try:
+        stats = rs.update(reports, db)
+    except sqlite3.Error:
+        pytest.skip("FTS5 없음")
+    if stats is None:
+        pytest.skip("FTS5 없음")
+    assert (stats["indexed"], stats["docs"], stats["passages"]) == (2, 2, 3)
+    assert rs.update(reports, db)["indexed"] == 0  # 변경 없음
+
+    hits = rs.search("TSLA 감쇠", k=3, path=db)
+    assert hits[0]["heading"] == "보고서 › TSLA 감쇠" and hits[0]["line"] == 3
+    assert not any("지시" in h["text"] for h in rs.search("지시", path=db))  # 프롬프트는 색인 안 함
+    step = rs.search("MSTR", kind="step", path=db)
+    assert [(h["kind"], h["run_key"], h["line"]) for h in step] == [("step1_grok", "20260203_0735", 6)]
+    assert rs.search("MSTR", kind="report", path=db) == []
+    assert rs.search("TSLA", exclude_runs=["20260203_0735"], path=db) == []
+
+    (run / "step1_grok.md").unlink()
+    stats = rs.update(reports, db)
+    assert (stats["removed"], stats["docs"]) == (1, 1)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""risk_metrics: 원화 환산 수익률 정렬, 비중·변동성·베타·VaR/CVaR·집중도, 거래일 캐시."""
+
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import risk_metrics as rm
+import swing_rules
+from conftest import history
+
+N = 121  # 수익률 120일 (MIN_DAYS보다 길게)
+
+
+def series(seed, base, vol):
+    rng = np.random.default_rng(seed)
+    return list(base * np.cumprod(1 + rng.normal(0, vol, N)))
+
+
+def fixture():
+    hist = {
+        "AAA": history(series(1, 100.0, 0.02)),
+        "KKK": history(series(2, 50_000.0, 0.01)),
+        rm.BENCHMARK: history(series(3, 500.0, 0.01)),
+        rm.FX_TICKER: history([1000.0] * N),  # 환율 고정 → 원화 수익률 = 현지 수익률
+    }
+    holdings = {"cash_krw": 1_000_000, "positions": [
+        {"symbol": "AAA", "qty": 10, "currency": "USD", "name": "에이"},
+        {"symbol": "AAA", "qty": 10, "currency": "USD"},  # 같은 종목은 합산
+        {"symbol": "KKK", "qty": 20, "currency": "KRW"},
+    ]}
+    return hist, holdings
+
+
+def test_compute_matches_numpy():
+    hist, holdings = fixture()
+    res = rm.compute(hist, holdings)
+    assert res["symbols"] == ["AAA", "KKK"] and res["names"][0] == "에이" and res["days"] == N - 1
+    krw = np.array([np.array(hist["AAA"]["close"]) * 1000, hist["KKK"]["close"]]).T
+    value = krw[-1] * [20, 20]
+    total = value.sum() + 1_000_000
+    assert res["total_krw"] == pytest.approx(total)
+    w = value / total
+    assert res["weight_pct"] == pytest.approx(list(w * 100))
+    r = krw[1:] / krw[:-1] - 1
+    bench = np.diff(hist[rm.BENCHMARK]["close"]) / hist[rm.BENCHMARK]["close"][:-1]
+    assert res["vol_pct"] == pytest.approx(list(r.std(axis=0, ddof=1) * math.sqrt(252) * 100))
+    beta = [np.cov(r[:, k], bench)[0, 1] / bench.var(ddof=1) for k in range(2)]
+    assert res["beta"] == pytest.approx(beta)
+    assert sum(res["risk_contrib_pct"]) == pytest.approx(100.0)
+    port = r @ w
+    q = np.percentile(port, 5)
+    v95 = res["portfolio"]["var"]["95"]
+    assert v95["var_pct"] == pytest.approx(-q * 100)
+    assert v95["cvar_pct"] == pytest.approx(-port[port <= q].mean() * 100)
+    assert v95["cvar_pct"] >= v95["var_pct"] and v95["var_krw"] == pytest.approx(-q * total)
+    hhi = float((np.append(w, 1_000_000 / total) ** 2).sum())
+    c = res["concentration"]
+    assert c["hhi"] == pytest.approx(hhi) and c["effective_n"] == pytest.approx(1 / hhi)
+    assert c["top"][0]["symbol"] == ("AAA" if w[0] > w[1] else "KKK")
+
+
+def test_short_or_missing_history_returns_none():
+    hist, holdings = fixture()
+    short = {s: {"dates": h["dates"][-30:], "close": h["close"][-30:]} for s, h in hist.items()}
+    assert rm.compute(short, holdings) is None
+    del hist[rm.BENCHMARK]
+    assert rm.compute(hist, holdings) is None
+
+
+def test_load_reuses_cache_for_same_trading_day(tmp_path, monkeypatch):
+    hist, holdings = fixture()
+    calls = []
+    monkeypatch.setattr(swing_rules, "load_daily_history", lambda *a, **k: calls.append(a) or hist)
+    cache = tmp_path / "risk.json"
+    first = rm.load(holdings, cache_file=cache)
+    second = rm.load(holdings, cache_file=cache)
+    assert first["cached"] is False and second["cached"] is True
+    assert second["portfolio"]["vol_pct"] == pytest.approx(first["portfolio"]["vol_pct"]) and len(calls) == 2
+    assert "포트폴리오 리스크 지표" in rm.format_for_prompt(second)
+
+
+def test_load_uses_given_history(tmp_path, monkeypatch):
+    hist, holdings = fixture()
+    symbols, years = rm.history_request(holdings)
+    assert symbols == ["AAA", "KKK", rm.BENCHMARK, rm.FX_TICKER] and years >= swing_rules.SIGNAL_HISTORY_YEARS
+    monkeypatch.setattr(swing_rules, "load_daily_history", lambda *a, **k: pytest.fail("재조회"))
+    assert rm.load(holdings, cache_file=tmp_path / "risk.json", history=hist)["cached"] is False
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""snapshot_store: 실행 기록(중복 run_id 무시), 날짜별 마지막 실행 시계열, 기존 보고서 이관 파싱."""
+
+from datetime import datetime
+
+import snapshot_store as ss
+
+TODAY = datetime(2026, 10, 19, 9, 0)
+
+
+def rows(tsla_value, cash=1_000_000):
+    return [
+        {"account": "법인 Active", "symbol": None, "currency": "KRW", "name": "현금", "value_krw": cash, "pct": 10.0},
+        {"account": "법인 Active", "symbol": "TSLA", "currency": "USD", "name": "테슬라", "qty": 10, "value_krw": tsla_value,
+         "pct": 60.0, "cost_krw": 5_000_000, "pnl_krw": tsla_value - 5_000_000},
+        {"account": "개인", "symbol": "TSLA", "currency": "USD", "name": "테슬라", "qty": 5, "value_krw": tsla_value / 2, "pct": 30.0},
+    ]
+
+
+def record(db, run_id, now, tsla_value, cagr=None):
+    return ss.record_run(run_id, rows(tsla_value), 1_000_000 + tsla_value * 1.5, 1400.0, {"TSLA": {"regular": 430.0}},
+                         cagr=cagr, now=now, path=db)
+
+
+def test_record_and_daily_series(tmp_path):
+    db = tmp_path / "snap.sqlite3"
+    assert record(db, "r1", TODAY.replace(day=18), 6_000_000, {"alpha": 12.0, "beta": None, "final": 10.5})
+    assert record(db, "r2", TODAY.replace(hour=8), 7_000_000)
+    assert record(db, "r3", TODAY, 8_000_000)
+    assert not record(db, "r3", TODAY, 9_000_000)  # 같은 run_id는 건너뜀
+    total = ss.total_series(days=7, path=db)
+    assert [(r["date"], r["run_id"]) for r in total] == [("2026-10-18", "r1"), ("2026-10-19", "r3")]
+    assert total[1]["cash_krw"] == 1_000_000 and total[1]["pnl_krw"] == 3_000_000
+    weights = ss.weight_series("TSLA", days=7, path=db)
+    assert weights[1]["qty"] == 15 and weights[1]["value_krw"] == 12_000_000 and weights[1]["pct"] == 90.0
+    assert ss.weight_series("현금", days=7, path=db)[0]["value_krw"] == 1_000_000
+    assert [r["final_cagr"] for r in ss.cagr_series(days=7, path=db)] == [10.5]
+    assert ss.quote_series("TSLA", days=7, path=db)[-1]["regular"] == 430.0
+    assert ss.recent_runs(1, path=db)[0]["run_id"] == "r3"
+
+
+def test_missing_store_is_empty(tmp_path):
+    assert ss.total_series(path=tmp_path / "none.sqlite3") == []
+
+
+def test_import_reports(tmp_path):
+    (tmp_path / "portfolio_report_20261016_0930.md").write_text(
+        "작성일: 2026년 10월 16일 09시 30분\nUSD/KRW 환율: 1,401.50원\nBase(Grok) 12.5% | Base(Gemini) N/A%\n\n"
+        "## 결론\n최종 전략적 CAGR: 11.2%\n", encoding="utf-8")
+    (tmp_path / "20261016_0930").mkdir()
+    (tmp_path / "20261016_0930" / "step1_grok.md").write_text(
+        "| 계좌 | 종목 | 수량 | 단가/환산 | 평가액(원) | 비중 |\n|---|---|---|---|---|---|\n"
+        "| 법인 Active | 현금 | - | 원 | 1,000,000 | 20.0% |\n"
+        "| 법인 Active | 테슬라 | 10 | $285.00 | 4,000,000 | 80.0% |\n\n"
+        "**총자산(API·스크립트 계산): 5,000,000원**\n\n- TSLA:\n  • 정규장: $285.00\n  • 애프터마켓: $286.10\n",
+        encoding="utf-8")
+    (tmp_path / "portfolio_report_notes.md").write_text("작성일 없음", encoding="utf-8")
+    db = tmp_path / "snap.sqlite3"
+    assert ss.import_reports(tmp_path, path=db) == (1, 0)
+    assert ss.import_reports(tmp_path, path=db) == (0, 1)
+    [run] = ss.recent_runs(path=db)
+    assert run["source"] == "report" and run["usd_krw"] == 1401.5 and run["total_krw"] == 5_000_000
+    assert (run["alpha_cagr"], run["beta_cagr"], run["final_cagr"]) == (12.5, None, 11.2)
+    item = ss.parse_report(tmp_path / "portfolio_report_20261016_0930.md", {"테슬라": "TSLA"})
+    assert [r["symbol"] for r in item["rows"]] == [None, "TSLA"]
+    assert item["us_stock_prices"] == {"TSLA": {"regular": 285.0, "post": 286.1}}
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""stress_test: config 덮어쓰기, 계좌 합산 장부, 요인·환·종목 충격 적용, 요인 그리드 분포."""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import common
+import stress_test as st
+
+
+def rows():
+    return [
+        {"account": "법인 Active", "symbol": None, "currency": "KRW", "name": "현금", "value_krw": 1_000_000},
+        {"account": "법인 Active", "symbol": "AAA", "currency": "USD", "name": "에이", "value_krw": 2_000_000},
+        {"account": "개인", "symbol": "AAA", "currency": "USD", "name": "에이", "value_krw": 1_000_000},
+        {"account": "개인", "symbol": "KKK", "currency": "KRW", "name": "케이", "value_krw": 1_000_000},
+    ]
+
+
+def settings(scenarios, grid=None):
+    return {"exposures": {"AAA": {"market": 2.0}}, "scenarios": scenarios, "grid": grid or {}}
+
+
+def test_settings_override_only_given_keys(monkeypatch):
+    monkeypatch.setattr(common, "load_config", lambda: {})
+    assert st.load_settings() == {"exposures": st.DEFAULT_EXPOSURES, "scenarios": st.DEFAULT_SCENARIOS, "grid": st.DEFAULT_GRID}
+    monkeypatch.setattr(common, "load_config", lambda: {"stress": {"exposures": {"AAA": {"market": 2.0}}}})
+    s = st.load_settings()
+    assert s["exposures"]["AAA"] == {"market": 2.0} and len(s["exposures"]) == len(st.DEFAULT_EXPOSURES) + 1
+    assert s["scenarios"] is st.DEFAULT_SCENARIOS and s["grid"] is st.DEFAULT_GRID
+
+
+def test_build_book_merges_accounts():
+    book = st.build_book(rows())
+    assert book["symbols"] == [None, "AAA", "KKK"] and book["names"] == ["현금", "에이", "케이"]
+    assert book["values"] == [1_000_000, 3_000_000, 1_000_000]
+
+
+def test_named_scenarios():
+    res = st.run(rows(), settings([
+        {"name": "Bear", "factors": {"market": -20, "kr": -10}, "fx": 10},
+        {"name": "AAA 급락", "tickers": {"AAA": -50}},
+        {"name": "폭락", "factors": {"market": -80}},
+    ]))
+    assert res["total_krw"] == 5_000_000 and res["weights"]["에이"] == pytest.approx(60.0)
+    bear, single, crash = res["scenarios"]
+    # AAA: 300만 × (1 - 2×20%) × 1.1 = 198만, KKK: 100만 × 0.9 (환 노출 없음), 현금 그대로
+    assert bear["total_krw"] == pytest.approx(1_000_000 + 1_980_000 + 900_000)
+    assert single["total_krw"] == pytest.approx(3_500_000) and single["change_pct"] == pytest.approx(-30.0)
+    assert crash["weights"]["에이"] == 0.0  # 노출도 2 × -80% → 0에서 멈춤
+    assert res["grid"] is None
+
+
+def test_grid_percentiles_and_extremes():
+    res = st.run(rows(), settings([{"name": "Base"}], {"market": "-10:10:10", "fx": "0:10:10"}))
+    g = res["grid"]
+    assert g["cells"] == 6 and list(g["axes"]) == ["market", "fx"]
+    assert g["worst"]["shocks"] == {"market": -10.0, "fx": 0.0}
+    assert g["worst"]["change_pct"] == pytest.approx(-12.0)  # 300만 × -20% / 500만
+    assert g["best"]["change_pct"] == pytest.approx((3_000_000 * 1.2 * 1.1 - 3_000_000) / 5_000_000 * 100)
+    assert "스트레스 테스트" in st.format_for_prompt(res)
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""swing_backtest: 조합 그리드 필터, 종목 × 조합 레인 백테스트 지표."""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import swing_backtest as bt
+import swing_rules as sr
+from conftest import weekdays
+
+RULES = dict(sr.DEFAULT_RULES)
+
+
+def test_build_grid_drops_unordered_levels():
+    combos = bt.build_grid({"buy1_pct": [-15.0, -25.0], "buy2_pct": [-20.0]}, RULES)
+    assert [c["buy1_pct"] for c in combos] == [-15.0]  # 1차(-25) < 2차(-20)인 조합 제외
+    assert len(bt.build_grid({}, RULES)) == 1
+
+
+def test_run_sell_high_buy_dip_recover():
+    n = RULES["high_window_days"]
+    closes = [100.0] * n + [84.0, 100.0]
+    history = {"AAA": {"dates": weekdays(len(closes)), "close": closes}}
+    res = bt.run(history, bt.build_grid({}, RULES), fee_bps=0)
+    assert res["symbols"] == ["AAA"] and res["end"] == history["AAA"]["dates"][-1]
+    assert res["bh_return"][0] == pytest.approx(0.0)
+    # 최고가에서 일부 매도 → 84에 1차 매수 → 100 복구: 같은 가격으로 돌아왔으니 보유만 한 것보다 이익
+    assert res["sells"][0, 0] == 1 and res["buys"][0, 0] == 2
+    assert res["return"][0, 0] > 0
+    assert res["mdd"][0, 0] < res["bh_mdd"][0]
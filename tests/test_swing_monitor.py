@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""swing_monitor: 단계가 바뀔 때만 알림 (기준가 근처 등락·매수 전 복구 알림 없음)."""
+
+import swing_monitor as mon
+import swing_rules as sr
+from conftest import history
+
+RULES = dict(sr.DEFAULT_RULES)
+TODAY = "2026-10-19"
+
+
+def tick(st, price, day=TODAY, session="regular"):
+    alerts, _ = mon.on_tick(st, price, day, session, RULES)
+    return alerts
+
+
+def test_seed_stage_from_replay():
+    st = mon.seed_state("TSLA", "USD", history([100.0] * 70), RULES, TODAY)
+    assert st["stage"] == 1  # 최고가 근처 → 현금 확보
+    assert st["prior_high"] == 100.0
+    # today 이후 봉은 진행 중으로 보고 제외
+    h = history([100.0] * 70 + [84.0], end=TODAY)
+    assert mon.seed_state("TSLA", "USD", h, RULES, TODAY)["stage"] == 1
+
+
+def test_alerts_only_on_stage_change():
+    st = mon.seed_state("TSLA", "USD", history([100.0] * 70), RULES, TODAY)
+    assert tick(st, 95.0) == []             # 매수 전 복구 없음
+    assert tick(st, 99.0) == []             # 이미 현금 확보 → 재매도 없음
+    [a] = tick(st, 84.0)
+    assert (a["alert"], a["triggers"], a["stage"]) == (sr.SIGNAL_BUY1, ["buy1"], sr.STAGES[2])
+    assert tick(st, 86.0) == [] and tick(st, 84.0) == []  # 같은 기준 재돌파
+    [a] = tick(st, 79.0)
+    assert (a["alert"], a["triggers"], a["stage"]) == (sr.SIGNAL_BUY2, ["buy2"], sr.STAGES[3])
+    [a] = tick(st, 95.0)
+    assert (a["alert"], a["triggers"], a["stage"]) == (sr.SIGNAL_RECOVERY, ["recovery"], sr.STAGES[0])
+    [a] = tick(st, 99.0)
+    assert (a["alert"], a["triggers"], a["stage"]) == (sr.SIGNAL_SELL, ["sell"], sr.STAGES[1])
+    assert st["stage"] == 1
+
+
+def test_sell_price_and_rsi_one_alert():
+    closes = [50.0 + i * 0.5 for i in range(120)]  # 꾸준한 상승 → 주봉 RSI 100
+    st = mon.seed_state("TSLA", "USD", history(closes), RULES, TODAY)
+    st["stage"] = 0
+    alerts = tick(st, closes[-1] + 1)
+    assert len(alerts) == 1
+    assert alerts[0]["alert"] == sr.SIGNAL_SELL and alerts[0]["triggers"] == ["sell", "rsi"]
+    assert tick(st, closes[-1] + 2) == []
+    line = mon.format_alert(alerts[0], "USD", "2026-10-19 10:00")
+    assert "기준가" in line and "주봉 RSI" in line and "→ 현금 확보" in line
+
+
+def test_new_day_rolls_close_into_high():
+    st = mon.seed_state("TSLA", "USD", history([100.0] * 70), RULES, "2026-10-16")
+    tick(st, 110.0, day="2026-10-16")
+    tick(st, 108.0, day="2026-10-19")  # 다음 날 첫 틱 → 전일 정규장 종가가 최고가 창에 들어감
+    assert st["prior_high"] == 110.0
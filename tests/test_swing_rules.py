@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""swing_rules: 기준가·단계별 조건(단계 게이트)·신호 판정·기준 돌파·단계 재생·주봉 RSI."""
+
+import math
+
+import pytest
+
+import swing_rules as sr
+from conftest import weekdays
+
+RULES = dict(sr.DEFAULT_RULES)
+NAN = float("nan")
+
+
+def test_thresholds():
+    th = sr.thresholds(100.0, RULES)
+    assert th == pytest.approx({"sell": 98.0, "buy1": 85.0, "buy2": 80.0, "recovery": 90.0})
+
+
+@pytest.mark.parametrize("price, key, stages", [
+    (99.0, "sell", {0}),           # 매도는 대기에서만
+    (84.0, "buy1", {1}),           # 1차 매수는 현금 확보 후에만
+    (79.0, "buy2", {1, 2}),        # 2차 매수는 현금 확보·1차 매수 후
+    (95.0, "recovery", {2, 3}),    # 복구는 매수 후에만
+])
+def test_conditions_stage_gating(price, key, stages):
+    for stage in range(4):
+        c = sr.conditions(price, 100.0, 50.0, stage, RULES)
+        assert bool(c[key]) == (stage in stages), (key, stage)
+
+
+def test_conditions_rsi_sell():
+    assert sr.conditions(90.0, 100.0, 80.0, 0, RULES)["sell"]
+    assert not sr.conditions(90.0, 100.0, 70.0, 0, RULES)["sell"]
+    assert not sr.conditions(90.0, 100.0, NAN, 0, RULES)["sell"]  # RSI 계산 불가면 RSI 조건은 거짓
+    assert not sr.conditions(90.0, 100.0, 80.0, 1, RULES)["sell"]
+
+
+def test_conditions_numpy_matches_scalar():
+    np = pytest.importorskip("numpy")
+    stages = np.array([0, 1, 2, 3])
+    for price in (99.0, 95.0, 84.0, 79.0):
+        arr = sr.conditions(price, 100.0, 50.0, stages, RULES)
+        for key, values in arr.items():
+            assert values.tolist() == [bool(sr.conditions(price, 100.0, 50.0, s, RULES)[key]) for s in range(4)]
+    # 파라미터 조합 배열 (백테스트)
+    rules = dict(RULES, buy1_pct=np.array([-15.0, -10.0]))
+    assert sr.conditions(88.0, 100.0, 50.0, 1, rules)["buy1"].tolist() == [False, True]
+
+
+def test_evaluate_signal_position_only():
+    assert sr.evaluate_signal(99.0, 100.0, None, RULES) == (sr.SIGNAL_SELL, None)
+    assert sr.evaluate_signal(84.0, 100.0, None, RULES) == (sr.SIGNAL_BUY1, None)
+    assert sr.evaluate_signal(79.0, 100.0, None, RULES) == (sr.SIGNAL_BUY2, None)
+    assert sr.evaluate_signal(95.0, 100.0, None, RULES) == (sr.SIGNAL_HOLD, None)
+
+
+def test_evaluate_signal_with_stage():
+    assert sr.evaluate_signal(99.0, 100.0, 50.0, RULES, stage=0) == (sr.SIGNAL_SELL, 1)
+    assert sr.evaluate_signal(99.0, 100.0, 50.0, RULES, stage=1) == (sr.SIGNAL_HOLD, 1)  # 복구 전 재매도 없음
+    assert sr.evaluate_signal(84.0, 100.0, 50.0, RULES, stage=1) == (sr.SIGNAL_BUY1, 2)
+    assert sr.evaluate_signal(79.0, 100.0, 50.0, RULES, stage=1) == (sr.SIGNAL_BUY2, 3)  # 1·2차 함께
+    assert sr.evaluate_signal(95.0, 100.0, 50.0, RULES, stage=1) == (sr.SIGNAL_HOLD, 1)  # 매수 전 복구 없음
+    assert sr.evaluate_signal(95.0, 100.0, 50.0, RULES, stage=3) == (sr.SIGNAL_RECOVERY, 0)
+    assert sr.evaluate_signal(84.0, 100.0, None, RULES, stage=0) == (sr.SIGNAL_HOLD, 0)
+
+
+@pytest.mark.parametrize("prev, price, prev_rsi, rsi, expected", [
+    (None, 99.0, None, 50.0, []),
+    (97.0, 99.0, 50.0, 50.0, [(sr.SIGNAL_SELL, "sell")]),
+    (99.0, 99.5, 50.0, 50.0, []),                            # 이미 위에 있으면 돌파 아님
+    (90.0, 91.0, 70.0, 80.0, [(sr.SIGNAL_SELL, "rsi")]),
+    (90.0, 91.0, None, 80.0, []),
+    (86.0, 84.0, 50.0, 50.0, [(sr.SIGNAL_BUY1, "buy1")]),
+    (86.0, 79.0, 50.0, 50.0, [(sr.SIGNAL_BUY1, "buy1"), (sr.SIGNAL_BUY2, "buy2")]),
+    (89.0, 91.0, 50.0, 50.0, [(sr.SIGNAL_RECOVERY, "recovery")]),
+])
+def test_crossings(prev, price, prev_rsi, rsi, expected):
+    assert sr.crossings(prev, price, prev_rsi, rsi, 100.0, RULES) == expected
+
+
+def test_replay_stage():
+    n = RULES["high_window_days"]
+    flat = [100.0] * n
+    assert sr.replay_stage(weekdays(n - 1), flat[:-1], RULES) == 0  # 창이 차기 전엔 판정 없음
+    for tail, stage in (([], 1), ([84.0], 2), ([84.0, 79.0], 3), ([79.0], 3), ([84.0, 95.0], 0), ([84.0, 95.0, 99.0], 1)):
+        closes = flat + tail
+        assert sr.replay_stage(weekdays(len(closes)), closes, RULES) == stage, tail
+
+
+def test_weekly_rsi_series_matches_seed():
+    closes = [100.0 + 5 * math.sin(i / 3) for i in range(120)]
+    dates = weekdays(len(closes))
+    series = sr.weekly_rsi_series(dates, closes, 14)
+    # 마지막 날 값 = 완료 주 종가로 만든 상태 + 그날 종가 (모니터 초기화 방식)
+    weeks = {}
+    for d, c in zip(dates, closes):
+        weeks[sr.week_key(d)] = c
+    last = sr.week_key(dates[-1])
+    state = sr.rsi_seed([weeks[k] for k in sorted(weeks) if k < last], 14)
+    assert series[-1] == pytest.approx(sr.rsi_with(state, closes[-1], 14))
+    assert math.isnan(series[0])
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""swing_scanner: 종목 축 벡터화 결과가 swing_rules 단일 종목 계산(모니터·보고서와 같은 정의)과 일치."""
+
+import math
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import swing_rules as sr
+import swing_scanner as sc
+from conftest import history
+
+RULES = dict(sr.DEFAULT_RULES)
+NOW = datetime(2026, 10, 19, 15, 0, tzinfo=timezone.utc)  # 뉴욕 10/19 오전, 서울 10/20 새벽
+
+
+def wave(n, base, amp):
+    return [base + amp * math.sin(i / 4) + i * 0.05 for i in range(n)]
+
+
+def expected(h, price, today):
+    """한 종목 기준값 (swing_monitor.seed_state와 같은 방식)."""
+    dates = [d for d in h["dates"] if d < today]
+    closes = h["close"][:len(dates)]
+    high = max(max(closes[-(RULES["high_window_days"] - 1):]), price)
+    weeks = {}
+    for d, c in zip(dates, closes):
+        if sr.week_key(d) < sr.week_key(today):
+            weeks[sr.week_key(d)] = c
+    state = sr.rsi_seed([weeks[k] for k in sorted(weeks)], RULES["rsi_period"])
+    return high, sr.rsi_with(state, price, RULES["rsi_period"])
+
+
+def test_scan_matches_single_symbol_rules():
+    hist = {"AAA": history(wave(300, 100.0, 8.0)), "BBB": history(wave(200, 50.0, 2.0)),
+            "005930.KS": history(wave(300, 70_000.0, 3_000.0))}
+    prices = {"AAA": 90.0, "005930.KS": 72_000.0}  # BBB는 현재가 없음 → 마지막 종가
+    rows = sc.scan(hist, RULES, prices, {"AAA": "USD", "BBB": "USD", "005930.KS": "KRW"}, now=NOW)
+    assert [r["symbol"] for r in rows] == list(hist)
+    for r in rows:
+        h = hist[r["symbol"]]
+        price = prices.get(r["symbol"], h["close"][-1])
+        today = "2026-10-20" if r["currency"] == "KRW" else "2026-10-19"
+        high, rsi = expected(h, price, today)
+        assert r["price"] == price and r["high"] == pytest.approx(high)
+        assert r["rsi"] == pytest.approx(round(rsi, 1))
+        assert r["buy1"] == pytest.approx(high * (1 + RULES["buy1_pct"] / 100))
+        assert r["signal"] == sr.evaluate_signal(price, high, rsi, RULES)[0]
+    assert rows[1]["price_source"].endswith("종가")
+
+
+def test_short_history_has_no_rsi():
+    rows = sc.scan({"NEW": history([10.0, 11.0, 12.0])}, RULES, {"NEW": 12.5}, {"NEW": "USD"}, now=NOW)
+    assert rows[0]["rsi"] is None and rows[0]["high"] == 12.5
+
+
+def test_format_for_prompt_marks_sleeve():
+    rows = sc.scan({"TSLA": history(wave(100, 400.0, 20.0))}, RULES, {"TSLA": 410.0}, {"TSLA": "USD"}, now=NOW)
+    text = sc.format_for_prompt(rows, RULES, sleeve=["TSLA"], names={"TSLA": "테슬라"})
+    assert "| ★ 테슬라 | $410.00 |" in text
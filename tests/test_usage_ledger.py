@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""usage_ledger: 원장 기록·월/모델/실행/단계별 집계, 기존 .usage_cache.json 이관."""
+
+import json
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import usage_ledger as ul
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return tmp_path / "ledger.sqlite3"
+
+
+def set_ts(path, run_id, ts):
+    conn = sqlite3.connect(str(path))
+    with conn:
+        conn.execute("UPDATE usage SET ts = ? WHERE run_id = ?", (ts, run_id))
+    conn.close()
+
+
+def test_month_key():
+    assert ul.month_key(datetime(2026, 2, 3, 7, 35)) == "2026-02"
+
+
+def test_empty_ledger(ledger):
+    assert ul.month_totals(path=ledger) == {}
+    assert ul.recent_runs(path=ledger) == []
+    assert not ledger.exists()  # 조회만으로는 원장을 만들지 않음
+
+
+def test_record_and_totals(ledger):
+    ul.record_usage("r1", "openai", "gpt-5.2", 1000, 500, 0.02, step="step3_openai", latency_s=12.5, path=ledger)
+    ul.record_usage("r1", "grok", "grok-4", 800, 300, 0.01, step="step1_grok", latency_s=4.0, path=ledger)
+    ul.record_usage("r2", "openai", "gpt-5.2", 3000, 700, 0.04, step="step3_openai", latency_s=None, path=ledger)
+    ul.record_usage("r2", "openai", None, None, None, None, path=ledger)  # 빈 값은 0·unknown
+
+    totals = ul.month_totals(path=ledger)
+    assert totals["openai"]["inp"] == 4000 and totals["openai"]["out"] == 1200
+    assert totals["openai"]["cost"] == pytest.approx(0.06)
+    assert totals["grok"] == {"inp": 800, "out": 300, "cost": pytest.approx(0.01)}
+    assert ul.month_totals("2020-01", path=ledger) == {}
+
+    models = ul.model_totals(path=ledger)
+    assert [(m["provider"], m["model"], m["calls"]) for m in models] == [("openai", "gpt-5.2", 2), ("grok", "grok-4", 1), ("openai", "unknown", 1)]
+    assert {(r["provider"], r["calls"]) for r in ul.run_totals("r1", path=ledger)} == {("openai", 1), ("grok", 1)}
+
+    steps = {r["step"]: r for r in ul.step_stats(path=ledger)}
+    assert set(steps) == {"step1_grok", "step3_openai"}  # 단계 없는 행 제외
+    assert steps["step3_openai"]["avg_inp"] == 2000 and steps["step3_openai"]["avg_latency_s"] == 12.5
+
+
+def test_recent_runs_and_last_runs(ledger):
+    for run, inp in (("old", 100), ("mid", 200), ("new", 300)):
+        ul.record_usage(run, "openai", "gpt-5.2", inp, 10, 0.001, step="step3_openai", path=ledger)
+    set_ts(ledger, "old", "2026-01-01T00:00:00")
+    set_ts(ledger, "mid", "2026-01-02T00:00:00")
+    set_ts(ledger, "new", "2026-01-03T00:00:00")
+    assert [r["run_id"] for r in ul.recent_runs(2, path=ledger)] == ["new", "mid"]
+    [s] = ul.step_stats(last_runs=2, path=ledger)
+    assert s["calls"] == 2 and s["avg_inp"] == 250
+
+
+def test_legacy_cache_import(tmp_path, monkeypatch):
+    legacy = tmp_path / ".usage_cache.json"
+    legacy.write_text(json.dumps({
+        "2026-01": {"openai": {"inp": 1000, "out": 200, "cost": 1.5}, "grok": {"inp": 0, "out": 0, "cost": 0}},
+        "2026-02": {"gemini": {"inp": 10, "out": 5, "cost": 0.1}},
+    }), encoding="utf-8")
+    ledger = tmp_path / ".usage_ledger.sqlite3"
+    monkeypatch.setattr(ul, "LEGACY_CACHE_FILE", legacy)
+    monkeypatch.setattr(ul, "LEDGER_FILE", ledger)
+    ul.connect().close()
+    ul.connect().close()  # 두 번째 연결은 다시 이관하지 않음
+    assert ul.month_totals("2026-01") == {"openai": {"inp": 1000, "out": 200, "cost": 1.5}}
+    assert ul.month_totals("2026-02")["gemini"]["cost"] == pytest.approx(0.1)
+    assert ul.recent_runs() == []  # 이관 행은 실행 목록에서 제외
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""valuation: 열 단위 평가(numpy·순수 파이썬)가 기존 compute_portfolio_valuation(종목별 스칼라 계산)과 같은 행을 내는지."""
+
+import pytest
+
+import common
+import valuation
+
+LEGACY_KEYS = ("account", "name", "qty", "unit", "value_krw", "pct")
+
+
+def legacy_valuation(holdings, usd_krw_rate, us_stock_prices, kr_stock_prices):
+    """valuation.py 도입 전 generate_portfolio_report_3ai.compute_portfolio_valuation (비교 기준)."""
+    if not holdings or not holdings.get("positions"):
+        return [], 0
+    cash_krw = int(holdings.get("cash_krw") or 0)
+    total_krw = cash_krw
+    rows = []
+    if cash_krw > 0:
+        rows.append({"account": "법인 Active", "name": "현금", "qty": None, "unit": "원", "value_krw": cash_krw, "pct": None})
+    for pos in holdings["positions"]:
+        symbol = pos.get("symbol") or ""
+        qty = int(pos.get("qty") or 0)
+        currency = (pos.get("currency") or "USD").upper()
+        value_krw = 0
+        if currency == "USD":
+            price_usd = valuation.best_usd_price(us_stock_prices.get(symbol)) if us_stock_prices else None
+            if price_usd is not None and usd_krw_rate:
+                value_krw = round(qty * price_usd * usd_krw_rate, 0)
+                unit = f"${price_usd:.2f}"
+            else:
+                unit = "(가격 조회 실패)"
+        else:
+            price_krw = kr_stock_prices.get(symbol) if kr_stock_prices else None
+            if price_krw is not None:
+                value_krw = qty * int(price_krw)
+                unit = f"{int(price_krw):,}원"
+            else:
+                unit = "(가격 조회 실패)"
+        total_krw += value_krw
+        rows.append({"account": pos.get("account") or "", "name": pos.get("name") or symbol, "qty": qty, "unit": unit,
+                     "value_krw": value_krw, "pct": None})
+    if total_krw > 0:
+        for r in rows:
+            if r["value_krw"] and r["value_krw"] > 0:
+                r["pct"] = round(100.0 * r["value_krw"] / total_krw, 2)
+    return rows, int(total_krw)
+
+
+HOLDINGS = {
+    "cash_krw": 12_345_678,
+    "positions": [
+        {"account": "법인 Active", "symbol": "TSLA", "qty": 120, "currency": "USD", "avg_cost": 210.5, "cost_fx": 1320.0},
+        {"account": "개인 연금", "symbol": "TSLA", "qty": 35.0, "currency": "USD", "avg_cost": 250.0},
+        {"account": "법인 Active", "symbol": "MSTR", "qty": 40, "currency": "USD", "name": "MicroStrategy"},
+        {"account": "법인 Active", "symbol": "PLTR", "qty": 300},                       # 통화 생략 → USD, 애프터 가격만
+        {"account": "개인 연금", "symbol": "NVDA", "qty": 10, "currency": "usd"},        # 시세 없음
+        {"account": "개인 연금", "symbol": "360750.KS", "qty": 77, "currency": "KRW", "avg_cost": 18000},
+        {"account": "개인 연금", "symbol": "005930.KS", "qty": 5, "currency": "KRW"},    # 시세 없음
+    ],
+}
+US = {"TSLA": {"regular": 431.17, "post": 433.0}, "MSTR": {"regular": 312.555}, "PLTR": {"regular": None, "post": 178.31},
+      "NVDA": {}}
+KR = {"360750.KS": 21435.0}
+
+
+@pytest.fixture(params=["numpy", "python"])
+def engine(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+        monkeypatch.setattr(common, "_NUMPY", {"module": None, "checked": False})
+    else:
+        monkeypatch.setattr(common, "_NUMPY", {"module": None, "checked": True})
+    return request.param
+
+
+def rows_of(holdings, fx, us, kr):
+    rows, total = valuation.to_rows(valuation.value_book(holdings, fx, us, kr))
+    return [{k: r[k] for k in LEGACY_KEYS} for r in rows], total
+
+
+@pytest.mark.parametrize("fx", [1387.25, None])
+def test_rows_match_legacy(engine, fx):
+    rows, total = rows_of(HOLDINGS, fx, US, KR)
+    legacy_rows, legacy_total = legacy_valuation(HOLDINGS, fx, US, KR)
+    assert total == legacy_total
+    assert rows == legacy_rows
+    # 값 타입도 같아야 프롬프트 표 문자열이 같음 (USD 평가액 float, KRW int)
+    assert [type(r["value_krw"]) for r in rows] == [type(r["value_krw"]) for r in legacy_rows]
+
+
+def test_no_cash_no_prices(engine):
+    holdings = {"positions": HOLDINGS["positions"][:2]}
+    assert rows_of(holdings, 1387.25, {}, {}) == legacy_valuation(holdings, 1387.25, {}, {})
+    assert valuation.to_rows(valuation.value_book({}, 1387.25, US, KR)) == legacy_valuation({}, 1387.25, US, KR)
+
+
+def test_subtotals(engine):
+    book = valuation.value_book(HOLDINGS, 1400.0, US, KR)
+    assert sum(book["by_account"].values()) == pytest.approx(book["total_krw"])
+    assert book["by_currency"]["KRW"] == HOLDINGS["cash_krw"] + 77 * 21435
+    assert book["by_currency"]["USD"] == pytest.approx((155 * 431.17 + 40 * 312.555 + 300 * 178.31) * 1400.0)
+
+
+def test_pnl(engine):
+    fx = 1400.0
+    rows, _ = valuation.to_rows(valuation.value_book(HOLDINGS, fx, US, KR))
+    tsla = rows[1]
+    assert tsla["cost_krw"] == pytest.approx(120 * 210.5 * 1320.0)
+    assert tsla["pnl_fx_krw"] == pytest.approx(120 * 431.17 * (fx - 1320.0))
+    assert tsla["pnl_price_krw"] + tsla["pnl_fx_krw"] == pytest.approx(tsla["pnl_krw"])
+    assert rows[2]["cost_krw"] == pytest.approx(35 * 250.0 * fx) and rows[2]["pnl_fx_krw"] is None  # cost_fx 없으면 환율 효과 모름
+    kr = rows[6]
+    assert kr["pnl_fx_krw"] == 0.0 and kr["return_pct"] == pytest.approx((21435 / 18000 - 1) * 100)
+    assert rows[0]["pnl_krw"] is None and rows[3]["pnl_krw"] is None and rows[5]["pnl_krw"] is None
+
+
+def test_default_cost_fx_is_assumed(engine):
+    fx = 1400.0
+    rows, _ = valuation.to_rows(valuation.value_book(dict(HOLDINGS, default_cost_fx=1465), fx, US, KR))
+    tsla, tsla2, kr = rows[1], rows[2], rows[6]
+    assert (tsla["cost_fx"], tsla["cost_fx_assumed"]) == (1320.0, False)  # lot별 cost_fx 우선
+    assert (tsla2["cost_fx"], tsla2["cost_fx_assumed"]) == (1465.0, True)
+    assert tsla2["cost_krw"] == pytest.approx(35 * 250.0 * 1465) and tsla2["pnl_fx_krw"] == pytest.approx(35 * 431.17 * (fx - 1465))
+    assert (kr["cost_fx"], kr["cost_fx_assumed"], kr["pnl_fx_krw"]) == (None, False, 0.0)